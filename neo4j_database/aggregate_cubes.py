@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+论文聚合立方体（趋势看板用）
+按 年份 × 任务 × 模态 × 解剖结构 预先计算论文数，看板查询不再对全图做 Cypher 聚合。
+
+- 维度取自 Paper 节点的 year 和 ADDRESSES_TASK / USES_MODALITY / FOCUSES_ON_STRUCTURE 关系；
+  一篇论文可以有多个任务、模态、解剖结构，没有取值时计入“未知”成员（None）
+- 对维度的每个子集（共 16 个 cuboid）分别计算去重后的论文数，
+  因此上卷（如只按年份）不会把有多个模态的论文重复计数
+- 分组用 numpy 完成：关系按论文做向量化连接，组合键编码为整数后 np.unique 去重、np.bincount 计数
+- 单元数超过 MAX_CUBE_CELLS 的 cuboid 改为稀疏存储（只保存非零单元的坐标和计数），查询结果不变
+- 结果写入一个紧凑的二进制文件，以内存映射方式读取，单个查询是几次字典查找和数组索引（微秒级）
+
+文件格式（小端）：
+    头部 32 字节：magic、版本、索引 JSON 字节数、数据区偏移
+    索引 JSON：维度成员、各 cuboid 的偏移和形状、论文总数
+    数据区：各 cuboid 的 uint32 稠密数组（按 DIMENSIONS 顺序的轴，64 字节对齐）；
+            稀疏 cuboid 为非零单元的 uint64 扁平坐标数组和 uint32 计数数组（各自 64 字节对齐）
+
+用法:
+    python aggregate_cubes.py --build                                # 从 csv/ 构建 csv/paper_cubes.bin
+    python aggregate_cubes.py --info
+    python aggregate_cubes.py --group-by year --filter task=分割
+    python aggregate_cubes.py --group-by task modality --filter year=2018:2022
+"""
+
+import os
+import csv
+import json
+import mmap
+import time
+import struct
+import argparse
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from csv_layout import relation_csv_name
+
+CUBE_MAGIC = b'KGCUBE01'
+CUBE_VERSION = 2
+# 可以读取的文件版本（版本 1 没有稀疏 cuboid）
+READABLE_VERSIONS = (1, 2)
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 32
+DATA_ALIGNMENT = 64
+CUBE_FILE_NAME = 'paper_cubes.bin'
+
+# 维度：名称 -> (节点类型, 关系类型)；year 取自 Paper 节点
+DIMENSIONS = ['year', 'task', 'modality', 'structure']
+DIMENSION_SOURCES = {
+    'task': ('Task', 'ADDRESSES_TASK'),
+    'modality': ('ImagingModality', 'USES_MODALITY'),
+    'structure': ('AnatomicalStructure', 'FOCUSES_ON_STRUCTURE'),
+}
+
+# 稠密存储的 cuboid 单元数上限（uint32 数组，约 200 MB），超过时改为稀疏存储
+MAX_CUBE_CELLS = 50_000_000
+
+
+def cuboid_key(dims: Sequence[str]) -> str:
+    """cuboid 名称：按 DIMENSIONS 顺序排列的维度，用逗号连接（空字符串为总数）"""
+    return ','.join(dim for dim in DIMENSIONS if dim in dims)
+
+
+def read_dimension_edges(csv_dir: str, paper_index: Dict[str, int], node_type: str,
+                         rel_type: str) -> Tuple[np.ndarray, np.ndarray, list]:
+    """读取一个维度的 (论文序号, 成员编号) 关系，返回 论文数组, 成员编号数组, 成员列表"""
+    names = {}
+    node_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+    if os.path.exists(node_file):
+        with open(node_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                names[row['id']] = row.get('name', '')
+
+    members: List[Optional[str]] = [None]
+    codes = {}
+    papers, values = [], []
+    rel_file = os.path.join(csv_dir, relation_csv_name(rel_type))
+    if os.path.exists(rel_file):
+        with open(rel_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                paper = paper_index.get(row['from_id'])
+                name = names.get(row['to_id'])
+                if paper is None or not name:
+                    continue
+                code = codes.get(name)
+                if code is None:
+                    code = codes[name] = len(members)
+                    members.append(name)
+                papers.append(paper)
+                values.append(code)
+    return np.array(papers, dtype=np.int64), np.array(values, dtype=np.int64), members
+
+
+def with_unknown(papers: np.ndarray, values: np.ndarray, paper_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """去掉重复关系，按论文排序，并为没有该维度取值的论文补一行“未知”（编码 0）"""
+    width = values.max(initial=0) + 1
+    pairs = np.unique(papers * width + values)
+    papers, values = pairs // width, pairs % width
+    missing = np.setdiff1d(np.arange(paper_count, dtype=np.int64), papers, assume_unique=True)
+    papers = np.concatenate([papers, missing])
+    values = np.concatenate([values, np.zeros(len(missing), dtype=np.int64)])
+    order = np.argsort(papers, kind='stable')
+    return papers[order], values[order]
+
+
+def join_on_paper(left_papers: np.ndarray, left_columns: List[np.ndarray],
+                  right_papers: np.ndarray, right_values: np.ndarray,
+                  paper_count: int) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """按论文做向量化连接（两边都按论文排序，且每篇论文至少一行）"""
+    right_counts = np.bincount(right_papers, minlength=paper_count)
+    right_starts = np.concatenate([[0], np.cumsum(right_counts)[:-1]])
+    repeats = right_counts[left_papers]
+    left_index = np.repeat(np.arange(len(left_papers)), repeats)
+    block_starts = np.repeat(np.cumsum(repeats) - repeats, repeats)
+    right_index = right_starts[left_papers[left_index]] + (np.arange(len(left_index)) - block_starts)
+    columns = [column[left_index] for column in left_columns] + [right_values[right_index]]
+    return left_papers[left_index], columns
+
+
+def build_cubes(csv_dir: str, max_cells: int = MAX_CUBE_CELLS) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """从 CSV 构建所有 cuboid，返回 (索引信息, cuboid 名称 -> 计数)
+
+    计数为稠密数组；单元数超过 max_cells 的 cuboid 为 SparseCuboid。
+    """
+    paper_index = {}
+    years = []
+    with open(os.path.join(csv_dir, 'nodes_Paper.csv'), 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            paper_index[row['id']] = len(paper_index)
+            year = row.get('year', '')
+            years.append(int(year) if year and year.isdigit() else 0)
+    paper_count = len(paper_index)
+
+    year_values = np.array(years, dtype=np.int64)
+    year_members: List[Optional[int]] = [None] + sorted(set(years) - {0})
+    year_codes = np.searchsorted(np.array([0] + year_members[1:], dtype=np.int64), year_values)
+
+    members = {'year': year_members}
+    papers = np.arange(paper_count, dtype=np.int64)
+    columns = [year_codes]
+    for dim in DIMENSIONS[1:]:
+        node_type, rel_type = DIMENSION_SOURCES[dim]
+        dim_papers, dim_values, dim_members = read_dimension_edges(csv_dir, paper_index, node_type, rel_type)
+        dim_papers, dim_values = with_unknown(dim_papers, dim_values, paper_count)
+        papers, columns = join_on_paper(papers, columns, dim_papers, dim_values, paper_count)
+        members[dim] = dim_members
+
+    shape = [len(members[dim]) for dim in DIMENSIONS]
+    cuboids = {}
+    for size in range(len(DIMENSIONS) + 1):
+        for dims in combinations(range(len(DIMENSIONS)), size):
+            dims_shape = [shape[d] for d in dims]
+            cells = int(np.prod(dims_shape, dtype=object)) if dims else 1
+            key = cuboid_key([DIMENSIONS[d] for d in dims])
+            cell = np.zeros(len(papers), dtype=np.uint64)
+            for d in dims:
+                cell = cell * np.uint64(shape[d]) + columns[d].astype(np.uint64)
+            if cells <= max_cells:
+                # 同一论文在同一单元只计一次
+                distinct = np.unique(papers * cells + cell.astype(np.int64))
+                counts = np.bincount(distinct % cells, minlength=cells).astype(np.uint32)
+                cuboids[key] = counts.reshape(dims_shape)
+            else:
+                print(f"⚠️  cuboid [{key}] 有 {cells} 个单元（上限 {max_cells}），改为稀疏存储")
+                distinct = np.unique(np.column_stack([cell, papers.astype(np.uint64)]), axis=0)
+                coords, counts = np.unique(distinct[:, 0], return_counts=True)
+                cuboids[key] = SparseCuboid(dims_shape, coords, counts.astype(np.uint32))
+
+    info = {
+        'dimensions': DIMENSIONS,
+        'members': members,
+        'papers': paper_count,
+        'fact_rows': int(len(papers)),
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return info, cuboids
+
+
+class SparseCuboid:
+    def __init__(self, shape: Sequence[int], coords: np.ndarray, counts: np.ndarray):
+        """稀疏 cuboid：非零单元的扁平坐标（按 shape 的 C 顺序，升序）和论文数"""
+        self.shape = list(shape)
+        self.coords = coords
+        self.counts = counts
+
+    def select(self, selectors: Sequence, keep: Sequence[int]) -> Tuple[List[np.ndarray], np.ndarray]:
+        """按各轴的选择（整数或切片）过滤非零单元，返回保留轴 keep 上的坐标和计数"""
+        axes = np.unravel_index(self.coords, self.shape) if self.shape else ()
+        mask = np.ones(len(self.coords), dtype=bool)
+        for axis, selector in enumerate(selectors):
+            if isinstance(selector, slice):
+                start, stop, _ = selector.indices(self.shape[axis])
+                mask &= (axes[axis] >= start) & (axes[axis] < stop)
+            else:
+                mask &= axes[axis] == selector
+        return [axes[axis][mask] for axis in keep], self.counts[mask]
+
+
+def aligned(size: int) -> int:
+    return -(-size // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+
+def write_cubes(path: str, info: Dict, cuboids: Dict[str, np.ndarray]):
+    """写入立方体文件（临时文件 + 原子替换）"""
+    layout = {}
+    blocks = []
+    offset = 0
+    for key, array in cuboids.items():
+        if isinstance(array, SparseCuboid):
+            coords = np.ascontiguousarray(array.coords, dtype='<u8')
+            counts = np.ascontiguousarray(array.counts, dtype='<u4')
+            layout[key] = {'offset': offset, 'shape': array.shape, 'sparse': True, 'nnz': len(counts),
+                           'counts_offset': offset + aligned(coords.nbytes)}
+            blocks += [(offset, coords), (layout[key]['counts_offset'], counts)]
+            offset = layout[key]['counts_offset'] + aligned(counts.nbytes)
+        else:
+            layout[key] = {'offset': offset, 'shape': list(array.shape)}
+            blocks.append((offset, np.ascontiguousarray(array, dtype='<u4')))
+            offset += aligned(array.nbytes)
+    index = json.dumps(dict(info, cuboids=layout), ensure_ascii=False).encode('utf-8')
+    data_offset = -(-(HEADER_SIZE + len(index)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(CUBE_MAGIC, CUBE_VERSION, len(index), data_offset).ljust(HEADER_SIZE, b'\0'))
+        f.write(index)
+        for block_offset, array in blocks:
+            f.seek(data_offset + block_offset)
+            f.write(array.tobytes())
+        f.truncate(data_offset + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class PaperCube:
+    def __init__(self, path: str):
+        """以内存映射方式打开立方体文件"""
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size, data_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != CUBE_MAGIC or version not in READABLE_VERSIONS:
+            raise ValueError(f"不是立方体文件或版本不支持: {path}")
+        self.info = json.loads(self._mm[HEADER_SIZE:HEADER_SIZE + index_size].decode('utf-8'))
+        self.members = self.info['members']
+        self.member_codes = {dim: {value: code for code, value in enumerate(values)}
+                             for dim, values in self.members.items()}
+        self.cuboids = {}
+        for key, entry in self.info['cuboids'].items():
+            if entry.get('sparse'):
+                coords = np.frombuffer(self._mm, dtype='<u8', count=entry['nnz'],
+                                       offset=data_offset + entry['offset'])
+                counts = np.frombuffer(self._mm, dtype='<u4', count=entry['nnz'],
+                                       offset=data_offset + entry['counts_offset'])
+                self.cuboids[key] = SparseCuboid(entry['shape'], coords, counts)
+                continue
+            count = int(np.prod(entry['shape'])) if entry['shape'] else 1
+            self.cuboids[key] = np.frombuffer(self._mm, dtype='<u4', count=count,
+                                              offset=data_offset + entry['offset']).reshape(entry['shape'])
+
+    @classmethod
+    def load(cls, csv_dir: str) -> 'PaperCube':
+        return cls(os.path.join(csv_dir, CUBE_FILE_NAME))
+
+    def close(self):
+        self.cuboids = {}
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def papers(self) -> int:
+        return self.info['papers']
+
+    def _selector(self, dim: str, value):
+        """过滤值转为轴上的索引：单个值为整数，年份 (起, 止) 为切片（闭区间）"""
+        codes = self.member_codes[dim]
+        if dim == 'year' and isinstance(value, (tuple, list)):
+            start, end = value
+            years = self.members['year']
+            selected = [code for code, year in enumerate(years)
+                        if year is not None and (start is None or year >= start) and (end is None or year <= end)]
+            if not selected:
+                return slice(0, 0)
+            return slice(selected[0], selected[-1] + 1)
+        if dim == 'year' and value is not None:
+            value = int(value)
+        code = codes.get(value)
+        if code is None:
+            raise KeyError(f"{dim} 没有成员: {value}")
+        return code
+
+    def group_by(self, dims: Sequence[str] = (), **filters) -> Dict:
+        """按 dims 分组的论文数（只返回非零单元），filters 为 维度=取值
+
+        取值为单个成员；年份可用 (起, 止) 闭区间（年份是单值维度，区间内求和不会重复计数）。
+        dims 只有一个维度时键为成员本身，否则为成员元组。
+        """
+        if isinstance(dims, str):
+            dims = [dims]
+        dims = list(dict.fromkeys(dims))
+        for dim in list(dims) + list(filters):
+            if dim not in DIMENSIONS:
+                raise KeyError(f"未知维度: {dim}")
+        key = cuboid_key(set(dims) | set(filters))
+        axes = [dim for dim in DIMENSIONS if dim in key.split(',')] if key else []
+        selectors = []
+        for dim in axes:
+            selector = self._selector(dim, filters[dim]) if dim in filters else slice(None)
+            if dim in dims and not isinstance(selector, slice):
+                selector = slice(selector, selector + 1)
+            selectors.append(selector)
+        if isinstance(self.cuboids[key], SparseCuboid):
+            return self._sparse_group_by(self.cuboids[key], axes, selectors, dims)
+        view = self.cuboids[key][tuple(selectors)]
+
+        # 剩余轴：分组维度和年份区间（区间轴求和）
+        remaining = [(dim, selector) for dim, selector in zip(axes, selectors) if isinstance(selector, slice)]
+        summed = tuple(position for position, (dim, _) in enumerate(remaining) if dim not in dims)
+        if summed:
+            view = view.sum(axis=summed)
+            remaining = [(dim, selector) for dim, selector in remaining if dim in dims]
+        if not dims:
+            return {(): int(view)}
+        names = [dim for dim, _ in remaining]
+        order = [names.index(dim) for dim in dims]
+        view = np.transpose(view, order)
+        members = [self.members[names[axis]][remaining[axis][1]] for axis in order]
+        cells = np.nonzero(view)
+        counts = view[cells].tolist()
+        labels = [[axis_members[code] for code in codes.tolist()] for axis_members, codes in zip(members, cells)]
+        if len(dims) == 1:
+            return dict(zip(labels[0], counts))
+        return dict(zip(zip(*labels), counts))
+
+    def _sparse_group_by(self, cuboid: SparseCuboid, axes: List[str], selectors: List,
+                         dims: List[str]) -> Dict:
+        """稀疏 cuboid 的 group_by：过滤非零单元后按分组维度累加"""
+        codes, counts = cuboid.select(selectors, [axes.index(dim) for dim in dims])
+        if not dims:
+            return {(): int(counts.sum())}
+        result = {}
+        for cell, n in zip(zip(*(axis_codes.tolist() for axis_codes in codes)), counts.tolist()):
+            label = tuple(self.members[dim][code] for dim, code in zip(dims, cell))
+            result[label] = result.get(label, 0) + n
+        if len(dims) == 1:
+            return {label[0]: n for label, n in result.items()}
+        return result
+
+    def count(self, **filters) -> int:
+        """满足过滤条件的论文数"""
+        return self.group_by((), **filters)[()]
+
+    def series(self, dim: str = 'year', **filters) -> List[Tuple]:
+        """按一个维度的成员顺序排列的 (成员, 论文数)，包含计数为 0 的成员（趋势图用）"""
+        counts = self.group_by(dim, **filters)
+        return [(member, counts.get(member, 0)) for member in self.members[dim]]
+
+    def describe(self) -> Dict:
+        return {
+            'papers': self.papers,
+            'fact_rows': self.info['fact_rows'],
+            'members': {dim: len(values) for dim, values in self.members.items()},
+            'cuboids': len(self.cuboids),
+            'sparse_cuboids': sum(isinstance(c, SparseCuboid) for c in self.cuboids.values()),
+            'bytes': os.path.getsize(self.path),
+            'built_at': self.info['built_at'],
+        }
+
+
+def materialize_cubes(csv_dir: str, output_file: str = None) -> Dict:
+    """构建并写入立方体文件，返回摘要"""
+    output_file = output_file or os.path.join(csv_dir, CUBE_FILE_NAME)
+    start = time.perf_counter()
+    info, cuboids = build_cubes(csv_dir)
+    write_cubes(output_file, info, cuboids)
+    seconds = time.perf_counter() - start
+    with PaperCube(output_file) as cube:
+        summary = cube.describe()
+    summary['build_seconds'] = round(seconds, 3)
+    summary['file'] = output_file
+    return summary
+
+
+def parse_filters(items: List[str]) -> Dict:
+    """命令行过滤条件：dim=value，年份支持 起:止"""
+    filters = {}
+    for item in items or []:
+        dim, _, value = item.partition('=')
+        if dim == 'year' and ':' in value:
+            start, _, end = value.partition(':')
+            filters[dim] = (int(start) if start else None, int(end) if end else None)
+        else:
+            filters[dim] = value
+    return filters
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='论文聚合立方体（年份 × 任务 × 模态 × 解剖结构）')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--cube', default=None, help=f'立方体文件 (默认: <csv-dir>/{CUBE_FILE_NAME})')
+    parser.add_argument('--build', action='store_true', help='从 CSV 构建立方体文件')
+    parser.add_argument('--info', action='store_true', help='打印立方体摘要')
+    parser.add_argument('--group-by', nargs='*', choices=DIMENSIONS, help='分组维度（可为空，表示总数）')
+    parser.add_argument('--filter', nargs='+', metavar='DIM=VALUE',
+                       help='过滤条件，如 task=分割 year=2018:2022')
+    args = parser.parse_args(argv)
+    cube_file = args.cube or os.path.join(args.csv_dir, CUBE_FILE_NAME)
+
+    if args.build:
+        summary = materialize_cubes(args.csv_dir, cube_file)
+        print(f"✅ 已生成立方体: {cube_file} ({summary['bytes'] / 1024:.1f} KB, "
+              f"{summary['fact_rows']} 行事实, {summary['build_seconds']}s)")
+    if not os.path.exists(cube_file):
+        print(f"❌ 立方体文件不存在: {cube_file}（先运行 --build）")
+        return
+
+    with PaperCube(cube_file) as cube:
+        if args.info:
+            print(json.dumps(cube.describe(), ensure_ascii=False, indent=2))
+        if args.group_by is not None:
+            filters = parse_filters(args.filter)
+            start = time.perf_counter()
+            result = cube.group_by(args.group_by, **filters)
+            micros = (time.perf_counter() - start) * 1e6
+            for label, count in sorted(result.items(), key=lambda item: -item[1]):
+                print(f"   {label}: {count}")
+            print(f"⏱  {len(result)} 个单元，查询耗时 {micros:.0f} µs")
+
+
+if __name__ == '__main__':
+    main()
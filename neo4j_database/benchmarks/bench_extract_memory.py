@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取阶段内存基准测试
+比较 extract_nodes_and_relations 的列式累加器（extract_tables.py）与原先的逐行字典表示
+（节点字典列表 + 去重集合 + 名称到 ID 映射 + 关系字典列表）在同一语料上占用的内存。
+
+字典表示由列式结果逐行转换得到，结构与原实现一致（含 embedding 占位列）；
+转换后释放列式结果，剩余内存即字典表示的占用（字符串由两种表示共享，各计入一次）。
+两种表示都用旧版 MD5 ID，避免 ID 注册表影响比较。
+每个规模在独立的子进程（spawn）中运行，用 tracemalloc 统计抽取结束后仍保留的内存。
+
+用法:
+    python benchmarks/bench_extract_memory.py                           # 默认 100000 篇
+    python benchmarks/bench_extract_memory.py --sizes 100000 300000 --output memory.json
+    python benchmarks/bench_extract_memory.py --corpus ../standard.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import gc
+import tracemalloc
+import multiprocessing
+from collections import defaultdict
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+
+
+def dict_representation(nodes: Dict, relations) -> tuple:
+    """按原实现的结构把列式结果转换为逐行字典"""
+    node_lists = {}
+    node_set = defaultdict(set)
+    node_name_to_id = {}
+    for node_type, table in nodes.items():
+        rows = []
+        key_field = 'paper_id' if node_type == 'Paper' else \
+            'description' if node_type == 'Innovation' else 'name'
+        for row in table.rows():
+            node = dict(zip(table.fields, row))
+            rows.append(node)
+            node_set[node_type].add(node[key_field])
+            if node_type != 'Paper':
+                node_name_to_id[f'{node_type}:{node[key_field]}'] = node['id']
+        node_lists[node_type] = rows
+    relation_list = [{'from_id': rel.from_id, 'to_id': rel.to_id, 'type': rel.type,
+                      'value': rel.value, 'note': rel.note} for rel in relations]
+    return node_lists, node_set, node_name_to_id, relation_list
+
+
+def measure_worker(corpus_file: str, queue):
+    """子进程入口：抽取后统计列式结果保留的内存，再转换为字典表示并释放列式结果后统计"""
+    from json_to_csv import extract_nodes_and_relations
+    from vocab_normalizer import VocabularyNormalizer
+
+    with open(corpus_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    normalizer = VocabularyNormalizer.from_file(os.path.join(PROJECT_ROOT, 'vocabulary.json'))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        nodes, relations = extract_nodes_and_relations(data, normalizer)
+    extract_seconds = time.perf_counter() - start
+    columnar_bytes, columnar_peak = tracemalloc.get_traced_memory()
+
+    result = {
+        'papers': len(data),
+        'nodes': sum(len(table) for table in nodes.values()),
+        'relations': len(relations),
+        'extract_seconds': round(extract_seconds, 3),
+        'columnar_mb': round(columnar_bytes / 1024 / 1024, 1),
+        'columnar_peak_mb': round(columnar_peak / 1024 / 1024, 1),
+    }
+
+    legacy = dict_representation(nodes, relations)
+    del nodes, relations
+    gc.collect()
+    dict_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result['dict_mb'] = round(dict_bytes / 1024 / 1024, 1)
+    queue.put(result)
+    del legacy
+
+
+def measure(corpus_file: str) -> Dict:
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=measure_worker, args=(corpus_file, queue))
+    process.start()
+    process.join()
+    if queue.empty():
+        return {'error': f"子进程异常退出 (exit code {process.exitcode})"}
+    result = queue.get()
+    result['reduction'] = round(1 - result['columnar_mb'] / result['dict_mb'], 3) if result['dict_mb'] else None
+    return result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='抽取阶段内存基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000],
+                       help='合成语料的论文规模 (默认: 100000)')
+    parser.add_argument('--corpus', help='使用现有的 standard.json，不生成合成语料')
+    parser.add_argument('--output', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    results: List[Dict] = []
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.corpus:
+            corpora = [args.corpus]
+        else:
+            from synth_corpus import write_corpus
+
+            corpora = []
+            for papers in args.sizes:
+                corpus_file = os.path.join(workdir, f'standard_{papers}.json')
+                print(f"📝 生成 {papers} 篇论文的合成语料...")
+                write_corpus(corpus_file, papers)
+                corpora.append(corpus_file)
+
+        for corpus_file in corpora:
+            result = measure(corpus_file)
+            results.append(result)
+            if 'error' in result:
+                print(f"❌ {corpus_file}: {result['error']}")
+                continue
+            print(f"📊 {result['papers']} 篇论文: {result['nodes']} 个节点, {result['relations']} 条关系")
+            print(f"   列式累加器: {result['columnar_mb']} MB (抽取峰值 {result['columnar_peak_mb']} MB)")
+            print(f"   逐行字典:   {result['dict_mb']} MB")
+            print(f"   减少: {result['reduction']:.0%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已保存到: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导入路径基准测试
+对每个写入后端（sink）执行一次完整导入（约束 -> 节点 -> 向量索引 -> 关系），
+报告各阶段耗时、每秒行数和峰值内存。
+
+用法:
+    python benchmarks/bench_import.py                       # 本地 sqlite 文件 + 内存 sqlite
+    python benchmarks/bench_import.py --sinks sqlite neo4j  # 同时测试 Neo4j（读取 NEO4J_* 环境变量）
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import resource
+import tracemalloc
+import contextlib
+from typing import Dict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'cypher_scripts'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from csv_layout import NODE_FIELDS, load_schema, relation_csv_name
+from generate_cypher import detect_vector_configs
+from graph_sinks import Neo4jSink, SQLiteSink
+from import_to_cloud import Neo4jImporter
+
+
+def count_rows(csv_file: str) -> int:
+    """CSV 数据行数（不含表头）"""
+    if not os.path.exists(csv_file):
+        return 0
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def make_sink(name: str, workdir: str):
+    """按名称创建写入后端"""
+    if name == 'sqlite':
+        return SQLiteSink(os.path.join(workdir, 'bench.sqlite'))
+    if name == 'memory':
+        return SQLiteSink(':memory:')
+    if name == 'neo4j':
+        uri = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
+        password = os.getenv('NEO4J_PASSWORD', '')
+        if not password:
+            raise RuntimeError("测试 neo4j 后端需要设置 NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD")
+        return Neo4jSink(uri, os.getenv('NEO4J_USER', 'neo4j'), password)
+    raise ValueError(f"未知的后端: {name}")
+
+
+def bench_sink(name: str, csv_dir: str, schema: Dict, workdir: str) -> Dict:
+    """对一个后端执行完整导入并计时"""
+    node_types = list(NODE_FIELDS)
+    rel_defs = schema.get('relations', {})
+    node_rows = sum(count_rows(os.path.join(csv_dir, f'nodes_{t}.csv')) for t in node_types)
+    rel_rows = sum(count_rows(os.path.join(csv_dir, relation_csv_name(t))) for t in rel_defs)
+
+    importer = Neo4jImporter(make_sink(name, workdir))
+    timings = {}
+    tracemalloc.start()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            importer.create_constraints_and_indexes(schema)
+            timings['schema'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for node_type in node_types:
+                importer.import_nodes(os.path.join(csv_dir, f'nodes_{node_type}.csv'), node_type)
+            timings['nodes'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            importer.create_vector_indexes(detect_vector_configs(csv_dir, node_types))
+            timings['vector_indexes'] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for rel_type, rel_def in rel_defs.items():
+                importer.import_relations(os.path.join(csv_dir, relation_csv_name(rel_type)),
+                                          rel_type, rel_def['from'], rel_def['to'])
+            timings['relations'] = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        importer.close()
+
+    total = sum(timings.values())
+    return {
+        'sink': name,
+        'node_rows': node_rows,
+        'relation_rows': rel_rows,
+        'seconds': {k: round(v, 4) for k, v in timings.items()},
+        'total_seconds': round(total, 4),
+        'node_rows_per_sec': round(node_rows / timings['nodes'], 1) if timings['nodes'] else None,
+        'relation_rows_per_sec': round(rel_rows / timings['relations'], 1) if timings['relations'] else None,
+        'rows_per_sec': round((node_rows + rel_rows) / total, 1) if total else None,
+        'peak_python_mb': round(peak / 1024 / 1024, 2),
+        # Linux 下 ru_maxrss 单位为 KB，是进程级的累计峰值
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2),
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='导入路径基准测试')
+    parser.add_argument('--csv-dir', default=os.path.join(BENCH_DIR, '..', 'csv'),
+                       help='CSV 目录 (默认: ../csv)')
+    parser.add_argument('--sinks', nargs='+', choices=['sqlite', 'memory', 'neo4j'],
+                       default=['sqlite', 'memory'], help='要测试的写入后端')
+    parser.add_argument('--output', help='将结果写入 JSON 文件')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.csv_dir):
+        print(f"❌ CSV 目录不存在: {args.csv_dir}")
+        print("   请先运行 json_to_csv.py 生成 CSV 文件")
+        sys.exit(1)
+
+    schema = load_schema(os.path.join(BENCH_DIR, '..', '..', 'schema_v1.json'))
+    if 'neo4j' in args.sinks:
+        print("⚠ neo4j 后端会写入 NEO4J_URI 指向的数据库，建议使用空库")
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name in args.sinks:
+            print(f"⏱ 测试 {name} ...")
+            result = bench_sink(name, args.csv_dir, schema, workdir)
+            results.append(result)
+            print(f"   节点 {result['node_rows']} 行: {result['node_rows_per_sec']} 行/秒")
+            print(f"   关系 {result['relation_rows']} 行: {result['relation_rows_per_sec']} 行/秒")
+            print(f"   总计 {result['total_seconds']} 秒, {result['rows_per_sec']} 行/秒, "
+                  f"峰值内存 {result['peak_python_mb']} MB (Python 堆)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已保存到: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
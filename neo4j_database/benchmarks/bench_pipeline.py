@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端规模基准测试
+对每个规模生成合成语料（synth_corpus.py），依次执行流水线各阶段：
+    corpus -> json_to_csv -> quality_check -> statistics -> import (本地 SQLite 后端)
+每个阶段在独立的子进程中运行，记录耗时、CPU 时间、峰值 RSS 和输出大小，
+结果写入 JSON，并与保存的基线比较以发现性能回退。
+
+embedding 阶段依赖 GPU 模型，不在此基准中。
+
+用法:
+    python benchmarks/bench_pipeline.py --sizes 10000                      # 与基线比较
+    python benchmarks/bench_pipeline.py --sizes 10000 100000 1000000 --output results.json
+    python benchmarks/bench_pipeline.py --sizes 10000 --update-baseline    # 更新基线
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import resource
+import contextlib
+import multiprocessing
+from typing import Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'cypher_scripts'))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+sys.path.insert(0, BENCH_DIR)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(BENCH_DIR))
+SCHEMA_FILE = os.path.join(PROJECT_ROOT, 'schema_v1.json')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline_pipeline.json')
+
+STAGES = ['corpus', 'json_to_csv', 'quality_check', 'statistics', 'import']
+# 超过基线多少比例视为回退
+DEFAULT_TOLERANCE = 0.25
+# 耗时低于该值的阶段不做耗时比较（噪声太大）
+MIN_COMPARABLE_SECONDS = 0.5
+
+
+def dir_size(path: str) -> int:
+    """文件或目录的总字节数"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def stage_corpus(workdir: str, papers: int) -> Dict:
+    from synth_corpus import write_corpus
+
+    corpus_file = os.path.join(workdir, 'standard.json')
+    write_corpus(corpus_file, papers)
+    return {'rows_out': papers, 'outputs': [corpus_file]}
+
+
+def stage_json_to_csv(workdir: str, papers: int) -> Dict:
+    from json_to_csv import (extract_nodes_and_relations, write_nodes_csv, write_relations_csv,
+                             write_relations_by_type, load_schema)
+    from vocab_normalizer import VocabularyNormalizer
+    from id_registry import IdRegistry
+
+    csv_dir = os.path.join(workdir, 'csv')
+    os.makedirs(csv_dir, exist_ok=True)
+    with open(os.path.join(workdir, 'standard.json'), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    normalizer = VocabularyNormalizer.from_file(os.path.join(PROJECT_ROOT, 'vocabulary.json'))
+    schema = load_schema(SCHEMA_FILE)
+    with IdRegistry(os.path.join(csv_dir, 'id_registry.bin')) as registry:
+        nodes, relations = extract_nodes_and_relations(data, normalizer, registry, schema)
+        registry.save()
+    write_nodes_csv(nodes, csv_dir)
+    write_relations_csv(relations, csv_dir)
+    write_relations_by_type(nodes, relations, schema, csv_dir)
+    return {
+        'rows_in': len(data),
+        'rows_out': sum(len(v) for v in nodes.values()) + len(relations),
+        'outputs': [csv_dir],
+    }
+
+
+def stage_quality_check(workdir: str, papers: int) -> Dict:
+    from quality_check import generate_quality_report
+
+    output_file = os.path.join(workdir, 'quality_report.json')
+    generate_quality_report(os.path.join(workdir, 'csv'), output_file)
+    return {'outputs': [output_file]}
+
+
+def stage_statistics(workdir: str, papers: int) -> Dict:
+    from statistics import generate_statistics_report
+
+    output_file = os.path.join(workdir, 'statistics_report.json')
+    generate_statistics_report(os.path.join(workdir, 'csv'), output_file)
+    return {'outputs': [output_file]}
+
+
+def stage_import(workdir: str, papers: int) -> Dict:
+    from csv_layout import NODE_FIELDS, load_schema, relation_csv_name
+    from graph_sinks import SQLiteSink
+    from import_to_cloud import Neo4jImporter
+
+    csv_dir = os.path.join(workdir, 'csv')
+    sqlite_file = os.path.join(workdir, 'graph.sqlite')
+    schema = load_schema(SCHEMA_FILE)
+    importer = Neo4jImporter(SQLiteSink(sqlite_file))
+    try:
+        importer.create_constraints_and_indexes(schema)
+        for node_type in NODE_FIELDS:
+            importer.import_nodes(os.path.join(csv_dir, f'nodes_{node_type}.csv'), node_type)
+        for rel_type, rel_def in schema.get('relations', {}).items():
+            importer.import_relations(os.path.join(csv_dir, relation_csv_name(rel_type)),
+                                      rel_type, rel_def['from'], rel_def['to'])
+        rows_out = (sum(importer.sink.count_nodes(t) for t in NODE_FIELDS) +
+                    sum(importer.sink.count_relations(t) for t in schema.get('relations', {})))
+    finally:
+        importer.close()
+    return {'rows_out': rows_out, 'outputs': [sqlite_file]}
+
+
+STAGE_FUNCTIONS = {
+    'corpus': stage_corpus,
+    'json_to_csv': stage_json_to_csv,
+    'quality_check': stage_quality_check,
+    'statistics': stage_statistics,
+    'import': stage_import,
+}
+
+
+def stage_worker(stage: str, workdir: str, papers: int, queue):
+    """子进程入口：执行一个阶段并回报耗时和资源占用"""
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            result = STAGE_FUNCTIONS[stage](workdir, papers)
+    except Exception as e:
+        queue.put({'stage': stage, 'error': f"{type(e).__name__}: {e}"})
+        return
+    wall = time.perf_counter() - start_wall
+    outputs = result.pop('outputs', [])
+    result.update({
+        'stage': stage,
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(time.process_time() - start_cpu, 3),
+        # Linux 下 ru_maxrss 单位为 KB；子进程独立启动，峰值只反映本阶段
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'output_bytes': sum(dir_size(path) for path in outputs if os.path.exists(path)),
+        'papers_per_sec': round(papers / wall, 1) if wall else None,
+    })
+    queue.put(result)
+
+
+def run_stage(stage: str, workdir: str, papers: int) -> Dict:
+    """在全新的子进程（spawn）中运行阶段，避免前一阶段的内存影响峰值 RSS"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=stage_worker, args=(stage, workdir, papers, queue))
+    process.start()
+    process.join()
+    if queue.empty():
+        return {'stage': stage, 'error': f"子进程异常退出 (exit code {process.exitcode})"}
+    return queue.get()
+
+
+def bench_size(papers: int, stages: List[str], workdir: str) -> Dict:
+    """对一个规模依次运行各阶段"""
+    size_dir = os.path.join(workdir, f'papers_{papers}')
+    os.makedirs(size_dir, exist_ok=True)
+    results = {}
+    for stage in stages:
+        print(f"   ⏱ {stage} ...", end=' ', flush=True)
+        result = run_stage(stage, size_dir, papers)
+        results[stage] = result
+        if 'error' in result:
+            print(f"❌ {result['error']}")
+            break
+        print(f"{result['wall_seconds']}s, 峰值 RSS {result['peak_rss_mb']} MB, "
+              f"输出 {result['output_bytes'] / 1024 / 1024:.1f} MB")
+    return results
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """与基线比较，返回回退列表（耗时或峰值 RSS 超出基线 tolerance 以上）"""
+    regressions = []
+    for size, stages in results.items():
+        base_stages = baseline.get('results', {}).get(size)
+        if not base_stages:
+            continue
+        for stage, result in stages.items():
+            base = base_stages.get(stage)
+            if not base or 'error' in result or 'error' in base:
+                continue
+            if base['wall_seconds'] >= MIN_COMPARABLE_SECONDS and \
+                    result['wall_seconds'] > base['wall_seconds'] * (1 + tolerance):
+                regressions.append(f"{size} 篇 / {stage}: 耗时 {base['wall_seconds']}s -> "
+                                   f"{result['wall_seconds']}s")
+            if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(f"{size} 篇 / {stage}: 峰值 RSS {base['peak_rss_mb']} MB -> "
+                                   f"{result['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='端到端规模基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000],
+                       help='论文规模 (默认: 10000；可选 100000 1000000)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                       help='要运行的阶段（后面的阶段依赖前面阶段的输出）')
+    parser.add_argument('--workdir', help='工作目录（默认使用临时目录，结束后删除）')
+    parser.add_argument('--output', help='将结果写入 JSON 文件')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                       help='基线文件 (默认: benchmarks/baseline_pipeline.json)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                       help=f'允许超出基线的比例 (默认: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线')
+    args = parser.parse_args()
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': {},
+    }
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory())
+        for papers in args.sizes:
+            print(f"📊 规模: {papers} 篇论文")
+            report['results'][str(papers)] = bench_size(papers, args.stages, workdir)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已保存到: {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 基线已更新: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠ 基线文件不存在，跳过比较: {args.baseline}")
+        return
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_with_baseline(report['results'], baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 处性能回退（超出基线 {args.tolerance:.0%}）:")
+        for item in regressions:
+            print(f"   - {item}")
+        sys.exit(1)
+    print(f"\n✅ 未发现性能回退（基线: {baseline.get('created_at', '?')}）")
+
+
+if __name__ == '__main__':
+    main()
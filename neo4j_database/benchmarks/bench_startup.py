@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+命令行启动耗时基准
+对 kg.py 及其每个子命令，在新的解释器中执行 `kg.py <子命令> --help`（只导入模块、解析参数），记录：
+- 启动耗时（多次运行取中位数）
+- 启动时加载的重量级依赖（numpy、scipy、torch、tqdm、neo4j、FlagEmbedding 等，由 -X importtime 得到）
+
+检查两项：
+- 子命令加载了 ALLOWED_HEAVY 之外的重量级依赖即视为回退（与机器无关）
+- 启动耗时超过基线 tolerance 以上（且超出 MIN_REGRESSION_MS）视为回退
+
+用法:
+    python benchmarks/bench_startup.py                     # 与基线比较
+    python benchmarks/bench_startup.py --repeat 10 --output startup.json
+    python benchmarks/bench_startup.py --update-baseline   # 更新基线
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Set
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+from kg import COMMANDS
+
+KG_SCRIPT = os.path.join(BENCH_DIR, '..', 'kg.py')
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline_startup.json')
+
+HEAVY_MODULES = {'numpy', 'scipy', 'torch', 'tqdm', 'neo4j', 'FlagEmbedding', 'transformers', 'sentence_transformers'}
+# 各子命令启动时允许加载的重量级依赖（未列出的子命令不允许加载任何重量级依赖）
+# csv 经 id_registry 需要 numpy；cypher / import 只从 csv_layout 导入 CSV 布局，不允许加载 numpy
+ALLOWED_HEAVY = {
+    'csv': {'numpy'},
+    'embed': {'numpy'},
+    'similarity': {'numpy'},
+    'cooccurrence': {'numpy', 'scipy'},
+    'leaderboard': {'numpy'},
+    'related': {'numpy', 'scipy'},
+    'serve': {'numpy'},
+    'subgraph': {'numpy'},
+}
+# 超过基线多少比例视为回退
+DEFAULT_TOLERANCE = 0.5
+# 耗时增加低于该值（毫秒）时不算回退（解释器启动的噪声）
+MIN_REGRESSION_MS = 30.0
+DEFAULT_REPEAT = 5
+
+
+def run_help(command: List[str], importtime: bool = False) -> subprocess.CompletedProcess:
+    """在新解释器中执行 kg.py <command> --help"""
+    flags = ['-X', 'importtime'] if importtime else []
+    return subprocess.run([sys.executable] + flags + [KG_SCRIPT] + command + ['--help'],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+
+def imported_heavy_modules(stderr: str) -> Set[str]:
+    """从 -X importtime 的输出中找出加载的重量级依赖（顶层包名）"""
+    found = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.count('|') < 2:
+            continue
+        name = line.rsplit('|', 1)[1].strip().split('.')[0]
+        if name in HEAVY_MODULES:
+            found.add(name)
+    return found
+
+
+def bench_command(name: str, repeat: int) -> Dict:
+    """一个子命令的启动耗时中位数（毫秒）与加载的重量级依赖"""
+    command = [] if name == 'kg' else [name]
+    probe = run_help(command, importtime=True)
+    if probe.returncode != 0:
+        return {'command': name, 'error': probe.stderr.strip().splitlines()[-1:]}
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run_help(command)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    heavy = sorted(imported_heavy_modules(probe.stderr))
+    return {
+        'command': name,
+        'median_ms': round(statistics.median(timings), 1),
+        'min_ms': round(min(timings), 1),
+        'heavy_modules': heavy,
+        'unexpected_heavy': sorted(set(heavy) - ALLOWED_HEAVY.get(name, set())),
+    }
+
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """与基线比较启动耗时，返回回退列表"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get('results', {}).get(name)
+        if not base or 'error' in result or 'error' in base:
+            continue
+        if result['median_ms'] > base['median_ms'] * (1 + tolerance) and \
+                result['median_ms'] - base['median_ms'] > MIN_REGRESSION_MS:
+            regressions.append(f"{name}: 启动耗时 {base['median_ms']} ms -> {result['median_ms']} ms")
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='命令行启动耗时基准')
+    parser.add_argument('--commands', nargs='+', choices=['kg'] + list(COMMANDS), default=['kg'] + list(COMMANDS),
+                       help='要测量的子命令（kg 为 kg.py --help 本身）')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                       help=f'每个子命令运行次数，取中位数 (默认: {DEFAULT_REPEAT})')
+    parser.add_argument('--output', help='将结果写入 JSON 文件')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                       help='基线文件 (默认: benchmarks/baseline_startup.json)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                       help=f'允许超出基线的比例 (默认: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线')
+    args = parser.parse_args()
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': {},
+    }
+    print(f"{'子命令':<14}{'中位数(ms)':>12}{'最小(ms)':>10}  重量级依赖")
+    for name in args.commands:
+        result = bench_command(name, args.repeat)
+        report['results'][name] = result
+        if 'error' in result:
+            print(f"{name:<16}失败: {result['error']}")
+            continue
+        print(f"{name:<16}{result['median_ms']:>12.1f}{result['min_ms']:>10.1f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已保存到: {args.output}")
+
+    problems = [f"{name}: 启动失败 {result['error']}" for name, result in report['results'].items()
+                if 'error' in result]
+    problems += [f"{name}: 启动时加载了 {', '.join(result['unexpected_heavy'])}"
+                 for name, result in report['results'].items() if result.get('unexpected_heavy')]
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✅ 基线已更新: {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"⚠ 基线文件不存在，跳过耗时比较: {args.baseline}")
+    else:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems += compare_with_baseline(report['results'], baseline, args.tolerance)
+
+    if problems:
+        print(f"\n❌ 发现 {len(problems)} 处启动回退:")
+        for item in problems:
+            print(f"   - {item}")
+        sys.exit(1)
+    print("\n✅ 未发现启动回退")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+实体共现矩阵（方法 / 数据集推荐用）
+从抽取结果构建 论文 × 实体 的稀疏关联矩阵 A_T（论文与实体之间有任意关系即为 1），
+对每个配置的实体类型对 (S, T) 用稀疏矩阵乘法一次算出共现计数 C = A_S^T · A_T
+（同时出现 S_i 和 T_j 的论文数）以及 PMI 权重：
+
+    PMI(i, j) = log( C_ij · N / (n_i · n_j) )，N 为论文数，n_i 为出现实体 i 的论文数
+
+只保存非零单元（CSR），每个类型对一个压缩文件，另有 index.json 保存实体名称和出现次数。
+
+用法:
+    python cooccurrence.py                                         # 默认类型对，写入 csv/cooccurrence/
+    python cooccurrence.py --pairs Task:ImagingModality Method:Dataset
+    python cooccurrence.py --neighbors Task 分割 ImagingModality --top-k 5
+    python cooccurrence.py --neighbors Method U-Net Dataset --weight count --min-count 3
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from telemetry import phase
+
+OUTPUT_DIR_NAME = 'cooccurrence'
+INDEX_NAME = 'index.json'
+
+# 默认计算的实体类型对
+DEFAULT_PAIRS = [
+    ('Task', 'ImagingModality'),
+    ('Task', 'AnatomicalStructure'),
+    ('AnatomicalStructure', 'ImagingModality'),
+    ('Method', 'Task'),
+    ('Method', 'ImagingModality'),
+    ('Method', 'Dataset'),
+    ('Method', 'Metric'),
+    ('Dataset', 'Metric'),
+]
+
+# 各实体类型的名称列
+NAME_FIELDS = {'Innovation': 'description'}
+
+
+def pair_file_name(source: str, target: str) -> str:
+    return f'{source}__{target}.npz'
+
+
+def load_entities(csv_dir: str, entity_types: List[str]) -> Tuple[Dict[str, Tuple[str, int]], Dict[str, Dict]]:
+    """读取实体节点：返回 ID -> (类型, 序号)，以及 类型 -> {'ids', 'names'}"""
+    id_index = {}
+    entities = {}
+    for entity_type in entity_types:
+        ids, names = [], []
+        node_file = os.path.join(csv_dir, f'nodes_{entity_type}.csv')
+        if os.path.exists(node_file):
+            name_field = NAME_FIELDS.get(entity_type, 'name')
+            with open(node_file, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    id_index[row['id']] = (entity_type, len(ids))
+                    ids.append(row['id'])
+                    names.append(row.get(name_field, ''))
+        entities[entity_type] = {'ids': ids, 'names': names}
+    return id_index, entities
+
+
+def build_incidence(csv_dir: str, entity_types: List[str]) -> Tuple[Dict[str, sparse.csr_matrix], Dict[str, Dict], int]:
+    """构建各实体类型的 论文 × 实体 0/1 稀疏矩阵"""
+    paper_index = {}
+    with open(os.path.join(csv_dir, 'nodes_Paper.csv'), 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            paper_index[row['id']] = len(paper_index)
+    id_index, entities = load_entities(csv_dir, entity_types)
+
+    coords = {entity_type: ([], []) for entity_type in entity_types}
+    with open(os.path.join(csv_dir, 'relations.csv'), 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        from_column, to_column = header.index('from_id'), header.index('to_id')
+        for row in reader:
+            paper = paper_index.get(row[from_column])
+            entity = id_index.get(row[to_column])
+            if paper is None or entity is None:
+                # 实体指向论文的关系（目前 schema 中没有）
+                paper = paper_index.get(row[to_column])
+                entity = id_index.get(row[from_column])
+                if paper is None or entity is None:
+                    continue
+            papers, columns = coords[entity[0]]
+            papers.append(paper)
+            columns.append(entity[1])
+
+    incidence = {}
+    for entity_type, (papers, columns) in coords.items():
+        matrix = sparse.csr_matrix(
+            (np.ones(len(papers), dtype=np.int32), (np.array(papers, dtype=np.int64), np.array(columns, dtype=np.int64))),
+            shape=(len(paper_index), len(entities[entity_type]['ids'])))
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        incidence[entity_type] = matrix
+        entities[entity_type]['papers'] = np.asarray(matrix.sum(axis=0)).ravel().astype(int).tolist()
+    return incidence, entities, len(paper_index)
+
+
+def cooccurrence_matrix(left: sparse.csr_matrix, right: sparse.csr_matrix, same_type: bool,
+                        paper_count: int) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """共现计数（CSR，行为左侧实体）和与非零单元对齐的 PMI"""
+    counts = (left.T.tocsr() @ right).tocsr()
+    if same_type:
+        counts.setdiag(0)
+        counts.eliminate_zeros()
+    counts.sort_indices()
+    left_totals = np.asarray(left.sum(axis=0)).ravel().astype(np.float64)
+    right_totals = np.asarray(right.sum(axis=0)).ravel().astype(np.float64)
+    rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+    pmi = np.log(counts.data * float(paper_count) / (left_totals[rows] * right_totals[counts.indices]))
+    return counts, pmi.astype(np.float32)
+
+
+def save_pair(path: str, counts: sparse.csr_matrix, pmi: np.ndarray):
+    """写入一个类型对（临时文件 + 原子替换）"""
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, shape=np.array(counts.shape, dtype=np.int64),
+                        indptr=counts.indptr.astype(np.int64), indices=counts.indices.astype(np.int32),
+                        counts=counts.data.astype(np.uint32), pmi=pmi)
+    os.replace(tmp_path, path)
+
+
+def build_cooccurrence(csv_dir: str, pairs: List[Tuple[str, str]] = None, output_dir: str = None) -> Dict:
+    """构建并写入所有类型对的共现矩阵，返回摘要"""
+    pairs = pairs or DEFAULT_PAIRS
+    output_dir = output_dir or os.path.join(csv_dir, OUTPUT_DIR_NAME)
+    os.makedirs(output_dir, exist_ok=True)
+    entity_types = sorted({entity_type for pair in pairs for entity_type in pair})
+
+    with phase('incidence') as p:
+        incidence, entities, paper_count = build_incidence(csv_dir, entity_types)
+        p.rows_out = sum(matrix.nnz for matrix in incidence.values())
+
+    summary = {'papers': paper_count, 'pairs': []}
+    with phase('multiply') as p:
+        for source, target in pairs:
+            counts, pmi = cooccurrence_matrix(incidence[source], incidence[target], source == target, paper_count)
+            save_pair(os.path.join(output_dir, pair_file_name(source, target)), counts, pmi)
+            summary['pairs'].append({'source': source, 'target': target, 'shape': list(counts.shape),
+                                     'nonzero': int(counts.nnz)})
+        p.rows_out = sum(pair['nonzero'] for pair in summary['pairs'])
+
+    index = {
+        'papers': paper_count,
+        'pairs': [[pair['source'], pair['target']] for pair in summary['pairs']],
+        'entities': entities,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    tmp_path = os.path.join(output_dir, INDEX_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(output_dir, INDEX_NAME))
+    summary['output_dir'] = output_dir
+    return summary
+
+
+class CooccurrenceIndex:
+    def __init__(self, output_dir: str):
+        """读取 index.json；各类型对的矩阵在首次查询时加载"""
+        self.output_dir = output_dir
+        with open(os.path.join(output_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.pairs = [tuple(pair) for pair in self.index['pairs']]
+        self.entities = self.index['entities']
+        self.name_index = {entity_type: {name: position for position, name in enumerate(info['names'])}
+                           for entity_type, info in self.entities.items()}
+        self.matrices: Dict[Tuple[str, str], Tuple] = {}
+
+    @classmethod
+    def load(cls, csv_dir: str) -> 'CooccurrenceIndex':
+        return cls(os.path.join(csv_dir, OUTPUT_DIR_NAME))
+
+    def _matrix(self, source: str, target: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(indptr, indices, counts, pmi)，行为 source 实体；反方向的类型对转置后缓存"""
+        key = (source, target)
+        if key not in self.matrices:
+            if key in self.pairs:
+                stored, transpose = key, False
+            elif (target, source) in self.pairs:
+                stored, transpose = (target, source), True
+            else:
+                raise KeyError(f"未计算的类型对: {source}-{target}（已有: {self.pairs}）")
+            with np.load(os.path.join(self.output_dir, pair_file_name(*stored))) as data:
+                shape, indptr, indices = tuple(data['shape']), data['indptr'], data['indices']
+                counts, pmi = data['counts'], data['pmi']
+            if transpose:
+                # 计数和 PMI 按同一顺序转置（data 存放非零单元的位置）
+                positions = sparse.csr_matrix((np.arange(1, len(counts) + 1), indices, indptr), shape=shape).T.tocsr()
+                order = positions.data - 1
+                indptr, indices, counts, pmi = positions.indptr, positions.indices, counts[order], pmi[order]
+            self.matrices[key] = (indptr, indices, counts, pmi)
+        return self.matrices[key]
+
+    def neighbors(self, source: str, name: str, target: str, k: int = 10,
+                  weight: str = 'pmi', min_count: int = 1) -> List[Dict]:
+        """与 source 类型实体 name 共现的前 k 个 target 类型实体
+
+        weight 为 pmi（默认，偏向特异的搭配）或 count；min_count 过滤共现论文数过少的（PMI 不可靠）。
+        """
+        position = self.name_index[source].get(name)
+        if position is None:
+            raise KeyError(f"{source} 没有实体: {name}")
+        indptr, indices, counts, pmi = self._matrix(source, target)
+        start, end = indptr[position], indptr[position + 1]
+        row_indices, row_counts, row_pmi = indices[start:end], counts[start:end], pmi[start:end]
+        if min_count > 1:
+            keep = row_counts >= min_count
+            row_indices, row_counts, row_pmi = row_indices[keep], row_counts[keep], row_pmi[keep]
+        scores = row_pmi if weight == 'pmi' else row_counts.astype(np.float64)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.lexsort((-row_counts[top], -scores[top]))]
+        names = self.entities[target]['names']
+        return [{'name': names[row_indices[i]], 'count': int(row_counts[i]), 'pmi': round(float(row_pmi[i]), 4)}
+                for i in top]
+
+    def count(self, source: str, source_name: str, target: str, target_name: str) -> int:
+        """两个实体共同出现的论文数"""
+        position = self.name_index[source][source_name]
+        column = self.name_index[target][target_name]
+        indptr, indices, counts, _ = self._matrix(source, target)
+        start, end = indptr[position], indptr[position + 1]
+        found = np.searchsorted(indices[start:end], column)
+        if found < end - start and indices[start + found] == column:
+            return int(counts[start + found])
+        return 0
+
+
+def parse_pairs(items: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """命令行类型对：Source:Target"""
+    if not items:
+        return list(DEFAULT_PAIRS)
+    pairs = []
+    for item in items:
+        source, _, target = item.partition(':')
+        if not source or not target:
+            raise ValueError(f"类型对格式应为 Source:Target: {item}")
+        pairs.append((source, target))
+    return pairs
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='实体共现矩阵与 PMI')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--pairs', nargs='+', metavar='SOURCE:TARGET',
+                       help='要计算的实体类型对 (默认: 内置的 8 个类型对)')
+    parser.add_argument('--neighbors', nargs=3, metavar=('TYPE', 'NAME', 'TARGET_TYPE'),
+                       help='查询共现实体（不重新构建）')
+    parser.add_argument('--top-k', type=int, default=10, help='返回的实体数 (默认: 10)')
+    parser.add_argument('--weight', choices=['pmi', 'count'], default='pmi', help='排序依据 (默认: pmi)')
+    parser.add_argument('--min-count', type=int, default=1, help='最少共现论文数 (默认: 1)')
+    args = parser.parse_args(argv)
+
+    if args.neighbors:
+        source, name, target = args.neighbors
+        index = CooccurrenceIndex.load(args.csv_dir)
+        start = time.perf_counter()
+        results = index.neighbors(source, name, target, args.top_k, args.weight, args.min_count)
+        micros = (time.perf_counter() - start) * 1e6
+        for item in results:
+            print(f"   {item['name']:40s} 共现 {item['count']:5d} 篇  PMI {item['pmi']:+.3f}")
+        print(f"⏱  查询耗时 {micros:.0f} µs（含首次加载矩阵）")
+        return
+
+    if not os.path.exists(os.path.join(args.csv_dir, 'relations.csv')):
+        print(f"❌ 关系文件不存在: {os.path.join(args.csv_dir, 'relations.csv')}")
+        print("   请先运行 json_to_csv.py 生成 CSV 文件")
+        return
+    print("🔗 构建实体共现矩阵...")
+    summary = build_cooccurrence(args.csv_dir, parse_pairs(args.pairs))
+    for pair in summary['pairs']:
+        print(f"   {pair['source']:>20s} × {pair['target']:<20s}: "
+              f"{pair['shape'][0]} × {pair['shape'][1]}，非零 {pair['nonzero']}")
+    print(f"✅ 共现矩阵已保存到: {summary['output_dir']}")
+
+
+if __name__ == '__main__':
+    main()
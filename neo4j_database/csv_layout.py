@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点/关系 CSV 的列布局和文件命名
+json_to_csv.py 写出的 CSV 格式；导入、Cypher 生成等下游步骤只需要这些定义，
+从这里导入而不是从 json_to_csv.py 导入，避免加载抽取阶段的依赖（ID 注册表需要 numpy）。
+
+只依赖标准库。
+"""
+
+import json
+from typing import Dict
+
+
+# 各类型节点 CSV 的列顺序（与 extract_nodes_and_relations 中各节点表的列一致，节点类型编号按此顺序）
+NODE_FIELDS = {
+    'Paper': ['id', 'paper_id', 'title', 'doi', 'year', 'category', 'authors', 'embedding'],
+    'Task': ['id', 'legacy_id', 'name', 'type', 'embedding'],
+    'ImagingModality': ['id', 'legacy_id', 'name', 'type', 'embedding'],
+    'AnatomicalStructure': ['id', 'legacy_id', 'name', 'type', 'embedding'],
+    'Method': ['id', 'legacy_id', 'name', 'method_type', 'type', 'embedding'],
+    'Dataset': ['id', 'legacy_id', 'name', 'type', 'embedding'],
+    'Metric': ['id', 'legacy_id', 'name', 'type', 'embedding'],
+    'Innovation': ['id', 'legacy_id', 'description', 'innovation_type', 'type', 'embedding'],
+}
+
+# 关系 CSV 的列顺序（相同的 from/type/to 聚合为一行，后五列为聚合信息）
+RELATION_FIELDS = ['from_id', 'to_id', 'type', 'value', 'note',
+                   'support', 'papers', 'value_min', 'value_max', 'value_mean']
+
+# 聚合列的属性类型（schema 中未定义；papers 为 | 分隔的来源论文 ID，与 authors 一致）
+RELATION_AGGREGATE_TYPES = {
+    'support': 'integer',
+    'value_min': 'number',
+    'value_max': 'number',
+    'value_mean': 'number',
+}
+
+
+# 逐次数值提及的侧表（聚合后的关系 CSV 只保留第一次的 value，排行榜需要每次提及的数值和 note）
+METRIC_MENTIONS_NAME = 'metric_mentions.csv'
+METRIC_MENTION_TYPES = ['REPORTS_METRIC', 'ACHIEVES_METRIC']
+# paper 为提及所在论文的节点 ID
+METRIC_MENTION_FIELDS = ['from_id', 'to_id', 'type', 'paper', 'value', 'note']
+
+def load_schema(schema_file: str) -> Dict:
+    """读取 schema_v1.json"""
+    with open(schema_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def relation_csv_name(rel_type: str) -> str:
+    """按类型拆分后的关系文件名"""
+    return f'relations_{rel_type}.csv'
@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图写入后端（sink）
+- GraphSink: 导入器使用的写入接口
+- Neo4jSink: 写入 Neo4j（在线实例）
+- SQLiteSink: 写入本地 SQLite 文件，无需 Neo4j，用于离线基准测试、回归测试和原型开发
+
+所有写入都是幂等的 upsert：节点按 (标签, id)，关系按 (类型, from_id, to_id)。
+关系只在两端节点（按 schema 标签）都存在时写入，与 Cypher 中 MATCH + MERGE 的语义一致。
+"""
+
+import os
+import json
+import sqlite3
+from array import array
+from typing import Dict, List, Optional
+
+# 抽取阶段聚合出的关系列（SQLite edges 表的列和类型）
+EDGE_AGGREGATE_COLUMNS = [
+    ('support', 'INTEGER'),
+    ('papers', 'TEXT'),
+    ('value_min', 'REAL'),
+    ('value_max', 'REAL'),
+    ('value_mean', 'REAL'),
+]
+
+
+def _number(value, convert):
+    """CSV 中的数值列转换为数值，空值为 None"""
+    return convert(value) if value not in (None, '') else None
+
+
+class GraphSink:
+    """图写入接口；所有 rows 都是 CSV 行（dict），embedding 已解析为浮点数列表或 None"""
+
+    name = 'base'
+
+    def create_schema(self, schema: Dict):
+        """创建约束和索引"""
+        raise NotImplementedError
+
+    def upsert_nodes(self, label: str, rows: List[Dict]) -> int:
+        """写入一批节点，返回新建的节点数"""
+        raise NotImplementedError
+
+    def upsert_relations(self, rel_type: str, from_label: str, to_label: str,
+                         rows: List[Dict]) -> int:
+        """写入一批关系，返回新建的关系数"""
+        raise NotImplementedError
+
+    def delete_nodes(self, label: str, ids: List[str]) -> int:
+        """删除一批节点及其关系，返回删除的节点数"""
+        raise NotImplementedError
+
+    def delete_relations(self, rel_type: str, from_label: str, to_label: str,
+                         rows: List[Dict]) -> int:
+        """删除一批关系（rows 含 from_id, to_id），返回删除的关系数"""
+        raise NotImplementedError
+
+    def create_vector_indexes(self, vector_configs: Dict[str, tuple]):
+        """为每个标签创建向量索引，vector_configs 为 标签 -> (维度, 相似度函数)"""
+        raise NotImplementedError
+
+    def count_nodes(self, label: str) -> int:
+        """某标签的节点数"""
+        raise NotImplementedError
+
+    def count_relations(self, rel_type: str) -> int:
+        """某类型的关系数"""
+        raise NotImplementedError
+
+    def get_node(self, label: str, node_id: str) -> Optional[Dict]:
+        """按 id 查询节点属性（不含 embedding），不存在时返回 None"""
+        raise NotImplementedError
+
+    def set_build_version(self, version: str):
+        """记录本次导入的图数据版本（查询端据此使缓存失效）"""
+        raise NotImplementedError
+
+    def get_build_version(self) -> Optional[str]:
+        """读取图数据版本，未记录时返回 None"""
+        raise NotImplementedError
+
+    def clone(self) -> 'GraphSink':
+        """写入同一目标的新连接，供其他线程并发写入（各 sink 的连接不是线程安全的）"""
+        raise NotImplementedError
+
+    def close(self):
+        """关闭连接"""
+
+
+class Neo4jSink(GraphSink):
+    """通过 Neo4j Python Driver 写入"""
+
+    name = 'neo4j'
+
+    def __init__(self, uri: str, user: str, password: str):
+        """初始化 Neo4j 连接"""
+        from neo4j import GraphDatabase
+
+        self.uri = uri
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.session = self.driver.session()
+        self.owns_driver = True
+
+    def close(self):
+        """关闭连接"""
+        self.session.close()
+        if self.owns_driver:
+            self.driver.close()
+
+    def clone(self) -> 'Neo4jSink':
+        """共享 driver（线程安全）的新会话"""
+        sink = Neo4jSink.__new__(Neo4jSink)
+        sink.uri = self.uri
+        sink.driver = self.driver
+        sink.session = self.driver.session()
+        sink.owns_driver = False
+        return sink
+
+    def create_schema(self, schema: Dict):
+        """创建约束和索引"""
+        print("📋 创建约束和索引...")
+
+        constraints = [
+            "CREATE CONSTRAINT paper_id IF NOT EXISTS FOR (p:Paper) REQUIRE p.id IS UNIQUE",
+            "CREATE CONSTRAINT task_id IF NOT EXISTS FOR (t:Task) REQUIRE t.id IS UNIQUE",
+            "CREATE CONSTRAINT modality_id IF NOT EXISTS FOR (m:ImagingModality) REQUIRE m.id IS UNIQUE",
+            "CREATE CONSTRAINT structure_id IF NOT EXISTS FOR (s:AnatomicalStructure) REQUIRE s.id IS UNIQUE",
+            "CREATE CONSTRAINT method_id IF NOT EXISTS FOR (m:Method) REQUIRE m.id IS UNIQUE",
+            "CREATE CONSTRAINT dataset_id IF NOT EXISTS FOR (d:Dataset) REQUIRE d.id IS UNIQUE",
+            "CREATE CONSTRAINT metric_id IF NOT EXISTS FOR (m:Metric) REQUIRE m.id IS UNIQUE",
+            "CREATE CONSTRAINT innovation_id IF NOT EXISTS FOR (i:Innovation) REQUIRE i.id IS UNIQUE",
+        ]
+
+        # 按业务键查找的属性索引（graph_client.py 的模板按 paper_id / name 匹配，唯一约束只覆盖 id）
+        from generate_cypher import CONSTRAINT_PREFIX, index_statements
+        constraints += [statement for label in CONSTRAINT_PREFIX for statement in index_statements(label)]
+
+        for constraint in constraints:
+            try:
+                self.session.run(constraint)
+            except Exception as e:
+                print(f"   ⚠ {constraint[:50]}... 可能已存在: {e}")
+
+        print("✅ 约束和索引创建完成")
+
+    @staticmethod
+    def node_query(node_type: str):
+        """节点写入查询（按 id MERGE 后更新属性），参数为 $nodes"""
+        if node_type == 'Paper':
+            query = """
+            UNWIND $nodes AS node
+            MERGE (p:Paper {id: node.id})
+            SET p += {
+                paper_id: node.paper_id,
+                title: node.title,
+                doi: node.doi,
+                year: CASE WHEN node.year <> '' THEN toInteger(node.year) ELSE null END,
+                category: node.category,
+                authors: node.authors
+            }
+            WITH p, node
+            WHERE node.embedding IS NOT NULL
+            CALL db.create.setNodeVectorProperty(p, 'embedding', node.embedding)
+            """
+        elif node_type == 'Method':
+            query = """
+            UNWIND $nodes AS node
+            MERGE (m:Method {id: node.id})
+            SET m += {
+                legacy_id: node.legacy_id,
+                name: node.name,
+                method_type: node.method_type,
+                type: node.type
+            }
+            WITH m, node
+            WHERE node.embedding IS NOT NULL
+            CALL db.create.setNodeVectorProperty(m, 'embedding', node.embedding)
+            """
+        elif node_type == 'Innovation':
+            query = """
+            UNWIND $nodes AS node
+            MERGE (i:Innovation {id: node.id})
+            SET i += {
+                legacy_id: node.legacy_id,
+                description: node.description,
+                innovation_type: node.innovation_type,
+                type: node.type
+            }
+            WITH i, node
+            WHERE node.embedding IS NOT NULL
+            CALL db.create.setNodeVectorProperty(i, 'embedding', node.embedding)
+            """
+        elif node_type in ('Task', 'ImagingModality', 'AnatomicalStructure', 'Dataset', 'Metric'):
+            query = f"""
+            UNWIND $nodes AS node
+            MERGE (n:{node_type} {{id: node.id}})
+            SET n += {{
+                legacy_id: node.legacy_id,
+                name: node.name,
+                type: node.type
+            }}
+            WITH n, node
+            WHERE node.embedding IS NOT NULL
+            CALL db.create.setNodeVectorProperty(n, 'embedding', node.embedding)
+            """
+        else:
+            return None
+        return query
+
+    @staticmethod
+    def relation_query(rel_type: str, from_label: str, to_label: str) -> str:
+        """关系写入查询，参数为 $relations
+
+        关系类型和端点标签来自 schema，端点匹配走唯一约束索引；
+        使用 MERGE 保证失败后重跑同一批次不会产生重复关系
+        """
+        return f"""
+        UNWIND $relations AS rel
+        MATCH (from:{from_label} {{id: rel.from_id}})
+        MATCH (to:{to_label} {{id: rel.to_id}})
+        MERGE (from)-[r:{rel_type}]->(to)
+        SET r.value = CASE WHEN rel.value <> '' THEN toFloat(rel.value) ELSE null END,
+            r.note = rel.note,
+            r.support = CASE WHEN rel.support <> '' THEN toInteger(rel.support) ELSE null END,
+            r.papers = rel.papers,
+            r.value_min = CASE WHEN rel.value_min <> '' THEN toFloat(rel.value_min) ELSE null END,
+            r.value_max = CASE WHEN rel.value_max <> '' THEN toFloat(rel.value_max) ELSE null END,
+            r.value_mean = CASE WHEN rel.value_mean <> '' THEN toFloat(rel.value_mean) ELSE null END
+        """
+
+    def _write(self, query: str, counter: str, **params) -> int:
+        """在托管事务中执行一批写入，返回 counter 对应的计数
+
+        并发导入分片时，多个事务 MERGE 同一个枢纽节点（Task、Metric 等）可能发生死锁；
+        execute_write 对死锁等暂时性错误自动重试整个事务（写入都是幂等的）。
+        """
+        def work(tx):
+            return getattr(tx.run(query, **params).consume().counters, counter)
+
+        return self.session.execute_write(work)
+
+    def upsert_nodes(self, label: str, rows: List[Dict]) -> int:
+        query = self.node_query(label)
+        if query is None:
+            return 0
+        return self._write(query, 'nodes_created', nodes=rows)
+
+    def upsert_relations(self, rel_type: str, from_label: str, to_label: str,
+                         rows: List[Dict]) -> int:
+        query = self.relation_query(rel_type, from_label, to_label)
+        return self._write(query, 'relationships_created', relations=rows)
+
+    def delete_nodes(self, label: str, ids: List[str]) -> int:
+        query = f"""
+        UNWIND $ids AS id
+        MATCH (n:{label} {{id: id}})
+        DETACH DELETE n
+        """
+        return self._write(query, 'nodes_deleted', ids=ids)
+
+    def delete_relations(self, rel_type: str, from_label: str, to_label: str,
+                         rows: List[Dict]) -> int:
+        query = f"""
+        UNWIND $relations AS rel
+        MATCH (:{from_label} {{id: rel.from_id}})-[r:{rel_type}]->(:{to_label} {{id: rel.to_id}})
+        DELETE r
+        """
+        return self._write(query, 'relationships_deleted', relations=rows)
+
+    def create_vector_indexes(self, vector_configs: Dict[str, tuple]):
+        """为每个标签创建向量索引（维度和相似度函数由数据检测），等待填充完成并报告状态"""
+        import time
+        from generate_cypher import vector_index_name, INDEX_WAIT_SECONDS
+
+        if not vector_configs:
+            print("⚠ CSV 中没有 embedding，跳过向量索引")
+            return
+
+        print("📋 创建向量索引...")
+        for label, (dimension, similarity) in vector_configs.items():
+            name = vector_index_name(label)
+            self.session.run(
+                f"CREATE VECTOR INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.embedding) "
+                f"OPTIONS {{indexConfig: {{`vector.dimensions`: {dimension}, "
+                f"`vector.similarity_function`: '{similarity}'}}}}"
+            ).consume()
+            print(f"   ✓ {name}: {label}, {dimension} 维, {similarity}")
+
+        print(f"⏳ 等待向量索引填充（最多 {INDEX_WAIT_SECONDS} 秒）...")
+        start = time.time()
+        for label in vector_configs:
+            try:
+                self.session.run("CALL db.awaitIndex($name, $timeout)",
+                                 name=vector_index_name(label), timeout=INDEX_WAIT_SECONDS).consume()
+            except Exception as e:
+                print(f"   ⚠ {vector_index_name(label)} 未在超时内完成: {e}")
+
+        names = [vector_index_name(label) for label in vector_configs]
+        result = self.session.run(
+            "SHOW VECTOR INDEXES YIELD name, state, populationPercent "
+            "WHERE name IN $names RETURN name, state, populationPercent ORDER BY name",
+            names=names)
+        for record in result:
+            print(f"   {record['name']:25s}: {record['state']} ({record['populationPercent']:.1f}%)")
+        print(f"✅ 向量索引就绪 (耗时 {time.time() - start:.1f} 秒)")
+
+    def count_nodes(self, label: str) -> int:
+        return self.session.run(f"MATCH (n:{label}) RETURN count(n) AS count").single()['count']
+
+    def count_relations(self, rel_type: str) -> int:
+        return self.session.run(
+            f"MATCH ()-[r:{rel_type}]->() RETURN count(r) AS count").single()['count']
+
+    def get_node(self, label: str, node_id: str) -> Optional[Dict]:
+        record = self.session.run(
+            f"MATCH (n:{label} {{id: $id}}) RETURN n {{.*, embedding: null}} AS node",
+            id=node_id).single()
+        if record is None:
+            return None
+        return {k: v for k, v in record['node'].items() if v is not None}
+
+    def set_build_version(self, version: str):
+        self.session.run(
+            "MERGE (b:GraphBuild {id: 'current'}) SET b.version = $version, b.built_at = datetime()",
+            version=version).consume()
+
+    def get_build_version(self) -> Optional[str]:
+        record = self.session.run(
+            "MATCH (b:GraphBuild {id: 'current'}) RETURN b.version AS version").single()
+        return record['version'] if record else None
+
+
+class SQLiteSink(GraphSink):
+    """写入本地 SQLite 文件（或 ':memory:'）
+
+    nodes(label, id, props, embedding)：props 为 JSON，embedding 为 float32 BLOB
+    edges(type, from_id, to_id, value, note, support, papers, value_min, value_max, value_mean)：
+    按 (type, from_id, to_id) 唯一
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, timeout: float = 60.0, check_same_thread: bool = True):
+        """打开（或新建）数据库文件；timeout 为等待其他连接释放写锁的秒数
+
+        check_same_thread 为 False 时允许在创建连接以外的线程中使用（clone() 得到的连接
+        在工作线程中写入、在主线程中关闭，同一时刻只有一个线程使用）。
+        """
+        self.path = path
+        self.timeout = timeout
+        self.uri = 'sqlite:///' + (path if path == ':memory:' else os.path.abspath(path))
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=check_same_thread)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.integer_fields = {}
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS nodes (
+                label TEXT NOT NULL,
+                id TEXT NOT NULL,
+                props TEXT NOT NULL,
+                embedding BLOB,
+                PRIMARY KEY (label, id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS edges (
+                type TEXT NOT NULL,
+                from_id TEXT NOT NULL,
+                to_id TEXT NOT NULL,
+                value REAL,
+                note TEXT,
+                support INTEGER,
+                papers TEXT,
+                value_min REAL,
+                value_max REAL,
+                value_mean REAL,
+                PRIMARY KEY (type, from_id, to_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS vector_indexes (
+                label TEXT PRIMARY KEY,
+                dimension INTEGER NOT NULL,
+                similarity_function TEXT NOT NULL
+            );
+        """)
+        # 旧版数据库的 edges 表没有聚合列，补齐
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(edges)")}
+        for column, column_type in EDGE_AGGREGATE_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE edges ADD COLUMN {column} {column_type}")
+        self.conn.commit()
+
+    def close(self):
+        """提交并关闭数据库"""
+        self.conn.commit()
+        self.conn.close()
+
+    def clone(self) -> 'SQLiteSink':
+        """同一数据库文件的新连接（WAL 模式下写入按事务串行）；':memory:' 数据库无法共享"""
+        if self.path == ':memory:':
+            raise ValueError("':memory:' 数据库不能被其他连接打开")
+        sink = SQLiteSink(self.path, self.timeout, check_same_thread=False)
+        sink.integer_fields = dict(self.integer_fields)
+        return sink
+
+    def create_schema(self, schema: Dict):
+        """创建 id 查询和反向遍历的索引，并记录需要转换为整数的属性"""
+        from generate_cypher import node_property_types
+
+        self.conn.execute("CREATE INDEX IF NOT EXISTS nodes_id ON nodes (id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS edges_to ON edges (to_id, type)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS edges_from ON edges (from_id, type)")
+        self.conn.commit()
+        for label in schema.get('entities', {}):
+            self.integer_fields[label] = [name for name, value_type
+                                          in node_property_types(schema, label).items()
+                                          if value_type == 'integer']
+
+    def _node_props(self, label: str, row: Dict) -> str:
+        props = {k: v for k, v in row.items() if k not in ('id', 'embedding')}
+        for field in self.integer_fields.get(label, []):
+            value = props.get(field)
+            props[field] = int(value) if value not in (None, '') else None
+        return json.dumps(props, ensure_ascii=False)
+
+    def upsert_nodes(self, label: str, rows: List[Dict]) -> int:
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT INTO nodes (label, id, props) VALUES (?, ?, '{}') ON CONFLICT DO NOTHING",
+            [(label, row['id']) for row in rows])
+        created = self.conn.total_changes - before
+        # 空 embedding 不覆盖已有向量（与 Neo4j 中跳过 setNodeVectorProperty 一致）
+        self.conn.executemany(
+            "UPDATE nodes SET props = ?, embedding = COALESCE(?, embedding) WHERE label = ? AND id = ?",
+            [(self._node_props(label, row),
+              array('f', row['embedding']).tobytes() if row.get('embedding') else None,
+              label, row['id'])
+             for row in rows])
+        self.conn.commit()
+        return created
+
+    def upsert_relations(self, rel_type: str, from_label: str, to_label: str,
+                         rows: List[Dict]) -> int:
+        params = []
+        for row in rows:
+            params.append((rel_type, row['from_id'], row['to_id'],
+                           _number(row.get('value'), float), row.get('note'),
+                           _number(row.get('support'), int), row.get('papers'),
+                           _number(row.get('value_min'), float), _number(row.get('value_max'), float),
+                           _number(row.get('value_mean'), float),
+                           from_label, row['from_id'], to_label, row['to_id']))
+        before = self.conn.total_changes
+        self.conn.executemany(
+            """
+            INSERT INTO edges (type, from_id, to_id, value, note,
+                               support, papers, value_min, value_max, value_mean)
+            SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+            WHERE EXISTS (SELECT 1 FROM nodes WHERE label = ? AND id = ?)
+              AND EXISTS (SELECT 1 FROM nodes WHERE label = ? AND id = ?)
+            ON CONFLICT (type, from_id, to_id) DO NOTHING
+            """, params)
+        created = self.conn.total_changes - before
+        self.conn.executemany(
+            """
+            UPDATE edges SET value = ?, note = ?, support = ?, papers = ?,
+                             value_min = ?, value_max = ?, value_mean = ?
+            WHERE type = ? AND from_id = ? AND to_id = ?
+            """,
+            [p[3:10] + p[0:3] for p in params])
+        self.conn.commit()
+        return created
+
+    def delete_nodes(self, label: str, ids: List[str]) -> int:
+        before = self.conn.total_changes
+        self.conn.executemany("DELETE FROM nodes WHERE label = ? AND id = ?",
+                              [(label, node_id) for node_id in ids])
+        deleted = self.conn.total_changes - before
+        # 节点 id 在各标签间唯一，按 id 删除相连的关系（DETACH DELETE）
+        self.conn.executemany("DELETE FROM edges WHERE from_id = ? OR to_id = ?",
+                              [(node_id, node_id) for node_id in ids])
+        self.conn.commit()
+        return deleted
+
+    def delete_relations(self, rel_type: str, from_label: str, to_label: str,
+                         rows: List[Dict]) -> int:
+        before = self.conn.total_changes
+        self.conn.executemany("DELETE FROM edges WHERE type = ? AND from_id = ? AND to_id = ?",
+                              [(rel_type, row['from_id'], row['to_id']) for row in rows])
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def create_vector_indexes(self, vector_configs: Dict[str, tuple]):
+        """本地后端不建 ANN 索引，只记录每个标签的维度和相似度函数"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO vector_indexes (label, dimension, similarity_function) "
+            "VALUES (?, ?, ?)",
+            [(label, dimension, similarity)
+             for label, (dimension, similarity) in vector_configs.items()])
+        self.conn.commit()
+
+    def count_nodes(self, label: str) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM nodes WHERE label = ?", (label,)).fetchone()[0]
+
+    def count_relations(self, rel_type: str) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM edges WHERE type = ?", (rel_type,)).fetchone()[0]
+
+    def get_node(self, label: str, node_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT props FROM nodes WHERE label = ? AND id = ?",
+                                (label, node_id)).fetchone()
+        if row is None:
+            return None
+        props = json.loads(row[0])
+        props['id'] = node_id
+        return props
+
+    def set_build_version(self, version: str):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('build_version', ?)",
+                          (version,))
+        self.conn.commit()
+
+    def get_build_version(self) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'build_version'").fetchone()
+        return row[0] if row else None
+
+    def get_embedding(self, label: str, node_id: str) -> Optional[List[float]]:
+        """按 id 查询节点的 embedding"""
+        row = self.conn.execute("SELECT embedding FROM nodes WHERE label = ? AND id = ?",
+                                (label, node_id)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return array('f', row[0]).tolist()
+
+    def neighbors(self, node_id: str, rel_type: str = None, direction: str = 'out') -> List[Dict]:
+        """查询某节点的邻居（按关系类型过滤），direction 为 'out' 或 'in'"""
+        near, far = ('from_id', 'to_id') if direction == 'out' else ('to_id', 'from_id')
+        query = f"SELECT type, {far}, value, note FROM edges WHERE {near} = ?"
+        params = [node_id]
+        if rel_type:
+            query += " AND type = ?"
+            params.append(rel_type)
+        return [{'type': t, 'id': other, 'value': value, 'note': note}
+                for t, other, value, note in self.conn.execute(query, params)]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图谱快照与差异计算
+快照只保存节点 ID / 关系键及其属性的 8 字节哈希，用于和上次导入的数据比较，
+得到需要插入、更新和删除的节点和关系。
+
+快照文件格式：
+    KGSNAP1\\n<payload 的 SHA-256>\\n<gzip 压缩的 JSON payload>
+"""
+
+import os
+import csv
+import gzip
+import json
+import hashlib
+from typing import Dict, List, Set, Tuple
+
+SNAPSHOT_MAGIC = b'KGSNAP1\n'
+
+
+def row_hash(row: Dict, fields: List[str]) -> str:
+    """按列顺序计算一行属性的 8 字节哈希"""
+    payload = '\x1f'.join(row.get(field) or '' for field in fields)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def relation_key(row: Dict) -> str:
+    """关系键（同一类型内）：from_id 与 to_id"""
+    return f"{row['from_id']}\t{row['to_id']}"
+
+
+def build_snapshot(csv_dir: str, node_types: List[str], rel_types: List[str],
+                   rel_file_name) -> Dict:
+    """从 CSV 目录构建快照
+
+    rel_file_name 为关系类型到文件名的映射函数（csv_layout.relation_csv_name）。
+    同一关系键出现多次时，以最后一行为准（与 MERGE + SET 的结果一致）。
+    """
+    snapshot = {'nodes': {}, 'relations': {}}
+
+    for node_type in node_types:
+        csv_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+        entries = {}
+        if os.path.exists(csv_file):
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                fields = [c for c in reader.fieldnames or [] if c != 'id']
+                for row in reader:
+                    entries[row['id']] = row_hash(row, fields)
+        snapshot['nodes'][node_type] = entries
+
+    for rel_type in rel_types:
+        csv_file = os.path.join(csv_dir, rel_file_name(rel_type))
+        entries = {}
+        if os.path.exists(csv_file):
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                # value、note 及聚合列（support、papers、value_min/max/mean）
+                fields = [c for c in reader.fieldnames or [] if c not in ('from_id', 'to_id', 'type')]
+                for row in reader:
+                    entries[relation_key(row)] = row_hash(row, fields)
+        snapshot['relations'][rel_type] = entries
+
+    return snapshot
+
+
+def snapshot_version(snapshot: Dict) -> str:
+    """图数据版本号：快照内容的哈希，数据不变则版本不变"""
+    payload = json.dumps(snapshot, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def save_snapshot(path: str, snapshot: Dict):
+    """写入快照（先写临时文件再重命名）"""
+    payload = gzip.compress(
+        json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    checksum = hashlib.sha256(payload).hexdigest().encode('ascii')
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC + checksum + b'\n' + payload)
+    os.replace(tmp_file, path)
+
+
+def load_snapshot(path: str) -> Dict:
+    """读取并校验快照；格式或校验和不符时抛出 ValueError"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError(f"不是有效的快照文件: {path}")
+    header_end = data.index(b'\n', len(SNAPSHOT_MAGIC))
+    checksum = data[len(SNAPSHOT_MAGIC):header_end].decode('ascii')
+    payload = data[header_end + 1:]
+    if hashlib.sha256(payload).hexdigest() != checksum:
+        raise ValueError(f"快照校验和不一致，文件可能已损坏: {path}")
+    return json.loads(gzip.decompress(payload).decode('utf-8'))
+
+
+def diff_entries(old: Dict[str, str], new: Dict[str, str]) -> Tuple[Set[str], Set[str], Set[str]]:
+    """比较两组 键 -> 哈希，返回 (新增, 属性变化, 删除) 的键集合"""
+    inserts = set(new) - set(old)
+    deletes = set(old) - set(new)
+    updates = {key for key, value in new.items() if key in old and old[key] != value}
+    return inserts, updates, deletes
+
+
+def diff_snapshots(old: Dict, new: Dict) -> Dict:
+    """逐标签、逐关系类型比较两个快照"""
+    diff = {'nodes': {}, 'relations': {}}
+    for section in ('nodes', 'relations'):
+        names = set(old.get(section, {})) | set(new.get(section, {}))
+        for name in names:
+            inserts, updates, deletes = diff_entries(old.get(section, {}).get(name, {}),
+                                                     new.get(section, {}).get(name, {}))
+            if inserts or updates or deletes:
+                diff[section][name] = {
+                    'inserts': inserts,
+                    'updates': updates,
+                    'deletes': deletes,
+                }
+    return diff
+
+
+def collect_rows(csv_file: str, keys: Set[str], key_fn) -> List[Dict]:
+    """从 CSV 中取出键在 keys 中的行（重复键只保留最后一行）"""
+    rows = {}
+    if not keys or not os.path.exists(csv_file):
+        return []
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            key = key_fn(row)
+            if key in keys:
+                rows[key] = row
+    return list(rows.values())
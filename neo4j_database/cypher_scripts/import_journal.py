@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导入进度日志
+按数据库 URI 和文件记录已提交的批次，文件内容变化（哈希不同）时自动作废该文件的记录。
+导入中断后重新运行即可跳过已完成的批次。
+多个线程可共用一个日志（按分片并发导入时），记录和保存都在锁内进行。
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def merge_ranges(ranges: List[List[int]]) -> List[List[int]]:
+    """合并重叠或相邻的 [start, end) 区间"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class ImportJournal:
+    def __init__(self, journal_file: str, uri: str):
+        """加载（或新建）指定数据库的导入日志"""
+        self.journal_file = journal_file
+        self.uri = uri
+        self.lock = threading.RLock()
+        self.data = {}
+        if os.path.exists(journal_file):
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        self.files = self.data.setdefault(uri, {})
+
+    def save(self):
+        """原子写入日志文件（先写临时文件再重命名）"""
+        with self.lock:
+            tmp_file = self.journal_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.journal_file)
+
+    def reset(self):
+        """清空当前数据库的记录"""
+        self.files.clear()
+        self.save()
+
+    def begin_file(self, csv_file: str, kind: str, name: str) -> Dict:
+        """开始导入一个文件；文件哈希变化时丢弃旧的批次记录
+
+        kind 为 'node' 或 'relation'，name 为节点标签或关系类型。
+        哈希变化时保留之前的创建数量：MERGE 只计入新建的节点/关系，
+        重新导入后数据库中的数量为之前创建的加上本次新建的。
+        """
+        key = os.path.basename(csv_file)
+        sha256 = file_sha256(csv_file)
+        with self.lock:
+            entry = self.files.get(key)
+            if entry is None or entry.get('sha256') != sha256:
+                entry = {
+                    'sha256': sha256,
+                    'kind': kind,
+                    'name': name,
+                    'batches': [],
+                    'rows': 0,
+                    'created': entry['created'] if entry is not None else 0,
+                    'completed': False,
+                }
+                self.files[key] = entry
+                self.save()
+        return entry
+
+    @staticmethod
+    def is_done(entry: Dict, start: int, end: int) -> bool:
+        """[start, end) 行是否已在之前的运行中提交"""
+        for done_start, done_end in entry['batches']:
+            if done_start <= start and end <= done_end:
+                return True
+        return False
+
+    def record_batch(self, entry: Dict, start: int, end: int, created: int):
+        """记录一个已提交的批次"""
+        with self.lock:
+            entry['batches'] = merge_ranges(entry['batches'] + [[start, end]])
+            entry['rows'] += end - start
+            entry['created'] += created
+            self.save()
+
+    def finish_file(self, entry: Dict, total_rows: int):
+        """标记文件已全部导入"""
+        with self.lock:
+            entry['completed'] = entry['batches'] == [[0, total_rows]] or total_rows == 0
+            self.save()
+
+    def record_sync(self, csv_file: str, kind: str, name: str, rows: int, delta: int):
+        """增量同步成功后改写文件的记录
+
+        哈希和行数改为同步后的文件（之后的完整导入会跳过它），
+        创建数量加上本次同步的净变化（新建数 - 删除数），使 expected_counts 与数据库一致。
+        """
+        key = os.path.basename(csv_file)
+        sha256 = file_sha256(csv_file)
+        with self.lock:
+            entry = self.files.get(key)
+            self.files[key] = {
+                'sha256': sha256,
+                'kind': kind,
+                'name': name,
+                'batches': [[0, rows]] if rows else [],
+                'rows': rows,
+                'created': (entry['created'] if entry is not None else 0) + delta,
+                'completed': True,
+            }
+            self.save()
+
+    def expected_counts(self, kind: str) -> Dict[str, int]:
+        """按标签/关系类型汇总日志中记录的创建数量"""
+        counts = {}
+        for entry in self.files.values():
+            if entry['kind'] == kind:
+                counts[entry['name']] = counts.get(entry['name'], 0) + entry['created']
+        return counts
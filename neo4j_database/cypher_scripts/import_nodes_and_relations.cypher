@@ -1,6 +1,7 @@
-// Neo4j 导入脚本
-// 使用方法: 在 Neo4j Browser 或 cypher-shell 中执行此脚本
-// 或者使用: cypher-shell -u neo4j -p password -f import_nodes_and_relations.cypher
+// Neo4j 导入脚本（由 generate_cypher.py 根据 schema_v1.json 自动生成，请勿手动修改）
+// 使用方法: cypher-shell -u neo4j -p password -f import_nodes_and_relations.cypher
+// 在 Neo4j Browser 中执行时，每条 CALL { } IN TRANSACTIONS 语句需加 :auto 前缀
+// 每批提交 1000 行
 
 // ============================================
 // 1. 清理数据库（可选，谨慎使用）
@@ -12,36 +13,37 @@
 // ============================================
 
 // Paper 节点约束和索引
-CREATE CONSTRAINT paper_id IF NOT EXISTS FOR (p:Paper) REQUIRE p.id IS UNIQUE;
-CREATE INDEX paper_title IF NOT EXISTS FOR (p:Paper) ON (p.title);
+CREATE CONSTRAINT paper_id IF NOT EXISTS FOR (n:Paper) REQUIRE n.id IS UNIQUE;
+CREATE INDEX paper_paper_id IF NOT EXISTS FOR (n:Paper) ON (n.paper_id);
+CREATE INDEX paper_title IF NOT EXISTS FOR (n:Paper) ON (n.title);
 
 // Task 节点约束和索引
-CREATE CONSTRAINT task_id IF NOT EXISTS FOR (t:Task) REQUIRE t.id IS UNIQUE;
-CREATE INDEX task_name IF NOT EXISTS FOR (t:Task) ON (t.name);
+CREATE CONSTRAINT task_id IF NOT EXISTS FOR (n:Task) REQUIRE n.id IS UNIQUE;
+CREATE INDEX task_name IF NOT EXISTS FOR (n:Task) ON (n.name);
 
 // ImagingModality 节点约束和索引
-CREATE CONSTRAINT modality_id IF NOT EXISTS FOR (m:ImagingModality) REQUIRE m.id IS UNIQUE;
-CREATE INDEX modality_name IF NOT EXISTS FOR (m:ImagingModality) ON (m.name);
+CREATE CONSTRAINT modality_id IF NOT EXISTS FOR (n:ImagingModality) REQUIRE n.id IS UNIQUE;
+CREATE INDEX modality_name IF NOT EXISTS FOR (n:ImagingModality) ON (n.name);
 
 // AnatomicalStructure 节点约束和索引
-CREATE CONSTRAINT structure_id IF NOT EXISTS FOR (s:AnatomicalStructure) REQUIRE s.id IS UNIQUE;
-CREATE INDEX structure_name IF NOT EXISTS FOR (s:AnatomicalStructure) ON (s.name);
+CREATE CONSTRAINT structure_id IF NOT EXISTS FOR (n:AnatomicalStructure) REQUIRE n.id IS UNIQUE;
+CREATE INDEX structure_name IF NOT EXISTS FOR (n:AnatomicalStructure) ON (n.name);
 
 // Method 节点约束和索引
-CREATE CONSTRAINT method_id IF NOT EXISTS FOR (m:Method) REQUIRE m.id IS UNIQUE;
-CREATE INDEX method_name IF NOT EXISTS FOR (m:Method) ON (m.name);
+CREATE CONSTRAINT method_id IF NOT EXISTS FOR (n:Method) REQUIRE n.id IS UNIQUE;
+CREATE INDEX method_name IF NOT EXISTS FOR (n:Method) ON (n.name);
 
 // Dataset 节点约束和索引
-CREATE CONSTRAINT dataset_id IF NOT EXISTS FOR (d:Dataset) REQUIRE d.id IS UNIQUE;
-CREATE INDEX dataset_name IF NOT EXISTS FOR (d:Dataset) ON (d.name);
+CREATE CONSTRAINT dataset_id IF NOT EXISTS FOR (n:Dataset) REQUIRE n.id IS UNIQUE;
+CREATE INDEX dataset_name IF NOT EXISTS FOR (n:Dataset) ON (n.name);
 
 // Metric 节点约束和索引
-CREATE CONSTRAINT metric_id IF NOT EXISTS FOR (m:Metric) REQUIRE m.id IS UNIQUE;
-CREATE INDEX metric_name IF NOT EXISTS FOR (m:Metric) ON (m.name);
+CREATE CONSTRAINT metric_id IF NOT EXISTS FOR (n:Metric) REQUIRE n.id IS UNIQUE;
+CREATE INDEX metric_name IF NOT EXISTS FOR (n:Metric) ON (n.name);
 
 // Innovation 节点约束和索引
-CREATE CONSTRAINT innovation_id IF NOT EXISTS FOR (i:Innovation) REQUIRE i.id IS UNIQUE;
-CREATE INDEX innovation_description IF NOT EXISTS FOR (i:Innovation) ON (i.description);
+CREATE CONSTRAINT innovation_id IF NOT EXISTS FOR (n:Innovation) REQUIRE n.id IS UNIQUE;
+CREATE INDEX innovation_description IF NOT EXISTS FOR (n:Innovation) ON (n.description);
 
 // ============================================
 // 3. 导入节点
@@ -49,211 +51,362 @@ CREATE INDEX innovation_description IF NOT EXISTS FOR (i:Innovation) ON (i.descr
 
 // 导入 Paper 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_Paper.csv' AS row
-CREATE (p:Paper {
-    id: row.id,
-    paper_id: row.paper_id,
-    title: row.title,
-    doi: row.doi,
-    year: CASE WHEN row.year <> '' THEN toInteger(row.year) ELSE null END,
-    category: row.category,
-    authors: row.authors,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:Paper {id: row.id})
+    SET n.paper_id = row.paper_id,
+        n.title = row.title,
+        n.doi = row.doi,
+        n.year = CASE WHEN row.year <> '' THEN toInteger(row.year) ELSE null END,
+        n.category = row.category,
+        n.authors = row.authors
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 Task 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_Task.csv' AS row
-CREATE (t:Task {
-    id: row.id,
-    name: row.name,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:Task {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.name = row.name,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 ImagingModality 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_ImagingModality.csv' AS row
-CREATE (m:ImagingModality {
-    id: row.id,
-    name: row.name,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:ImagingModality {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.name = row.name,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 AnatomicalStructure 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_AnatomicalStructure.csv' AS row
-CREATE (s:AnatomicalStructure {
-    id: row.id,
-    name: row.name,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:AnatomicalStructure {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.name = row.name,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 Method 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_Method.csv' AS row
-CREATE (m:Method {
-    id: row.id,
-    name: row.name,
-    method_type: row.method_type,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:Method {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.name = row.name,
+        n.method_type = row.method_type,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 Dataset 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_Dataset.csv' AS row
-CREATE (d:Dataset {
-    id: row.id,
-    name: row.name,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:Dataset {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.name = row.name,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 Metric 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_Metric.csv' AS row
-CREATE (m:Metric {
-    id: row.id,
-    name: row.name,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:Metric {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.name = row.name,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // 导入 Innovation 节点
 LOAD CSV WITH HEADERS FROM 'file:///nodes_Innovation.csv' AS row
-CREATE (i:Innovation {
-    id: row.id,
-    description: row.description,
-    innovation_type: row.innovation_type,
-    type: row.type,
-    embedding: CASE WHEN row.embedding <> '' THEN [x IN split(row.embedding, ',') | toFloat(x)] ELSE [] END
-});
+CALL {
+    WITH row
+    MERGE (n:Innovation {id: row.id})
+    SET n.legacy_id = row.legacy_id,
+        n.description = row.description,
+        n.innovation_type = row.innovation_type,
+        n.type = row.type
+    WITH n, row
+    WHERE row.embedding <> ''
+    CALL db.create.setNodeVectorProperty(n, 'embedding', [x IN split(row.embedding, ',') | toFloat(x)])
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // ============================================
-// 4. 导入关系
+// 4. 创建向量索引（维度和相似度函数由数据检测）
 // ============================================
 
-// 方法 1: 使用 APOC 插件（推荐，如果已安装）
-// LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-// MATCH (from {id: row.from_id})
-// MATCH (to {id: row.to_id})
-// CALL apoc.create.relationship(from, row.type, {
-//     value: CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-//     note: row.note
-// }, to) YIELD rel
-// RETURN count(rel) AS relationships_created;
-
-// 方法 2: 为每种关系类型单独导入（推荐，无需 APOC）
-// ADDRESSES_TASK
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'ADDRESSES_TASK'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:ADDRESSES_TASK]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// USES_MODALITY
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'USES_MODALITY'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:USES_MODALITY]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// FOCUSES_ON_STRUCTURE
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'FOCUSES_ON_STRUCTURE'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:FOCUSES_ON_STRUCTURE]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// PROPOSES_METHOD
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'PROPOSES_METHOD'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:PROPOSES_METHOD]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// USES_DATASET
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'USES_DATASET'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:USES_DATASET]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// REPORTS_METRIC
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'REPORTS_METRIC'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:REPORTS_METRIC]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// HAS_INNOVATION
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'HAS_INNOVATION'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:HAS_INNOVATION]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// DESIGNED_FOR_TASK
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'DESIGNED_FOR_TASK'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:DESIGNED_FOR_TASK]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// APPLIED_TO_MODALITY
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'APPLIED_TO_MODALITY'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:APPLIED_TO_MODALITY]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// APPLIED_TO_STRUCTURE
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'APPLIED_TO_STRUCTURE'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:APPLIED_TO_STRUCTURE]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// EVALUATED_ON
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'EVALUATED_ON'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:EVALUATED_ON]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
-
-// ACHIEVES_METRIC
-LOAD CSV WITH HEADERS FROM 'file:///relations.csv' AS row
-WHERE row.type = 'ACHIEVES_METRIC'
-MATCH (from {id: row.from_id})
-MATCH (to {id: row.to_id})
-MERGE (from)-[r:ACHIEVES_METRIC]->(to)
-SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
-    r.note = row.note;
+// CSV 中没有 embedding，未创建向量索引
 
 // ============================================
-// 5. 创建关系索引（可选，提升查询性能）
+// 5. 导入关系（每种类型一个文件，端点按标签匹配）
 // ============================================
-// CREATE INDEX rel_type IF NOT EXISTS FOR ()-[r:ADDRESSES_TASK]-() ON (r.type);
-// CREATE INDEX rel_type IF NOT EXISTS FOR ()-[r:USES_MODALITY]-() ON (r.type);
-// ... 其他关系类型
+
+// ADDRESSES_TASK: (Paper)-[:ADDRESSES_TASK]->(Task)
+LOAD CSV WITH HEADERS FROM 'file:///relations_ADDRESSES_TASK.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:Task {id: row.to_id})
+    MERGE (from)-[r:ADDRESSES_TASK]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// USES_MODALITY: (Paper)-[:USES_MODALITY]->(ImagingModality)
+LOAD CSV WITH HEADERS FROM 'file:///relations_USES_MODALITY.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:ImagingModality {id: row.to_id})
+    MERGE (from)-[r:USES_MODALITY]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// FOCUSES_ON_STRUCTURE: (Paper)-[:FOCUSES_ON_STRUCTURE]->(AnatomicalStructure)
+LOAD CSV WITH HEADERS FROM 'file:///relations_FOCUSES_ON_STRUCTURE.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:AnatomicalStructure {id: row.to_id})
+    MERGE (from)-[r:FOCUSES_ON_STRUCTURE]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// PROPOSES_METHOD: (Paper)-[:PROPOSES_METHOD]->(Method)
+LOAD CSV WITH HEADERS FROM 'file:///relations_PROPOSES_METHOD.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:Method {id: row.to_id})
+    MERGE (from)-[r:PROPOSES_METHOD]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// USES_DATASET: (Paper)-[:USES_DATASET]->(Dataset)
+LOAD CSV WITH HEADERS FROM 'file:///relations_USES_DATASET.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:Dataset {id: row.to_id})
+    MERGE (from)-[r:USES_DATASET]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// REPORTS_METRIC: (Paper)-[:REPORTS_METRIC]->(Metric)
+LOAD CSV WITH HEADERS FROM 'file:///relations_REPORTS_METRIC.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:Metric {id: row.to_id})
+    MERGE (from)-[r:REPORTS_METRIC]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// HAS_INNOVATION: (Paper)-[:HAS_INNOVATION]->(Innovation)
+LOAD CSV WITH HEADERS FROM 'file:///relations_HAS_INNOVATION.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:Innovation {id: row.to_id})
+    MERGE (from)-[r:HAS_INNOVATION]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// DESIGNED_FOR_TASK: (Method)-[:DESIGNED_FOR_TASK]->(Task)
+LOAD CSV WITH HEADERS FROM 'file:///relations_DESIGNED_FOR_TASK.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Method {id: row.from_id})
+    MATCH (to:Task {id: row.to_id})
+    MERGE (from)-[r:DESIGNED_FOR_TASK]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// APPLIED_TO_MODALITY: (Method)-[:APPLIED_TO_MODALITY]->(ImagingModality)
+LOAD CSV WITH HEADERS FROM 'file:///relations_APPLIED_TO_MODALITY.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Method {id: row.from_id})
+    MATCH (to:ImagingModality {id: row.to_id})
+    MERGE (from)-[r:APPLIED_TO_MODALITY]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// APPLIED_TO_STRUCTURE: (Method)-[:APPLIED_TO_STRUCTURE]->(AnatomicalStructure)
+LOAD CSV WITH HEADERS FROM 'file:///relations_APPLIED_TO_STRUCTURE.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Method {id: row.from_id})
+    MATCH (to:AnatomicalStructure {id: row.to_id})
+    MERGE (from)-[r:APPLIED_TO_STRUCTURE]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// EVALUATED_ON: (Method)-[:EVALUATED_ON]->(Dataset)
+LOAD CSV WITH HEADERS FROM 'file:///relations_EVALUATED_ON.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Method {id: row.from_id})
+    MATCH (to:Dataset {id: row.to_id})
+    MERGE (from)-[r:EVALUATED_ON]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// ACHIEVES_METRIC: (Method)-[:ACHIEVES_METRIC]->(Metric)
+LOAD CSV WITH HEADERS FROM 'file:///relations_ACHIEVES_METRIC.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Method {id: row.from_id})
+    MATCH (to:Metric {id: row.to_id})
+    MERGE (from)-[r:ACHIEVES_METRIC]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// SIMILAR_TO: (Paper)-[:SIMILAR_TO]->(Paper)
+LOAD CSV WITH HEADERS FROM 'file:///relations_SIMILAR_TO.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Paper {id: row.from_id})
+    MATCH (to:Paper {id: row.to_id})
+    MERGE (from)-[r:SIMILAR_TO]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// SIMILAR_METHOD: (Method)-[:SIMILAR_METHOD]->(Method)
+LOAD CSV WITH HEADERS FROM 'file:///relations_SIMILAR_METHOD.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Method {id: row.from_id})
+    MATCH (to:Method {id: row.to_id})
+    MERGE (from)-[r:SIMILAR_METHOD]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
+
+// SIMILAR_INNOVATION: (Innovation)-[:SIMILAR_INNOVATION]->(Innovation)
+LOAD CSV WITH HEADERS FROM 'file:///relations_SIMILAR_INNOVATION.csv' AS row
+CALL {
+    WITH row
+    MATCH (from:Innovation {id: row.from_id})
+    MATCH (to:Innovation {id: row.to_id})
+    MERGE (from)-[r:SIMILAR_INNOVATION]->(to)
+    SET r.value = CASE WHEN row.value <> '' THEN toFloat(row.value) ELSE null END,
+        r.note = row.note,
+        r.support = CASE WHEN row.support <> '' THEN toInteger(row.support) ELSE null END,
+        r.papers = row.papers,
+        r.value_min = CASE WHEN row.value_min <> '' THEN toFloat(row.value_min) ELSE null END,
+        r.value_max = CASE WHEN row.value_max <> '' THEN toFloat(row.value_max) ELSE null END,
+        r.value_mean = CASE WHEN row.value_mean <> '' THEN toFloat(row.value_mean) ELSE null END
+} IN TRANSACTIONS OF 1000 ROWS;
 
 // ============================================
 // 6. 验证导入结果
@@ -265,4 +418,3 @@ ORDER BY nodeType;
 MATCH ()-[r]->()
 RETURN type(r) AS relationshipType, count(r) AS count
 ORDER BY relationshipType;
-
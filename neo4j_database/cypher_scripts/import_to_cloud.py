@@ -2,52 +2,65 @@
 # -*- coding: utf-8 -*-
 """
 将 CSV 文件导入到 Neo4j Cloud 实例
-支持通过 Neo4j Python Driver 或 HTTP API 导入
+通过 Neo4j Python Driver 导入；也可用 --sink sqlite 导入本地 SQLite 文件（离线测试）
+--shards 时读取 json_to_csv.py --shards 生成的分片：先并发导入所有节点分片，再并发导入关系分片，
+每个线程使用独立的连接，导入日志按分片文件记录进度
 """
 
 
 import os
+import sys
 import csv
-from neo4j import GraphDatabase
+import argparse
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 import time
 
+from import_journal import ImportJournal
+from graph_sinks import GraphSink, Neo4jSink, SQLiteSink
+from graph_snapshot import (build_snapshot, save_snapshot, load_snapshot, diff_snapshots,
+                            collect_rows, relation_key, snapshot_version)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from csv_layout import load_schema, relation_csv_name
+from shards import DEFAULT_WORKERS, require_manifest
+from generate_cypher import detect_vector_configs
+from vector_utils import parse_embedding, scan_embedding_csv
+
 os.environ["NEO4J_URI"]="neo4j+s://e96b056a.databases.neo4j.io"
 os.environ["NEO4J_USER"]="neo4j"
 os.environ["NEO4J_PASSWORD"]="l_Xozo1gLym66VVmHMXa9WMNmpju9uUsScSXtYy-elc"
+
+
+def count_csv_rows(csv_file: str) -> int:
+    """CSV 的数据行数（不含表头）"""
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
 class Neo4jImporter:
-    def __init__(self, uri: str, user: str, password: str):
-        """初始化 Neo4j 连接"""
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.session = self.driver.session()
+    def __init__(self, sink: GraphSink, journal: ImportJournal = None):
+        """初始化导入器
+
+        sink 为写入后端（Neo4jSink 或 SQLiteSink）；
+        journal 用于记录已提交的批次，重新运行时跳过已完成的部分
+        """
+        self.sink = sink
+        self.journal = journal
     
     def close(self):
         """关闭连接"""
-        self.session.close()
-        self.driver.close()
+        self.sink.close()
     
-    def create_constraints_and_indexes(self):
+    def create_constraints_and_indexes(self, schema: Dict):
         """创建约束和索引"""
-        print("📋 创建约束和索引...")
-        
-        constraints = [
-            "CREATE CONSTRAINT paper_id IF NOT EXISTS FOR (p:Paper) REQUIRE p.id IS UNIQUE",
-            "CREATE CONSTRAINT task_id IF NOT EXISTS FOR (t:Task) REQUIRE t.id IS UNIQUE",
-            "CREATE CONSTRAINT modality_id IF NOT EXISTS FOR (m:ImagingModality) REQUIRE m.id IS UNIQUE",
-            "CREATE CONSTRAINT structure_id IF NOT EXISTS FOR (s:AnatomicalStructure) REQUIRE s.id IS UNIQUE",
-            "CREATE CONSTRAINT method_id IF NOT EXISTS FOR (m:Method) REQUIRE m.id IS UNIQUE",
-            "CREATE CONSTRAINT dataset_id IF NOT EXISTS FOR (d:Dataset) REQUIRE d.id IS UNIQUE",
-            "CREATE CONSTRAINT metric_id IF NOT EXISTS FOR (m:Metric) REQUIRE m.id IS UNIQUE",
-            "CREATE CONSTRAINT innovation_id IF NOT EXISTS FOR (i:Innovation) REQUIRE i.id IS UNIQUE",
-        ]
-        
-        for constraint in constraints:
-            try:
-                self.session.run(constraint)
-            except Exception as e:
-                print(f"   ⚠ {constraint[:50]}... 可能已存在: {e}")
-        
-        print("✅ 约束和索引创建完成")
+        self.sink.create_schema(schema)
+    
+    def create_vector_indexes(self, vector_configs: Dict[str, tuple]):
+        """为每个标签创建向量索引"""
+        self.sink.create_vector_indexes(vector_configs)
     
     def import_nodes(self, csv_file: str, node_type: str):
         """导入节点"""
@@ -64,121 +77,87 @@ class Neo4jImporter:
         if not nodes:
             return 0
         
-        # 根据节点类型构建 Cypher 查询
-        if node_type == 'Paper':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (p:Paper {
-                id: node.id,
-                paper_id: node.paper_id,
-                title: node.title,
-                doi: node.doi,
-                year: CASE WHEN node.year <> '' THEN toInteger(node.year) ELSE null END,
-                category: node.category,
-                authors: node.authors,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'Task':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (t:Task {
-                id: node.id,
-                name: node.name,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'ImagingModality':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (m:ImagingModality {
-                id: node.id,
-                name: node.name,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'AnatomicalStructure':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (s:AnatomicalStructure {
-                id: node.id,
-                name: node.name,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'Method':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (m:Method {
-                id: node.id,
-                name: node.name,
-                method_type: node.method_type,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'Dataset':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (d:Dataset {
-                id: node.id,
-                name: node.name,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'Metric':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (m:Metric {
-                id: node.id,
-                name: node.name,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        elif node_type == 'Innovation':
-            query = """
-            UNWIND $nodes AS node
-            CREATE (i:Innovation {
-                id: node.id,
-                description: node.description,
-                innovation_type: node.innovation_type,
-                type: node.type,
-                embedding: CASE WHEN node.embedding <> '' THEN [x IN split(node.embedding, ',') | toFloat(x)] ELSE [] END
-            })
-            """
-        else:
-            return 0
-        
-        # 批量导入（每批 1000 个）
+        # 批量导入（每批 50 个）
         batch_size = 50
+        prepare = self._embedding_preparer(csv_file, node_type)
+        total = self._run_batches(csv_file, 'node', node_type, nodes, batch_size,
+                                  lambda batch: self.sink.upsert_nodes(node_type, batch), prepare)
+        
+        print(f"✅ {node_type} 节点导入完成 ({total} 个节点)")
+        return total
+    
+    def _embedding_preparer(self, csv_file: str, node_type: str):
+        """返回按批解析 embedding 的函数
+
+        embedding 在客户端解析为浮点数列表后以原生列表发送；
+        空 embedding 和维度与该文件主流维度不一致的向量置为 None，不写入。
+        """
+        dimension = scan_embedding_csv(csv_file).dimension
+        
+        def prepare(batch: List[Dict]) -> List[Dict]:
+            prepared = []
+            mismatched = 0
+            for row in batch:
+                row = dict(row)
+                vector = parse_embedding(row.get('embedding', ''))
+                if vector is not None and len(vector) != dimension:
+                    vector = None
+                    mismatched += 1
+                row['embedding'] = vector
+                prepared.append(row)
+            if mismatched:
+                print(f"   ⚠ {node_type}: {mismatched} 个向量维度不是 {dimension}，已跳过")
+            return prepared
+        
+        return prepare
+    
+    def _run_batches(self, csv_file: str, kind: str, name: str, rows: List, batch_size: int,
+                     write, prepare=None) -> int:
+        """分批写入，每批为一个事务，write(batch) 返回新建（或删除）的数量
+
+        已记录在日志中的批次直接跳过；每批提交成功后立即写入日志。
+        csv_file 为 None 时不记录日志（用于增量同步，同步完成后由 sync 统一改写日志）。
+        prepare 用于在发送前转换每批数据（如解析 embedding）。
+        """
+        entry = None
+        if self.journal is not None and csv_file is not None:
+            entry = self.journal.begin_file(csv_file, kind, name)
         total = 0
+        skipped = 0
         
-        for i in range(0, len(nodes), batch_size):
-            batch = nodes[i:i+batch_size]
+        for i in range(0, len(rows), batch_size):
+            end = min(i + batch_size, len(rows))
+            if entry is not None and ImportJournal.is_done(entry, i, end):
+                skipped += end - i
+                continue
+            
+            batch = rows[i:end]
+            if prepare is not None:
+                batch = prepare(batch)
             try:
-                result = self.session.run(query, nodes=batch)
-                count = result.consume().counters.nodes_created
+                count = write(batch)
                 total += count
-                print(f"   ✓ 已导入 {min(i+batch_size, len(nodes))}/{len(nodes)} 个节点")
+                if entry is not None:
+                    self.journal.record_batch(entry, i, end, count)
+                print(f"   ✓ 已提交 {end}/{len(rows)} 行")
             except Exception as e:
-                print(f"   ❌ 导入失败: {e}")
+                print(f"   ❌ 导入失败 (第 {i}-{end} 行): {e}")
+                print("   重新运行即可从失败的批次继续")
                 raise
         
-        print(f"✅ {node_type} 节点导入完成 ({total} 个节点)")
+        if skipped:
+            print(f"   ↷ 跳过 {skipped} 行（之前的运行中已提交）")
+        if entry is not None:
+            self.journal.finish_file(entry, len(rows))
         return total
     
-    def import_relations(self, csv_file: str):
-        """导入关系"""
+    def import_relations(self, csv_file: str, rel_type: str, from_label: str, to_label: str):
+        """导入一种类型的关系（按类型拆分后的 relations_<TYPE>.csv）"""
         if not os.path.exists(csv_file):
             print(f"⚠ 关系文件不存在: {csv_file}")
             return 0
         
-        print(f"📥 导入关系...")
+        print(f"📥 导入 {rel_type} 关系...")
         
         with open(csv_file, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
@@ -187,100 +166,275 @@ class Neo4jImporter:
         if not relations:
             return 0
         
-        # 使用动态关系类型创建
-        query = """
-        UNWIND $relations AS rel
-        MATCH (from {id: rel.from_id})
-        MATCH (to {id: rel.to_id})
-        CALL apoc.create.relationship(from, rel.type, {
-            value: CASE WHEN rel.value <> '' THEN toFloat(rel.value) ELSE null END,
-            note: rel.note
-        }, to) YIELD rel AS r
-        RETURN count(r) AS count
+        batch_size = 1000
+        total = self._run_batches(
+            csv_file, 'relation', rel_type, relations, batch_size,
+            lambda batch: self.sink.upsert_relations(rel_type, from_label, to_label, batch))
+        
+        print(f"✅ {rel_type} 关系导入完成 ({total} 条关系)")
+        return total
+    
+    def import_shards(self, tasks: List[tuple], workers: int) -> List[int]:
+        """并发执行导入任务：tasks 为 (方法名, 参数元组)，如 ('import_nodes', (分片文件, 标签))
+
+        同一批任务之间互不依赖（全部节点分片，或全部关系分片）；每个线程通过 sink.clone()
+        使用自己的连接，共用导入日志。返回值按 tasks 的顺序排列。
         """
+        if workers <= 1:
+            return [getattr(self, method)(*args) for method, args in tasks]
+        
+        local = threading.local()
+        clones = []
+        lock = threading.Lock()
+        
+        def run(task):
+            importer = getattr(local, 'importer', None)
+            if importer is None:
+                sink = self.sink.clone()
+                with lock:
+                    clones.append(sink)
+                importer = local.importer = Neo4jImporter(sink, journal=self.journal)
+            method, args = task
+            return getattr(importer, method)(*args)
         
-        # 如果没有 apoc，使用备用方法
-        query_fallback = """
-        UNWIND $relations AS rel
-        MATCH (from {id: rel.from_id})
-        MATCH (to {id: rel.to_id})
-        MERGE (from)-[r:RELATED_TO]->(to)
-        SET r.type = rel.type,
-            r.value = CASE WHEN rel.value <> '' THEN toFloat(rel.value) ELSE null END,
-            r.note = rel.note
-        RETURN count(r) AS count
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(run, tasks))
+        finally:
+            for sink in clones:
+                sink.close()
+    
+    def sync(self, csv_dir: str, schema: Dict, old_snapshot: Dict, new_snapshot: Dict) -> Dict:
+        """按快照差异增量同步：只发送新增、属性变化和删除的节点/关系
+
+        顺序：节点写入 -> 关系删除 -> 关系写入 -> 节点删除（DETACH DELETE）
+        全部完成后按各文件新的哈希、行数和本次的净变化改写导入日志，--verify 与同步后的数据比较。
         """
+        diff = diff_snapshots(old_snapshot, new_snapshot)
+        summary = {'nodes': {}, 'relations': {}}
+        relations = schema.get('relations', {})
+        # (node|relation, 标签/关系类型) -> 新建数 - 删除数
+        net = {}
         
-        batch_size = 1000
-        total = 0
+        for node_type, changes in diff['nodes'].items():
+            keys = changes['inserts'] | changes['updates']
+            csv_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+            rows = collect_rows(csv_file, keys, lambda row: row['id'])
+            if rows:
+                print(f"📥 同步 {node_type} 节点: 新增 {len(changes['inserts'])}, 更新 {len(changes['updates'])}")
+                net[('node', node_type)] = self._run_batches(
+                    None, 'node', node_type, rows, 50,
+                    lambda batch: self.sink.upsert_nodes(node_type, batch),
+                    self._embedding_preparer(csv_file, node_type))
+            summary['nodes'][node_type] = {k: len(v) for k, v in changes.items()}
         
-        for i in range(0, len(relations), batch_size):
-            batch = relations[i:i+batch_size]
-            try:
-                # 尝试使用 apoc
-                result = self.session.run(query, relations=batch)
-                count = result.single()['count'] if result.peek() else 0
-                total += count
-            except Exception:
-                # 使用备用方法
-                try:
-                    result = self.session.run(query_fallback, relations=batch)
-                    count = result.single()['count'] if result.peek() else 0
-                    total += count
-                except Exception as e:
-                    print(f"   ❌ 导入失败: {e}")
-                    raise
-            
-            print(f"   ✓ 已导入 {min(i+batch_size, len(relations))}/{len(relations)} 条关系")
+        for rel_type, changes in diff['relations'].items():
+            rel_def = relations.get(rel_type)
+            if rel_def is None or not changes['deletes']:
+                continue
+            print(f"🗑 删除 {rel_type} 关系: {len(changes['deletes'])} 条")
+            rows = [dict(zip(('from_id', 'to_id'), key.split('\t'))) for key in sorted(changes['deletes'])]
+            net[('relation', rel_type)] = -self._run_batches(
+                None, 'relation', rel_type, rows, 1000,
+                lambda batch: self.sink.delete_relations(rel_type, rel_def['from'], rel_def['to'], batch))
         
-        print(f"✅ 关系导入完成 ({total} 条关系)")
-        return total
+        for rel_type, changes in diff['relations'].items():
+            rel_def = relations.get(rel_type)
+            if rel_def is None:
+                continue
+            keys = changes['inserts'] | changes['updates']
+            rows = collect_rows(os.path.join(csv_dir, relation_csv_name(rel_type)), keys, relation_key)
+            if rows:
+                print(f"📥 同步 {rel_type} 关系: 新增 {len(changes['inserts'])}, 更新 {len(changes['updates'])}")
+                net[('relation', rel_type)] = net.get(('relation', rel_type), 0) + self._run_batches(
+                    None, 'relation', rel_type, rows, 1000,
+                    lambda batch: self.sink.upsert_relations(rel_type, rel_def['from'], rel_def['to'], batch))
+            summary['relations'][rel_type] = {k: len(v) for k, v in changes.items()}
+        
+        for node_type, changes in diff['nodes'].items():
+            if not changes['deletes']:
+                continue
+            print(f"🗑 删除 {node_type} 节点: {len(changes['deletes'])} 个")
+            rows = sorted(changes['deletes'])
+            net[('node', node_type)] = net.get(('node', node_type), 0) - self._run_batches(
+                None, 'node', node_type, rows, 1000,
+                lambda batch: self.sink.delete_nodes(node_type, batch))
+        
+        if self.journal is not None:
+            files = [('node', node_type, os.path.join(csv_dir, f'nodes_{node_type}.csv'))
+                     for node_type in new_snapshot['nodes']]
+            files += [('relation', rel_type, os.path.join(csv_dir, relation_csv_name(rel_type)))
+                      for rel_type in new_snapshot['relations'] if rel_type in relations]
+            for kind, name, csv_file in files:
+                if os.path.exists(csv_file):
+                    self.journal.record_sync(csv_file, kind, name, count_csv_rows(csv_file),
+                                             net.get((kind, name), 0))
+        
+        return summary
+    
+    def verify_counts(self, schema: Dict) -> bool:
+        """比较数据库中各标签/关系类型的数量与日志记录是否一致"""
+        print("🔍 校验导入结果...")
+        
+        ok = True
+        expected_nodes = self.journal.expected_counts('node')
+        expected_rels = self.journal.expected_counts('relation')
+        
+        checks = [(label, self.sink.count_nodes, expected_nodes)
+                  for label in sorted(expected_nodes)]
+        checks += [(rel_type, self.sink.count_relations, expected_rels)
+                   for rel_type in schema.get('relations', {}) if rel_type in expected_rels]
+        
+        for name, count, expected in checks:
+            actual = count(name)
+            if actual == expected[name]:
+                print(f"   ✅ {name:25s}: {actual}")
+            else:
+                ok = False
+                print(f"   ❌ {name:25s}: 数据库 {actual} / 日志 {expected[name]}")
+        
+        incomplete = [key for key, entry in self.journal.files.items() if not entry['completed']]
+        if incomplete:
+            ok = False
+            print(f"   ⚠ 以下文件未导入完成: {', '.join(incomplete)}")
+        
+        return ok
 
 
 def main():
     """主函数"""
-    import sys
-    
-    # 从环境变量或命令行参数获取连接信息
-    uri = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
-    user = os.getenv('NEO4J_USER', 'neo4j')
-    password = os.getenv('NEO4J_PASSWORD', '')
-    
-    if len(sys.argv) >= 4:
-        uri = sys.argv[1]
-        user = sys.argv[2]
-        password = sys.argv[3]
-    elif not password:
-        password = input("请输入 Neo4j 密码: ")
+    parser = argparse.ArgumentParser(description='Neo4j Cloud 导入工具')
+    parser.add_argument('uri', nargs='?', help='Neo4j URI（默认读取 NEO4J_URI）')
+    parser.add_argument('user', nargs='?', help='用户名（默认读取 NEO4J_USER）')
+    parser.add_argument('password', nargs='?', help='密码（默认读取 NEO4J_PASSWORD）')
+    parser.add_argument('--verify', action='store_true',
+                       help='不导入，只比较数据库中各标签/关系类型的数量与导入日志')
+    parser.add_argument('--reset-journal', action='store_true',
+                       help='清空该数据库的导入日志，从头导入')
+    parser.add_argument('--sync', action='store_true',
+                       help='增量同步：与上次导入的快照比较，只发送变化的节点和关系')
+    parser.add_argument('--sink', choices=['neo4j', 'sqlite'], default='neo4j',
+                       help='写入后端：neo4j（默认）或本地 sqlite 文件')
+    parser.add_argument('--sqlite-path', default=None,
+                       help='sqlite 后端的数据库文件（默认: csv/graph.sqlite）')
+    parser.add_argument('--shards', action='store_true',
+                       help='导入 json_to_csv.py --shards 生成的分片（csv/shards/），各分片并发导入')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help=f'--shards 时的并发连接数 (默认: {DEFAULT_WORKERS})')
+    args = parser.parse_args()
+    if args.shards and args.sync:
+        parser.error('--sync 按快照差异同步，不能与 --shards 同时使用')
     
     script_dir = os.path.dirname(os.path.abspath(__file__))
     csv_dir = os.path.join(script_dir, '..', 'csv')
     
+    if args.sink == 'sqlite':
+        sink = SQLiteSink(args.sqlite_path or os.path.join(csv_dir, 'graph.sqlite'))
+        uri = sink.uri
+        user = '-'
+    else:
+        # 从环境变量或命令行参数获取连接信息
+        uri = args.uri or os.getenv('NEO4J_URI', 'bolt://localhost:7687')
+        user = args.user or os.getenv('NEO4J_USER', 'neo4j')
+        password = args.password or os.getenv('NEO4J_PASSWORD', '')
+        
+        if not password:
+            password = input("请输入 Neo4j 密码: ")
+        sink = Neo4jSink(uri, user, password)
+    
+    schema = load_schema(os.path.join(script_dir, '..', '..', 'schema_v1.json'))
+    journal_file = os.path.join(csv_dir, '.import_journal.json')
+    snapshot_file = os.path.join(
+        csv_dir, f".import_snapshot_{hashlib.md5(uri.encode('utf-8')).hexdigest()[:8]}.bin")
+    
     print("=" * 50)
     print("Neo4j Cloud 导入工具")
     print("=" * 50)
     print(f"URI: {uri}")
     print(f"用户: {user}")
     print(f"CSV 目录: {csv_dir}")
+    print(f"导入日志: {journal_file}")
     print()
     
-    importer = Neo4jImporter(uri, user, password)
+    journal = ImportJournal(journal_file, uri)
+    if args.reset_journal:
+        journal.reset()
+    
+    importer = Neo4jImporter(sink, journal=journal)
     
     try:
+        if args.verify:
+            if not importer.verify_counts(schema):
+                sys.exit(1)
+            return
+        
         # 创建约束和索引
-        importer.create_constraints_and_indexes()
+        importer.create_constraints_and_indexes(schema)
         
-        # 导入节点
         node_types = ['Paper', 'Task', 'ImagingModality', 'AnatomicalStructure',
                      'Method', 'Dataset', 'Metric', 'Innovation']
+        new_snapshot = build_snapshot(csv_dir, node_types, list(schema.get('relations', {})),
+                                      relation_csv_name)
         
-        for node_type in node_types:
-            csv_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
-            importer.import_nodes(csv_file, node_type)
+        if args.sync:
+            if os.path.exists(snapshot_file):
+                old_snapshot = load_snapshot(snapshot_file)
+            else:
+                print("⚠ 没有上次导入的快照，所有数据按新增处理（无法检测删除）")
+                old_snapshot = {'nodes': {}, 'relations': {}}
+            
+            summary = importer.sync(csv_dir, schema, old_snapshot, new_snapshot)
+            importer.create_vector_indexes(detect_vector_configs(csv_dir, node_types))
+            save_snapshot(snapshot_file, new_snapshot)
+            importer.sink.set_build_version(snapshot_version(new_snapshot))
+            
+            print("\n✅ 增量同步完成!")
+            for section, label in (('nodes', '节点'), ('relations', '关系')):
+                for name, counts in sorted(summary[section].items()):
+                    print(f"   {label} {name:25s}: +{counts['inserts']} ~{counts['updates']} -{counts['deletes']}")
+            return
+        
+        if args.shards:
+            # 导入前校验分片的 SHA-256
+            manifest = require_manifest(csv_dir, checksums=True)
+            # 所有节点分片完成后才导入关系（关系只在两端节点都存在时写入）
+            node_tasks = [('import_nodes', (manifest.file_path(entry), node_type))
+                          for node_type in node_types for entry in manifest.node_shards(node_type)]
+            print(f"📦 按分片导入: {len(node_tasks)} 个节点分片, {args.workers} 个并发连接")
+            importer.import_shards(node_tasks, args.workers)
+        else:
+            # 导入节点
+            for node_type in node_types:
+                csv_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+                importer.import_nodes(csv_file, node_type)
         
-        # 导入关系
-        relations_file = os.path.join(csv_dir, 'relations.csv')
-        importer.import_relations(relations_file)
+        # 按数据检测的维度和相似度函数创建向量索引
+        importer.create_vector_indexes(detect_vector_configs(csv_dir, node_types))
+        
+        if args.shards:
+            # schema 中的关系类型按分片导入；derived_by 的关系（如 SIMILAR_TO）由其他步骤写出，不分片
+            relation_tasks = []
+            for rel_type, rel_def in schema.get('relations', {}).items():
+                endpoints = (rel_type, rel_def['from'], rel_def['to'])
+                entries = manifest.relation_shards(rel_type)
+                if entries:
+                    relation_tasks += [('import_relations', (manifest.file_path(entry),) + endpoints)
+                                       for entry in entries]
+                elif rel_def.get('derived_by'):
+                    relation_tasks.append(('import_relations',
+                                           (os.path.join(csv_dir, relation_csv_name(rel_type)),) + endpoints))
+            print(f"📦 按分片导入: {len(relation_tasks)} 个关系文件, {args.workers} 个并发连接")
+            importer.import_shards(relation_tasks, args.workers)
+        else:
+            # 导入关系（每种 schema 关系类型一个文件）
+            for rel_type, rel_def in schema.get('relations', {}).items():
+                relations_file = os.path.join(csv_dir, relation_csv_name(rel_type))
+                importer.import_relations(relations_file, rel_type, rel_def['from'], rel_def['to'])
+        
+        # 记录本次导入的快照，供之后的增量同步比较
+        save_snapshot(snapshot_file, new_snapshot)
+        # 写入图数据版本，查询端（graph_client.py）据此使缓存失效
+        importer.sink.set_build_version(snapshot_version(new_snapshot))
         
         print("\n✅ 导入完成!")
         
@@ -290,4 +444,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻的本地 embedding 服务
+模型只加载一次，查询时的问题文本与批量流水线使用同一模型和同一归一化（generate_embeddings.encode_texts）。
+
+- 监听 localhost HTTP（--port）或 Unix socket（--socket）
+- 微批处理：并发的单条请求进入同一队列，后台线程在第一条请求等待 --max-wait-ms 后
+  （或凑满 --max-batch 条时）合并为一批编码；编码繁忙时积压的请求直接组成下一批
+- 最近编码过的文本由 LRU 缓存，命中时不进入队列
+- GET /metrics 输出 Prometheus 文本格式（队列深度、批大小、缓存命中、延迟分位数），GET /stats 输出 JSON
+
+接口:
+    POST /encode   {"texts": ["...", ...]}
+                   返回 {"dimension": d, "embeddings": [[...], ...]}；
+                   请求头 Accept: application/octet-stream 时返回小端 float32 矩阵（X-Embedding-Shape: n,d）
+    GET  /health   GET /stats   GET /metrics
+
+用法:
+    python embedding_server.py --port 8765
+    python embedding_server.py --socket /tmp/kg_embedding.sock --max-batch 64 --max-wait-ms 10
+    python generate_embeddings.py --server unix:/tmp/kg_embedding.sock     # 批量流水线使用该服务编码
+
+    from embedding_server import EmbeddingClient
+    vectors = EmbeddingClient('http://127.0.0.1:8765').encode(['脑肿瘤分割'])
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import socketserver
+import http.client
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from graph_client import QueryCache, LatencyStats
+from telemetry import prometheus_escape
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_CACHE_SIZE = 4096
+
+SHAPE_HEADER = 'X-Embedding-Shape'
+BINARY_TYPE = 'application/octet-stream'
+
+
+class MicroBatcher:
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, cache_size: int = DEFAULT_CACHE_SIZE):
+        """把并发的编码请求合并成批；encode_fn 接收文本列表，返回归一化的 float32 矩阵"""
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.cache = QueryCache(cache_size, float('inf'))
+        self.latency = LatencyStats()
+        self.queue = queue.Queue()
+        self.dimension = None
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.batch_texts = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.worker = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self.worker.start()
+
+    def encode(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        """编码一组文本（阻塞到结果就绪），返回 [len(texts), d] 的 float32 矩阵"""
+        started = time.perf_counter()
+        results = [None] * len(texts)
+        pending = []
+        for position, text in enumerate(texts):
+            hit, vector = self.cache.get(text)
+            if hit:
+                results[position] = vector
+            else:
+                future = Future()
+                self.queue.put((text, future, time.monotonic()))
+                pending.append((position, future))
+        if pending:
+            depth = self.queue.qsize()
+            with self.lock:
+                self.max_queue_depth = max(self.max_queue_depth, depth)
+        for position, future in pending:
+            results[position] = future.result(timeout)
+        with self.lock:
+            self.requests += 1
+            self.texts += len(texts)
+        self.latency.record('request', (time.perf_counter() - started) * 1000.0)
+        if not results:
+            return np.zeros((0, self.dimension or 0), dtype=np.float32)
+        return np.vstack(results)
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            # 截止时间从第一条请求入队算起：编码繁忙时积压的请求不再等待
+            deadline = first[2] + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._encode_batch(batch)
+            if stop:
+                return
+
+    def _encode_batch(self, batch: List):
+        """编码一批请求（相同文本只编码一次），结果写入缓存并唤醒等待的请求"""
+        waiting = {}
+        now = time.monotonic()
+        for text, future, enqueued in batch:
+            waiting.setdefault(text, []).append(future)
+            self.latency.record('queue_wait', (now - enqueued) * 1000.0)
+        texts = list(waiting)
+        started = time.perf_counter()
+        try:
+            vectors = np.asarray(self.encode_fn(texts), dtype=np.float32)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+            for futures in waiting.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        self.latency.record('batch', (time.perf_counter() - started) * 1000.0)
+        self.dimension = vectors.shape[1]
+        with self.lock:
+            self.batches += 1
+            self.batch_texts += len(texts)
+        for text, vector in zip(texts, vectors):
+            vector.flags.writeable = False
+            self.cache.put(text, vector)
+            for future in waiting[text]:
+                future.set_result(vector)
+
+    def close(self):
+        """处理完已入队的请求后停止后台线程"""
+        self.queue.put(None)
+        self.worker.join()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            counters = {
+                'requests': self.requests,
+                'texts': self.texts,
+                'batches': self.batches,
+                'batch_texts': self.batch_texts,
+                'mean_batch_size': round(self.batch_texts / self.batches, 2) if self.batches else 0.0,
+                'errors': self.errors,
+                'queue_depth': self.queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+            }
+        return dict(counters, dimension=self.dimension, max_batch=self.max_batch,
+                    max_wait_ms=self.max_wait * 1000.0, cache=self.cache.stats(), latency=self.latency.stats())
+
+
+def prometheus_metrics(stats: Dict) -> str:
+    """stats() 转为 Prometheus 文本格式"""
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples: List):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+
+    metric('kg_embedding_queue_depth', 'gauge', '等待编码的文本数', [('', stats['queue_depth'])])
+    metric('kg_embedding_queue_depth_max', 'gauge', '队列深度峰值', [('', stats['max_queue_depth'])])
+    metric('kg_embedding_requests_total', 'counter', '编码请求数', [('', stats['requests'])])
+    metric('kg_embedding_texts_total', 'counter', '请求的文本数（含缓存命中）', [('', stats['texts'])])
+    metric('kg_embedding_batches_total', 'counter', '模型编码的批数', [('', stats['batches'])])
+    metric('kg_embedding_batch_texts_total', 'counter', '模型编码的文本数', [('', stats['batch_texts'])])
+    metric('kg_embedding_errors_total', 'counter', '编码失败的批数', [('', stats['errors'])])
+    metric('kg_embedding_cache_hits_total', 'counter', 'LRU 缓存命中数', [('', stats['cache']['hits'])])
+    metric('kg_embedding_cache_misses_total', 'counter', 'LRU 缓存未命中数', [('', stats['cache']['misses'])])
+    samples = []
+    for operation, item in stats['latency'].items():
+        for quantile in ('p50', 'p95', 'p99'):
+            samples.append((f'{{operation="{prometheus_escape(operation)}",quantile="0.{quantile[1:]}"}}',
+                            item[f'{quantile}_ms']))
+    metric('kg_embedding_latency_ms', 'gauge', '最近请求的延迟分位数（毫秒）；'
+           'request 为整个请求，queue_wait 为排队，batch 为一次模型编码', samples)
+    return '\n'.join(lines) + '\n'
+
+
+class EmbeddingRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'KGEmbedding/1.0'
+
+    def setup(self):
+        super().setup()
+        # 响应头和响应体分两次写出，关闭 Nagle 避免与延迟 ACK 叠加出约 40ms 的等待
+        if self.connection.family != socket.AF_UNIX:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, True)
+
+    def do_GET(self):
+        batcher = self.server.batcher
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok', 'model': self.server.model_name, 'dimension': batcher.dimension})
+        elif self.path == '/stats':
+            self._send_json(200, batcher.stats())
+        elif self.path == '/metrics':
+            self._send(200, prometheus_metrics(batcher.stats()).encode('utf-8'), 'text/plain; version=0.0.4')
+        else:
+            self._send_json(404, {'error': f'未知路径: {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/encode':
+            self._send_json(404, {'error': f'未知路径: {self.path}'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            texts = request['texts']
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError('texts 必须是字符串列表')
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f'请求格式错误: {e}'})
+            return
+        try:
+            vectors = self.server.batcher.encode(texts)
+        except Exception as e:
+            self._send_json(500, {'error': f'编码失败: {type(e).__name__}: {e}'})
+            return
+        if BINARY_TYPE in self.headers.get('Accept', ''):
+            self._send(200, vectors.astype('<f4').tobytes(), BINARY_TYPE,
+                       {SHAPE_HEADER: f'{vectors.shape[0]},{vectors.shape[1]}'})
+        else:
+            self._send_json(200, {'dimension': int(vectors.shape[1]), 'embeddings': vectors.tolist()})
+
+    def _send_json(self, status: int, payload: Dict):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'), 'application/json')
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix socket 的 client_address 为空字符串
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_request(self, code='-', size='-'):
+        # 只记录错误响应，正常请求不输出
+        if str(getattr(code, 'value', code)).startswith(('4', '5')):
+            super().log_request(code, size)
+
+
+class EmbeddingHTTPServer(ThreadingHTTPServer):
+    # 并发连接较多时默认的 listen 队列（5）不够
+    request_queue_size = 128
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def create_server(batcher: MicroBatcher, model_name: str, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                  socket_path: Optional[str] = None):
+    """创建 HTTP 服务（socket_path 不为空时监听 Unix socket）；调用方负责 serve_forever"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = ThreadingUnixHTTPServer(socket_path, EmbeddingRequestHandler)
+        os.chmod(socket_path, 0o600)
+    else:
+        server = EmbeddingHTTPServer((host, port), EmbeddingRequestHandler)
+    server.batcher = batcher
+    server.model_name = model_name
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class EmbeddingClient:
+    def __init__(self, address: str, timeout: float = 120.0):
+        """连接 embedding 服务：address 为 http://host:port 或 unix:/path/to.sock
+
+        encode() 与模型对象的接口相同，可直接传给 update_csv_with_embeddings；
+        每个线程使用自己的长连接。
+        """
+        self.address = address
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.address.startswith('unix:'):
+            return _UnixHTTPConnection(self.address[len('unix:'):], self.timeout)
+        host = self.address.split('://', 1)[-1].rstrip('/')
+        return http.client.HTTPConnection(host, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, body: bytes = None, headers: Dict = None):
+        """发送请求，返回 (状态码, 响应头, 响应体)；长连接被服务端关闭时重连一次"""
+        for attempt in range(2):
+            connection = getattr(self.local, 'connection', None)
+            if connection is None:
+                connection = self.local.connection = self._connect()
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                return response.status, response.headers, response.read()
+            except (ConnectionError, http.client.HTTPException, BrokenPipeError):
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """编码一组文本，返回 L2 归一化的 float32 矩阵"""
+        body = json.dumps({'texts': list(texts)}, ensure_ascii=False).encode('utf-8')
+        status, headers, payload = self._request('POST', '/encode', body, {
+            'Content-Type': 'application/json', 'Accept': BINARY_TYPE})
+        if status != 200:
+            raise RuntimeError(f"embedding 服务返回 {status}: {payload.decode('utf-8', 'replace')}")
+        rows, dimension = (int(x) for x in headers[SHAPE_HEADER].split(','))
+        return np.frombuffer(payload, dtype='<f4').reshape(rows, dimension).copy()
+
+    def health(self) -> Dict:
+        return json.loads(self._request('GET', '/health')[2])
+
+    def stats(self) -> Dict:
+        return json.loads(self._request('GET', '/stats')[2])
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    parser = argparse.ArgumentParser(description='常驻的本地 embedding 服务（微批处理）')
+    parser.add_argument('--host', default='127.0.0.1',
+                       help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'监听端口 (默认: {DEFAULT_PORT})')
+    parser.add_argument('--socket', default=None,
+                       help='改为监听 Unix socket 路径')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH,
+                       help=f'每批最多编码的文本数 (默认: {DEFAULT_MAX_BATCH})')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS,
+                       help=f'第一条请求最多等待凑批的时间（毫秒） (默认: {DEFAULT_MAX_WAIT_MS})')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE,
+                       help=f'LRU 缓存的文本数，0 为不缓存 (默认: {DEFAULT_CACHE_SIZE})')
+    args = parser.parse_args(argv)
+
+    from generate_embeddings import load_model, encode_texts
+
+    model = load_model()
+    model_name = os.getenv('BGE_MODEL_PATH', '').strip() or 'BAAI/bge-multilingual-gemma2'
+    batcher = MicroBatcher(lambda texts: encode_texts(model, texts), args.max_batch, args.max_wait_ms,
+                           args.cache_size)
+    # 预热一次，确定向量维度
+    batcher.encode([' '])
+    server = create_server(batcher, model_name, args.host, args.port, args.socket)
+    address = f'unix:{args.socket}' if args.socket else f'http://{args.host}:{args.port}'
+    print(f"🚀 embedding 服务已启动: {address}（{batcher.dimension} 维，max_batch={args.max_batch}，"
+          f"max_wait={args.max_wait_ms}ms）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹ 正在停止...")
+    finally:
+        server.server_close()
+        batcher.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
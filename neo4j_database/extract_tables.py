@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抽取阶段的紧凑累加器
+- NodeTable：每种节点一组列数组，去重索引（规范化名称 -> 行号）同时用于关系端点匹配，
+  节点不再同时保存在节点列表、去重集合和名称到 ID 映射三处；embedding 列不存储，写出时为空
+- StringTable：低基数字符串（关系类型、方法类型等）只保存一份，关系类型按整数编码
+- RelationTable：关系按整数编码存储（端点为节点句柄 = 行号 << 3 | 节点类型编号），
+  相同的 (from, type, to) 只保留一行，记录支持论文数、来源论文和数值 value 的最小/最大/平均值；
+  value 为第一次提及的原始写法，note 为各次提及的不同说明，只为非空的行保存；
+  指定的关系类型另外逐次记录数值提及（来源论文、数值、note），供排行榜等按提及使用
+CSV 写出直接遍历列数组，不生成中间字典。
+"""
+
+from array import array
+from itertools import repeat
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 节点句柄中节点类型编号占用的位数（最多 8 种节点类型）
+TYPE_BITS = 3
+TYPE_MASK = (1 << TYPE_BITS) - 1
+
+# 同一条边各次提及的不同 note 的连接符
+NOTE_SEPARATOR = '; '
+
+
+class StringTable:
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        """字符串 <-> 整数编码，同一字符串只保存一份"""
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def intern(self, value: str) -> str:
+        """返回表中保存的同值字符串（重复取值共享同一个对象）"""
+        return self.values[self.code(value)]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class NodeTable:
+    __slots__ = ('node_type', 'type_code', 'fields', 'stored', 'columns', 'index', 'id_column')
+
+    def __init__(self, node_type: str, type_code: int, fields: List[str]):
+        """一种节点的列式存储；fields 为 CSV 列顺序，embedding 列不存储"""
+        self.node_type = node_type
+        self.type_code = type_code
+        self.fields = fields
+        self.stored = [field for field in fields if field != 'embedding']
+        self.columns: List[list] = [[] for _ in self.stored]
+        self.index: Dict[str, int] = {}
+        self.id_column = self.columns[self.stored.index('id')]
+
+    def add(self, key: str, values: Tuple) -> int:
+        """按键去重添加一行（values 与 stored 列顺序一致），返回行号"""
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.id_column)
+            for column, value in zip(self.columns, values):
+                column.append(value)
+        return row
+
+    def handle(self, key: str) -> Optional[int]:
+        """键对应的节点句柄，不存在时返回 None"""
+        row = self.index.get(key)
+        return None if row is None else (row << TYPE_BITS) | self.type_code
+
+    def column(self, name: str) -> list:
+        return self.columns[self.stored.index(name)]
+
+    def rows(self) -> Iterator[Tuple]:
+        """按 CSV 列顺序逐行输出（embedding 列为空字符串）"""
+        columns = [self.columns[self.stored.index(field)] if field != 'embedding' else repeat('')
+                   for field in self.fields]
+        return zip(*columns)
+
+    def __len__(self) -> int:
+        return len(self.id_column)
+
+
+class Relation:
+    __slots__ = ('from_id', 'to_id', 'type', 'value', 'note', 'support', 'papers',
+                 'value_min', 'value_max', 'value_mean', 'from_label', 'to_label')
+
+    def __init__(self, from_id, to_id, rel_type, from_label, to_label):
+        """一条聚合后的关系（遍历 RelationTable 时按需生成）"""
+        self.from_id = from_id
+        self.to_id = to_id
+        self.type = rel_type
+        self.from_label = from_label
+        self.to_label = to_label
+        self.value = self.note = self.papers = ''
+        self.value_min = self.value_max = self.value_mean = ''
+        self.support = 0
+
+    def row(self) -> Tuple:
+        """RELATION_FIELDS 顺序的 CSV 行"""
+        return (self.from_id, self.to_id, self.type, self.value, self.note, self.support,
+                self.papers, self.value_min, self.value_max, self.value_mean)
+
+
+def parse_number(value) -> Optional[float]:
+    """关系的 value 转为数值，不是数值时返回 None"""
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RelationTable:
+    __slots__ = ('tables', 'paper_table', 'types', 'index', 'from_handles', 'to_handles', 'type_codes',
+                 'support', 'last_paper', 'papers', 'extras', 'stats', 'mentions',
+                 'mention_types', 'mention_rows', 'mention_papers', 'mention_values', 'mention_notes')
+
+    def __init__(self, tables: List[NodeTable], paper_table: NodeTable = None,
+                 mention_types: Iterable[str] = ()):
+        """整数编码、按 (from, type, to) 聚合的关系
+
+        tables 按节点类型编号排列，用于把句柄还原为节点 ID；paper_table 用于还原来源论文 ID。
+        同一条边被多篇论文提及时只保留一行，记录支持论文数、来源论文和数值 value 的最小/最大/平均值。
+        value 保留第一次提及的原始写法（平均值只写入 value_mean），note 保留各次提及中不同的说明。
+        mention_types 中的关系类型另外保存每次数值提及，见 numeric_mentions()。
+        """
+        self.tables = tables
+        self.paper_table = paper_table
+        self.types = StringTable()
+        self.index: Dict[Tuple[int, int, int], int] = {}
+        self.from_handles = array('q')
+        self.to_handles = array('q')
+        self.type_codes = array('H')
+        self.support = array('I')
+        # 最近一篇来源论文的行号（-1 表示没有）；同一篇论文内重复提及不重复计数
+        self.last_paper = array('q')
+        # 行号 -> 全部来源论文行号，只为有多篇来源论文的行保存
+        self.papers: Dict[int, array] = {}
+        # 行号 -> [value, notes]：第一个非空 value，按首次出现顺序排列的不同 note；只保存非空的行
+        self.extras: Dict[int, list] = {}
+        # 行号 -> [数值个数, 最小值, 最大值, 合计]
+        self.stats: Dict[int, list] = {}
+        self.mentions = 0
+        # 逐次数值提及：边的行号、来源论文行号、数值，note 只为非空的提及保存（提及序号 -> note）
+        self.mention_types = frozenset(mention_types)
+        self.mention_rows = array('q')
+        self.mention_papers = array('q')
+        self.mention_values = array('d')
+        self.mention_notes: Dict[int, str] = {}
+
+    def append(self, from_handle: int, to_handle: int, rel_type: str, value, note, paper_row: int = -1):
+        """记录一次关系提及，已存在的边只更新聚合值"""
+        self.mentions += 1
+        type_code = self.types.code(rel_type)
+        key = (from_handle, to_handle, type_code)
+        row = self.index.get(key)
+        if row is None:
+            row = self.index[key] = len(self.type_codes)
+            self.from_handles.append(from_handle)
+            self.to_handles.append(to_handle)
+            self.type_codes.append(type_code)
+            self.support.append(1)
+            self.last_paper.append(paper_row)
+        elif paper_row != self.last_paper[row]:
+            self.support[row] += 1
+            sources = self.papers.get(row)
+            if sources is None:
+                sources = self.papers[row] = array('q', [self.last_paper[row]])
+            sources.append(paper_row)
+            self.last_paper[row] = paper_row
+
+        # 数值 0 也是报告的 value，不能按真值判断
+        has_value = value is not None and value != ''
+        if has_value or note:
+            extra = self.extras.get(row)
+            if extra is None:
+                extra = self.extras[row] = ['', []]
+            if has_value and extra[0] == '':
+                extra[0] = value
+            if note and note not in extra[1]:
+                extra[1].append(note)
+        number = parse_number(value)
+        if number is not None and rel_type in self.mention_types:
+            if note:
+                self.mention_notes[len(self.mention_rows)] = note
+            self.mention_rows.append(row)
+            self.mention_papers.append(paper_row)
+            self.mention_values.append(number)
+        if number is not None:
+            stat = self.stats.get(row)
+            if stat is None:
+                self.stats[row] = [1, number, number, number]
+            else:
+                stat[0] += 1
+                stat[1] = min(stat[1], number)
+                stat[2] = max(stat[2], number)
+                stat[3] += number
+
+    def __len__(self) -> int:
+        return len(self.type_codes)
+
+    def __iter__(self) -> Iterator[Relation]:
+        id_columns = [table.id_column for table in self.tables]
+        labels = [table.node_type for table in self.tables]
+        paper_ids = self.paper_table.id_column if self.paper_table is not None else []
+        types = self.types.values
+        extras, stats, papers = self.extras, self.stats, self.papers
+        for row, (from_handle, to_handle, type_code) in enumerate(
+                zip(self.from_handles, self.to_handles, self.type_codes)):
+            from_code = from_handle & TYPE_MASK
+            to_code = to_handle & TYPE_MASK
+            rel = Relation(id_columns[from_code][from_handle >> TYPE_BITS],
+                           id_columns[to_code][to_handle >> TYPE_BITS],
+                           types[type_code], labels[from_code], labels[to_code])
+            rel.support = self.support[row]
+            sources = papers.get(row)
+            if sources is not None:
+                rel.papers = '|'.join(paper_ids[paper] for paper in sources)
+            elif self.last_paper[row] >= 0:
+                rel.papers = paper_ids[self.last_paper[row]]
+            extra = extras.get(row)
+            if extra is not None:
+                rel.value, rel.note = extra[0], NOTE_SEPARATOR.join(extra[1])
+            stat = stats.get(row)
+            if stat is not None:
+                count, low, high, total = stat
+                rel.value_min, rel.value_max = low, high
+                rel.value_mean = round(total / count, 6)
+            yield rel
+
+    def numeric_mentions(self) -> Iterator[Tuple]:
+        """按提及顺序输出 mention_types 的数值提及：(from_id, to_id, type, 来源论文 ID, value, note)"""
+        id_columns = [table.id_column for table in self.tables]
+        paper_ids = self.paper_table.id_column if self.paper_table is not None else []
+        types = self.types.values
+        for index, (row, paper, value) in enumerate(
+                zip(self.mention_rows, self.mention_papers, self.mention_values)):
+            from_handle, to_handle = self.from_handles[row], self.to_handles[row]
+            yield (id_columns[from_handle & TYPE_MASK][from_handle >> TYPE_BITS],
+                   id_columns[to_handle & TYPE_MASK][to_handle >> TYPE_BITS],
+                   types[self.type_codes[row]],
+                   paper_ids[paper] if paper >= 0 else '',
+                   value, self.mention_notes.get(index, ''))
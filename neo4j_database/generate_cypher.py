@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+根据 schema_v1.json 生成 LOAD CSV 导入脚本
+- 每个节点文件、每种关系文件各读取一次
+- 使用 CALL { } IN TRANSACTIONS 分批提交
+- 关系端点按标签匹配，走唯一约束索引
+- embedding 通过 db.create.setNodeVectorProperty 写入，空 embedding 跳过
+- 按数据检测到的维度和相似度函数为每个标签创建向量索引
+- 生成后按 csv/ 中实际的表头校验脚本引用的列
+"""
+
+import os
+import re
+import csv
+import sys
+import argparse
+from typing import Dict, List
+
+from csv_layout import NODE_FIELDS, RELATION_FIELDS, RELATION_AGGREGATE_TYPES, load_schema, relation_csv_name
+from vector_utils import scan_embedding_csv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cypher_scripts'))
+from graph_snapshot import build_snapshot, snapshot_version
+from telemetry import phase
+
+
+# 约束/索引名前缀（与 import_to_cloud.py 中的约束名保持一致）
+CONSTRAINT_PREFIX = {
+    'Paper': 'paper',
+    'Task': 'task',
+    'ImagingModality': 'modality',
+    'AnatomicalStructure': 'structure',
+    'Method': 'method',
+    'Dataset': 'dataset',
+    'Metric': 'metric',
+    'Innovation': 'innovation',
+}
+
+# 各类型节点建立普通索引的属性（graph_client.py 的查询模板按 Paper.paper_id 和各类型的 name 匹配）
+INDEX_FIELDS = {
+    'Paper': ['paper_id', 'title'],
+    'Innovation': ['description'],
+}
+DEFAULT_INDEX_FIELDS = ['name']
+
+
+def index_statements(label: str) -> List[str]:
+    """一种节点的普通索引语句（不带结尾分号）"""
+    prefix = CONSTRAINT_PREFIX.get(label, label.lower())
+    return [f"CREATE INDEX {prefix}_{field} IF NOT EXISTS FOR (n:{label}) ON (n.{field})"
+            for field in INDEX_FIELDS.get(label, DEFAULT_INDEX_FIELDS)]
+
+DEFAULT_BATCH_SIZE = 1000
+
+# 等待向量索引填充完成的超时（秒）
+INDEX_WAIT_SECONDS = 600
+
+
+def vector_index_name(label: str) -> str:
+    """向量索引名，例如 paper_embeddings"""
+    return f"{CONSTRAINT_PREFIX.get(label, label.lower())}_embeddings"
+
+
+def property_expression(column: str, value_type) -> str:
+    """根据 schema 中的类型生成 CSV 列到属性值的转换表达式"""
+    if isinstance(value_type, list):
+        value_type = next((t for t in value_type if t != 'null'), 'string')
+    if value_type == 'integer':
+        return f"CASE WHEN row.{column} <> '' THEN toInteger(row.{column}) ELSE null END"
+    if value_type == 'number':
+        return f"CASE WHEN row.{column} <> '' THEN toFloat(row.{column}) ELSE null END"
+    return f"row.{column}"
+
+
+def node_property_types(schema: Dict, node_type: str) -> Dict[str, str]:
+    """读取 schema 中节点属性的类型（未定义的属性按字符串处理）"""
+    entity = schema.get('entities', {}).get(node_type, {})
+    return {name: attr.get('type', 'string')
+            for name, attr in entity.get('attributes', {}).items()}
+
+
+def relation_property_types(schema: Dict) -> Dict[str, str]:
+    """汇总 schema 中所有关系属性的类型（含抽取阶段的聚合列）"""
+    types = dict(RELATION_AGGREGATE_TYPES)
+    for rel_def in schema.get('relations', {}).values():
+        for name, prop in rel_def.get('properties', {}).items():
+            types[name] = prop.get('type', 'string')
+    return types
+
+
+def schema_node_labels(schema: Dict) -> List[str]:
+    """schema 中出现的全部节点标签（按 NODE_FIELDS 的顺序）"""
+    labels = set(schema.get('entities', {}).keys())
+    for rel_def in schema.get('relations', {}).values():
+        labels.add(rel_def['from'])
+        labels.add(rel_def['to'])
+    ordered = [label for label in NODE_FIELDS if label in labels]
+    return ordered + sorted(labels - set(ordered))
+
+
+def build_constraints(labels: List[str]) -> List[str]:
+    """生成约束和索引语句"""
+    lines = []
+    for label in labels:
+        prefix = CONSTRAINT_PREFIX.get(label, label.lower())
+        lines.append(f"// {label} 节点约束和索引")
+        lines.append(f"CREATE CONSTRAINT {prefix}_id IF NOT EXISTS "
+                     f"FOR (n:{label}) REQUIRE n.id IS UNIQUE;")
+        lines += [f"{statement};" for statement in index_statements(label)]
+        lines.append("")
+    return lines
+
+
+def build_node_block(label: str, columns: List[str], prop_types: Dict[str, str],
+                     batch_size: int) -> List[str]:
+    """生成单个节点文件的导入语句"""
+    assignments = [f"n.{column} = {property_expression(column, prop_types.get(column, 'string'))}"
+                   for column in columns if column not in ('id', 'embedding')]
+    lines = [
+        f"// 导入 {label} 节点",
+        f"LOAD CSV WITH HEADERS FROM 'file:///nodes_{label}.csv' AS row",
+        "CALL {",
+        "    WITH row",
+        f"    MERGE (n:{label} {{id: row.id}})",
+    ]
+    if assignments:
+        lines.append("    SET " + ",\n        ".join(assignments))
+    if 'embedding' in columns:
+        lines += [
+            "    WITH n, row",
+            "    WHERE row.embedding <> ''",
+            "    CALL db.create.setNodeVectorProperty(n, 'embedding', "
+            "[x IN split(row.embedding, ',') | toFloat(x)])",
+        ]
+    lines.append(f"}} IN TRANSACTIONS OF {batch_size} ROWS;")
+    lines.append("")
+    return lines
+
+
+def build_vector_indexes(vector_configs: Dict[str, tuple]) -> List[str]:
+    """为每个有 embedding 的标签生成向量索引语句，并等待索引填充完成"""
+    lines = []
+    for label, (dimension, similarity) in vector_configs.items():
+        lines.append(f"// {label}: {dimension} 维, {similarity}")
+        lines.append(f"CREATE VECTOR INDEX {vector_index_name(label)} IF NOT EXISTS "
+                     f"FOR (n:{label}) ON (n.embedding)")
+        lines.append(f"OPTIONS {{indexConfig: {{`vector.dimensions`: {dimension}, "
+                     f"`vector.similarity_function`: '{similarity}'}}}};")
+        lines.append("")
+    if not vector_configs:
+        lines.append("// CSV 中没有 embedding，未创建向量索引")
+        lines.append("")
+        return lines
+    lines += [
+        f"CALL db.awaitIndexes({INDEX_WAIT_SECONDS});",
+        "",
+        "SHOW VECTOR INDEXES YIELD name, state, populationPercent",
+        "RETURN name, state, populationPercent",
+        "ORDER BY name;",
+        "",
+    ]
+    return lines
+
+
+def detect_vector_configs(csv_dir: str, labels: List[str]) -> Dict[str, tuple]:
+    """从节点 CSV 检测每个标签的向量维度和相似度函数"""
+    configs = {}
+    for label in labels:
+        if 'embedding' not in NODE_FIELDS.get(label, []):
+            continue
+        stats = scan_embedding_csv(os.path.join(csv_dir, f'nodes_{label}.csv'))
+        if stats.dimension is not None:
+            configs[label] = (stats.dimension, stats.similarity_function)
+            if len(stats.dimensions) > 1:
+                print(f"⚠ {label}: embedding 维度不一致 {dict(stats.dimensions)}，"
+                      f"索引使用 {stats.dimension} 维")
+    return configs
+
+
+def build_relation_block(rel_type: str, rel_def: Dict, prop_types: Dict[str, str],
+                         batch_size: int) -> List[str]:
+    """生成单个关系类型文件的导入语句"""
+    prop_columns = [c for c in RELATION_FIELDS if c not in ('from_id', 'to_id', 'type')]
+    assignments = [f"r.{column} = {property_expression(column, prop_types.get(column, 'string'))}"
+                   for column in prop_columns]
+    lines = [
+        f"// {rel_type}: ({rel_def['from']})-[:{rel_type}]->({rel_def['to']})",
+        f"LOAD CSV WITH HEADERS FROM 'file:///{relation_csv_name(rel_type)}' AS row",
+        "CALL {",
+        "    WITH row",
+        f"    MATCH (from:{rel_def['from']} {{id: row.from_id}})",
+        f"    MATCH (to:{rel_def['to']} {{id: row.to_id}})",
+        f"    MERGE (from)-[r:{rel_type}]->(to)",
+    ]
+    if assignments:
+        lines.append("    SET " + ",\n        ".join(assignments))
+    lines.append(f"}} IN TRANSACTIONS OF {batch_size} ROWS;")
+    lines.append("")
+    return lines
+
+
+def generate_import_script(schema: Dict, batch_size: int = DEFAULT_BATCH_SIZE,
+                           vector_configs: Dict[str, tuple] = None,
+                           build_version: str = None) -> str:
+    """根据 schema 生成完整的 LOAD CSV 导入脚本
+
+    vector_configs 为 标签 -> (维度, 相似度函数)，为空时不创建向量索引；
+    build_version 为 CSV 数据的版本号，导入完成后写入 (:GraphBuild) 节点
+    """
+    labels = schema_node_labels(schema)
+    rel_prop_types = relation_property_types(schema)
+
+    lines = [
+        "// Neo4j 导入脚本（由 generate_cypher.py 根据 schema_v1.json 自动生成，请勿手动修改）",
+        "// 使用方法: cypher-shell -u neo4j -p password -f import_nodes_and_relations.cypher",
+        "// 在 Neo4j Browser 中执行时，每条 CALL { } IN TRANSACTIONS 语句需加 :auto 前缀",
+        f"// 每批提交 {batch_size} 行",
+        "",
+        "// ============================================",
+        "// 1. 清理数据库（可选，谨慎使用）",
+        "// ============================================",
+        "// MATCH (n) DETACH DELETE n;",
+        "",
+        "// ============================================",
+        "// 2. 创建索引和约束",
+        "// ============================================",
+        "",
+    ]
+    lines += build_constraints(labels)
+
+    lines += [
+        "// ============================================",
+        "// 3. 导入节点",
+        "// ============================================",
+        "",
+    ]
+    for label in labels:
+        columns = NODE_FIELDS.get(label, ['id'])
+        lines += build_node_block(label, columns, node_property_types(schema, label), batch_size)
+
+    lines += [
+        "// ============================================",
+        "// 4. 创建向量索引（维度和相似度函数由数据检测）",
+        "// ============================================",
+        "",
+    ]
+    lines += build_vector_indexes(vector_configs or {})
+
+    lines += [
+        "// ============================================",
+        "// 5. 导入关系（每种类型一个文件，端点按标签匹配）",
+        "// ============================================",
+        "",
+    ]
+    for rel_type, rel_def in schema.get('relations', {}).items():
+        lines += build_relation_block(rel_type, rel_def, rel_prop_types, batch_size)
+
+    if build_version:
+        lines += [
+            "// 记录图数据版本（查询端据此使缓存失效）",
+            f"MERGE (b:GraphBuild {{id: 'current'}}) "
+            f"SET b.version = '{build_version}', b.built_at = datetime();",
+            "",
+        ]
+
+    lines += [
+        "// ============================================",
+        "// 6. 验证导入结果",
+        "// ============================================",
+        "MATCH (n)",
+        "RETURN labels(n)[0] AS nodeType, count(n) AS count",
+        "ORDER BY nodeType;",
+        "",
+        "MATCH ()-[r]->()",
+        "RETURN type(r) AS relationshipType, count(r) AS count",
+        "ORDER BY relationshipType;",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def verify_script_against_csv(script_file: str, csv_dir: str) -> List[str]:
+    """校验脚本中 LOAD CSV 引用的文件和列是否与 csv/ 中的实际表头一致"""
+    with open(script_file, 'r', encoding='utf-8') as f:
+        script = f.read()
+
+    issues = []
+    for statement in script.split(';'):
+        # 去掉注释行，避免匹配到注释中的示例
+        code = "\n".join(line for line in statement.splitlines()
+                         if not line.strip().startswith('//'))
+        match = re.search(r"FROM 'file:///([^']+)'", code)
+        if not match:
+            continue
+        filename = match.group(1)
+        csv_file = os.path.join(csv_dir, filename)
+        if not os.path.exists(csv_file):
+            issues.append(f"缺失文件: {filename}")
+            continue
+
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            header = next(csv.reader(f), [])
+
+        referenced = set(re.findall(r"\brow\.(\w+)", code))
+        for column in sorted(referenced - set(header)):
+            issues.append(f"{filename}: 缺失列 {column}")
+
+    return issues
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    parser = argparse.ArgumentParser(description='根据 schema 生成 LOAD CSV 导入脚本')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'每个事务提交的行数 (默认: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--verify-only', action='store_true',
+                       help='不重新生成，只校验现有脚本与 CSV 表头')
+    args = parser.parse_args(argv)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(script_dir)
+    schema_file = os.path.join(project_root, 'schema_v1.json')
+    csv_dir = os.path.join(script_dir, 'csv')
+    output_file = os.path.join(script_dir, 'cypher_scripts', 'import_nodes_and_relations.cypher')
+
+    if not args.verify_only:
+        schema = load_schema(schema_file)
+        labels = schema_node_labels(schema)
+        with phase('detect_vectors'):
+            vector_configs = detect_vector_configs(csv_dir, labels)
+        build_version = None
+        if os.path.exists(csv_dir):
+            with phase('build_version'):
+                build_version = snapshot_version(build_snapshot(
+                    csv_dir, labels, list(schema.get('relations', {})), relation_csv_name))
+        with phase('generate'):
+            script = generate_import_script(schema, batch_size=args.batch_size,
+                                            vector_configs=vector_configs,
+                                            build_version=build_version)
+            with open(output_file, 'w', encoding='utf-8') as f:
+                f.write(script)
+        print(f"✓ 已生成导入脚本: {output_file} (每批 {args.batch_size} 行)")
+
+    if not os.path.exists(csv_dir):
+        print(f"⚠ CSV 目录不存在，跳过表头校验: {csv_dir}")
+        return
+
+    with phase('verify'):
+        issues = verify_script_against_csv(output_file, csv_dir)
+    if issues:
+        print(f"❌ 导入脚本与 CSV 表头不一致 ({len(issues)} 个问题):")
+        for issue in issues:
+            print(f"   - {issue}")
+        sys.exit(1)
+
+    print("✅ 导入脚本与 CSV 表头一致")
+
+
+if __name__ == '__main__':
+    main()
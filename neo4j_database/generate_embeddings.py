@@ -3,18 +3,41 @@
 """
 为节点生成 embedding，使用 bge-multilingual-gemma2 模型
 参考: https://github.com/FlagOpen/FlagEmbedding/blob/master/README_zh.md
+
+指定 --server（或环境变量 KG_EMBEDDING_SERVER）时使用常驻的 embedding_server.py 编码，
+不在本进程中加载模型。
+
+编码结果按分片写入检查点，崩溃或中断后重新运行从最后一个完成的分片继续；
+CSV 通过临时文件 + 重命名原子替换，embedding_manifest.json 记录各类型的行数、维度和完成状态。
+
+--shards 时读取 json_to_csv.py --shards 生成的哈希分片，多个分片并发编码（配合 embedding 服务的
+微批处理）；每个分片完成后即原子替换并记录到分片 manifest，最后按原始行序由分片重建 nodes_<类型>.csv。
 """
 
 import os
 import csv
 import json
+import time
+import shutil
+import hashlib
+import argparse
 import numpy as np
 from typing import List, Dict
-from tqdm import tqdm
-import torch
 
-os.environ["CUDA_VISIBLE_DEVICES"] = "0,2,5"
-os.environ["BGE_MODEL_PATH"] = "/data/gdh/knowledgegraph/models/bge-multilingual-gemma2"
+from telemetry import phase
+from shards import ShardManifest, file_entry, require_manifest, shard_index
+
+# 默认的 GPU 和本地模型目录（已设置的环境变量优先），只在加载模型时生效
+DEFAULT_CUDA_VISIBLE_DEVICES = "0,2,5"
+DEFAULT_BGE_MODEL_PATH = "/data/gdh/knowledgegraph/models/bge-multilingual-gemma2"
+
+# 编码检查点目录（CSV 目录下）与 manifest 文件名（quality_check.py 读取同名文件）
+CHECKPOINT_DIRNAME = '.embedding_checkpoints'
+MANIFEST_NAME = 'embedding_manifest.json'
+MANIFEST_VERSION = 1
+DEFAULT_SHARD_SIZE = 4096
+
+
 def load_model():
     """加载 bge-multilingual-gemma2 模型
 
@@ -22,6 +45,8 @@ def load_model():
     - 如果设置了环境变量 BGE_MODEL_PATH 且目录存在，则从该目录加载
     - 否则从 HuggingFace Hub 加载: 'BAAI/bge-multilingual-gemma2'
     """
+    os.environ.setdefault("CUDA_VISIBLE_DEVICES", DEFAULT_CUDA_VISIBLE_DEVICES)
+    os.environ.setdefault("BGE_MODEL_PATH", DEFAULT_BGE_MODEL_PATH)
     try:
         from FlagEmbedding import FlagModel
 
@@ -91,10 +116,114 @@ def l2_normalize(vectors: np.ndarray) -> np.ndarray:
     return vectors / norms
 
 
-def update_csv_with_embeddings(csv_dir: str, model, batch_size: int = 16):
-    """为所有节点 CSV 文件添加 embedding"""
+def encode_texts(model, texts: List[str]) -> np.ndarray:
+    """编码一批文本，返回 L2 归一化的 float32 矩阵（批量流水线与 embedding_server.py 共用）"""
+    # 不再向 FlagEmbedding 传递 normalize_embeddings，避免与内部实现冲突
+    return l2_normalize(np.asarray(model.encode(texts), dtype="float32"))
+
+
+def text_digest(texts: List[str]) -> str:
+    """一组待编码文本的摘要（文本或顺序变化时检查点作废）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def write_json_atomic(path: str, data: Dict):
+    """原子写入 JSON（先写临时文件并 fsync，再重命名）"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_manifest(csv_dir: str) -> Dict:
+    """读取 embedding manifest；不存在或损坏时返回空 manifest"""
+    path = os.path.join(csv_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print(f"⚠ manifest 损坏，将重新生成: {path}")
+    return {'version': MANIFEST_VERSION, 'types': {}}
+
+
+class ShardCheckpoint:
+    def __init__(self, directory: str, digest: str, model_name: str, rows: int, shard_size: int,
+                 restart: bool = False):
+        """一种节点的编码检查点：每 shard_size 行一个 .npy 分片，state.json 记录已完成的分片
+
+        文本摘要、模型、行数或分片大小与检查点不一致（或 restart=True）时丢弃旧分片。
+        """
+        self.directory = directory
+        self.shard_size = shard_size
+        self.num_shards = (rows + shard_size - 1) // shard_size
+        self.state_file = os.path.join(directory, 'state.json')
+        expected = {'text_digest': digest, 'model': model_name, 'rows': rows, 'shard_size': shard_size}
+        state = None
+        if not restart and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+        if state is None or any(state.get(key) != value for key, value in expected.items()):
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+            state = dict(expected, completed=0)
+            write_json_atomic(self.state_file, state)
+        self.state = state
+        # 只信任连续且文件存在的分片
+        completed = 0
+        while completed < state['completed'] and os.path.exists(self.shard_path(completed)):
+            completed += 1
+        self.state['completed'] = completed
+
+    @property
+    def completed(self) -> int:
+        return self.state['completed']
+
+    def shard_path(self, index: int) -> str:
+        return os.path.join(self.directory, f'shard_{index:05d}.npy')
+
+    def write_shard(self, index: int, vectors: np.ndarray):
+        """写入一个分片（临时文件 + fsync + 重命名），再更新 state.json"""
+        path = self.shard_path(index)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(vectors, dtype='float32'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.state['completed'] = index + 1
+        write_json_atomic(self.state_file, self.state)
+
+    def read_shard(self, index: int) -> np.ndarray:
+        return np.load(self.shard_path(index), mmap_mode='r')
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def update_csv_with_embeddings(csv_dir: str, model, batch_size: int = 16, model_name: str = '',
+                               shard_size: int = DEFAULT_SHARD_SIZE, restart: bool = False):
+    """为所有节点 CSV 文件添加 embedding
+
+    编码结果按 shard_size 行写入 csv/.embedding_checkpoints/<类型>/ 下的分片，中断后重新运行从最后一个
+    完成的分片继续；全部分片完成后写出临时 CSV 再重命名替换原文件，并更新 embedding_manifest.json。
+    manifest 中记录的 CSV（大小和修改时间未变）且文本未变的节点类型直接跳过。
+    """
+    from tqdm import tqdm
+
     node_types = ['Paper', 'Task', 'ImagingModality', 'AnatomicalStructure', 
                   'Method', 'Dataset', 'Metric', 'Innovation']
+    manifest = load_manifest(csv_dir)
+    manifest_path = os.path.join(csv_dir, MANIFEST_NAME)
     
     for node_type in node_types:
         csv_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
@@ -105,62 +234,286 @@ def update_csv_with_embeddings(csv_dir: str, model, batch_size: int = 16):
         
         print(f"\n🔄 处理 {node_type} 节点...")
         
-        # 读取 CSV
-        rows = []
+        # 读取 CSV（只保留待编码文本，写出时再流式读取原文件）
         texts = []
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                rows.append(row)
-                text = generate_text_for_embedding(row, node_type)
-                texts.append(text if text else " ")  # 空文本用空格代替
+        with phase(f'read:{node_type}') as p:
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                fieldnames = list(reader.fieldnames or [])
+                for row in reader:
+                    text = generate_text_for_embedding(row, node_type)
+                    texts.append(text if text else " ")  # 空文本用空格代替
+            p.rows_out = len(texts)
         
-        if not rows:
+        if not texts:
             print(f"   ⚠ {node_type} 节点为空，跳过")
             continue
         
-        # 批量生成 embedding
+        digest = text_digest(texts)
+        stat = os.stat(csv_file)
+        entry = manifest['types'].get(node_type)
+        if not restart and entry and entry.get('text_digest') == digest and entry.get('model') == model_name \
+                and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            print(f"   ⏭ manifest 显示 embedding 已是最新，跳过 ({len(texts)} 个节点)")
+            continue
+        
+        checkpoint = ShardCheckpoint(os.path.join(csv_dir, CHECKPOINT_DIRNAME, node_type), digest,
+                                     model_name, len(texts), shard_size, restart)
+        
+        # 分片编码（跳过已完成的分片）
+        if checkpoint.completed:
+            print(f"   ↩ 从检查点恢复: {checkpoint.completed}/{checkpoint.num_shards} 个分片已完成")
         print(f"   📊 生成 {len(texts)} 个节点的 embedding...")
-        embeddings: List[np.ndarray] = []
         
-        for i in tqdm(range(0, len(texts), batch_size), desc=f"   Processing {node_type}"):
-            batch_texts = texts[i:i+batch_size]
-            # 不再向 FlagEmbedding 传递 normalize_embeddings，避免与内部实现冲突
-            batch_embeddings = model.encode(batch_texts)
-            batch_embeddings = np.asarray(batch_embeddings, dtype="float32")
-            batch_embeddings = l2_normalize(batch_embeddings)
-            embeddings.extend(batch_embeddings)
+        with phase(f'encode:{node_type}') as p:
+            start_row = checkpoint.completed * shard_size
+            with tqdm(total=len(texts), initial=start_row, desc=f"   Processing {node_type}") as progress:
+                for index in range(checkpoint.completed, checkpoint.num_shards):
+                    shard_texts = texts[index * shard_size:(index + 1) * shard_size]
+                    vectors = []
+                    for i in range(0, len(shard_texts), batch_size):
+                        vectors.append(encode_texts(model, shard_texts[i:i+batch_size]))
+                        progress.update(len(vectors[-1]))
+                    checkpoint.write_shard(index, np.concatenate(vectors))
+            p.rows_in = len(texts) - start_row
+            p.rows_out = len(texts) - start_row
         
-        # 更新 CSV 文件
+        # 写出临时 CSV，完成后原子替换原文件
         print(f"   💾 更新 CSV 文件...")
-        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = list(rows[0].keys())
+        if 'embedding' not in fieldnames:
+            fieldnames.append('embedding')
+        tmp_file = csv_file + '.tmp'
+        dimension = 0
+        with phase(f'write:{node_type}') as p:
+            with open(csv_file, 'r', encoding='utf-8') as src, \
+                    open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                reader = csv.DictReader(src)
+                for index in range(checkpoint.num_shards):
+                    shard = checkpoint.read_shard(index)
+                    dimension = shard.shape[1]
+                    for embedding in shard:
+                        row = next(reader)
+                        # 将 embedding 转换为字符串（逗号分隔）
+                        row['embedding'] = ','.join(map(str, embedding.tolist()))
+                        writer.writerow(row)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, csv_file)
+            p.rows_in = p.rows_out = len(texts)
+        
+        # 记录到 manifest 后才删除检查点（两者之间中断时，重新运行只需重写 CSV）
+        stat = os.stat(csv_file)
+        manifest['types'][node_type] = {
+            'csv': os.path.basename(csv_file),
+            'rows': len(texts),
+            'embedded': len(texts),
+            'dimension': dimension,
+            'model': model_name,
+            'text_digest': digest,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        write_json_atomic(manifest_path, manifest)
+        checkpoint.remove()
+        
+        print(f"   ✅ {node_type} 节点处理完成 ({len(texts)} 个节点)")
+    
+    # 所有类型完成后删除空的检查点目录
+    try:
+        os.rmdir(os.path.join(csv_dir, CHECKPOINT_DIRNAME))
+    except OSError:
+        pass
+
+
+def embed_shard(path: str, node_type: str, model, batch_size: int) -> Dict:
+    """为一个节点分片生成 embedding，写出临时文件后原子替换，返回行数和维度"""
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        fieldnames = list(reader.fieldnames or [])
+        rows = list(reader)
+    texts = [generate_text_for_embedding(row, node_type) or " " for row in rows]
+    vectors = [encode_texts(model, texts[i:i+batch_size]) for i in range(0, len(texts), batch_size)]
+    vectors = np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype='float32')
+    
+    if 'embedding' not in fieldnames:
+        fieldnames.append('embedding')
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        for row, embedding in zip(rows, vectors):
+            row['embedding'] = ','.join(map(str, embedding.tolist()))
+            writer.writerow(row)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
+    return {'rows': len(rows), 'dimension': int(vectors.shape[1])}
+
+
+def rebuild_from_shards(csv_file: str, node_type: str, manifest: ShardManifest, entries: List[Dict]) -> Dict:
+    """按原始 CSV 的行序从分片重建 CSV：每行取其 id 所在分片的下一行（分片内保持原始相对顺序）
+
+    返回行数、有 embedding 的行数、维度和文本摘要（与 update_csv_with_embeddings 写入 manifest 的相同）。
+    """
+    files = {entry['index']: open(manifest.file_path(entry), 'r', encoding='utf-8') for entry in entries}
+    tmp_file = csv_file + '.tmp'
+    digest = hashlib.blake2b(digest_size=16)
+    rows = embedded = dimension = 0
+    try:
+        readers = {index: csv.DictReader(f) for index, f in files.items()}
+        with open(csv_file, 'r', encoding='utf-8') as src, \
+                open(tmp_file, 'w', newline='', encoding='utf-8') as f:
+            fieldnames = next(iter(readers.values())).fieldnames
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            
-            for row, embedding in zip(rows, embeddings):
-                # 将 embedding 转换为字符串（逗号分隔）
-                row['embedding'] = ','.join(map(str, embedding.tolist()))
+            for source in csv.DictReader(src):
+                row = next(readers[shard_index(source['id'], manifest.shards)], None)
+                if row is None or row['id'] != source['id']:
+                    raise ValueError(f"{os.path.basename(csv_file)} 与分片不一致（节点 {source['id']}），"
+                                     f"请重新运行 json_to_csv.py --shards")
+                text = generate_text_for_embedding(row, node_type) or " "
+                digest.update(text.encode('utf-8'))
+                digest.update(b'\0')
+                if row.get('embedding'):
+                    embedded += 1
+                    dimension = dimension or row['embedding'].count(',') + 1
                 writer.writerow(row)
+                rows += 1
+            f.flush()
+            os.fsync(f.fileno())
+    finally:
+        for f in files.values():
+            f.close()
+    os.replace(tmp_file, csv_file)
+    return {'rows': rows, 'embedded': embedded, 'dimension': dimension, 'text_digest': digest.hexdigest()}
+
+
+def update_shards_with_embeddings(csv_dir: str, model, batch_size: int = 16, model_name: str = '',
+                                  workers: int = 4, restart: bool = False):
+    """为 csv/shards/ 中的节点分片并发生成 embedding，再由分片重建节点 CSV
+
+    每个分片完成后在分片 manifest 中记录模型（embedding_model），中断后重新运行只编码未完成的分片；
+    所有分片完成后按原始行序重建 nodes_<类型>.csv，更新 embedding_manifest.json 和分片 manifest 中的原始文件记录。
+    """
+    from tqdm import tqdm
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    # 节点 CSV 由本函数从分片重建，不检查原始文件；大小与记录不一致的分片（替换后未来得及记录）重新编码
+    manifest = require_manifest(csv_dir, sources=False, sizes=False)
+    embedding_manifest = load_manifest(csv_dir)
+    manifest_path = os.path.join(csv_dir, MANIFEST_NAME)
+    
+    for node_type in manifest.node_types():
+        entries = manifest.node_shards(node_type)
+        source = manifest.data['nodes'][node_type]['source']
+        csv_file = os.path.join(csv_dir, source)
+        pending = [entry for entry in entries
+                   if restart or entry.get('embedding_model') != model_name
+                   or os.path.getsize(manifest.file_path(entry)) != entry['bytes']]
+        if not pending and source not in manifest.stale_sources():
+            print(f"\n⏭ {node_type}: 所有分片的 embedding 已是最新，跳过")
+            continue
         
-        print(f"   ✅ {node_type} 节点处理完成 ({len(rows)} 个节点)")
+        print(f"\n🔄 处理 {node_type} 节点（{len(entries)} 个分片，{len(pending)} 个待编码）...")
+        total = sum(entry['rows'] for entry in pending)
+        with phase(f'encode:{node_type}') as p:
+            with tqdm(total=total, desc=f"   Processing {node_type}") as progress, \
+                    ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                futures = {pool.submit(embed_shard, manifest.file_path(entry), node_type, model, batch_size): entry
+                           for entry in pending}
+                # 每个分片完成即写入 manifest，中断或出错后重新运行从未完成的分片继续
+                errors = []
+                for future in as_completed(futures):
+                    entry = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    progress.update(result['rows'])
+                    entry.update(file_entry(manifest.file_path(entry), result['rows']))
+                    entry['embedding_model'] = model_name
+                    entry['embedding_dimension'] = result['dimension']
+                    manifest.save()
+                if errors:
+                    print(f"   ❌ {len(errors)} 个分片编码失败，重新运行即可从未完成的分片继续")
+                    raise errors[0]
+            p.rows_in = p.rows_out = total
+        
+        print(f"   💾 由分片重建 {source}...")
+        with phase(f'write:{node_type}') as p:
+            rebuilt = rebuild_from_shards(csv_file, node_type, manifest, entries)
+            p.rows_in = p.rows_out = rebuilt['rows']
+        manifest.refresh_source(source)
+        manifest.save()
+        
+        stat = os.stat(csv_file)
+        embedding_manifest['types'][node_type] = {
+            'csv': source,
+            'rows': rebuilt['rows'],
+            'embedded': rebuilt['embedded'],
+            'dimension': rebuilt['dimension'],
+            'model': model_name,
+            'text_digest': rebuilt['text_digest'],
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        write_json_atomic(manifest_path, embedding_manifest)
+        print(f"   ✅ {node_type} 节点处理完成 ({rebuilt['rows']} 个节点)")
 
 
-def main():
-    """主函数"""
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_dir = os.path.join(script_dir, 'csv')
+    parser = argparse.ArgumentParser(description='为节点 CSV 生成 embedding')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--batch-size', type=int, default=32,
+                       help='每次编码的文本数 (默认: 32)')
+    parser.add_argument('--server', default=os.getenv('KG_EMBEDDING_SERVER') or None,
+                       help='embedding 服务地址（http://host:port 或 unix:/path），'
+                            '默认读取 KG_EMBEDDING_SERVER，未设置时在本进程加载模型')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                       help=f'每个检查点分片的行数，中断后从最后一个完成的分片继续 (默认: {DEFAULT_SHARD_SIZE})')
+    parser.add_argument('--restart', action='store_true',
+                       help='丢弃已有检查点和 manifest 记录，全部重新编码')
+    parser.add_argument('--shards', action='store_true',
+                       help='读取 json_to_csv.py --shards 生成的分片（csv/shards/），并发编码后重建节点 CSV')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='--shards 时同时编码的分片数 (默认: 使用 embedding 服务时 4，否则 1)')
+    args = parser.parse_args(argv)
+    csv_dir = args.csv_dir
     
     if not os.path.exists(csv_dir):
         print(f"❌ CSV 目录不存在: {csv_dir}")
         print("   请先运行 json_to_csv.py 生成 CSV 文件")
         return
     
-    # 加载模型
-    model = load_model()
+    if args.server:
+        from embedding_server import EmbeddingClient
+
+        model = EmbeddingClient(args.server)
+        model_name = model.health()['model']
+        print(f"🔌 使用 embedding 服务: {args.server} ({model_name})")
+    else:
+        # 加载模型
+        with phase('load_model'):
+            model = load_model()
+        model_name = os.getenv('BGE_MODEL_PATH', '').strip() or 'BAAI/bge-multilingual-gemma2'
     
-    # 生成 embedding
-    update_csv_with_embeddings(csv_dir, model, batch_size=32)
+    if args.shards:
+        # 本进程内的模型默认只用一个线程编码；embedding 服务会把并发请求合并成批
+        workers = args.workers or (4 if args.server else 1)
+        update_shards_with_embeddings(csv_dir, model, batch_size=args.batch_size, model_name=model_name,
+                                      workers=workers, restart=args.restart)
+    else:
+        # 生成 embedding（按分片写检查点，中断后重新运行即可继续）
+        update_csv_with_embeddings(csv_dir, model, batch_size=args.batch_size, model_name=model_name,
+                                   shard_size=args.shard_size, restart=args.restart)
     
     print("\n✅ Embedding 生成完成!")
 
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识图谱查询客户端（供下游 QA / 推荐服务使用）
+- 同一 (uri, user) 共享一个 Driver，由 Driver 维护连接池
+- 按 schema_v1.json 编写的命名参数化查询模板（按 Paper.paper_id 和 name 匹配，导入时为这些属性建立索引）
+- 只读查询以 READ 模式执行，集群（neo4j:// 路由 URI）下会路由到副本
+- LRU + TTL 结果缓存，图数据版本（导入时写入的 (:GraphBuild)）变化时整体失效
+- 缓存命中率与每个模板的延迟统计
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+# 命名查询模板：模板名 -> Cypher（参数用 $name 传入）
+QUERY_TEMPLATES = {
+    # 按任务 / 模态 / 解剖结构查论文
+    'papers_by_task': """
+        MATCH (p:Paper)-[:ADDRESSES_TASK]->(t:Task {name: $task})
+        RETURN p.paper_id AS paper_id, p.title AS title, p.year AS year
+        ORDER BY p.year DESC
+        LIMIT $limit
+    """,
+    'papers_by_modality': """
+        MATCH (p:Paper)-[:USES_MODALITY]->(m:ImagingModality {name: $modality})
+        RETURN p.paper_id AS paper_id, p.title AS title, p.year AS year
+        ORDER BY p.year DESC
+        LIMIT $limit
+    """,
+    'papers_by_structure': """
+        MATCH (p:Paper)-[:FOCUSES_ON_STRUCTURE]->(s:AnatomicalStructure {name: $structure})
+        RETURN p.paper_id AS paper_id, p.title AS title, p.year AS year
+        ORDER BY p.year DESC
+        LIMIT $limit
+    """,
+    'papers_by_task_and_modality': """
+        MATCH (t:Task {name: $task})<-[:ADDRESSES_TASK]-(p:Paper)
+              -[:USES_MODALITY]->(m:ImagingModality {name: $modality})
+        RETURN p.paper_id AS paper_id, p.title AS title, p.year AS year
+        ORDER BY p.year DESC
+        LIMIT $limit
+    """,
+    # 论文详情
+    'paper': """
+        MATCH (p:Paper {paper_id: $paper_id})
+        OPTIONAL MATCH (p)-[:ADDRESSES_TASK]->(t:Task)
+        OPTIONAL MATCH (p)-[:USES_MODALITY]->(m:ImagingModality)
+        OPTIONAL MATCH (p)-[:FOCUSES_ON_STRUCTURE]->(s:AnatomicalStructure)
+        RETURN p.paper_id AS paper_id, p.title AS title, p.doi AS doi, p.year AS year,
+               p.category AS category, p.authors AS authors,
+               collect(DISTINCT t.name) AS tasks,
+               collect(DISTINCT m.name) AS modalities,
+               collect(DISTINCT s.name) AS structures
+    """,
+    'paper_methods': """
+        MATCH (p:Paper {paper_id: $paper_id})-[:PROPOSES_METHOD]->(m:Method)
+        RETURN m.name AS method, m.method_type AS method_type
+    """,
+    'paper_metrics': """
+        MATCH (p:Paper {paper_id: $paper_id})-[r:REPORTS_METRIC]->(m:Metric)
+        RETURN m.name AS metric, r.value AS value, r.note AS note
+    """,
+    # 相似论文：读取 similarity.py 预先计算的 SIMILAR_TO 关系（一跳）
+    'similar_papers': """
+        MATCH (p:Paper {paper_id: $paper_id})-[r:SIMILAR_TO]->(node:Paper)
+        RETURN node.paper_id AS paper_id, node.title AS title, r.value AS score
+        ORDER BY score DESC
+        LIMIT $limit
+    """,
+    # 实时向量查询（使用导入时创建的 paper_embeddings 索引，排除自身；用于尚未计算 kNN 的论文）
+    'similar_papers_vector': """
+        MATCH (p:Paper {paper_id: $paper_id})
+        WHERE p.embedding IS NOT NULL
+        CALL db.index.vector.queryNodes('paper_embeddings', $limit + 1, p.embedding)
+        YIELD node, score
+        WHERE node <> p
+        RETURN node.paper_id AS paper_id, node.title AS title, score
+        ORDER BY score DESC
+        LIMIT $limit
+    """,
+    # 方法相关
+    'method_datasets': """
+        MATCH (m:Method {name: $method})-[:EVALUATED_ON]->(d:Dataset)
+        RETURN d.name AS dataset
+    """,
+    'method_metrics': """
+        MATCH (m:Method {name: $method})-[r:ACHIEVES_METRIC]->(x:Metric)
+        RETURN x.name AS metric, r.value AS value, r.note AS note
+    """,
+    'methods_for_task': """
+        MATCH (m:Method)-[:DESIGNED_FOR_TASK]->(t:Task {name: $task})
+        RETURN m.name AS method, m.method_type AS method_type
+        LIMIT $limit
+    """,
+    'papers_using_dataset': """
+        MATCH (p:Paper)-[:USES_DATASET]->(d:Dataset {name: $dataset})
+        RETURN p.paper_id AS paper_id, p.title AS title, p.year AS year
+        ORDER BY p.year DESC
+        LIMIT $limit
+    """,
+}
+
+# 模板参数的默认值
+TEMPLATE_DEFAULTS = {'limit': 20}
+
+BUILD_VERSION_QUERY = "MATCH (b:GraphBuild {id: 'current'}) RETURN b.version AS version"
+
+# 共享 Driver：(uri, user) -> Driver
+_DRIVERS = {}
+_DRIVERS_LOCK = threading.Lock()
+
+
+def get_shared_driver(uri: str, auth: Tuple[str, str], max_pool_size: int = 50,
+                      acquisition_timeout: float = 30.0):
+    """获取（或创建）同一 (uri, user) 共享的 Driver，连接池由 Driver 维护"""
+    key = (uri, auth[0])
+    with _DRIVERS_LOCK:
+        driver = _DRIVERS.get(key)
+        if driver is None:
+            from neo4j import GraphDatabase
+
+            driver = GraphDatabase.driver(uri, auth=auth,
+                                          max_connection_pool_size=max_pool_size,
+                                          connection_acquisition_timeout=acquisition_timeout)
+            _DRIVERS[key] = driver
+        return driver
+
+
+def close_all_drivers():
+    """关闭所有共享 Driver（进程退出前调用）"""
+    with _DRIVERS_LOCK:
+        for driver in _DRIVERS.values():
+            driver.close()
+        _DRIVERS.clear()
+
+
+class QueryCache:
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        """线程安全的 LRU + TTL 缓存；max_size 为 0 时不缓存"""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """命中返回 (True, 值)，否则返回 (False, None)"""
+        now = time.monotonic()
+        with self.lock:
+            item = self.entries.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > now:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self.entries[key]
+                self.expired += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+            }
+
+
+class LatencyStats:
+    def __init__(self, window: int = 1000):
+        """按模板记录最近 window 次数据库查询的耗时（毫秒）"""
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def record(self, name: str, millis: float):
+        with self.lock:
+            self.samples.setdefault(name, deque(maxlen=self.window)).append(millis)
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    @staticmethod
+    def percentile(sorted_values: List[float], q: float) -> float:
+        index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+        return sorted_values[index]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            report = {}
+            for name, samples in self.samples.items():
+                values = sorted(samples)
+                report[name] = {
+                    'count': self.counts[name],
+                    'mean_ms': round(sum(values) / len(values), 3),
+                    'p50_ms': round(self.percentile(values, 0.50), 3),
+                    'p95_ms': round(self.percentile(values, 0.95), 3),
+                    'p99_ms': round(self.percentile(values, 0.99), 3),
+                    'max_ms': round(values[-1], 3),
+                }
+            return report
+
+
+class GraphClient:
+    def __init__(self, uri: str, auth: Tuple[str, str], database: Optional[str] = None,
+                 cache_size: int = 1024, cache_ttl: float = 300.0,
+                 version_check_interval: float = 30.0, driver=None):
+        """创建查询客户端
+
+        driver 为空时使用按 (uri, user) 共享的 Driver；
+        每隔 version_check_interval 秒检查一次图数据版本，版本变化时清空缓存。
+        """
+        self.uri = uri
+        self.database = database
+        self.driver = driver if driver is not None else get_shared_driver(uri, auth)
+        self.cache = QueryCache(cache_size, cache_ttl)
+        self.latency = LatencyStats()
+        self.version_check_interval = version_check_interval
+        self.build_version = None
+        self.version_checked_at = None
+        self.version_lock = threading.Lock()
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """从 NEO4J_URI / NEO4J_USER / NEO4J_PASSWORD 环境变量创建客户端"""
+        uri = os.getenv('NEO4J_URI')
+        user = os.getenv('NEO4J_USER', 'neo4j')
+        password = os.getenv('NEO4J_PASSWORD')
+        if not uri or not password:
+            raise ValueError("请设置 NEO4J_URI, NEO4J_USER 和 NEO4J_PASSWORD 环境变量")
+        return cls(uri, (user, password), **kwargs)
+
+    def close(self):
+        """释放客户端；共享 Driver 由 close_all_drivers() 统一关闭"""
+        self.cache.clear()
+
+    def _read(self, cypher: str, params: Dict) -> List[Dict]:
+        """以只读事务执行查询（路由到副本），返回 dict 列表"""
+        from neo4j import READ_ACCESS
+
+        def work(tx):
+            return [record.data() for record in tx.run(cypher, params)]
+
+        with self.driver.session(database=self.database,
+                                 default_access_mode=READ_ACCESS) as session:
+            return session.execute_read(work)
+
+    def _check_build_version(self):
+        """距上次检查超过间隔时读取图数据版本，变化则清空缓存"""
+        now = time.monotonic()
+        with self.version_lock:
+            if (self.version_checked_at is not None
+                    and now - self.version_checked_at < self.version_check_interval):
+                return
+            self.version_checked_at = now
+        records = self._read(BUILD_VERSION_QUERY, {})
+        version = records[0]['version'] if records else None
+        with self.version_lock:
+            if version != self.build_version:
+                if self.build_version is not None:
+                    self.invalidations += 1
+                self.build_version = version
+                self.cache.clear()
+
+    @staticmethod
+    def cache_key(name: str, params: Dict) -> str:
+        return name + '\x1f' + json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+
+    def query(self, name: str, use_cache: bool = True, **params) -> List[Dict]:
+        """执行命名查询模板（只读），结果为 dict 列表
+
+        返回的列表可能被缓存共享，调用方不要原地修改。
+        """
+        if name not in QUERY_TEMPLATES:
+            raise KeyError(f"未知查询模板: {name}（可用: {', '.join(sorted(QUERY_TEMPLATES))}）")
+        params = {**TEMPLATE_DEFAULTS, **params}
+        return self.run_read(QUERY_TEMPLATES[name], params, name=name, use_cache=use_cache)
+
+    def run_read(self, cypher: str, params: Optional[Dict] = None, name: str = 'adhoc',
+                 use_cache: bool = True) -> List[Dict]:
+        """执行任意只读 Cypher；name 用于延迟统计和缓存键"""
+        params = params or {}
+        self._check_build_version()
+
+        key = self.cache_key(cypher if name == 'adhoc' else name, params)
+        if use_cache:
+            hit, value = self.cache.get(key)
+            if hit:
+                return value
+
+        start = time.perf_counter()
+        records = self._read(cypher, params)
+        self.latency.record(name, (time.perf_counter() - start) * 1000)
+
+        if use_cache:
+            self.cache.put(key, records)
+        return records
+
+    def invalidate(self):
+        """手动清空缓存"""
+        self.cache.clear()
+
+    def stats(self) -> Dict:
+        """缓存命中率、图数据版本和每个模板的延迟统计"""
+        return {
+            'uri': self.uri,
+            'build_version': self.build_version,
+            'invalidations': self.invalidations,
+            'cache': self.cache.stats(),
+            'latency': self.latency.stats(),
+        }
+
+
+def main():
+    """命令行：执行一个命名查询并打印结果和统计"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='知识图谱查询客户端')
+    parser.add_argument('template', nargs='?', help='查询模板名')
+    parser.add_argument('--param', action='append', default=[], metavar='KEY=VALUE',
+                        help='查询参数，可多次指定（如 --param task=segmentation）')
+    parser.add_argument('--repeat', type=int, default=1, help='重复执行次数（观察缓存效果）')
+    parser.add_argument('--list', action='store_true', help='列出所有查询模板')
+    args = parser.parse_args()
+
+    if args.list or not args.template:
+        for name, cypher in QUERY_TEMPLATES.items():
+            params = sorted(set(re.findall(r'\$(\w+)', cypher)))
+            print(f"  {name:<30} 参数: {', '.join(params)}")
+        return
+
+    params = {}
+    for item in args.param:
+        key, _, value = item.partition('=')
+        params[key] = int(value) if value.isdigit() else value
+
+    try:
+        client = GraphClient.from_env()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    try:
+        for _ in range(args.repeat):
+            records = client.query(args.template, **params)
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False, default=str))
+        print(f"\n📊 {json.dumps(client.stats(), ensure_ascii=False, indent=2)}")
+    finally:
+        client.close()
+        close_all_drivers()
+
+
+if __name__ == "__main__":
+    main()
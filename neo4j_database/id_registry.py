@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化节点 ID 注册表
+把 (节点类型, 规范化名称) 映射为跨运行稳定的紧凑整数 ID（全局自增，各类型共用一个序列，
+因此 ID 在各标签间唯一），同时保存旧版 MD5 十六进制 ID 以便兼容和迁移。
+
+文件以内存映射方式读取：查找时直接在映射的开放寻址哈希表中探测，不需要把整个表读入内存；
+首次出现的键用非加密哈希（CRC32 + Adler-32 组成 64 位）定位槽位，
+槽位哈希相同但键不同（哈希碰撞）时继续探测并计数。
+新分配的 ID 先保存在内存中，save() 时写临时文件后原子替换。
+
+文件格式（小端）：
+    头部 64 字节：magic、版本、哈希方式、条目数、槽位数、下一个 ID、字符串区字节数
+    槽位表：槽位数 × (键哈希 u64, 条目序号+1 u32, 填充 u32)，条目序号+1 为 0 表示空槽
+    条目表：条目数 × (ID u64, 键哈希 u64, 旧版 ID u64, 字符串偏移 u64, 字符串长度 u32, 填充 u32)
+    字符串区：UTF-8 编码的 "类型\\x1f名称"
+
+用法:
+    python id_registry.py --registry csv/id_registry.bin --stats
+    python id_registry.py --registry csv/id_registry.bin --check
+    python id_registry.py --registry csv/id_registry.bin --export-legacy-map legacy_map.csv
+"""
+
+import os
+import csv
+import mmap
+import zlib
+import struct
+import hashlib
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+REGISTRY_MAGIC = b'KGIDREG1'
+REGISTRY_VERSION = 1
+# 键哈希方式：1 = (Adler-32 << 32) | CRC32（低位为 CRC32，用于定位槽位）
+HASH_CRC32_ADLER32 = 1
+
+HEADER = struct.Struct('<8sIIQQQQ')
+HEADER_SIZE = 64
+SLOT = struct.Struct('<QII')
+SLOT_DTYPE = np.dtype([('hash', '<u8'), ('entry', '<u4'), ('pad', '<u4')])
+ENTRY_DTYPE = np.dtype([('id', '<u8'), ('hash', '<u8'), ('legacy', '<u8'),
+                        ('offset', '<u8'), ('length', '<u4'), ('pad', '<u4')])
+
+MIN_CAPACITY = 1024
+# 槽位表最大装载率，超过时扩容为两倍
+MAX_LOAD_FACTOR = 0.5
+
+KEY_SEPARATOR = '\x1f'
+
+
+def legacy_hex_id(node_type: str, name: str) -> str:
+    """旧版节点 ID：md5("类型:名称") 的前 16 个十六进制字符"""
+    return hashlib.md5(f"{node_type}:{name}".encode('utf-8')).hexdigest()[:16]
+
+
+def encode_key(node_type: str, name: str) -> bytes:
+    return f"{node_type}{KEY_SEPARATOR}{name}".encode('utf-8')
+
+
+def key_hash(key: bytes) -> int:
+    """64 位非加密键哈希（两个独立的校验和拼接，碰撞由键比较检出）
+
+    短字符串的 Adler-32 低位分布很差，放在高 32 位；槽位由分布均匀的 CRC32 决定。
+    """
+    return (zlib.adler32(key) << 32) | zlib.crc32(key)
+
+
+def capacity_for(count: int) -> int:
+    """能容纳 count 个条目的槽位数（2 的幂）"""
+    capacity = MIN_CAPACITY
+    while count > capacity * MAX_LOAD_FACTOR:
+        capacity *= 2
+    return capacity
+
+
+class IdRegistry:
+    def __init__(self, path: str):
+        """打开注册表文件（不存在时为空表，save() 时创建）"""
+        self.path = path
+        self._file = None
+        self._mm = None
+        self.count = 0
+        self.capacity = 0
+        self.next_id = 1
+        self.strings_size = 0
+
+        # 本次运行新分配的条目：键 -> (ID, 键哈希, 旧版 ID)
+        self.new_entries: Dict[bytes, Tuple[int, int, int]] = {}
+        self._new_order: List[bytes] = []
+        self._legacy_index: Optional[Dict[int, int]] = None
+
+        self.hash_collisions = 0
+        self.legacy_collisions: List[Tuple[str, str, str]] = []
+
+        if os.path.exists(path):
+            self._open()
+
+    def _open(self):
+        self._file = open(self.path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, hash_kind, count, capacity, next_id, strings_size = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != REGISTRY_MAGIC:
+            raise ValueError(f"不是 ID 注册表文件: {self.path}")
+        if version != REGISTRY_VERSION or hash_kind != HASH_CRC32_ADLER32:
+            raise ValueError(f"不支持的注册表版本 {version} / 哈希方式 {hash_kind}: {self.path}")
+        expected = HEADER_SIZE + capacity * SLOT.size + count * ENTRY_DTYPE.itemsize + strings_size
+        if len(self._mm) != expected:
+            raise ValueError(f"注册表文件长度不符（{len(self._mm)} != {expected}），可能已损坏: {self.path}")
+        self.count = count
+        self.capacity = capacity
+        self.next_id = next_id
+        self.strings_size = strings_size
+        self._slots_offset = HEADER_SIZE
+        self._entries_offset = self._slots_offset + capacity * SLOT.size
+        self._strings_offset = self._entries_offset + count * ENTRY_DTYPE.itemsize
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+            self._mm = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count + len(self.new_entries)
+
+    # ---- 映射表访问 ----
+
+    def _slots(self) -> np.ndarray:
+        return np.frombuffer(self._mm, dtype=SLOT_DTYPE, count=self.capacity, offset=self._slots_offset)
+
+    def _entries(self) -> np.ndarray:
+        return np.frombuffer(self._mm, dtype=ENTRY_DTYPE, count=self.count, offset=self._entries_offset)
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int, int]:
+        """(ID, 键哈希, 旧版 ID, 字符串偏移, 字符串长度)"""
+        return struct.unpack_from('<QQQQI', self._mm, self._entries_offset + index * ENTRY_DTYPE.itemsize)
+
+    def _entry_key(self, offset: int, length: int) -> bytes:
+        start = self._strings_offset + offset
+        return self._mm[start:start + length]
+
+    def _find_stored(self, key: bytes, hashed: int) -> Optional[int]:
+        """在映射的槽位表中查找键，返回 ID；哈希相同而键不同时计为碰撞并继续探测"""
+        if not self.count:
+            return None
+        mask = self.capacity - 1
+        slot = hashed & mask
+        while True:
+            slot_hash, entry, _ = SLOT.unpack_from(self._mm, self._slots_offset + slot * SLOT.size)
+            if entry == 0:
+                return None
+            if slot_hash == hashed:
+                node_id, _, _, offset, length = self._entry(entry - 1)
+                if self._entry_key(offset, length) == key:
+                    return node_id
+                self.hash_collisions += 1
+            slot = (slot + 1) & mask
+
+    # ---- 查找与分配 ----
+
+    def get(self, node_type: str, name: str) -> Optional[int]:
+        """已注册的 ID，未注册时返回 None"""
+        key = encode_key(node_type, name)
+        entry = self.new_entries.get(key)
+        if entry is not None:
+            return entry[0]
+        return self._find_stored(key, key_hash(key))
+
+    def assign(self, node_type: str, name: str) -> int:
+        """返回 ID，首次出现时分配新的 ID"""
+        key = encode_key(node_type, name)
+        entry = self.new_entries.get(key)
+        if entry is not None:
+            return entry[0]
+        hashed = key_hash(key)
+        node_id = self._find_stored(key, hashed)
+        if node_id is not None:
+            return node_id
+
+        node_id = self.next_id
+        self.next_id += 1
+        legacy = int(legacy_hex_id(node_type, name), 16)
+        legacy_index = self.legacy_index()
+        if legacy in legacy_index:
+            # 旧版 MD5 截断 ID 相同的两个键在旧方案下会被合并为同一个节点
+            other = legacy_index[legacy]
+            self.legacy_collisions.append((f"{legacy:016x}", f"{node_type}:{name}",
+                                           self.describe(other) or str(other)))
+        else:
+            legacy_index[legacy] = node_id
+        self.new_entries[key] = (node_id, hashed, legacy)
+        self._new_order.append(key)
+        return node_id
+
+    def legacy_index(self) -> Dict[int, int]:
+        """旧版 ID（整数）-> ID，首次使用时从映射表构建"""
+        if self._legacy_index is None:
+            self._legacy_index = {}
+            if self.count:
+                entries = self._entries()
+                self._legacy_index = dict(zip(entries['legacy'].tolist(), entries['id'].tolist()))
+            for node_id, _, legacy in self.new_entries.values():
+                self._legacy_index.setdefault(legacy, node_id)
+        return self._legacy_index
+
+    def resolve_legacy(self, legacy_id: str) -> Optional[int]:
+        """旧版十六进制 ID -> ID"""
+        try:
+            return self.legacy_index().get(int(legacy_id, 16))
+        except ValueError:
+            return None
+
+    def legacy_id(self, node_type: str, name: str) -> str:
+        """键对应的旧版十六进制 ID（不需要注册）"""
+        return legacy_hex_id(node_type, name)
+
+    def describe(self, node_id: int) -> Optional[str]:
+        """ID -> "类型:名称"（线性扫描，只用于报告）"""
+        for entry_id, node_type, name, _ in self.items():
+            if entry_id == node_id:
+                return f"{node_type}:{name}"
+        return None
+
+    def items(self) -> Iterator[Tuple[int, str, str, str]]:
+        """按 ID 顺序遍历 (ID, 类型, 名称, 旧版 ID)"""
+        for index in range(self.count):
+            node_id, _, legacy, offset, length = self._entry(index)
+            node_type, _, name = self._entry_key(offset, length).decode('utf-8').partition(KEY_SEPARATOR)
+            yield node_id, node_type, name, f"{legacy:016x}"
+        for key in self._new_order:
+            node_id, _, legacy = self.new_entries[key]
+            node_type, _, name = key.decode('utf-8').partition(KEY_SEPARATOR)
+            yield node_id, node_type, name, f"{legacy:016x}"
+
+    # ---- 写出 ----
+
+    def save(self) -> int:
+        """把新分配的条目写入文件（临时文件 + 原子替换），返回新增条目数"""
+        if not self.new_entries and os.path.exists(self.path):
+            return 0
+        added = len(self.new_entries)
+        count = self.count + added
+        capacity = capacity_for(count)
+
+        new_keys = self._new_order
+        new_strings = b''.join(new_keys)
+        entries = np.zeros(count, dtype=ENTRY_DTYPE)
+        if self.count:
+            entries[:self.count] = self._entries()
+            old_strings = self._mm[self._strings_offset:self._strings_offset + self.strings_size]
+        else:
+            old_strings = b''
+        offset = self.strings_size
+        for index, key in enumerate(new_keys, start=self.count):
+            node_id, hashed, legacy = self.new_entries[key]
+            entries[index] = (node_id, hashed, legacy, offset, len(key), 0)
+            offset += len(key)
+
+        if capacity == self.capacity:
+            # 槽位数不变：复制原槽位表，只插入新条目
+            slots = self._slots().copy()
+            start = self.count
+        else:
+            slots = np.zeros(capacity, dtype=SLOT_DTYPE)
+            start = 0
+        mask = capacity - 1
+        slot_hash = slots['hash']
+        slot_entry = slots['entry']
+        for index, hashed in enumerate(entries['hash'][start:].tolist(), start=start):
+            slot = hashed & mask
+            while slot_entry[slot]:
+                slot = (slot + 1) & mask
+            slot_hash[slot] = hashed
+            slot_entry[slot] = index + 1
+
+        strings_size = self.strings_size + len(new_strings)
+        header = HEADER.pack(REGISTRY_MAGIC, REGISTRY_VERSION, HASH_CRC32_ADLER32,
+                             count, capacity, self.next_id, strings_size)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_file = self.path + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(header.ljust(HEADER_SIZE, b'\0'))
+            f.write(slots.tobytes())
+            f.write(entries.tobytes())
+            f.write(old_strings)
+            f.write(new_strings)
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(tmp_file, self.path)
+
+        self.new_entries = {}
+        self._new_order = []
+        self._open()
+        return added
+
+    # ---- 校验与统计 ----
+
+    def check(self) -> List[str]:
+        """校验文件：ID 唯一、键唯一、键哈希与键一致、每个条目都能通过槽位表找到"""
+        problems = []
+        if not self.count:
+            return problems
+        entries = self._entries()
+        ids = entries['id']
+        if len(np.unique(ids)) != len(ids):
+            problems.append("存在重复的 ID")
+        if ids.max() >= self.next_id:
+            problems.append(f"ID 超出 next_id ({ids.max()} >= {self.next_id})")
+        seen = set()
+        for index in range(self.count):
+            node_id, hashed, _, offset, length = self._entry(index)
+            key = self._entry_key(offset, length)
+            if key in seen:
+                problems.append(f"重复的键: {key.decode('utf-8', 'replace')}")
+            seen.add(key)
+            if key_hash(key) != hashed:
+                problems.append(f"键哈希不一致: {key.decode('utf-8', 'replace')}")
+            elif self._find_stored(key, hashed) != node_id:
+                problems.append(f"槽位表中找不到: {key.decode('utf-8', 'replace')}")
+        return problems
+
+    def stats(self) -> Dict:
+        by_type = {}
+        for _, node_type, _, _ in self.items():
+            by_type[node_type] = by_type.get(node_type, 0) + 1
+        return {
+            'entries': len(self),
+            'new_entries': len(self.new_entries),
+            'next_id': self.next_id,
+            'capacity': self.capacity,
+            'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            'hash_collisions': self.hash_collisions,
+            'legacy_collisions': len(self.legacy_collisions),
+            'by_type': by_type,
+        }
+
+
+def export_legacy_map(registry: IdRegistry, output_file: str) -> int:
+    """导出 ID 与旧版 ID 的对照表（CSV：id, legacy_id, type, name），返回行数"""
+    rows = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'legacy_id', 'type', 'name'])
+        for node_id, node_type, name, legacy in registry.items():
+            writer.writerow([node_id, legacy, node_type, name])
+            rows += 1
+    return rows
+
+
+def main():
+    """主函数"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='节点 ID 注册表工具')
+    parser.add_argument('--registry', default=os.path.join(script_dir, 'csv', 'id_registry.bin'),
+                       help='注册表文件 (默认: csv/id_registry.bin)')
+    parser.add_argument('--stats', action='store_true', help='打印条目数和各类型分布')
+    parser.add_argument('--check', action='store_true', help='校验注册表文件')
+    parser.add_argument('--export-legacy-map', metavar='CSV', help='导出 ID 与旧版 MD5 ID 的对照表')
+    parser.add_argument('--lookup', nargs=2, metavar=('TYPE', 'NAME'), help='查询一个节点的 ID')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.registry):
+        print(f"❌ 注册表文件不存在: {args.registry}")
+        raise SystemExit(1)
+
+    with IdRegistry(args.registry) as registry:
+        if args.lookup:
+            node_id = registry.get(*args.lookup)
+            if node_id is None:
+                print(f"⚠ 未注册: {args.lookup[0]}:{args.lookup[1]}")
+            else:
+                print(f"{node_id}\t(旧版 ID: {registry.legacy_id(*args.lookup)})")
+        if args.check:
+            problems = registry.check()
+            if problems:
+                print(f"❌ 发现 {len(problems)} 个问题:")
+                for problem in problems[:20]:
+                    print(f"   - {problem}")
+                raise SystemExit(1)
+            print(f"✅ 注册表校验通过 ({len(registry)} 个条目)")
+        if args.export_legacy_map:
+            rows = export_legacy_map(registry, args.export_legacy_map)
+            print(f"✅ 已导出 {rows} 条对照: {args.export_legacy_map}")
+        if args.stats or not (args.lookup or args.check or args.export_legacy_map):
+            stats = registry.stats()
+            print(f"📊 ID 注册表: {args.registry}")
+            print(f"   条目数: {stats['entries']} (下一个 ID: {stats['next_id']})")
+            print(f"   文件大小: {stats['file_bytes'] / 1024:.1f} KB, 槽位数: {stats['capacity']}")
+            for node_type, count in sorted(stats['by_type'].items()):
+                print(f"     - {node_type}: {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,33 @@
 import json
 import csv
 import os
-from collections import defaultdict
-from typing import Dict, List, Set, Any
-import hashlib
+import shutil
+import argparse
+from collections import Counter
+from typing import Dict, List, Optional
+
+from telemetry import phase, stage_rows, count
+from vocab_normalizer import VocabularyNormalizer, NODE_TYPE_FIELDS
+from id_registry import IdRegistry, legacy_hex_id
+from extract_tables import NodeTable, RelationTable, StringTable, TYPE_BITS
+from csv_layout import (NODE_FIELDS, RELATION_FIELDS, RELATION_AGGREGATE_TYPES, METRIC_MENTIONS_NAME,
+                        METRIC_MENTION_FIELDS, METRIC_MENTION_TYPES, load_schema, relation_csv_name)
+from shards import (ShardWriter, UNSPLIT_GROUP, new_manifest, publish_shards, remove_shards,
+                    shard_dir, source_entry)
+
+
+# 关系端点依次尝试匹配的节点类型（关系类型不在 schema 中，或按 schema 的端点标签没有匹配时）
+ENTITY_NODE_TYPES = ['Task', 'ImagingModality', 'AnatomicalStructure',
+                     'Method', 'Dataset', 'Metric', 'Innovation']
+
+# 词表 OOV 报告文件名（写在 CSV 目录下）
+OOV_REPORT_NAME = 'vocabulary_oov.json'
+
+# 节点 ID 注册表文件名（写在 CSV 目录下，跨运行保留）
+ID_REGISTRY_NAME = 'id_registry.bin'
+
+# 节点 ID 方案：registry 为注册表分配的紧凑整数 ID，legacy 为旧版 MD5 截断 ID
+ID_SCHEMES = ['registry', 'legacy']
 
 
 def normalize_string(s: str) -> str:
@@ -20,267 +44,459 @@ def normalize_string(s: str) -> str:
 
 
 def generate_node_id(node_type: str, name: str) -> str:
-    """生成节点唯一ID"""
-    normalized_name = normalize_string(name)
-    # 使用类型和名称生成唯一ID
-    unique_str = f"{node_type}:{normalized_name}"
-    # 使用哈希确保ID唯一且固定长度
-    return hashlib.md5(unique_str.encode('utf-8')).hexdigest()[:16]
-
-
-def extract_nodes_and_relations(data: List[Dict]) -> tuple:
-    """从 JSON 数据中提取所有节点和关系"""
-    nodes = {
-        'Paper': [],
-        'Task': [],
-        'ImagingModality': [],
-        'AnatomicalStructure': [],
-        'Method': [],
-        'Dataset': [],
-        'Metric': [],
-        'Innovation': []
-    }
+    """旧版节点ID（md5 截断为 16 个十六进制字符），未使用 ID 注册表时采用"""
+    return legacy_hex_id(node_type, normalize_string(name))
+
+
+def extract_nodes_and_relations(data: List[Dict], normalizer: VocabularyNormalizer = None,
+                                registry: IdRegistry = None, schema: Dict = None) -> tuple:
+    """从 JSON 数据中提取所有节点和关系
+
+    返回 (节点类型 -> NodeTable, RelationTable)，见 extract_tables.py。
+    提供 normalizer 时，任务、模态、解剖结构、方法类型、创新类型规范为词表标准值，
+    关系端点按同样的规则匹配；不提供时只去除首尾空白。
+    提供 registry 时节点 ID 由注册表分配（紧凑整数），否则使用旧版 MD5 ID。
+    提供 schema 时关系端点按该关系类型在 schema 中的 from/to 标签匹配（见 resolve_entity）。
+    相同的 (from, type, to) 关系聚合为一条，记录支持论文数、来源论文和 value 的最小/最大/平均值。
+    """
+    if normalizer is None:
+        canonical = lookup = lambda field, raw: normalize_string(raw)
+    else:
+        canonical, lookup = normalizer.canonical, normalizer.lookup
+    if registry is None:
+        generate_id = generate_node_id
+    else:
+        def generate_id(node_type, name):
+            return str(registry.assign(node_type, name))
+
+    tables = [NodeTable(node_type, code, fields) for code, (node_type, fields) in enumerate(NODE_FIELDS.items())]
+    nodes = {table.node_type: table for table in tables}
+    relations = RelationTable(tables, nodes['Paper'], METRIC_MENTION_TYPES)
+    # 关系类型 -> (from 标签列表, to 标签列表)
+    endpoint_labels = {rel_type: ([rel_def['from']], [rel_def['to']])
+                       for rel_type, rel_def in (schema or {}).get('relations', {}).items()}
+    any_labels = (ENTITY_NODE_TYPES, ENTITY_NODE_TYPES)
+    # 低基数取值（类型、方法类型、分类等）共享同一个字符串对象
+    strings = StringTable()
+    intern = strings.intern
     
-    relations = []
-    node_set = defaultdict(set)  # 用于去重
-    node_name_to_id = {}  # 节点名称到ID的映射
+    papers = nodes['Paper']
+    tasks = nodes['Task']
+    modalities = nodes['ImagingModality']
+    structures = nodes['AnatomicalStructure']
+    methods = nodes['Method']
+    datasets = nodes['Dataset']
+    metrics = nodes['Metric']
+    innovations = nodes['Innovation']
     
     for paper in data:
         paper_id = paper.get('paper_id', '')
         
         # 1. 创建 Paper 节点
+        paper_handle = None
+        paper_row = -1
         if paper_id:
-            paper_node = {
-                'id': paper_id,
-                'paper_id': paper_id,
-                'title': paper.get('title', ''),
-                'doi': paper.get('doi', ''),
-                'year': paper.get('year', ''),
-                'category': paper.get('category', ''),
-                'authors': '|'.join(paper.get('authors', [])),
-                'embedding': ''  # 稍后填充
-            }
-            if paper_id not in node_set['Paper']:
-                nodes['Paper'].append(paper_node)
-                node_set['Paper'].add(paper_id)
+            if paper_id not in papers.index:
+                papers.add(paper_id, (
+                    paper_id,
+                    paper_id,
+                    paper.get('title', ''),
+                    paper.get('doi', ''),
+                    paper.get('year', ''),
+                    intern(paper.get('category', '')),
+                    '|'.join(paper.get('authors', [])),
+                ))
+            paper_handle = papers.handle(paper_id)
+            paper_row = paper_handle >> TYPE_BITS
         
         # 2. 提取 Task 节点
         for task in paper.get('tasks', []):
-            task_normalized = normalize_string(task)
-            if task_normalized and task_normalized not in node_set['Task']:
-                task_id = generate_node_id('Task', task_normalized)
-                nodes['Task'].append({
-                    'id': task_id,
-                    'name': task_normalized,
-                    'type': 'Task',
-                    'embedding': ''
-                })
-                node_set['Task'].add(task_normalized)
-                node_name_to_id[f'Task:{task_normalized}'] = task_id
+            task_normalized = canonical('task', task)
+            if task_normalized and task_normalized not in tasks.index:
+                tasks.add(task_normalized, (generate_id('Task', task_normalized),
+                                            generate_node_id('Task', task_normalized),
+                                            task_normalized, 'Task'))
         
         # 3. 提取 ImagingModality 节点
         for modality in paper.get('imaging_modalities', []):
-            modality_normalized = normalize_string(modality)
-            if modality_normalized and modality_normalized not in node_set['ImagingModality']:
-                modality_id = generate_node_id('ImagingModality', modality_normalized)
-                nodes['ImagingModality'].append({
-                    'id': modality_id,
-                    'name': modality_normalized,
-                    'type': 'ImagingModality',
-                    'embedding': ''
-                })
-                node_set['ImagingModality'].add(modality_normalized)
-                node_name_to_id[f'ImagingModality:{modality_normalized}'] = modality_id
+            modality_normalized = canonical('modality', modality)
+            if modality_normalized and modality_normalized not in modalities.index:
+                modalities.add(modality_normalized, (generate_id('ImagingModality', modality_normalized),
+                                                     generate_node_id('ImagingModality', modality_normalized),
+                                                     modality_normalized, 'ImagingModality'))
         
         # 4. 提取 AnatomicalStructure 节点
         for structure in paper.get('anatomical_structures', []):
-            structure_normalized = normalize_string(structure)
-            if structure_normalized and structure_normalized not in node_set['AnatomicalStructure']:
-                structure_id = generate_node_id('AnatomicalStructure', structure_normalized)
-                nodes['AnatomicalStructure'].append({
-                    'id': structure_id,
-                    'name': structure_normalized,
-                    'type': 'AnatomicalStructure',
-                    'embedding': ''
-                })
-                node_set['AnatomicalStructure'].add(structure_normalized)
-                node_name_to_id[f'AnatomicalStructure:{structure_normalized}'] = structure_id
+            structure_normalized = canonical('structure', structure)
+            if structure_normalized and structure_normalized not in structures.index:
+                structures.add(structure_normalized, (generate_id('AnatomicalStructure', structure_normalized),
+                                                      generate_node_id('AnatomicalStructure', structure_normalized),
+                                                      structure_normalized, 'AnatomicalStructure'))
         
         # 5. 提取 Method 节点
         for method in paper.get('methods', []):
             method_name = normalize_string(method.get('name', ''))
-            if method_name and method_name not in node_set['Method']:
-                method_id = generate_node_id('Method', method_name)
-                nodes['Method'].append({
-                    'id': method_id,
-                    'name': method_name,
-                    'method_type': method.get('type', ''),
-                    'type': 'Method',
-                    'embedding': ''
-                })
-                node_set['Method'].add(method_name)
-                node_name_to_id[f'Method:{method_name}'] = method_id
+            if method_name and method_name not in methods.index:
+                methods.add(method_name, (generate_id('Method', method_name),
+                                          generate_node_id('Method', method_name),
+                                          method_name,
+                                          intern(canonical('method_type', method.get('type', ''))),
+                                          'Method'))
         
         # 6. 提取 Dataset 节点
         for dataset in paper.get('datasets', []):
             dataset_normalized = normalize_string(dataset)
-            if dataset_normalized and dataset_normalized not in node_set['Dataset']:
-                dataset_id = generate_node_id('Dataset', dataset_normalized)
-                nodes['Dataset'].append({
-                    'id': dataset_id,
-                    'name': dataset_normalized,
-                    'type': 'Dataset',
-                    'embedding': ''
-                })
-                node_set['Dataset'].add(dataset_normalized)
-                node_name_to_id[f'Dataset:{dataset_normalized}'] = dataset_id
+            if dataset_normalized and dataset_normalized not in datasets.index:
+                datasets.add(dataset_normalized, (generate_id('Dataset', dataset_normalized),
+                                                  generate_node_id('Dataset', dataset_normalized),
+                                                  dataset_normalized, 'Dataset'))
         
-        # 7. 提取 Metric 节点
+        # 7. 提取 Metric 节点（使用名称作为唯一键）
         for metric in paper.get('metrics', []):
             metric_name = normalize_string(metric.get('name', ''))
-            if metric_name:
-                metric_key = f"{metric_name}"  # 使用名称作为唯一键
-                if metric_key not in node_set['Metric']:
-                    metric_id = generate_node_id('Metric', metric_name)
-                    nodes['Metric'].append({
-                        'id': metric_id,
-                        'name': metric_name,
-                        'type': 'Metric',
-                        'embedding': ''
-                    })
-                    node_set['Metric'].add(metric_key)
-                    node_name_to_id[f'Metric:{metric_name}'] = metric_id
+            if metric_name and metric_name not in metrics.index:
+                metrics.add(metric_name, (generate_id('Metric', metric_name),
+                                          generate_node_id('Metric', metric_name),
+                                          metric_name, 'Metric'))
         
-        # 8. 提取 Innovation 节点
+        # 8. 提取 Innovation 节点（使用描述作为唯一键）
         for innovation in paper.get('innovations', []):
             innovation_desc = normalize_string(innovation.get('description', ''))
-            if innovation_desc:
-                innovation_key = innovation_desc  # 使用描述作为唯一键
-                if innovation_key not in node_set['Innovation']:
-                    innovation_id = generate_node_id('Innovation', innovation_desc)
-                    nodes['Innovation'].append({
-                        'id': innovation_id,
-                        'description': innovation_desc,
-                        'innovation_type': innovation.get('type', ''),
-                        'type': 'Innovation',
-                        'embedding': ''
-                    })
-                    node_set['Innovation'].add(innovation_key)
-                    node_name_to_id[f'Innovation:{innovation_desc}'] = innovation_id
+            if innovation_desc and innovation_desc not in innovations.index:
+                innovations.add(innovation_desc, (generate_id('Innovation', innovation_desc),
+                                                  generate_node_id('Innovation', innovation_desc),
+                                                  innovation_desc,
+                                                  intern(canonical('innovation_type', innovation.get('type', ''))),
+                                                  'Innovation'))
         
         # 9. 提取关系
         for relation in paper.get('relations', []):
             rel_type = relation.get('type', '')
             from_entity = relation.get('from', '')
             to_entity = relation.get('to', '')
-            value = relation.get('value', '')
-            note = relation.get('note', '')
             
             if not rel_type or not from_entity or not to_entity:
                 continue
             
-            # 确定 from 和 to 的节点ID
-            from_id = None
-            to_id = None
+            from_labels, to_labels = endpoint_labels.get(rel_type, any_labels)
             
-            # 处理 from 节点
+            # 处理 from 节点：论文自身，或按 schema 的端点标签匹配
             if from_entity == paper_id:
-                from_id = paper_id
+                from_handle = paper_handle
             else:
-                # 尝试匹配各种节点类型
-                from_normalized = normalize_string(from_entity)
-                for node_type in ['Task', 'ImagingModality', 'AnatomicalStructure', 
-                                 'Method', 'Dataset', 'Metric', 'Innovation']:
-                    key = f'{node_type}:{from_normalized}'
-                    if key in node_name_to_id:
-                        from_id = node_name_to_id[key]
-                        break
+                from_handle = resolve_entity(from_entity, from_labels, nodes, lookup)
             
             # 处理 to 节点
-            to_normalized = normalize_string(to_entity)
-            for node_type in ['Task', 'ImagingModality', 'AnatomicalStructure', 
-                             'Method', 'Dataset', 'Metric', 'Innovation']:
-                key = f'{node_type}:{to_normalized}'
-                if key in node_name_to_id:
-                    to_id = node_name_to_id[key]
-                    break
+            to_handle = resolve_entity(to_entity, to_labels, nodes, lookup)
             
-            if from_id and to_id:
-                rel_row = {
-                    'from_id': from_id,
-                    'to_id': to_id,
-                    'type': rel_type,
-                    'value': value if value else '',
-                    'note': note if note else ''
-                }
-                relations.append(rel_row)
+            if from_handle is not None and to_handle is not None:
+                relations.append(from_handle, to_handle, rel_type,
+                                 relation.get('value', ''), relation.get('note', ''), paper_row)
     
     return nodes, relations
 
 
-def write_nodes_csv(nodes: Dict[str, List[Dict]], output_dir: str):
+def resolve_entity(entity: str, labels: List[str], nodes: Dict[str, NodeTable],
+                   lookup) -> Optional[int]:
+    """匹配关系端点，返回节点句柄
+
+    1. 在 labels（schema 中该关系端点的标签）的节点中按名称精确匹配
+    2. labels 中的词表类型（任务、模态、解剖结构）再按词表规范化（别名、包含的别名）匹配
+    3. 仍未匹配时按 ENTITY_NODE_TYPES 精确匹配任意类型：得到的关系端点标签与 schema 不一致，
+       只保留在 relations.csv 中，write_relations_by_type 拆分时计入标签不一致的统计
+    方法、数据集等名称中包含词表术语（如 "CT-Net"）时不会被匹配到词表节点。
+    """
+    stripped = normalize_string(entity)
+    for node_type in labels:
+        table = nodes[node_type]
+        row = table.index.get(stripped)
+        if row is not None:
+            return (row << TYPE_BITS) | table.type_code
+    for node_type in labels:
+        field = NODE_TYPE_FIELDS.get(node_type)
+        if field:
+            table = nodes[node_type]
+            row = table.index.get(lookup(field, entity))
+            if row is not None:
+                return (row << TYPE_BITS) | table.type_code
+    for node_type in ENTITY_NODE_TYPES:
+        table = nodes[node_type]
+        row = table.index.get(stripped)
+        if row is not None:
+            return (row << TYPE_BITS) | table.type_code
+    return None
+
+
+def write_vocabulary_report(normalizer: VocabularyNormalizer, output_file: str, top: int = 20) -> Dict:
+    """打印并保存词表规范化统计（各字段匹配方式计数和最常见的 OOV 取值）"""
+    report = normalizer.report(top)
+    print(f"\n📚 词表规范化:")
+    for field, item in report.items():
+        matched = ', '.join(f"{kind} {n}" for kind, n in sorted(item['matched'].items())) or '无'
+        print(f"   - {field}: 命中 [{matched}], OOV {item['oov_total']} 次 / {item['oov_distinct']} 种")
+        for value, n in item['oov_top'][:5]:
+            print(f"       · {value}: {n}")
+        count(f'vocab_oov_{field}', item['oov_total'])
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"   OOV 报告: {output_file}")
+    return report
+
+
+def write_nodes_csv(nodes: Dict[str, NodeTable], output_dir: str):
     """将节点写入 CSV 文件"""
-    for node_type, node_list in nodes.items():
-        if not node_list:
+    for node_type, table in nodes.items():
+        if not len(table):
             continue
         
         filename = os.path.join(output_dir, f'nodes_{node_type}.csv')
-        fieldnames = list(node_list[0].keys())
         
         with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(node_list)
+            writer = csv.writer(f)
+            writer.writerow(table.fields)
+            writer.writerows(table.rows())
         
-        print(f"✓ 已生成节点文件: {filename} ({len(node_list)} 个节点)")
+        print(f"✓ 已生成节点文件: {filename} ({len(table)} 个节点)")
 
 
-def write_relations_csv(relations: List[Dict], output_dir: str):
+def write_relations_csv(relations: RelationTable, output_dir: str):
     """将关系写入 CSV 文件"""
-    if not relations:
+    if not len(relations):
         print("⚠ 没有关系数据")
         return
     
     filename = os.path.join(output_dir, 'relations.csv')
-    fieldnames = ['from_id', 'to_id', 'type', 'value', 'note']
     
     with open(filename, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(relations)
+        writer = csv.writer(f)
+        writer.writerow(RELATION_FIELDS)
+        writer.writerows(rel.row() for rel in relations)
     
     print(f"✓ 已生成关系文件: {filename} ({len(relations)} 条关系)")
 
 
-def main():
-    """主函数"""
+def write_metric_mentions(relations: RelationTable, output_dir: str) -> int:
+    """写出指标关系的逐次数值提及（metric_mentions.csv），返回提及数"""
+    filename = os.path.join(output_dir, METRIC_MENTIONS_NAME)
+    total = 0
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(METRIC_MENTION_FIELDS)
+        for mention in relations.numeric_mentions():
+            writer.writerow(mention)
+            total += 1
+    print(f"✓ 已生成指标提及文件: {filename} ({total} 次数值提及)")
+    return total
+
+
+def write_relations_by_type(nodes: Dict[str, NodeTable], relations: RelationTable,
+                            schema: Dict, output_dir: str) -> Dict[str, int]:
+    """按 schema 中的关系类型拆分关系文件
+
+    每种关系类型写入 relations_<TYPE>.csv（即使为空也写表头），
+    供 Cypher 导入脚本逐类型读取，每个文件只扫描一次。
+    只保留两端节点标签与 schema 定义一致的关系；类型不在 schema 中
+    或端点标签不匹配的关系仍保留在 relations.csv 中，这里只做统计。
+    schema 中标记 derived_by 的关系类型（如 similarity.py 计算的 SIMILAR_TO）由其他步骤写入，这里跳过。
+    """
+    schema_relations = {rel_type: rel_def for rel_type, rel_def in schema.get('relations', {}).items()
+                        if not rel_def.get('derived_by')}
+    unknown_types = Counter()
+    label_mismatch = Counter()
+    counts = {rel_type: 0 for rel_type in schema_relations}
+    
+    files = {}
+    writers = {}
+    try:
+        for rel_type in schema_relations:
+            filename = os.path.join(output_dir, relation_csv_name(rel_type))
+            files[rel_type] = open(filename, 'w', newline='', encoding='utf-8')
+            writers[rel_type] = csv.writer(files[rel_type])
+            writers[rel_type].writerow(RELATION_FIELDS)
+        
+        # 关系中端点的节点类型直接编码在句柄中，不需要建立 ID 到标签的映射
+        for rel in relations:
+            rel_def = schema_relations.get(rel.type)
+            if rel_def is None:
+                unknown_types[rel.type] += 1
+                continue
+            if rel.from_label != rel_def['from'] or rel.to_label != rel_def['to']:
+                label_mismatch[rel.type] += 1
+                continue
+            writers[rel.type].writerow(rel.row())
+            counts[rel.type] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    
+    for rel_type, total in counts.items():
+        filename = os.path.join(output_dir, relation_csv_name(rel_type))
+        print(f"✓ 已生成关系文件: {filename} ({total} 条关系)")
+    
+    if unknown_types:
+        print(f"⚠ {sum(unknown_types.values())} 条关系的类型不在 schema 中，未拆分:")
+        for rel_type, count in unknown_types.most_common(10):
+            print(f"   - {rel_type}: {count} 条")
+    if label_mismatch:
+        print(f"⚠ {sum(label_mismatch.values())} 条关系的端点标签与 schema 不一致，未拆分:")
+        for rel_type, count in label_mismatch.most_common(10):
+            print(f"   - {rel_type}: {count} 条")
+    
+    return counts
+
+
+def write_shards(nodes: Dict[str, NodeTable], relations: RelationTable, schema: Dict,
+                 output_dir: str, shards: int) -> Dict:
+    """把节点和关系按哈希分区写入 csv/shards/，并写出 manifest.json
+
+    节点按 id 分区，每种节点类型最多 shards 个分片；关系按 from_id 分区，
+    与 relations_<TYPE>.csv 相同的关系按类型分组，其余关系（类型不在 schema 中或端点标签不一致）
+    归入 UNSPLIT_GROUP，所有分组合起来与 relations.csv 相同。
+    先写入临时目录，完成后替换旧的分片目录。
+    """
+    tmp_dir = shard_dir(output_dir) + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = new_manifest(shards)
+    
+    for node_type, table in nodes.items():
+        if not len(table):
+            continue
+        writer = ShardWriter(tmp_dir, f'nodes_{node_type}.csv', table.fields, shards)
+        for row in table.rows():
+            writer.write(row[0], row)
+        manifest['nodes'][node_type] = {'source': f'nodes_{node_type}.csv', 'fields': table.fields,
+                                        'shards': writer.close()}
+    
+    schema_relations = {rel_type: rel_def for rel_type, rel_def in schema.get('relations', {}).items()
+                        if not rel_def.get('derived_by')}
+    writers = {}
+    for rel in relations:
+        rel_def = schema_relations.get(rel.type)
+        group = rel.type
+        if rel_def is None or rel.from_label != rel_def['from'] or rel.to_label != rel_def['to']:
+            group = UNSPLIT_GROUP
+        writer = writers.get(group)
+        if writer is None:
+            csv_name = 'relations.csv' if group == UNSPLIT_GROUP else relation_csv_name(group)
+            writer = writers[group] = ShardWriter(tmp_dir, csv_name, RELATION_FIELDS, shards)
+        row = rel.row()
+        writer.write(row[0], row)
+    for group, writer in writers.items():
+        manifest['relations'][group] = {'source': writer.csv_name, 'shards': writer.close()}
+    
+    for name in [group['source'] for group in manifest['nodes'].values()] + ['relations.csv']:
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            manifest['sources'][name] = source_entry(path)
+    publish_shards(output_dir, tmp_dir, manifest)
+    
+    files = sum(len(group['shards']) for section in ('nodes', 'relations')
+                for group in manifest[section].values())
+    print(f"✓ 已生成分片: {shard_dir(output_dir)} ({files} 个文件，每种类型最多 {shards} 个分片)")
+    return manifest
+
+
+def save_id_registry(registry: IdRegistry, nodes: Dict[str, NodeTable]):
+    """保存注册表并报告碰撞；Paper 节点沿用 paper_id，与整数 ID 重复时给出警告"""
+    with phase('save_id_registry'):
+        added = registry.save()
+    stats = registry.stats()
+    print(f"\n🔑 ID 注册表: {registry.path}")
+    print(f"   条目数: {stats['entries']} (本次新增 {added})")
+    if stats['hash_collisions']:
+        print(f"   键哈希碰撞 {stats['hash_collisions']} 次（已通过键比较区分）")
+    if registry.legacy_collisions:
+        print(f"⚠ {len(registry.legacy_collisions)} 组节点的旧版 MD5 ID 相同（旧方案下会被合并）:")
+        for legacy, key, other in registry.legacy_collisions[:10]:
+            print(f"   - {legacy}: {key} / {other}")
+    count('id_registry_new', added)
+    count('id_registry_legacy_collisions', len(registry.legacy_collisions))
+    
+    entity_ids = {node_id for node_type, table in nodes.items() if node_type != 'Paper'
+                  for node_id in table.id_column}
+    clashes = [node_id for node_id in nodes['Paper'].id_column if node_id in entity_ids]
+    if clashes:
+        print(f"⚠ {len(clashes)} 个 paper_id 与注册表 ID 相同，关系端点可能混淆: {clashes[:5]}")
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     
     input_file = os.path.join(project_root, 'standard.json')
+    schema_file = os.path.join(project_root, 'schema_v1.json')
+    vocab_file = os.path.join(project_root, 'vocabulary.json')
     output_dir = os.path.join(script_dir, 'csv')
     
+    parser = argparse.ArgumentParser(description='将 standard.json 转换为节点和关系 CSV')
+    parser.add_argument('--id-scheme', choices=ID_SCHEMES, default='registry',
+                       help='节点 ID 方案: registry 为注册表分配的整数 ID，legacy 为旧版 MD5 ID (默认: registry)')
+    parser.add_argument('--id-registry', default=os.path.join(output_dir, ID_REGISTRY_NAME),
+                       help=f'ID 注册表文件 (默认: csv/{ID_REGISTRY_NAME})')
+    parser.add_argument('--shards', type=int, default=0,
+                       help='另外将每种节点类型和关系类型按哈希分区写入 N 个分片（csv/shards/），'
+                            '供下游步骤并发处理 (默认: 0，不分片)')
+    args = parser.parse_args(argv)
+    if args.shards < 0:
+        parser.error('--shards 不能为负数')
+    
     os.makedirs(output_dir, exist_ok=True)
     
     print(f"📖 读取文件: {input_file}")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with phase('parse_json') as p:
+        with open(input_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        p.rows_out = len(data)
+    
+    with phase('compile_vocabulary'):
+        normalizer = VocabularyNormalizer.from_file(vocab_file)
+    
+    registry = None
+    if args.id_scheme == 'registry':
+        with phase('open_id_registry'):
+            registry = IdRegistry(args.id_registry)
+    
+    schema = load_schema(schema_file)
     
     print(f"📊 处理 {len(data)} 篇论文...")
-    nodes, relations = extract_nodes_and_relations(data)
+    with phase('extract') as p:
+        nodes, relations = extract_nodes_and_relations(data, normalizer, registry, schema)
+        total_nodes = sum(len(v) for v in nodes.values())
+        p.rows_in = len(data)
+        p.rows_out = total_nodes + len(relations)
+    count('relation_mentions', relations.mentions)
+    count('relation_duplicates_merged', relations.mentions - len(relations))
+    if registry is not None:
+        save_id_registry(registry, nodes)
+        registry.close()
     
     print(f"\n📝 生成 CSV 文件...")
-    write_nodes_csv(nodes, output_dir)
-    write_relations_csv(relations, output_dir)
+    with phase('write_nodes') as p:
+        write_nodes_csv(nodes, output_dir)
+        p.rows_in = p.rows_out = total_nodes
+    with phase('write_relations') as p:
+        write_relations_csv(relations, output_dir)
+        write_relations_by_type(nodes, relations, schema, output_dir)
+        write_metric_mentions(relations, output_dir)
+        p.rows_in = p.rows_out = len(relations)
+    if args.shards:
+        with phase('write_shards') as p:
+            write_shards(nodes, relations, schema, output_dir, args.shards)
+            p.rows_in = p.rows_out = total_nodes + len(relations)
+    elif remove_shards(output_dir):
+        print(f"🗑 已删除过期的分片目录: {shard_dir(output_dir)}")
+    stage_rows(rows_in=len(data), rows_out=total_nodes + len(relations))
+    write_vocabulary_report(normalizer, os.path.join(output_dir, OOV_REPORT_NAME))
     
     # 统计信息
-    total_nodes = sum(len(v) for v in nodes.values())
     print(f"\n✅ 转换完成!")
     print(f"   总节点数: {total_nodes}")
-    print(f"   总关系数: {len(relations)}")
+    print(f"   总关系数: {len(relations)} (由 {relations.mentions} 次提及聚合)")
     print(f"   节点类型分布:")
-    for node_type, node_list in nodes.items():
-        print(f"     - {node_type}: {len(node_list)}")
+    for node_type, table in nodes.items():
+        print(f"     - {node_type}: {len(table)}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+知识图谱工具的统一入口
+各子命令对应一个脚本的 main()，只在执行该子命令时才导入对应模块：
+--help、统计、质量检查等轻量命令不会加载 numpy、torch 等重量级依赖。
+子命令的参数原样传给对应脚本（python kg.py stats --help 查看该脚本的参数）。
+
+用法:
+    python kg.py --help
+    python kg.py pipeline --skip-embedding
+    python kg.py csv --id-scheme registry
+    python kg.py stats --mode streaming
+    python kg.py serve --socket /tmp/kg_embedding.sock
+    python kg.py import --sink sqlite
+
+启动耗时和各子命令加载的重量级依赖由 benchmarks/bench_startup.py 检查。
+"""
+
+import os
+import sys
+import argparse
+import importlib
+from typing import List
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 子命令 -> (模块, 模块所在目录（相对本脚本）, 说明)
+COMMANDS = {
+    'pipeline': ('main', '', '运行完整流水线（main.py）'),
+    'validate': ('schema_validator', '', '按 schema 和词表校验 standard.json'),
+    'csv': ('json_to_csv', '', 'standard.json 转为节点和关系 CSV'),
+    'embed': ('generate_embeddings', '', '为节点 CSV 生成 embedding'),
+    'similarity': ('similarity', '', '根据 embedding 计算 kNN 相似关系'),
+    'cypher': ('generate_cypher', '', '生成 Cypher 导入脚本'),
+    'quality': ('quality_check', '', '数据质量检查'),
+    'stats': ('statistics', '', '统计验证（精确 / 流式）'),
+    'cooccurrence': ('cooccurrence', '', '实体共现矩阵与 PMI'),
+    'leaderboard': ('leaderboard', '', '(数据集, 指标) 排行榜索引'),
+    'related': ('related_papers', '', '个性化 PageRank 相关论文'),
+    'import': ('import_to_cloud', 'cypher_scripts', '导入 Neo4j 或本地 SQLite'),
+    'serve': ('embedding_server', '', '常驻 embedding 服务'),
+    'subgraph': ('subgraph', '', '子图检索'),
+    'query': ('graph_client', '', '执行命名查询模板'),
+}
+
+
+def run_command(command: str, args: List[str]):
+    """导入子命令对应的模块并运行其 main()"""
+    module_name, directory, _ = COMMANDS[command]
+    for path in {SCRIPT_DIR, os.path.normpath(os.path.join(SCRIPT_DIR, directory))}:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    module = importlib.import_module(module_name)
+    # 部分脚本的 main() 不接收参数，统一通过 sys.argv 传递
+    sys.argv = [f'kg.py {command}'] + list(args)
+    return module.main()
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    width = max(len(name) for name in COMMANDS)
+    parser = argparse.ArgumentParser(
+        prog='kg.py', description='知识图谱工具的统一入口',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='子命令:\n' + '\n'.join(f'  {name:<{width}}  {help_text}'
+                                       for name, (_, _, help_text) in COMMANDS.items()))
+    parser.add_argument('command', choices=list(COMMANDS), metavar='command',
+                       help='子命令（见下方列表）')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                       help='传给子命令的参数')
+    args = parser.parse_args(argv)
+    return run_command(args.command, args.args)
+
+
+if __name__ == '__main__':
+    main()
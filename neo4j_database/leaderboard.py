@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+方法 / 数据集 / 指标排行榜索引
+“数据集 X 上 Dice 最高的方法”不再需要在 Neo4j 中扫描全部指标关系：流水线中预先按 (数据集, 指标)
+分组，保存排好序的指标值数组，top-k 和名次查询直接在内存映射文件上完成。
+
+- 指标值取自逐次提及的 metric_mentions.csv（json_to_csv.py 写出），不使用聚合后关系的 value，
+  同一条边在不同论文、不同数据集上的数值各自成为记录
+- 方法的指标值（ACHIEVES_METRIC）记为该方法的记录；论文对同一指标没有方法级提及时，
+  论文的指标值（REPORTS_METRIC）记给论文提出的每个方法（PROPOSES_METHOD，没有时方法为空）
+- 数据集：论文（ACHIEVES_METRIC 时为方法 EVALUATED_ON 与论文 USES_DATASET 的交集）只有一个候选数据集时即为该数据集，
+  否则取 note 中提到的那个候选；无法确定时跳过该提及（unattributed_mentions），
+  不再把一个数值记到论文的每个数据集上
+- 指标方向（越大越好 / 越小越好）取自 vocabulary.json 的 metric_direction
+- 每个 (数据集, 指标) 的记录按指标值升序连续存放，越大越好的指标从末尾读取
+
+文件格式（小端）：
+    头部 32 字节：magic、版本、索引 JSON 字节数、数据区偏移
+    索引 JSON：数据集、指标（含方向）、方法、论文 ID，各分组的 [数据集, 指标, 起, 止]
+    数据区：values float64、papers uint32、methods int32（-1 为空），各自 64 字节对齐
+
+用法:
+    python leaderboard.py --build                                  # 从 csv/ 构建 csv/leaderboard.bin
+    python leaderboard.py --info
+    python leaderboard.py --top BraTS Dice --top-k 10
+    python leaderboard.py --rank BraTS Dice 0.91
+"""
+
+import os
+import csv
+import json
+import mmap
+import time
+import struct
+import argparse
+from collections import defaultdict
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from csv_layout import METRIC_MENTIONS_NAME, relation_csv_name
+from extract_tables import parse_number
+
+LEADERBOARD_MAGIC = b'KGLEAD01'
+LEADERBOARD_VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 32
+DATA_ALIGNMENT = 64
+LEADERBOARD_FILE_NAME = 'leaderboard.bin'
+# 数据区的数组：名称 -> 类型
+ARRAYS = [('values', '<f8'), ('papers', '<u4'), ('methods', '<i4')]
+
+
+def load_metric_directions(vocab_file: str) -> Tuple[Dict[str, str], str]:
+    """读取 vocabulary.json 的 metric_direction，返回 (小写指标名 -> higher/lower, 默认方向)"""
+    spec = {}
+    if os.path.exists(vocab_file):
+        with open(vocab_file, 'r', encoding='utf-8') as f:
+            spec = json.load(f).get('metric_direction', {})
+    directions = {}
+    for name in spec.get('higher_is_better', []):
+        directions[name.strip().lower()] = 'higher'
+    for name in spec.get('lower_is_better', []):
+        directions[name.strip().lower()] = 'lower'
+    return directions, spec.get('default', 'higher')
+
+
+def read_names(csv_dir: str, node_type: str) -> Dict[str, str]:
+    """节点 ID -> 名称"""
+    names = {}
+    node_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+    if os.path.exists(node_file):
+        with open(node_file, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                names[row['id']] = row.get('name', '')
+    return names
+
+
+def read_edges(csv_dir: str, rel_type: str):
+    """逐行读取一种关系（文件不存在时为空）"""
+    rel_file = os.path.join(csv_dir, relation_csv_name(rel_type))
+    if not os.path.exists(rel_file):
+        return
+    with open(rel_file, 'r', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def attribute_dataset(note: str, candidates: List[str], dataset_names: Dict[str, str]) -> Optional[str]:
+    """指标提及所属的数据集：只有一个候选时即为该候选，否则为 note 中提到的唯一候选
+
+    名称互相包含时（BraTS 与 BraTS-1）只算较长的一个；note 没有提到或提到多个候选时返回 None。
+    """
+    if len(candidates) == 1:
+        return candidates[0]
+    folded = (note or '').lower()
+    if not folded:
+        return None
+    matched = [dataset for dataset in candidates
+               if dataset_names[dataset] and dataset_names[dataset].lower() in folded]
+    matched = [dataset for dataset in matched
+               if not any(other != dataset and dataset_names[dataset].lower() in dataset_names[other].lower()
+                          for other in matched)]
+    return matched[0] if len(matched) == 1 else None
+
+
+def read_mentions(csv_dir: str):
+    """逐行读取 metric_mentions.csv；文件不存在（旧版 CSV）时提示重新生成并以状态 1 退出"""
+    mention_file = os.path.join(csv_dir, METRIC_MENTIONS_NAME)
+    if not os.path.exists(mention_file):
+        print(f"❌ 指标提及文件不存在: {mention_file}")
+        print("   请重新运行 json_to_csv.py 生成 CSV")
+        raise SystemExit(1)
+    with open(mention_file, 'r', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def build_leaderboard(csv_dir: str, vocab_file: str) -> Tuple[Dict, Dict[str, np.ndarray]]:
+    """从 CSV 构建排行榜，返回 (索引信息, 数组名 -> 数组)"""
+    directions, default_direction = load_metric_directions(vocab_file)
+    dataset_names = read_names(csv_dir, 'Dataset')
+    metric_names = read_names(csv_dir, 'Metric')
+    method_names = read_names(csv_dir, 'Method')
+
+    paper_datasets = defaultdict(list)
+    for row in read_edges(csv_dir, 'USES_DATASET'):
+        if row['to_id'] in dataset_names:
+            paper_datasets[row['from_id']].append(row['to_id'])
+    paper_methods = defaultdict(list)
+    for row in read_edges(csv_dir, 'PROPOSES_METHOD'):
+        if row['to_id'] in method_names:
+            paper_methods[row['from_id']].append(row['to_id'])
+    evaluated_on = defaultdict(set)
+    for row in read_edges(csv_dir, 'EVALUATED_ON'):
+        evaluated_on[row['from_id']].add(row['to_id'])
+
+    codes = {'datasets': {}, 'metrics': {}, 'methods': {}, 'papers': {}}
+
+    def code(kind: str, key: str) -> int:
+        table = codes[kind]
+        value = table.get(key)
+        if value is None:
+            value = table[key] = len(table)
+        return value
+
+    groups = defaultdict(list)  # (数据集编号, 指标编号) -> [(值, 论文编号, 方法编号)]
+    skipped = unattributed = 0
+    # 提及按论文顺序写出，同一篇论文的提及是连续的
+    for paper, rows in groupby(read_mentions(csv_dir), key=lambda row: row['paper']):
+        rows = list(rows)
+        mentions = [row for row in rows
+                    if row['to_id'] in metric_names and parse_number(row['value']) is not None
+                    and (row['type'] != 'ACHIEVES_METRIC' or row['from_id'] in method_names)]
+        skipped += len(rows) - len(mentions)
+        # 有方法级提及的指标不再使用论文级的数值
+        achieved = {row['to_id'] for row in mentions if row['type'] == 'ACHIEVES_METRIC'}
+        datasets = paper_datasets.get(paper, [])
+        seen = set()
+        for row in mentions:
+            metric = row['to_id']
+            if row['type'] == 'ACHIEVES_METRIC':
+                methods = [row['from_id']]
+                evaluated = evaluated_on.get(row['from_id'])
+                candidates = [dataset for dataset in datasets if dataset in evaluated] if evaluated else []
+                candidates = candidates or datasets
+            elif metric in achieved:
+                continue
+            else:
+                methods = paper_methods.get(paper) or [None]
+                candidates = datasets
+            if not candidates:
+                skipped += 1
+                continue
+            dataset = attribute_dataset(row['note'], candidates, dataset_names)
+            if dataset is None:
+                unattributed += 1
+                continue
+            value = parse_number(row['value'])
+            for method in methods:
+                if method is not None and evaluated_on.get(method) and dataset not in evaluated_on[method]:
+                    continue
+                if (dataset, metric, value, method) in seen:
+                    continue
+                seen.add((dataset, metric, value, method))
+                method_code = code('methods', method) if method is not None else -1
+                groups[(code('datasets', dataset), code('metrics', metric))].append(
+                    (value, code('papers', paper), method_code))
+
+    entries = sum(len(rows) for rows in groups.values())
+    arrays = {name: np.empty(entries, dtype=dtype) for name, dtype in ARRAYS}
+    layout = []
+    offset = 0
+    for (dataset_code, metric_code), rows in sorted(groups.items()):
+        rows.sort(key=lambda item: item[0])
+        end = offset + len(rows)
+        arrays['values'][offset:end], arrays['papers'][offset:end], arrays['methods'][offset:end] = zip(*rows)
+        layout.append([dataset_code, metric_code, offset, end])
+        offset = end
+
+    metrics = [metric_names[metric] for metric in codes['metrics']]
+    info = {
+        'datasets': [dataset_names[dataset] for dataset in codes['datasets']],
+        'metrics': metrics,
+        'directions': [directions.get(name.strip().lower(), default_direction) for name in metrics],
+        'unconfigured_metrics': [name for name in metrics if name.strip().lower() not in directions],
+        'methods': [method_names[method] for method in codes['methods']],
+        'papers': list(codes['papers']),
+        'groups': layout,
+        'entries': entries,
+        'skipped_reports': skipped,
+        'unattributed_mentions': unattributed,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    return info, arrays
+
+
+def write_leaderboard(path: str, info: Dict, arrays: Dict[str, np.ndarray]):
+    """写入排行榜文件（临时文件 + 原子替换）"""
+    layout = {}
+    offset = 0
+    for name, dtype in ARRAYS:
+        layout[name] = offset
+        offset += -(-arrays[name].nbytes // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    index = json.dumps(dict(info, arrays=layout), ensure_ascii=False).encode('utf-8')
+    data_offset = -(-(HEADER_SIZE + len(index)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(LEADERBOARD_MAGIC, LEADERBOARD_VERSION, len(index), data_offset).ljust(HEADER_SIZE, b'\0'))
+        f.write(index)
+        for name, dtype in ARRAYS:
+            f.seek(data_offset + layout[name])
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        f.truncate(data_offset + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Leaderboard:
+    def __init__(self, path: str):
+        """以内存映射方式打开排行榜文件"""
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size, data_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != LEADERBOARD_MAGIC or version != LEADERBOARD_VERSION:
+            raise ValueError(f"不是排行榜文件或版本不支持: {path}")
+        self.info = json.loads(self._mm[HEADER_SIZE:HEADER_SIZE + index_size].decode('utf-8'))
+        self.arrays = {name: np.frombuffer(self._mm, dtype=dtype, count=self.info['entries'],
+                                           offset=data_offset + self.info['arrays'][name])
+                       for name, dtype in ARRAYS}
+        datasets, metrics = self.info['datasets'], self.info['metrics']
+        self.groups = {(datasets[dataset], metrics[metric]): (start, end)
+                       for dataset, metric, start, end in self.info['groups']}
+        self.directions = dict(zip(metrics, self.info['directions']))
+        self.method_codes = {name: code for code, name in enumerate(self.info['methods'])}
+
+    @classmethod
+    def load(cls, csv_dir: str) -> 'Leaderboard':
+        return cls(os.path.join(csv_dir, LEADERBOARD_FILE_NAME))
+
+    def close(self):
+        self.arrays = {}
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _group(self, dataset: str, metric: str) -> Tuple[int, int]:
+        group = self.groups.get((dataset, metric))
+        if group is None:
+            raise KeyError(f"没有排行记录: {dataset} / {metric}")
+        return group
+
+    def _best_first(self, dataset: str, metric: str) -> slice:
+        """分组在数组中的切片（从最好到最差）"""
+        start, end = self._group(dataset, metric)
+        if self.directions[metric] == 'higher':
+            return slice(end - 1, start - 1 if start else None, -1)
+        return slice(start, end)
+
+    def top(self, dataset: str, metric: str, k: int = 10, per_method: bool = True) -> List[Dict]:
+        """(数据集, 指标) 上最好的 k 条记录；per_method 时每个方法只保留最好的一条"""
+        view = self._best_first(dataset, metric)
+        methods = self.arrays['methods'][view]
+        if per_method:
+            # 每个方法第一次出现（即最好）的位置；没有方法的记录全部保留
+            _, first = np.unique(methods, return_index=True)
+            keep = methods < 0
+            keep[first] = True
+            selected = np.flatnonzero(keep)[:k]
+        else:
+            selected = np.arange(min(k, len(methods)))
+        values = self.arrays['values'][view][selected].tolist()
+        papers = self.arrays['papers'][view][selected].tolist()
+        method_names, paper_ids = self.info['methods'], self.info['papers']
+        return [{'rank': rank, 'value': value,
+                 'method': method_names[method] if method >= 0 else None,
+                 'paper_id': paper_ids[paper]}
+                for rank, (value, method, paper) in enumerate(zip(values, methods[selected].tolist(), papers), 1)]
+
+    def rank(self, dataset: str, metric: str, value: float) -> int:
+        """指标值 value 在 (数据集, 指标) 记录中的名次（严格更好的记录数 + 1）"""
+        start, end = self._group(dataset, metric)
+        values = self.arrays['values'][start:end]
+        if self.directions[metric] == 'higher':
+            return int(len(values) - np.searchsorted(values, value, side='right')) + 1
+        return int(np.searchsorted(values, value, side='left')) + 1
+
+    def size(self, dataset: str, metric: str) -> int:
+        """(数据集, 指标) 的记录数"""
+        start, end = self._group(dataset, metric)
+        return end - start
+
+    def method_rank(self, dataset: str, metric: str, method: str) -> Optional[Dict]:
+        """方法在 (数据集, 指标) 上最好的一条记录及其名次，没有记录时返回 None"""
+        code = self.method_codes.get(method)
+        if code is None:
+            return None
+        start, end = self._group(dataset, metric)
+        positions = np.flatnonzero(self.arrays['methods'][start:end] == code)
+        if not len(positions):
+            return None
+        best = start + int(positions[-1] if self.directions[metric] == 'higher' else positions[0])
+        value = float(self.arrays['values'][best])
+        return {'rank': self.rank(dataset, metric, value), 'value': value, 'method': method,
+                'paper_id': self.info['papers'][self.arrays['papers'][best]]}
+
+    def describe(self) -> Dict:
+        return {
+            'groups': len(self.groups),
+            'entries': self.info['entries'],
+            'datasets': len(self.info['datasets']),
+            'metrics': dict(self.directions),
+            'unconfigured_metrics': self.info['unconfigured_metrics'],
+            'skipped_reports': self.info['skipped_reports'],
+            'unattributed_mentions': self.info.get('unattributed_mentions', 0),
+            'bytes': os.path.getsize(self.path),
+            'built_at': self.info['built_at'],
+        }
+
+
+def materialize_leaderboard(csv_dir: str, vocab_file: str, output_file: str = None) -> Dict:
+    """构建并写入排行榜文件，返回摘要"""
+    output_file = output_file or os.path.join(csv_dir, LEADERBOARD_FILE_NAME)
+    start = time.perf_counter()
+    info, arrays = build_leaderboard(csv_dir, vocab_file)
+    write_leaderboard(output_file, info, arrays)
+    seconds = time.perf_counter() - start
+    with Leaderboard(output_file) as board:
+        summary = board.describe()
+    summary['build_seconds'] = round(seconds, 3)
+    summary['file'] = output_file
+    return summary
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(script_dir)
+    parser = argparse.ArgumentParser(description='方法 / 数据集 / 指标排行榜索引')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--vocab', default=os.path.join(project_root, 'vocabulary.json'),
+                       help='指标方向配置 (默认: ../vocabulary.json 的 metric_direction)')
+    parser.add_argument('--board', default=None,
+                       help=f'排行榜文件 (默认: <csv-dir>/{LEADERBOARD_FILE_NAME})')
+    parser.add_argument('--build', action='store_true', help='从 CSV 构建排行榜文件')
+    parser.add_argument('--info', action='store_true', help='打印排行榜摘要')
+    parser.add_argument('--top', nargs=2, metavar=('DATASET', 'METRIC'), help='查询前 k 名')
+    parser.add_argument('--top-k', type=int, default=10, help='返回的记录数 (默认: 10)')
+    parser.add_argument('--all-entries', action='store_true', help='不按方法去重（同一方法可出现多次）')
+    parser.add_argument('--rank', nargs=3, metavar=('DATASET', 'METRIC', 'VALUE'), help='查询指标值的名次')
+    args = parser.parse_args(argv)
+    board_file = args.board or os.path.join(args.csv_dir, LEADERBOARD_FILE_NAME)
+
+    if args.build:
+        summary = materialize_leaderboard(args.csv_dir, args.vocab, board_file)
+        print(f"✅ 已生成排行榜: {board_file} ({summary['bytes'] / 1024:.1f} KB, "
+              f"{summary['groups']} 个 (数据集, 指标) 分组, {summary['entries']} 条记录, {summary['build_seconds']}s)")
+        if summary['unattributed_mentions']:
+            print(f"⚠ {summary['unattributed_mentions']} 次指标提及无法确定数据集（论文有多个数据集且 note 未指明），已跳过")
+        if summary['unconfigured_metrics']:
+            print(f"⚠ {len(summary['unconfigured_metrics'])} 个指标未配置方向，按默认方向排序: "
+                  f"{', '.join(summary['unconfigured_metrics'][:10])}")
+    if not os.path.exists(board_file):
+        print(f"❌ 排行榜文件不存在: {board_file}（先运行 --build）")
+        return
+
+    with Leaderboard(board_file) as board:
+        if args.info:
+            print(json.dumps(board.describe(), ensure_ascii=False, indent=2))
+        if args.top:
+            dataset, metric = args.top
+            start = time.perf_counter()
+            results = board.top(dataset, metric, args.top_k, per_method=not args.all_entries)
+            micros = (time.perf_counter() - start) * 1e6
+            arrow = '↑' if board.directions.get(metric) == 'higher' else '↓'
+            print(f"🏆 {dataset} / {metric} {arrow}")
+            for entry in results:
+                print(f"   {entry['rank']:3d}. {entry['value']:<12g} {entry['method'] or '-':30s} {entry['paper_id']}")
+            print(f"⏱  查询耗时 {micros:.0f} µs")
+        if args.rank:
+            dataset, metric, value = args.rank
+            print(f"   {metric}={value} 在 {dataset} 上排第 {board.rank(dataset, metric, float(value))} "
+                  f"/ {board.size(dataset, metric)}")
+
+
+if __name__ == '__main__':
+    main()
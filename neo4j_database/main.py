@@ -2,40 +2,140 @@
 # -*- coding: utf-8 -*-
 """
 Neo4j 图谱构建主脚本
-整合所有功能：JSON转CSV、生成Embedding、质量检查、统计验证
+整合所有功能：Schema 校验、JSON转CSV、生成Embedding、kNN 相似关系、生成导入脚本、质量检查、统计验证、实体共现矩阵、排行榜索引、相关论文
 """
 
 import os
 import sys
+import json
+import time
 import argparse
 from pathlib import Path
 
+from pipeline import Step, DagExecutor, FAILURE_POLICIES
+from csv_layout import load_schema, relation_csv_name
+from telemetry import write_prometheus_textfile
 
-def run_step(script_name: str, description: str):
-    """运行一个步骤"""
+# build_steps 中的步骤名（--steps / --profile-stage 的可选值）
+STEP_NAMES = ['validate', 'csv', 'embedding', 'similarity', 'cypher', 'quality', 'statistics', 'cooccurrence', 'leaderboard', 'related']
+
+
+def build_steps(script_dir: str, cypher_batch_size: int, id_scheme: str = 'registry',
+                statistics_mode: str = 'exact', similarity_labels: list = None,
+                strict_validation: bool = False, shards: int = 0) -> dict:
+    """流水线步骤：依赖、输入和输出（输入/输出用于判断是否需要重跑）
+
+    shards > 0 时 csv 步骤另外写出哈希分片，embedding、质量检查和流式统计按分片并发处理。
+    """
+    project_root = os.path.dirname(script_dir)
+    csv_dir = os.path.join(script_dir, 'csv')
+    standard_json = os.path.join(project_root, 'standard.json')
+    schema_json = os.path.join(project_root, 'schema_v1.json')
+    node_csvs = os.path.join(csv_dir, 'nodes_*.csv')
+    # json_to_csv.py 写出的关系文件；similarity.py 写出的 relations_SIMILAR_*.csv 不在其中，
+    # 不依赖 similarity 的步骤与它并行运行，不能把它写出的文件计入输入
+    extracted_relation_csvs = [os.path.join(csv_dir, 'relations.csv')] + [
+        os.path.join(csv_dir, relation_csv_name(rel_type))
+        for rel_type, rel_def in load_schema(schema_json).get('relations', {}).items()
+        if not rel_def.get('derived_by')]
+    # 全部关系文件（含相似关系），只用于在 similarity 之后运行的步骤
+    relation_csvs = os.path.join(csv_dir, 'relations*.csv')
+    shard_files = [os.path.join(csv_dir, 'shards', '*')] if shards else []
+    shard_args = ['--shards'] if shards else []
+
+    def script(name):
+        return os.path.join(script_dir, name)
+
+    steps = [
+        # 抽取前按 schema 校验 standard.json；strict_validation 时发现错误即失败，后续步骤不再运行
+        Step('validate', 'Schema 校验', script('schema_validator.py'),
+             args=['--input', standard_json, '--output', os.path.join(script_dir, 'validation_report.json')] +
+                  (['--fail-on-error'] if strict_validation else []),
+             inputs=[standard_json, schema_json, os.path.join(project_root, 'vocabulary.json'),
+                     script('vocab_normalizer.py')],
+             outputs=[os.path.join(script_dir, 'validation_report.json')]),
+        # 注册表由本步骤更新，只作为输出记录（作为输入会导致每次都重跑）
+        Step('csv', 'JSON 转 CSV', script('json_to_csv.py'),
+             args=['--id-scheme', id_scheme] + (['--shards', str(shards)] if shards else []),
+             deps=['validate'],
+             inputs=[standard_json, schema_json, os.path.join(project_root, 'vocabulary.json'),
+                     script('vocab_normalizer.py'), script('id_registry.py'), script('extract_tables.py')],
+             outputs=[node_csvs, *extracted_relation_csvs, os.path.join(csv_dir, 'vocabulary_oov.json'),
+                      os.path.join(csv_dir, 'metric_mentions.csv')] + shard_files +
+                     ([os.path.join(csv_dir, 'id_registry.bin')] if id_scheme == 'registry' else [])),
+        # embedding 原地写回节点 CSV（分片时写回分片，再由分片重建节点 CSV）
+        Step('embedding', '生成 Embedding', script('generate_embeddings.py'),
+             args=['--csv-dir', csv_dir] + shard_args,
+             deps=['csv'],
+             outputs=[node_csvs] + shard_files),
+        # kNN 相似关系写入 relations_SIMILAR_*.csv，与其他关系一起导入
+        Step('similarity', 'kNN 相似关系', script('similarity.py'),
+             args=['--csv-dir', csv_dir, '--labels'] + (similarity_labels or ['Paper']),
+             deps=['csv', 'embedding'],
+             inputs=[node_csvs],
+             outputs=[os.path.join(csv_dir, 'relations_SIMILAR_*.csv')]),
+        Step('cypher', '生成导入脚本', script('generate_cypher.py'),
+             args=['--batch-size', str(cypher_batch_size)],
+             deps=['csv', 'embedding', 'similarity'],
+             inputs=[node_csvs, relation_csvs, schema_json, script('csv_layout.py'),
+                     script('vector_utils.py')],
+             outputs=[os.path.join(script_dir, 'cypher_scripts', 'import_nodes_and_relations.cypher')]),
+        Step('quality', '质量检查', script('quality_check.py'),
+             args=['--csv-dir', csv_dir] + shard_args,
+             deps=['csv', 'embedding'],
+             inputs=[node_csvs, *extracted_relation_csvs] + shard_files,
+             outputs=[os.path.join(script_dir, 'quality_report.json')]),
+        # 精确统计不读取分片
+        Step('statistics', '统计验证', script('statistics.py'),
+             args=['--mode', statistics_mode] + (shard_args if statistics_mode == 'streaming' else []),
+             deps=['csv', 'embedding'],
+             inputs=[node_csvs, *extracted_relation_csvs, script('sketches.py'), script('aggregate_cubes.py')] +
+                    (shard_files if statistics_mode == 'streaming' else []),
+             outputs=[os.path.join(script_dir, 'statistics_report.json')] +
+                     ([os.path.join(csv_dir, 'paper_cubes.bin')] if statistics_mode == 'exact' else [])),
+        Step('cooccurrence', '实体共现矩阵', script('cooccurrence.py'),
+             args=['--csv-dir', csv_dir],
+             deps=['csv', 'embedding'],
+             inputs=[node_csvs, *extracted_relation_csvs],
+             outputs=[os.path.join(csv_dir, 'cooccurrence', '*')]),
+        # 指标值取自逐次提及的 metric_mentions.csv，指标方向取自 vocabulary.json 的 metric_direction
+        Step('leaderboard', '排行榜索引', script('leaderboard.py'),
+             args=['--build', '--csv-dir', csv_dir],
+             deps=['csv', 'embedding'],
+             inputs=[node_csvs, *extracted_relation_csvs, os.path.join(csv_dir, 'metric_mentions.csv'),
+                     os.path.join(project_root, 'vocabulary.json')],
+             outputs=[os.path.join(csv_dir, 'leaderboard.bin')]),
+        Step('related', '相关论文（个性化 PageRank）', script('related_papers.py'),
+             args=['--build', '--csv-dir', csv_dir],
+             deps=['csv', 'embedding'],
+             inputs=[node_csvs, os.path.join(csv_dir, 'relations.csv')],
+             outputs=[os.path.join(csv_dir, 'related_papers.bin')]),
+    ]
+    return {step.name: step for step in steps}
+
+
+def announce_step(step: Step):
+    """步骤开始时打印标题"""
     print("\n" + "=" * 60)
-    print(f"📌 {description}")
-    print("=" * 60)
-    
-    script_path = os.path.join(os.path.dirname(__file__), script_name)
-    
-    if not os.path.exists(script_path):
-        print(f"❌ 脚本不存在: {script_path}")
-        return False
-    
-    # 执行脚本
-    import subprocess
-    result = subprocess.run(
-        [sys.executable, script_path],
-        cwd=os.path.dirname(script_path)
-    )
-    
-    if result.returncode == 0:
-        print(f"✅ {description} 完成")
-        return True
-    else:
-        print(f"❌ {description} 失败 (退出码: {result.returncode})")
-        return False
+    print(f"📌 {step.description}")
+    print("=" * 60, flush=True)
+
+
+def print_telemetry(records: list):
+    """打印各步骤的耗时、峰值内存和吞吐"""
+    print(f"\n   {'步骤':<22}{'耗时(s)':>10}{'CPU(s)':>10}{'峰值RSS(MB)':>14}{'读入行':>10}{'输出行':>10}{'行/秒':>12}")
+    for record in records:
+        if record.get('status') in ('skipped', 'blocked', 'not_run'):
+            print(f"   {record['stage']:<22}{record['status']:>10}")
+            continue
+        rss = record.get('peak_rss_bytes')
+        print(f"   {record['stage']:<22}"
+              f"{record.get('wall_seconds', 0):>10.2f}"
+              f"{record.get('cpu_seconds', 0):>10.2f}"
+              f"{(rss / 1024 / 1024 if rss else 0):>14.1f}"
+              f"{record.get('rows_in', 0):>10}"
+              f"{record.get('rows_out', 0):>10}"
+              f"{record.get('rows_per_sec') or 0:>12.1f}")
 
 
 def main():
@@ -48,8 +148,41 @@ def main():
     parser.add_argument('--skip-statistics', action='store_true',
                        help='跳过统计验证')
     parser.add_argument('--steps', nargs='+',
-                       choices=['csv', 'embedding', 'quality', 'statistics'],
+                       choices=STEP_NAMES,
                        help='只执行指定的步骤')
+    parser.add_argument('--cypher-batch-size', type=int, default=1000,
+                       help='导入脚本中每个事务提交的行数 (默认: 1000)')
+    parser.add_argument('--id-scheme', choices=['registry', 'legacy'], default='registry',
+                       help='节点 ID 方案：registry 为注册表分配的整数 ID（默认），legacy 为旧版 MD5 ID')
+    parser.add_argument('--statistics-mode', choices=['exact', 'streaming'], default='exact',
+                       help='统计方式：exact 精确统计（默认），streaming 流式近似统计（内存固定，附误差界）')
+    parser.add_argument('--similarity-labels', nargs='+', choices=['Paper', 'Method', 'Innovation'],
+                       default=['Paper'], help='计算 kNN 相似关系的节点标签 (默认: Paper)')
+    parser.add_argument('--strict-validation', action='store_true',
+                       help='standard.json 不符合 schema 时终止流水线（默认只写出 validation_report.json）')
+    parser.add_argument('--shards', type=int, default=0,
+                       help='将节点和关系按哈希分区另外写成 N 个分片（csv/shards/），embedding、质量检查和'
+                            '流式统计按分片并发处理 (默认: 0，不分片)')
+    parser.add_argument('--embedding-server', default=None,
+                       help='使用常驻的 embedding_server.py 编码（http://host:port 或 unix:/path），'
+                            '不在流水线中加载模型；也可设置环境变量 KG_EMBEDDING_SERVER')
+    parser.add_argument('--telemetry-dir', default=None,
+                       help='运行日志目录 (默认: ./telemetry)')
+    parser.add_argument('--prometheus-textfile', default=None,
+                       help='Prometheus textfile 输出路径 (默认: <telemetry-dir>/kg_pipeline.prom)')
+    parser.add_argument('--profile-stage',
+                       choices=STEP_NAMES,
+                       help='对指定步骤做性能分析，结果写入运行日志目录')
+    parser.add_argument('--profiler', choices=['cprofile', 'sampling'], default='cprofile',
+                       help='性能分析方式：cprofile（.prof，可用 snakeviz 查看）'
+                            '或 sampling（collapsed stacks，可用 flamegraph.pl 绘图）')
+    parser.add_argument('--jobs', type=int, default=min(3, os.cpu_count() or 1),
+                       help='最多同时运行的步骤数 (默认: min(3, CPU 核数))')
+    parser.add_argument('--on-failure', choices=FAILURE_POLICIES, default='stop',
+                       help='步骤失败时：stop 不再启动新步骤（默认），'
+                            'continue 继续运行不依赖失败步骤的其他步骤')
+    parser.add_argument('--force', action='store_true',
+                       help='忽略输入哈希，重新运行所有步骤')
     
     args = parser.parse_args()
     
@@ -62,54 +195,72 @@ def main():
     
     # 确保 CSV 目录存在
     os.makedirs(csv_dir, exist_ok=True)
-    
-    steps_to_run = []
+    telemetry_dir = args.telemetry_dir or os.path.join(script_dir, 'telemetry')
+    os.makedirs(telemetry_dir, exist_ok=True)
+    if args.embedding_server:
+        # 通过环境变量传给 embedding 步骤：服务地址不影响输出，不计入步骤的输入哈希
+        os.environ['KG_EMBEDDING_SERVER'] = args.embedding_server
+    all_steps = build_steps(script_dir, args.cypher_batch_size, args.id_scheme, args.statistics_mode,
+                            args.similarity_labels, args.strict_validation, args.shards)
     
     if args.steps:
         # 用户指定了步骤
-        if 'csv' in args.steps:
-            steps_to_run.append(('json_to_csv.py', 'JSON 转 CSV'))
-        if 'embedding' in args.steps and not args.skip_embedding:
-            steps_to_run.append(('generate_embeddings.py', '生成 Embedding'))
-        if 'quality' in args.steps and not args.skip_quality:
-            steps_to_run.append(('quality_check.py', '质量检查'))
-        if 'statistics' in args.steps and not args.skip_statistics:
-            steps_to_run.append(('statistics.py', '统计验证'))
+        selected = [name for name in all_steps if name in args.steps]
     else:
         # 默认执行所有步骤
-        steps_to_run.append(('json_to_csv.py', 'JSON 转 CSV'))
-        
-        if not args.skip_embedding:
-            steps_to_run.append(('generate_embeddings.py', '生成 Embedding'))
-        else:
+        selected = list(all_steps)
+        if args.skip_embedding:
             print("\n⚠ 跳过 Embedding 生成（使用 --skip-embedding）")
-        
-        if not args.skip_quality:
-            steps_to_run.append(('quality_check.py', '质量检查'))
-        else:
+        if args.skip_quality:
             print("\n⚠ 跳过质量检查（使用 --skip-quality）")
-        
-        if not args.skip_statistics:
-            steps_to_run.append(('statistics.py', '统计验证'))
-        else:
+        if args.skip_statistics:
             print("\n⚠ 跳过统计验证（使用 --skip-statistics）")
+    skipped_by_flag = {'embedding': args.skip_embedding, 'quality': args.skip_quality,
+                       'statistics': args.skip_statistics}
+    steps_to_run = [all_steps[name] for name in selected if not skipped_by_flag.get(name)]
     
-    # 执行步骤
-    success_count = 0
-    for script_name, description in steps_to_run:
-        if run_step(script_name, description):
-            success_count += 1
-        else:
-            print(f"\n❌ 步骤失败: {description}")
-            response = input("是否继续执行后续步骤? (y/n): ")
-            if response.lower() != 'y':
-                break
+    # 执行步骤（依赖满足后并行运行，输入未变化的步骤直接跳过）
+    run_started = time.time()
+    executor = DagExecutor(steps_to_run,
+                           state_file=os.path.join(csv_dir, '.pipeline_state.json'),
+                           jobs=args.jobs,
+                           failure_policy=args.on_failure,
+                           force=args.force,
+                           profile_stage=args.profile_stage,
+                           profiler=args.profiler,
+                           profile_dir=telemetry_dir,
+                           announce=announce_step)
+    records = executor.run()
+    success_count = sum(1 for record in records if record['success'])
     
     # 总结
     print("\n" + "=" * 60)
     print("📊 执行总结")
     print("=" * 60)
-    print(f"   成功步骤: {success_count}/{len(steps_to_run)}")
+    skipped = sum(1 for record in records if record['status'] == 'skipped')
+    print(f"   成功步骤: {success_count}/{len(steps_to_run)}（其中 {skipped} 个输入未变化已跳过）")
+    print_telemetry(records)
+    
+    # 写出运行日志和 Prometheus textfile
+    run = {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(run_started)),
+        'finished_at_unix': round(time.time(), 3),
+        'wall_seconds': round(time.time() - run_started, 3),
+        'argv': sys.argv[1:],
+        'success': success_count == len(steps_to_run),
+        'stages': records,
+    }
+    run_log = os.path.join(telemetry_dir,
+                           f"run_{time.strftime('%Y%m%d-%H%M%S', time.localtime(run_started))}.json")
+    with open(run_log, 'w', encoding='utf-8') as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+    prom_file = args.prometheus_textfile or os.path.join(telemetry_dir, 'kg_pipeline.prom')
+    write_prometheus_textfile(prom_file, run)
+    print(f"\n📈 运行日志: {run_log}")
+    print(f"   Prometheus 指标: {prom_file}")
+    for record in records:
+        if record.get('profile_file'):
+            print(f"   性能分析 ({record['stage']}): {record['profile_file']}")
     
     if success_count == len(steps_to_run):
         print("\n✅ 所有步骤执行完成！")
@@ -121,9 +272,11 @@ def main():
         print(f"   2. 查看统计报告: {script_dir}/statistics_report.json")
         print(f"   3. 导入到 Neo4j:")
         print(f"      - 使用 Cypher 脚本: {script_dir}/cypher_scripts/import_nodes_and_relations.cypher")
-        print(f"      - 或使用 Python 脚本: python {script_dir}/cypher_scripts/import_to_cloud.py")
+        print(f"      - 或使用 Python 脚本: python {script_dir}/cypher_scripts/import_to_cloud.py"
+              + (" --shards" if args.shards else ""))
     else:
         print(f"\n⚠ 部分步骤未完成，请检查错误信息")
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线 DAG 执行器
+- 每个步骤声明依赖、输入和输出文件；依赖都成功后才运行
+- 互不依赖的步骤并行执行：支持 fork 的系统上每个步骤在 fork 出的子进程中运行，
+  步骤脚本先在主进程中导入，不再重复启动解释器和导入模块；
+  不支持 fork 时在线程中逐个运行（遥测按进程记录，线程并行会混在一起）
+- 输入、输出文件和参数的哈希与上次成功运行相同时跳过该步骤
+- 失败策略非交互：stop（不再启动新步骤）或 continue（只跳过依赖失败步骤的下游）
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import traceback
+import importlib.util
+import threading
+import multiprocessing
+import multiprocessing.connection
+from typing import Callable, Dict, List, Optional
+
+import telemetry
+
+FAILURE_POLICIES = ('stop', 'continue')
+
+
+class Step:
+    def __init__(self, name: str, description: str, script: str, args: List[str] = None,
+                 deps: List[str] = None, inputs: List[str] = None, outputs: List[str] = None):
+        """一个流水线步骤
+
+        script 为脚本路径，运行其 main()（有参数时调用 main(args)）；
+        inputs / outputs 为文件路径或 glob 模式，用于计算哈希判断是否需要重跑。
+        """
+        self.name = name
+        self.description = description
+        self.script = script
+        self.args = args or []
+        self.deps = deps or []
+        self.inputs = inputs or []
+        self.outputs = outputs or []
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """展开 glob 模式，返回排序后的存在的文件"""
+    paths = set()
+    for pattern in patterns:
+        paths.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(paths)
+
+
+class PipelineState:
+    def __init__(self, state_file: str):
+        """各步骤上次成功运行时的输入/输出摘要，以及文件哈希缓存（按大小和修改时间）"""
+        self.state_file = state_file
+        self.data = {'steps': {}, 'files': {}}
+        if os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                print(f"⚠ 状态文件损坏，将重新运行所有步骤: {state_file}")
+
+    def save(self):
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def file_hash(self, path: str) -> str:
+        """文件内容哈希；大小和修改时间未变时直接使用缓存"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        cached = self.data['files'].get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['hash']
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        self.data['files'][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                   'hash': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def digest(self, paths: List[str], extra: str = '') -> str:
+        """一组文件（路径 + 内容）和附加字符串的摘要"""
+        digest = hashlib.blake2b(extra.encode('utf-8'), digest_size=16)
+        for path in paths:
+            digest.update(os.path.abspath(path).encode('utf-8'))
+            digest.update(self.file_hash(path).encode('ascii'))
+        return digest.hexdigest()
+
+    def input_digest(self, step: Step) -> str:
+        """步骤当前的输入摘要
+
+        同时出现在输出中的输入文件（原地修改，如 embedding 写回节点 CSV）只计入输出摘要。
+        脚本本身和参数计入输入摘要。
+        """
+        output_set = set(expand_paths(step.outputs))
+        inputs = [path for path in expand_paths(step.inputs + [step.script]) if path not in output_set]
+        return self.digest(inputs, extra=json.dumps(step.args))
+
+    def fingerprint(self, step: Step, inputs: str = None) -> Dict[str, str]:
+        """步骤的输入/输出摘要；inputs 为启动步骤前计算的输入摘要，为空时按当前文件计算"""
+        outputs = expand_paths(step.outputs)
+        return {
+            'inputs': self.input_digest(step) if inputs is None else inputs,
+            'outputs': self.digest(outputs),
+            'output_count': len(outputs),
+        }
+
+    def is_up_to_date(self, step: Step) -> bool:
+        previous = self.data['steps'].get(step.name)
+        if not previous or not step.outputs:
+            return False
+        current = self.fingerprint(step)
+        return current['output_count'] > 0 and all(
+            previous.get(key) == current[key] for key in ('inputs', 'outputs'))
+
+    def record_success(self, step: Step, inputs: str):
+        """记录成功运行：inputs 为启动前的输入摘要（运行期间并行步骤写入的文件不计入），输出摘要按结束时计算"""
+        self.data['steps'][step.name] = {**self.fingerprint(step, inputs),
+                                         'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        self.save()
+
+    def refresh_outputs(self, step: Step):
+        """下游步骤原地修改了本步骤的输出（如 embedding 写回节点 CSV）后，更新输出摘要"""
+        previous = self.data['steps'].get(step.name)
+        if previous:
+            current = self.fingerprint(step)
+            previous['outputs'] = current['outputs']
+            previous['output_count'] = current['output_count']
+            self.save()
+
+    def forget(self, step: Step):
+        if self.data['steps'].pop(step.name, None) is not None:
+            self.save()
+
+
+_modules = {}
+
+
+def load_step_module(script: str):
+    """按文件路径加载步骤脚本（同一进程内只加载一次）
+
+    使用独立的模块名，避免 statistics.py 等与标准库重名的脚本互相遮蔽。
+    """
+    module = _modules.get(script)
+    if module is None:
+        name = 'kg_step_' + os.path.splitext(os.path.basename(script))[0]
+        spec = importlib.util.spec_from_file_location(name, script)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[script] = module
+    return module
+
+
+def execute_step(step: Step, profile: Optional[tuple] = None) -> Dict:
+    """在当前进程中运行步骤的 main()，返回遥测记录
+
+    profile 为 (分析方式, 输出文件)。SystemExit(0) 视为成功，其余退出码和异常视为失败。
+    """
+    telemetry.reset()
+    record = {'stage': step.name, 'description': step.description, 'success': False}
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    stop_profiler = telemetry.start_profiler(*profile) if profile else None
+    try:
+        module = load_step_module(step.script)
+        if step.args:
+            module.main(step.args)
+        else:
+            module.main()
+        record['success'] = True
+        record['exit_code'] = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        record['success'] = code == 0
+        record['exit_code'] = code
+    except Exception as e:
+        traceback.print_exc()
+        record['exit_code'] = 1
+        record['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        if stop_profiler:
+            stop_profiler()
+            record['profile_file'] = profile[1]
+
+    wall = time.perf_counter() - start_wall
+    summary = telemetry.process_summary()
+    record.update({
+        'wall_seconds': round(wall, 3),
+        'cpu_seconds': round(time.process_time() - start_cpu, 3),
+        'peak_rss_bytes': summary['peak_rss_bytes'],
+        'rows_in': summary['rows_in'],
+        'rows_out': summary['rows_out'],
+        'phases': summary['phases'],
+        'counters': summary['counters'],
+    })
+    for key in ('bytes_read', 'bytes_written'):
+        values = [p[key] for p in summary['phases'] if key in p]
+        if values:
+            record[key] = sum(values)
+    rows = max(record['rows_in'], record['rows_out'])
+    if wall > 0 and rows:
+        record['rows_per_sec'] = round(rows / wall, 1)
+    return record
+
+
+def _step_worker(step: Step, profile: Optional[tuple], conn):
+    """子进程 / 线程入口：运行步骤并通过管道回传记录"""
+    try:
+        record = execute_step(step, profile)
+    except BaseException as e:
+        record = {'stage': step.name, 'success': False, 'exit_code': 1, 'error': repr(e)}
+    sys.stdout.flush()
+    conn.send(record)
+    conn.close()
+
+
+class StepJob:
+    def __init__(self, step: Step, profile: Optional[tuple], use_fork: bool):
+        """启动一个步骤
+
+        use_fork 为 True 时在 fork 出的子进程中运行：共享父进程已导入的模块，
+        各步骤的内存互不影响（峰值 RSS 包含 fork 时父进程的内存）；否则在线程中运行。
+        """
+        self.step = step
+        self.conn, child_conn = multiprocessing.Pipe(duplex=False)
+        if use_fork:
+            try:
+                load_step_module(step.script)
+            except BaseException:
+                # 导入失败留给子进程报告（打印堆栈并记为失败）
+                _modules.pop(step.script, None)
+            context = multiprocessing.get_context('fork')
+            self.worker = context.Process(target=_step_worker, args=(step, profile, child_conn),
+                                          name=f'kg-step-{step.name}')
+        else:
+            self.worker = threading.Thread(target=_step_worker, args=(step, profile, child_conn),
+                                           name=f'kg-step-{step.name}', daemon=True)
+        self.worker.start()
+        if use_fork:
+            child_conn.close()
+
+    def result(self) -> Dict:
+        try:
+            record = self.conn.recv()
+        except EOFError:
+            record = {'stage': self.step.name, 'success': False, 'error': '子进程异常退出'}
+        self.worker.join()
+        exitcode = getattr(self.worker, 'exitcode', 0)
+        if exitcode:
+            record['success'] = False
+            record.setdefault('exit_code', exitcode)
+        return record
+
+
+class DagExecutor:
+    def __init__(self, steps: List[Step], state_file: str, jobs: int = 1,
+                 failure_policy: str = 'stop', force: bool = False,
+                 profile_stage: str = None, profiler: str = 'cprofile', profile_dir: str = None,
+                 announce: Callable[[Step], None] = None):
+        """按依赖关系执行步骤
+
+        jobs 为最大并行步骤数；force 为 True 时忽略哈希，全部重跑。
+        """
+        if failure_policy not in FAILURE_POLICIES:
+            raise ValueError(f"未知的失败策略: {failure_policy}")
+        self.steps = {step.name: step for step in steps}
+        self.state = PipelineState(state_file)
+        self.jobs = max(1, jobs)
+        self.failure_policy = failure_policy
+        self.force = force
+        self.profile_stage = profile_stage
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.announce = announce
+        self.use_fork = 'fork' in multiprocessing.get_all_start_methods()
+        if not self.use_fork:
+            self.jobs = 1
+        self.check_graph()
+
+    def check_graph(self):
+        """检查依赖是否存在环（依赖不在本次运行中的步骤视为已满足）"""
+        visiting, done = set(), set()
+
+        def visit(name, path):
+            if name in done or name not in self.steps:
+                return
+            if name in visiting:
+                raise ValueError(f"步骤依赖存在环: {' -> '.join(path + [name])}")
+            visiting.add(name)
+            for dep in self.steps[name].deps:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.steps:
+            visit(name, [])
+
+    def profile_for(self, step: Step) -> Optional[tuple]:
+        if step.name != self.profile_stage:
+            return None
+        suffix = 'prof' if self.profiler == 'cprofile' else 'folded'
+        stage = os.path.splitext(os.path.basename(step.script))[0]
+        return (self.profiler, os.path.join(self.profile_dir or '.', f'{stage}.{suffix}'))
+
+    def upstream_sharing_outputs(self, step: Step) -> List[Step]:
+        """与 step 有相同输出文件的上游步骤（传递依赖）"""
+        outputs = set(expand_paths(step.outputs))
+        result, stack, seen = [], list(step.deps), set()
+        while stack:
+            name = stack.pop()
+            if name in seen or name not in self.steps:
+                continue
+            seen.add(name)
+            upstream = self.steps[name]
+            if outputs & set(expand_paths(upstream.outputs)):
+                result.append(upstream)
+            stack.extend(upstream.deps)
+        return result
+
+    def dep_status(self, step: Step, records: Dict) -> str:
+        """ready / waiting / blocked（有依赖失败或被阻塞）"""
+        deps = [dep for dep in step.deps if dep in self.steps]
+        if any(records.get(dep, {}).get('status') in ('failed', 'blocked', 'not_run') for dep in deps):
+            return 'blocked'
+        return 'ready' if all(dep in records for dep in deps) else 'waiting'
+
+    def run(self) -> List[Dict]:
+        """执行全部步骤，返回每个步骤的记录（status 为 succeeded / skipped / failed / blocked / not_run）"""
+        records = {}
+        pending = dict(self.steps)
+        running = {}
+        # 步骤 -> 启动前的输入摘要
+        input_digests = {}
+        stopped = False
+
+        while pending or running:
+            # 启动所有依赖已满足的步骤；跳过输入未变化的步骤后可能有新的步骤就绪，因此循环到没有变化为止
+            progressed = True
+            while progressed:
+                progressed = False
+                for name, step in list(pending.items()):
+                    status = 'not_run' if stopped else self.dep_status(step, records)
+                    if status in ('blocked', 'not_run'):
+                        records[name] = {'stage': name, 'description': step.description,
+                                         'status': status, 'success': False}
+                        if status == 'blocked':
+                            print(f"⏭ 跳过 {step.description}：依赖的步骤失败")
+                        del pending[name]
+                        progressed = True
+                    elif status == 'ready' and len(running) < self.jobs:
+                        del pending[name]
+                        progressed = True
+                        if not self.force and self.state.is_up_to_date(step):
+                            records[name] = {'stage': name, 'description': step.description,
+                                             'status': 'skipped', 'success': True}
+                            print(f"⏭ 跳过 {step.description}：输入未变化")
+                            continue
+                        input_digests[name] = self.state.input_digest(step)
+                        if self.announce:
+                            self.announce(step)
+                        job = StepJob(step, self.profile_for(step), self.use_fork)
+                        running[job.conn] = job
+
+            if not running:
+                break
+
+            # 等待任意一个步骤结束
+            for conn in multiprocessing.connection.wait(list(running)):
+                job = running.pop(conn)
+                step = job.step
+                record = job.result()
+                record.setdefault('description', step.description)
+                if record['success']:
+                    record['status'] = 'succeeded'
+                    self.state.record_success(step, input_digests.pop(step.name))
+                    for upstream in self.upstream_sharing_outputs(step):
+                        self.state.refresh_outputs(upstream)
+                    print(f"✅ {step.description} 完成 ({record.get('wall_seconds', 0):.1f}s)")
+                else:
+                    record['status'] = 'failed'
+                    self.state.forget(step)
+                    print(f"❌ {step.description} 失败 (退出码: {record.get('exit_code')})")
+                    if self.failure_policy == 'stop':
+                        stopped = True
+                records[step.name] = record
+
+        return [records[name] for name in self.steps]
@@ -5,12 +5,42 @@
 - 检查重复节点
 - 检查孤立节点
 - 检查关系完整性
+
+--shards 时读取 json_to_csv.py 生成的哈希分片，各分片并发检查后按分片顺序合并。
 """
 
 import os
 import csv
+import json
+import argparse
 from collections import defaultdict, Counter
-from typing import Dict, List, Set
+from typing import Dict, List, Set, Tuple
+
+from telemetry import phase
+from shards import DEFAULT_WORKERS, map_shards, require_manifest
+
+# generate_embeddings.py 写出的 manifest（与 generate_embeddings.MANIFEST_NAME 一致）
+EMBEDDING_MANIFEST = 'embedding_manifest.json'
+
+NODE_TYPES = ['Paper', 'Task', 'ImagingModality', 'AnatomicalStructure',
+              'Method', 'Dataset', 'Metric', 'Innovation']
+
+# 报告中保存的无效关系明细数上限
+MAX_INVALID_DETAILS = 20
+
+# 分片模式下，关系分片的检查进程在 fork 时继承的全部节点 ID
+_node_ids: Set[str] = set()
+
+
+def duplicate_key(node_type: str, row: Dict) -> str:
+    """根据节点类型选择判断重复的唯一标识字段"""
+    if node_type == 'Paper':
+        return row.get('paper_id', '')
+    if node_type in ('Task', 'ImagingModality', 'AnatomicalStructure', 'Method', 'Dataset', 'Metric'):
+        return row.get('name', '')
+    if node_type == 'Innovation':
+        return row.get('description', '')
+    return row.get('id', '')
 
 
 def check_duplicate_nodes(csv_dir: str) -> Dict[str, List]:
@@ -39,52 +69,41 @@ def check_duplicate_nodes(csv_dir: str) -> Dict[str, List]:
             for row in reader:
                 nodes.append(row)
                 
-                # 根据节点类型选择唯一标识字段
-                if node_type == 'Paper':
-                    key = row.get('paper_id', '')
-                elif node_type == 'Task':
-                    key = row.get('name', '')
-                elif node_type == 'ImagingModality':
-                    key = row.get('name', '')
-                elif node_type == 'AnatomicalStructure':
-                    key = row.get('name', '')
-                elif node_type == 'Method':
-                    key = row.get('name', '')
-                elif node_type == 'Dataset':
-                    key = row.get('name', '')
-                elif node_type == 'Metric':
-                    key = row.get('name', '')
-                elif node_type == 'Innovation':
-                    key = row.get('description', '')
-                else:
-                    key = row.get('id', '')
+                key = duplicate_key(node_type, row)
                 
                 if key:
                     name_to_ids[key].append(row.get('id', ''))
         
         # 查找重复
-        node_duplicates = []
-        for name, ids in name_to_ids.items():
-            if len(ids) > 1:
-                node_duplicates.append({
-                    'name': name,
-                    'ids': ids,
-                    'count': len(ids)
-                })
-        
+        node_duplicates = find_duplicates(node_type, name_to_ids, len(nodes))
         if node_duplicates:
             duplicates[node_type] = node_duplicates
-            print(f"\n❌ {node_type}: 发现 {len(node_duplicates)} 个重复节点")
-            for dup in node_duplicates[:10]:  # 只显示前10个
-                print(f"   - '{dup['name']}': {dup['count']} 个重复 (IDs: {dup['ids'][:3]}...)")
-            if len(node_duplicates) > 10:
-                print(f"   ... 还有 {len(node_duplicates) - 10} 个重复节点")
-        else:
-            print(f"✅ {node_type}: 无重复节点 ({len(nodes)} 个节点)")
     
     return duplicates
 
 
+def find_duplicates(node_type: str, name_to_ids: Dict[str, List[str]], total: int) -> List[Dict]:
+    """标识对应多个 ID 的节点即为重复，打印并返回重复列表"""
+    node_duplicates = []
+    for name, ids in name_to_ids.items():
+        if len(ids) > 1:
+            node_duplicates.append({
+                'name': name,
+                'ids': ids,
+                'count': len(ids)
+            })
+    
+    if node_duplicates:
+        print(f"\n❌ {node_type}: 发现 {len(node_duplicates)} 个重复节点")
+        for dup in node_duplicates[:10]:  # 只显示前10个
+            print(f"   - '{dup['name']}': {dup['count']} 个重复 (IDs: {dup['ids'][:3]}...)")
+        if len(node_duplicates) > 10:
+            print(f"   ... 还有 {len(node_duplicates) - 10} 个重复节点")
+    else:
+        print(f"✅ {node_type}: 无重复节点 ({total} 个节点)")
+    return node_duplicates
+
+
 def check_orphan_nodes(csv_dir: str) -> Dict[str, int]:
     """检查孤立节点（没有关系的节点）"""
     print("\n" + "=" * 60)
@@ -127,20 +146,24 @@ def check_orphan_nodes(csv_dir: str) -> Dict[str, int]:
                 if node_id and node_id not in connected_nodes:
                     orphan_nodes += 1
         
-        orphan_counts[node_type] = {
-            'total': total_nodes,
-            'orphan': orphan_nodes,
-            'connected': total_nodes - orphan_nodes
-        }
-        
-        if orphan_nodes > 0:
-            print(f"⚠ {node_type}: {orphan_nodes}/{total_nodes} 个孤立节点 ({orphan_nodes/total_nodes*100:.1f}%)")
-        else:
-            print(f"✅ {node_type}: 所有节点都有连接 ({total_nodes} 个节点)")
+        orphan_counts[node_type] = orphan_summary(node_type, total_nodes, orphan_nodes)
     
     return orphan_counts
 
 
+def orphan_summary(node_type: str, total_nodes: int, orphan_nodes: int) -> Dict[str, int]:
+    """打印并返回一种节点的孤立节点统计"""
+    if orphan_nodes > 0:
+        print(f"⚠ {node_type}: {orphan_nodes}/{total_nodes} 个孤立节点 ({orphan_nodes/total_nodes*100:.1f}%)")
+    else:
+        print(f"✅ {node_type}: 所有节点都有连接 ({total_nodes} 个节点)")
+    return {
+        'total': total_nodes,
+        'orphan': orphan_nodes,
+        'connected': total_nodes - orphan_nodes
+    }
+
+
 def check_relation_integrity(csv_dir: str) -> Dict:
     """检查关系完整性"""
     print("\n" + "=" * 60)
@@ -193,14 +216,20 @@ def check_relation_integrity(csv_dir: str) -> Dict:
                     'rel_type': rel_type
                 })
     
+    missing_from = sum(1 for r in invalid_relations if r['type'] == 'missing_from')
+    missing_to = sum(1 for r in invalid_relations if r['type'] == 'missing_to')
+    return relation_summary(relation_types, missing_from, missing_to, invalid_relations)
+
+
+def relation_summary(relation_types: Counter, missing_from: int, missing_to: int,
+                     invalid_details: List[Dict]) -> Dict:
+    """打印并返回关系完整性检查结果"""
     print(f"\n📊 关系类型统计:")
     for rel_type, count in relation_types.most_common():
         print(f"   - {rel_type}: {count} 条")
     
-    if invalid_relations:
-        print(f"\n❌ 发现 {len(invalid_relations)} 条无效关系:")
-        missing_from = sum(1 for r in invalid_relations if r['type'] == 'missing_from')
-        missing_to = sum(1 for r in invalid_relations if r['type'] == 'missing_to')
+    if missing_from or missing_to:
+        print(f"\n❌ 发现 {missing_from + missing_to} 条无效关系:")
         print(f"   - 缺失起始节点: {missing_from} 条")
         print(f"   - 缺失目标节点: {missing_to} 条")
     else:
@@ -209,13 +238,30 @@ def check_relation_integrity(csv_dir: str) -> Dict:
     return {
         'total_relations': sum(relation_types.values()),
         'relation_types': dict(relation_types),
-        'invalid_relations': len(invalid_relations),
-        'invalid_details': invalid_relations[:20]  # 只保存前20个
+        'invalid_relations': missing_from + missing_to,
+        'invalid_details': invalid_details[:MAX_INVALID_DETAILS]
     }
 
 
+def load_embedding_manifest(csv_dir: str) -> Dict[str, Dict]:
+    """读取 embedding manifest 中各节点类型的记录；不存在或损坏时返回空字典"""
+    path = os.path.join(csv_dir, EMBEDDING_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('types', {})
+    except (OSError, ValueError):
+        print(f"⚠ manifest 损坏，逐行检查 embedding: {path}")
+        return {}
+
+
 def check_embedding_coverage(csv_dir: str) -> Dict[str, Dict]:
-    """检查 embedding 覆盖率"""
+    """检查 embedding 覆盖率
+
+    CSV 的大小和修改时间与 embedding manifest 的记录一致时直接使用 manifest 中的行数，
+    不解析向量；否则逐行检查。
+    """
     print("\n" + "=" * 60)
     print("🔍 检查 Embedding 覆盖率...")
     print("=" * 60)
@@ -223,6 +269,7 @@ def check_embedding_coverage(csv_dir: str) -> Dict[str, Dict]:
     node_types = ['Paper', 'Task', 'ImagingModality', 'AnatomicalStructure',
                  'Method', 'Dataset', 'Metric', 'Innovation']
     
+    manifest = load_embedding_manifest(csv_dir)
     embedding_stats = {}
     
     for node_type in node_types:
@@ -231,45 +278,63 @@ def check_embedding_coverage(csv_dir: str) -> Dict[str, Dict]:
         if not os.path.exists(csv_file):
             continue
         
-        total = 0
-        with_embedding = 0
-        empty_embedding = 0
-        
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                total += 1
-                embedding = row.get('embedding', '').strip()
-                if embedding and embedding != '':
-                    with_embedding += 1
-                else:
-                    empty_embedding += 1
-        
-        embedding_stats[node_type] = {
-            'total': total,
-            'with_embedding': with_embedding,
-            'empty_embedding': empty_embedding,
-            'coverage': with_embedding / total * 100 if total > 0 else 0
-        }
-        
-        if empty_embedding > 0:
-            print(f"⚠ {node_type}: {with_embedding}/{total} 个节点有 embedding ({embedding_stats[node_type]['coverage']:.1f}%)")
+        stat = os.stat(csv_file)
+        entry = manifest.get(node_type)
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            total = entry['rows']
+            with_embedding = entry['embedded']
+            source = 'manifest'
         else:
-            print(f"✅ {node_type}: 所有节点都有 embedding ({total} 个节点)")
+            total = 0
+            with_embedding = 0
+            source = 'csv'
+            
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    total += 1
+                    if row.get('embedding', '').strip():
+                        with_embedding += 1
+        
+        embedding_stats[node_type] = coverage_summary(node_type, total, with_embedding, source)
     
     return embedding_stats
 
 
+def coverage_summary(node_type: str, total: int, with_embedding: int, source: str) -> Dict:
+    """打印并返回一种节点的 embedding 覆盖率"""
+    stats = {
+        'total': total,
+        'with_embedding': with_embedding,
+        'empty_embedding': total - with_embedding,
+        'coverage': with_embedding / total * 100 if total > 0 else 0,
+        'source': source
+    }
+    
+    if total > with_embedding:
+        print(f"⚠ {node_type}: {with_embedding}/{total} 个节点有 embedding ({stats['coverage']:.1f}%)")
+    else:
+        print(f"✅ {node_type}: 所有节点都有 embedding ({total} 个节点)")
+    return stats
+
+
 def generate_quality_report(csv_dir: str, output_file: str = None):
     """生成质量检查报告"""
     print("\n" + "=" * 60)
     print("📋 生成质量检查报告...")
     print("=" * 60)
     
-    duplicates = check_duplicate_nodes(csv_dir)
-    orphans = check_orphan_nodes(csv_dir)
-    relations = check_relation_integrity(csv_dir)
-    embeddings = check_embedding_coverage(csv_dir)
+    with phase('duplicates'):
+        duplicates = check_duplicate_nodes(csv_dir)
+    with phase('orphans') as p:
+        orphans = check_orphan_nodes(csv_dir)
+        p.rows_in = sum(v.get('total', 0) for v in orphans.values())
+    with phase('relation_integrity') as p:
+        relations = check_relation_integrity(csv_dir)
+        p.rows_in = relations.get('total_relations', 0)
+    with phase('embedding_coverage') as p:
+        embeddings = check_embedding_coverage(csv_dir)
+        p.rows_in = sum(v.get('total', 0) for v in embeddings.values())
     
     # 生成报告
     report = {
@@ -278,9 +343,151 @@ def generate_quality_report(csv_dir: str, output_file: str = None):
         'relations': relations,
         'embeddings': embeddings
     }
+    finish_quality_report(report, output_file)
+    return report
+
+
+def scan_node_shard(task: Tuple[str, str]) -> Dict:
+    """读取一个节点分片：重复检查用的 标识 -> ID 列表、ID 列表（按行序）和有 embedding 的节点数"""
+    node_type, path = task
+    name_to_ids = defaultdict(list)
+    ids = []
+    with_embedding = 0
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            node_id = row.get('id', '')
+            ids.append(node_id)
+            key = duplicate_key(node_type, row)
+            if key:
+                name_to_ids[key].append(node_id)
+            if row.get('embedding', '').strip():
+                with_embedding += 1
+    return {'name_to_ids': dict(name_to_ids), 'ids': ids, 'with_embedding': with_embedding}
+
+
+def scan_relation_shard(path: str) -> Dict:
+    """读取一个关系分片：各类型的关系数、端点不在 _node_ids 中的关系，以及有连接的节点"""
+    relation_types = Counter()
+    missing = Counter()
+    details = []
+    connected = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            from_id = row.get('from_id', '')
+            to_id = row.get('to_id', '')
+            rel_type = row.get('type', '')
+            relation_types[rel_type] += 1
+            connected.add(from_id)
+            connected.add(to_id)
+            for kind, node_id in (('missing_from', from_id), ('missing_to', to_id)):
+                if node_id in _node_ids:
+                    continue
+                missing[kind] += 1
+                if len(details) < MAX_INVALID_DETAILS:
+                    details.append({'type': kind, 'from_id': from_id, 'to_id': to_id, 'rel_type': rel_type})
+    return {'relation_types': relation_types, 'missing': missing, 'details': details, 'connected': connected}
+
+
+def generate_sharded_quality_report(csv_dir: str, output_file: str = None, workers: int = DEFAULT_WORKERS):
+    """按 csv/shards/ 中的分片并发检查，生成与 generate_quality_report 结构相同的报告
+
+    第一轮并发读取节点分片（重复标识、ID、embedding 数），第二轮并发读取关系分片
+    （端点与全部节点 ID 比较，全部 ID 在 fork 时由子进程继承）；
+    各分片的结果按分片顺序合并，重复节点和无效关系明细中的顺序为分片顺序而非原始 CSV 的行序。
+    """
+    global _node_ids
+    print("\n" + "=" * 60)
+    print("📋 生成质量检查报告（分片）...")
+    print("=" * 60)
+    
+    manifest = require_manifest(csv_dir)
+    node_types = [node_type for node_type in NODE_TYPES if manifest.node_shards(node_type)]
+    tasks = [(node_type, manifest.file_path(entry))
+             for node_type in node_types for entry in manifest.node_shards(node_type)]
+    relation_files = [manifest.file_path(entry)
+                      for group in manifest.relation_groups() for entry in manifest.relation_shards(group)]
+    print(f"   {manifest.shards} 路分区: {len(tasks)} 个节点分片, {len(relation_files)} 个关系分片, "
+          f"{workers} 个进程")
+    
+    with phase('scan_node_shards') as p:
+        node_results = map_shards(scan_node_shard, tasks, workers)
+        p.rows_in = sum(len(result['ids']) for result in node_results)
+    by_type = defaultdict(list)
+    for (node_type, _), result in zip(tasks, node_results):
+        by_type[node_type].append(result)
+    
+    _node_ids = {node_id for result in node_results for node_id in result['ids']}
+    try:
+        with phase('scan_relation_shards') as p:
+            relation_results = map_shards(scan_relation_shard, relation_files, workers)
+            p.rows_in = sum(sum(result['relation_types'].values()) for result in relation_results)
+    finally:
+        _node_ids = set()
+    
+    print("=" * 60)
+    print("🔍 检查重复节点...")
+    print("=" * 60)
+    duplicates = {}
+    for node_type in node_types:
+        name_to_ids = defaultdict(list)
+        for result in by_type[node_type]:
+            for name, ids in result['name_to_ids'].items():
+                name_to_ids[name].extend(ids)
+        total = sum(len(result['ids']) for result in by_type[node_type])
+        node_duplicates = find_duplicates(node_type, name_to_ids, total)
+        if node_duplicates:
+            duplicates[node_type] = node_duplicates
+    
+    print("\n" + "=" * 60)
+    print("🔍 检查孤立节点...")
+    print("=" * 60)
+    connected = set()
+    for result in relation_results:
+        connected |= result['connected']
+    orphans = {}
+    for node_type in node_types:
+        ids = [node_id for result in by_type[node_type] for node_id in result['ids']]
+        orphan_nodes = sum(1 for node_id in ids if node_id and node_id not in connected)
+        orphans[node_type] = orphan_summary(node_type, len(ids), orphan_nodes)
+    
+    print("\n" + "=" * 60)
+    print("🔍 检查关系完整性...")
+    print("=" * 60)
+    relation_types = Counter()
+    missing = Counter()
+    details = []
+    for result in relation_results:
+        relation_types.update(result['relation_types'])
+        missing.update(result['missing'])
+        details.extend(result['details'])
+    relations = relation_summary(relation_types, missing['missing_from'], missing['missing_to'], details)
+    
+    print("\n" + "=" * 60)
+    print("🔍 检查 Embedding 覆盖率...")
+    print("=" * 60)
+    embeddings = {}
+    for node_type in node_types:
+        results = by_type[node_type]
+        embeddings[node_type] = coverage_summary(node_type, sum(len(result['ids']) for result in results),
+                                                 sum(result['with_embedding'] for result in results), 'shards')
+    
+    report = {
+        'duplicates': duplicates,
+        'orphans': orphans,
+        'relations': relations,
+        'embeddings': embeddings
+    }
+    finish_quality_report(report, output_file)
+    return report
+
+
+def finish_quality_report(report: Dict, output_file: str = None):
+    """保存报告并打印总结"""
+    duplicates = report['duplicates']
+    orphans = report['orphans']
+    relations = report['relations']
     
     if output_file:
-        import json
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(report, f, ensure_ascii=False, indent=2)
         print(f"\n✅ 报告已保存到: {output_file}")
@@ -303,22 +510,32 @@ def generate_quality_report(csv_dir: str, output_file: str = None):
             print(f"⚠ 发现 {total_orphans} 个孤立节点")
         if invalid_rels > 0:
             print(f"⚠ 发现 {invalid_rels} 条无效关系")
-    
-    return report
 
 
-def main():
-    """主函数"""
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_dir = os.path.join(script_dir, 'csv')
+    parser = argparse.ArgumentParser(description='图谱质量检查')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--output', default=os.path.join(script_dir, 'quality_report.json'),
+                       help='报告文件 (默认: quality_report.json)')
+    parser.add_argument('--shards', action='store_true',
+                       help='读取 json_to_csv.py --shards 生成的分片（csv/shards/），并发检查后合并')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help=f'--shards 时的并发进程数 (默认: {DEFAULT_WORKERS})')
+    args = parser.parse_args(argv)
+    csv_dir = args.csv_dir
     
     if not os.path.exists(csv_dir):
         print(f"❌ CSV 目录不存在: {csv_dir}")
         print("   请先运行 json_to_csv.py 生成 CSV 文件")
         return
     
-    output_file = os.path.join(script_dir, 'quality_report.json')
-    generate_quality_report(csv_dir, output_file)
+    if args.shards:
+        generate_sharded_quality_report(csv_dir, args.output, args.workers)
+    else:
+        generate_quality_report(csv_dir, args.output)
 
 
 if __name__ == '__main__':
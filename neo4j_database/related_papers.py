@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于图结构的相关论文（个性化 PageRank）
+embedding 相似度不考虑图结构；这里在 relations.csv 构成的图上，从每篇论文出发计算近似的
+个性化 PageRank（带重启的随机游走），保留得分最高的 k 篇论文：共享越多、越“专门”
+（连接论文越少）的方法、数据集、任务、解剖结构的论文得分越高。
+
+- 图为无向、无权：节点为全部节点 CSV 中的节点，边为 relations.csv 中两端都存在的关系
+- 近似方法为批量的前向推送（forward push）：每个源论文维护残差向量，
+  残差 r(u) ≥ ε·deg(u) 的节点把 α·r(u) 计入得分、(1-α)·r(u) 平均推给邻居，其余残差丢弃；
+  一批源论文（--batch-size）的残差组成稀疏矩阵，每一轮推送是一次稀疏矩阵乘法
+- 丢弃的残差使每个得分最多低估 ε·deg；连接大量论文的节点（如常见指标）残差达不到阈值，
+  不会展开，因此计算量与图规模无关地受 1/ε 限制
+- 多批源论文由多个进程并行计算（fork，邻接矩阵写时复制共享）
+
+结果文件（小端）：
+    头部 32 字节：magic、版本、索引 JSON 字节数、数据区偏移
+    索引 JSON：参数、论文数、k、各数组的偏移
+    数据区：论文 ID（换行分隔的 UTF-8）、neighbors int32 [论文数 × k]（-1 为空）、scores float32 [论文数 × k]
+
+用法:
+    python related_papers.py --build                          # 从 csv/ 构建 csv/related_papers.bin
+    python related_papers.py --build --epsilon 1e-5 --top-k 20 --workers 8
+    python related_papers.py --paper paper_1859
+"""
+
+import os
+import csv
+import json
+import mmap
+import time
+import struct
+import argparse
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from csv_layout import NODE_FIELDS
+from telemetry import phase
+
+RELATED_MAGIC = b'KGPPR001'
+RELATED_VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 32
+DATA_ALIGNMENT = 64
+RELATED_FILE_NAME = 'related_papers.bin'
+
+DEFAULT_ALPHA = 0.15
+DEFAULT_EPSILON = 1e-5
+DEFAULT_TOP_K = 20
+DEFAULT_BATCH_SIZE = 512
+MAX_ROUNDS = 20
+
+# 并行计算时由 fork 继承的图（避免把邻接矩阵序列化给每个进程）
+_graph: Optional[Tuple[sparse.csr_matrix, np.ndarray, int]] = None
+
+
+def load_graph(csv_dir: str) -> Tuple[List[str], sparse.csr_matrix, np.ndarray]:
+    """读取节点和 relations.csv，返回 (论文 ID, 对称 0/1 邻接矩阵, 度数)；论文在前"""
+    paper_ids = []
+    index = {}
+    with open(os.path.join(csv_dir, 'nodes_Paper.csv'), 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            index[row['id']] = len(paper_ids)
+            paper_ids.append(row['id'])
+    for node_type in NODE_FIELDS:
+        node_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+        if node_type == 'Paper' or not os.path.exists(node_file):
+            continue
+        with open(node_file, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            id_column = next(reader).index('id')
+            for row in reader:
+                index.setdefault(row[id_column], len(index))
+
+    sources, targets = [], []
+    with open(os.path.join(csv_dir, 'relations.csv'), 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        from_column, to_column = header.index('from_id'), header.index('to_id')
+        for row in reader:
+            source = index.get(row[from_column])
+            target = index.get(row[to_column])
+            if source is not None and target is not None and source != target:
+                sources.append(source)
+                targets.append(target)
+
+    n = len(index)
+    sources = np.array(sources, dtype=np.int32)
+    targets = np.array(targets, dtype=np.int32)
+    adjacency = sparse.csr_matrix(
+        (np.ones(2 * len(sources), dtype=np.float32),
+         (np.concatenate([sources, targets]), np.concatenate([targets, sources]))), shape=(n, n))
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1.0
+    degree = np.asarray(adjacency.sum(axis=1), dtype=np.float32).ravel()
+    return paper_ids, adjacency, degree
+
+
+def push_batch(adjacency: sparse.csr_matrix, degree: np.ndarray, sources: np.ndarray, paper_count: int,
+               alpha: float, epsilon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """一批源论文的近似个性化 PageRank，返回各源论文得分最高的 k 篇论文 (索引, 得分)"""
+    batch = len(sources)
+    n = adjacency.shape[0]
+    residual = sparse.csr_matrix((np.ones(batch, dtype=np.float32), sources, np.arange(batch + 1)),
+                                 shape=(batch, n))
+    scores = sparse.csr_matrix((batch, n), dtype=np.float32)
+    spread_factor = ((1.0 - alpha) / np.maximum(degree, 1.0)).astype(np.float32)
+    for _ in range(MAX_ROUNDS):
+        # 只推送 r(u) ≥ ε·deg(u) 的节点，其余残差丢弃
+        keep = residual.data >= epsilon * degree[residual.indices]
+        if not keep.any():
+            break
+        residual.data[~keep] = 0.0
+        residual.eliminate_zeros()
+        scores = scores + alpha * residual
+        residual.data *= spread_factor[residual.indices]
+        residual = (residual @ adjacency).tocsr()
+
+    neighbors = np.full((batch, k), -1, dtype=np.int32)
+    best = np.zeros((batch, k), dtype=np.float32)
+    scores = scores.tocsr()
+    for row in range(batch):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        columns, values = scores.indices[start:end], scores.data[start:end]
+        mask = (columns < paper_count) & (columns != sources[row])
+        columns, values = columns[mask], values[mask]
+        if len(values) > k:
+            top = np.argpartition(-values, k - 1)[:k]
+            columns, values = columns[top], values[top]
+        order = np.argsort(-values, kind='stable')
+        neighbors[row, :len(order)] = columns[order]
+        best[row, :len(order)] = values[order]
+    return neighbors, best
+
+
+def _push_worker(args: Tuple) -> Tuple[int, np.ndarray, np.ndarray]:
+    start, end, alpha, epsilon, k = args
+    adjacency, degree, paper_count = _graph
+    neighbors, scores = push_batch(adjacency, degree, np.arange(start, end), paper_count, alpha, epsilon, k)
+    return start, neighbors, scores
+
+
+def related_papers(adjacency: sparse.csr_matrix, degree: np.ndarray, paper_count: int,
+                   alpha: float = DEFAULT_ALPHA, epsilon: float = DEFAULT_EPSILON, k: int = DEFAULT_TOP_K,
+                   batch_size: int = DEFAULT_BATCH_SIZE, workers: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """所有论文的 top-k 相关论文，返回 neighbors [论文数 × k], scores [论文数 × k]"""
+    global _graph
+    neighbors = np.full((paper_count, k), -1, dtype=np.int32)
+    scores = np.zeros((paper_count, k), dtype=np.float32)
+    tasks = [(start, min(start + batch_size, paper_count), alpha, epsilon, k)
+             for start in range(0, paper_count, batch_size)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) if tasks else 1
+    _graph = (adjacency, degree, paper_count)
+    try:
+        if workers <= 1:
+            results = map(_push_worker, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            results = pool.imap_unordered(_push_worker, tasks)
+        for start, batch_neighbors, batch_scores in results:
+            neighbors[start:start + len(batch_neighbors)] = batch_neighbors
+            scores[start:start + len(batch_scores)] = batch_scores
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        _graph = None
+    return neighbors, scores
+
+
+def write_related(path: str, info: Dict, paper_ids: List[str], neighbors: np.ndarray, scores: np.ndarray):
+    """写入结果文件（临时文件 + 原子替换）"""
+    blobs = [('paper_ids', '\n'.join(paper_ids).encode('utf-8')),
+             ('neighbors', np.ascontiguousarray(neighbors, dtype='<i4').tobytes()),
+             ('scores', np.ascontiguousarray(scores, dtype='<f4').tobytes())]
+    layout = {}
+    offset = 0
+    for name, blob in blobs:
+        layout[name] = {'offset': offset, 'bytes': len(blob)}
+        offset += -(-len(blob) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+    index = json.dumps(dict(info, arrays=layout), ensure_ascii=False).encode('utf-8')
+    data_offset = -(-(HEADER_SIZE + len(index)) // DATA_ALIGNMENT) * DATA_ALIGNMENT
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(RELATED_MAGIC, RELATED_VERSION, len(index), data_offset).ljust(HEADER_SIZE, b'\0'))
+        f.write(index)
+        for name, blob in blobs:
+            f.seek(data_offset + layout[name]['offset'])
+            f.write(blob)
+        f.truncate(data_offset + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RelatedPapers:
+    def __init__(self, path: str):
+        """以内存映射方式打开结果文件"""
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_size, data_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != RELATED_MAGIC or version != RELATED_VERSION:
+            raise ValueError(f"不是相关论文文件或版本不支持: {path}")
+        self.info = json.loads(self._mm[HEADER_SIZE:HEADER_SIZE + index_size].decode('utf-8'))
+        arrays = self.info['arrays']
+        ids = arrays['paper_ids']
+        start = data_offset + ids['offset']
+        self.paper_ids = self._mm[start:start + ids['bytes']].decode('utf-8').split('\n') if ids['bytes'] else []
+        self.paper_index = {paper_id: row for row, paper_id in enumerate(self.paper_ids)}
+        shape = (self.info['papers'], self.info['k'])
+        self.neighbors = np.frombuffer(self._mm, dtype='<i4', count=shape[0] * shape[1],
+                                       offset=data_offset + arrays['neighbors']['offset']).reshape(shape)
+        self.scores = np.frombuffer(self._mm, dtype='<f4', count=shape[0] * shape[1],
+                                    offset=data_offset + arrays['scores']['offset']).reshape(shape)
+
+    @classmethod
+    def load(cls, csv_dir: str) -> 'RelatedPapers':
+        return cls(os.path.join(csv_dir, RELATED_FILE_NAME))
+
+    def close(self):
+        self.neighbors = self.scores = None
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def related(self, paper_id: str, k: int = None) -> List[Tuple[str, float]]:
+        """与 paper_id 结构上最相关的论文 [(论文 ID, 得分)]，按得分降序"""
+        row = self.paper_index.get(paper_id)
+        if row is None:
+            raise KeyError(f"没有论文: {paper_id}")
+        k = k or self.info['k']
+        neighbors = self.neighbors[row, :k].tolist()
+        scores = self.scores[row, :k].tolist()
+        return [(self.paper_ids[neighbor], score) for neighbor, score in zip(neighbors, scores) if neighbor >= 0]
+
+    def describe(self) -> Dict:
+        filled = int((self.neighbors[:, 0] >= 0).sum()) if self.info['papers'] else 0
+        return {
+            'papers': self.info['papers'],
+            'papers_with_related': filled,
+            'k': self.info['k'],
+            'alpha': self.info['alpha'],
+            'epsilon': self.info['epsilon'],
+            'graph_nodes': self.info['graph_nodes'],
+            'graph_edges': self.info['graph_edges'],
+            'bytes': os.path.getsize(self.path),
+            'built_at': self.info['built_at'],
+        }
+
+
+def build_related(csv_dir: str, output_file: str = None, alpha: float = DEFAULT_ALPHA,
+                  epsilon: float = DEFAULT_EPSILON, k: int = DEFAULT_TOP_K,
+                  batch_size: int = DEFAULT_BATCH_SIZE, workers: int = None) -> Dict:
+    """构建并写入相关论文文件，返回摘要"""
+    output_file = output_file or os.path.join(csv_dir, RELATED_FILE_NAME)
+    started = time.perf_counter()
+    with phase('load_graph') as p:
+        paper_ids, adjacency, degree = load_graph(csv_dir)
+        p.rows_out = adjacency.nnz // 2
+    with phase('push') as p:
+        p.rows_in = len(paper_ids)
+        neighbors, scores = related_papers(adjacency, degree, len(paper_ids), alpha, epsilon, k,
+                                           batch_size, workers)
+        p.rows_out = int((neighbors >= 0).sum())
+    info = {
+        'papers': len(paper_ids),
+        'k': k,
+        'alpha': alpha,
+        'epsilon': epsilon,
+        'graph_nodes': adjacency.shape[0],
+        'graph_edges': adjacency.nnz // 2,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    write_related(output_file, info, paper_ids, neighbors, scores)
+    with RelatedPapers(output_file) as related:
+        summary = related.describe()
+    summary['build_seconds'] = round(time.perf_counter() - started, 3)
+    summary['file'] = output_file
+    return summary
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='基于个性化 PageRank 的相关论文')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--output', default=None,
+                       help=f'结果文件 (默认: <csv-dir>/{RELATED_FILE_NAME})')
+    parser.add_argument('--build', action='store_true', help='从 CSV 构建结果文件')
+    parser.add_argument('--alpha', type=float, default=DEFAULT_ALPHA,
+                       help=f'重启概率 (默认: {DEFAULT_ALPHA})')
+    parser.add_argument('--epsilon', type=float, default=DEFAULT_EPSILON,
+                       help=f'推送阈值，越小越精确、越慢 (默认: {DEFAULT_EPSILON})')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                       help=f'每篇论文保留的相关论文数 (默认: {DEFAULT_TOP_K})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                       help=f'每批同时计算的源论文数 (默认: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, default=None, help='并行进程数 (默认: CPU 核数)')
+    parser.add_argument('--paper', help='查询一篇论文的相关论文')
+    args = parser.parse_args(argv)
+    output_file = args.output or os.path.join(args.csv_dir, RELATED_FILE_NAME)
+
+    if args.build:
+        if not os.path.exists(os.path.join(args.csv_dir, 'relations.csv')):
+            print(f"❌ 关系文件不存在: {os.path.join(args.csv_dir, 'relations.csv')}")
+            print("   请先运行 json_to_csv.py 生成 CSV 文件")
+            return
+        print(f"🔗 计算个性化 PageRank 相关论文（α={args.alpha}, ε={args.epsilon}, k={args.top_k}）...")
+        summary = build_related(args.csv_dir, output_file, args.alpha, args.epsilon, args.top_k,
+                                args.batch_size, args.workers)
+        print(f"✅ 已生成相关论文: {output_file} ({summary['bytes'] / 1024:.1f} KB, "
+              f"{summary['papers_with_related']}/{summary['papers']} 篇论文有结果, {summary['build_seconds']}s)")
+    if args.paper:
+        if not os.path.exists(output_file):
+            print(f"❌ 结果文件不存在: {output_file}（先运行 --build）")
+            return
+        with RelatedPapers(output_file) as related:
+            for paper_id, score in related.related(args.paper):
+                print(f"   {paper_id:20s} {score:.6f}")
+
+
+if __name__ == '__main__':
+    main()
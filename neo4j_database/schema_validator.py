@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+standard.json 结构校验
+从 schema_v1.json 和 vocabulary.json 一次性编译出校验函数：为每个字段生成专用的检查代码
+（必填、类型、非空、数值有限、词表、关系类型），逐条论文执行时不再解释 schema。
+
+- 流式：按字节区间逐条解析论文（JSONDecoder.raw_decode），不整体加载文件
+- 多进程：大文件按字节切分为多个区间，由多个进程并行解析和校验（fork）。
+  区间从其中第一个论文的起点开始（按 `},{"<论文字段>"` 定位）；前一个区间解析出的真实起点
+  与之不一致时，从真实起点重新校验该区间，结果与单进程完全一致
+- 词表字段先查词表值集合；不在集合中时用 vocab_normalizer 判断：能规范为标准值的记为警告
+  non_canonical（json_to_csv.py 会自动规范），无法规范的记为错误 off_vocabulary
+- 报告按错误码和字段路径汇总，附前 --max-details 条明细（论文序号、paper_id、字段路径、期望、实际值）
+
+错误码：
+    not_object            论文不是对象
+    missing_required      缺少必填字段
+    wrong_type            类型不符（如指标 value 不是数值）
+    empty_value           必填字符串为空
+    non_finite            数值为 NaN / Infinity
+    off_vocabulary        取值不在词表中且无法规范
+    non_canonical         取值可规范为词表值（警告）
+    unknown_relation_type 关系类型不在 schema 中（警告；json_to_csv.py 保留在 relations.csv 中，不拆分为按类型的关系文件）
+    duplicate_paper_id    paper_id 重复
+    invalid_json          JSON 语法错误（校验在此处停止）
+
+用法:
+    python schema_validator.py                                   # 校验 ../standard.json
+    python schema_validator.py --input big.json --workers 16 --fail-on-error
+    python schema_validator.py --show-source                     # 打印编译出的校验代码
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import math
+import time
+import argparse
+import multiprocessing
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from telemetry import phase, stage_rows
+from vocab_normalizer import FieldNormalizer
+
+WARNING_CODES = {'non_canonical', 'unknown_relation_type'}
+DEFAULT_CHUNK_MB = 32
+DEFAULT_MAX_DETAILS = 1000
+# 小于该大小的文件在本进程中校验（fork 和进程间传输的开销大于收益）
+PARALLEL_MIN_BYTES = 64 << 20
+# 区间末尾的论文跨越区间边界时，每次多解码的字节数（不够时加倍）
+TAIL_BYTES = 1 << 20
+VALUE_PREVIEW_CHARS = 120
+
+_TYPE_CHECKS = {
+    'string': 'type({v}) is str',
+    'integer': 'type({v}) is int',
+    'number': 'type({v}) in _NUMBER_TYPES',
+    'boolean': 'type({v}) is bool',
+    'null': '{v} is None',
+    'array': 'type({v}) is list',
+    'object': 'type({v}) is dict',
+}
+_MISSING = object()
+_WHITESPACE = b' \t\r\n'
+# 论文之间的分隔（逗号或数组结束），以及候选论文起点 `},{"<字段名>":`
+_SEPARATOR = re.compile(r'[ \t\r\n]*([,\]])[ \t\r\n]*')
+_CANDIDATE = re.compile(rb'\}[ \t\r\n]*,[ \t\r\n]*(\{)[ \t\r\n]*"([^"\\]*)"[ \t\r\n]*:')
+
+# 并行校验时由 fork 继承的校验器（避免序列化编译出的函数）
+_validator: Optional['CompiledValidator'] = None
+
+
+def _spec_types(spec: Dict) -> List[str]:
+    types = spec.get('type', [])
+    return [types] if isinstance(types, str) else list(types)
+
+
+def _preview(value) -> str:
+    """错误明细中的取值预览（截断）"""
+    if value is _MISSING:
+        return None
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return text if len(text) <= VALUE_PREVIEW_CHARS else text[:VALUE_PREVIEW_CHARS] + '…'
+
+
+class ErrorCollector:
+    def __init__(self, max_details: int):
+        """一个区间的错误计数（错误码 × 字段路径）和前 max_details 条明细"""
+        self.counts = Counter()
+        self.details = []
+        self.max_details = max_details
+        self.error_papers = 0
+        self._last_error_index = -1
+
+    def add(self, index: int, paper_id: Optional[str], pattern: str, path: str, code: str, expected, value):
+        """记录一个问题；pattern 为不含下标的字段路径（如 methods[].name）"""
+        self.counts[code, pattern] += 1
+        if code not in WARNING_CODES and index != self._last_error_index:
+            self._last_error_index = index
+            self.error_papers += 1
+        if len(self.details) < self.max_details:
+            self.details.append((index, paper_id, path, code, expected, _preview(value)))
+
+
+class _CodeGenerator:
+    def __init__(self, vocabularies: Dict[str, FieldNormalizer], enums: Dict[str, Tuple[frozenset, str]]):
+        """把 schema 的字段定义翻译为 Python 源码；词表和枚举集合作为常量放入命名空间"""
+        self.lines: List[str] = []
+        self.namespace: Dict = {'_MISSING': _MISSING, '_NUMBER_TYPES': (int, float), '_isfinite': math.isfinite}
+        self.vocabularies = vocabularies
+        self.enums = enums
+        self.depth = 0
+
+    def emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def constant(self, name: str, value) -> str:
+        self.namespace[name] = value
+        return name
+
+    def add_call(self, pattern: str, path: str, code: str, expected, value: str) -> str:
+        return f"_add(index, pid, {pattern!r}, {path}, {code!r}, {expected!r}, {value})"
+
+    def field(self, indent: int, container: str, key: str, spec: Dict, pattern: str, path: str):
+        """对象的一个字段：取值后生成检查（缺失与类型不符共用一次类型判断）"""
+        var = f'v{self.depth}'
+        self.emit(indent, f"{var} = {container}.get({key!r}, _MISSING)")
+        self.value(indent, var, spec, pattern, path, 'required' if spec.get('required') else 'optional')
+
+    def value(self, indent: int, var: str, spec: Dict, pattern: str, path: str, presence: str = None):
+        """取值检查：类型不符时报错，否则按类型生成后续检查（elif 链，命中第一个问题即停止）
+
+        presence 为 'required' / 'optional' 时 var 可能是 _MISSING（对象字段），None 为数组元素。
+        """
+        types = _spec_types(spec) or ['string']
+        multi = len(types) > 1
+        expected = '/'.join(types)
+        self.emit(indent, f"if not ({' or '.join(_TYPE_CHECKS[t].format(v=var) for t in types)}):")
+        if presence == 'required':
+            self.emit(indent + 1, f"if {var} is _MISSING:")
+            self.emit(indent + 2, self.add_call(pattern, path, 'missing_required', expected, '_MISSING'))
+            self.emit(indent + 1, "else:")
+            self.emit(indent + 2, self.add_call(pattern, path, 'wrong_type', expected, var))
+        elif presence == 'optional':
+            self.emit(indent + 1, f"if {var} is not _MISSING:")
+            self.emit(indent + 2, self.add_call(pattern, path, 'wrong_type', expected, var))
+        else:
+            self.emit(indent + 1, self.add_call(pattern, path, 'wrong_type', expected, var))
+
+        if 'string' in types:
+            guard = f"type({var}) is str and " if multi else ''
+            if spec.get('required'):
+                self.emit(indent, f"elif {guard}not {var}.strip():")
+                self.emit(indent + 1, self.add_call(pattern, path, 'empty_value', 'non-empty string', var))
+            field = spec.get('vocabulary')
+            if field in self.vocabularies:
+                values = self.constant(f'_VOCAB_{field}', frozenset(self.vocabularies[field].values))
+                check = self.constant(f'_CHECK_{field}', self.vocabulary_check(field))
+                self.emit(indent, f"elif {guard}{var} not in {values}:")
+                self.emit(indent + 1, f"{check}(_add, index, pid, {pattern!r}, {path}, {var})")
+            if pattern in self.enums:
+                allowed, code = self.enums[pattern]
+                name = self.constant(f'_ENUM_{len(self.namespace)}', allowed)
+                self.emit(indent, f"elif {guard}{var} not in {name}:")
+                self.emit(indent + 1, self.add_call(pattern, path, code, 'schema', var))
+        if 'number' in types:
+            self.emit(indent, f"elif type({var}) is float and not _isfinite({var}):")
+            self.emit(indent + 1, self.add_call(pattern, path, 'non_finite', 'finite number', var))
+
+        items = spec.get('items')
+        if 'array' in types and items is not None:
+            # 字符串数组的词表约束写在数组字段上；数组元素不允许为空
+            if isinstance(items, str):
+                item_spec = {'type': items, 'vocabulary': spec.get('vocabulary')}
+            else:
+                item_spec = dict(items, type=items.get('type', 'object'))
+            item_spec['required'] = True
+            self.depth += 1
+            counter, item = f'i{self.depth}', f'item{self.depth}'
+            guard = f"type({var}) is list" if multi else ''
+            self.emit(indent, f"elif {guard}:" if guard else "else:")
+            self.emit(indent + 1, f"for {counter}, {item} in enumerate({var}):")
+            item_path = self.join_index(path, counter)
+            self.value(indent + 2, item, item_spec, pattern + '[]', item_path)
+            self.depth -= 1
+        properties = spec.get('properties')
+        if 'object' in types and properties:
+            self.depth += 1
+            guard = f"type({var}) is dict" if multi else ''
+            self.emit(indent, f"elif {guard}:" if guard else "else:")
+            for key, child in properties.items():
+                self.field(indent + 1, var, key, child, f'{pattern}.{key}', self.join_key(path, key))
+            self.depth -= 1
+
+    @staticmethod
+    def join_index(path: str, counter: str) -> str:
+        """路径源码（字符串字面量或 f-string）加下标"""
+        body = path[2:-1] if path.startswith("f'") else path[1:-1]
+        return f"f'{body}[{{{counter}}}]'"
+
+    @staticmethod
+    def join_key(path: str, key: str) -> str:
+        if path.startswith("f'"):
+            return f"f'{path[2:-1]}.{key}'"
+        return repr(f'{path[1:-1]}.{key}')
+
+    def vocabulary_check(self, field: str) -> Callable:
+        """词表值集合之外的取值：能规范的记为 non_canonical（警告），否则 off_vocabulary（结果按原文缓存）"""
+        normalizer = self.vocabularies[field]
+        cache: Dict[str, Optional[str]] = {}
+
+        def check(add, index, pid, pattern, path, value):
+            canonical = cache.get(value, _MISSING)
+            if canonical is _MISSING:
+                canonical = cache[value] = normalizer.normalize(value)[0]
+            if canonical is None:
+                add(index, pid, pattern, path, 'off_vocabulary', field, value)
+            else:
+                add(index, pid, pattern, path, 'non_canonical', canonical, value)
+        return check
+
+
+class CompiledValidator:
+    def __init__(self, schema: Dict, vocabulary: Dict, entity: str = 'Paper'):
+        """从 schema 和词表编译论文校验函数 validate(paper, index, add) -> paper_id"""
+        attributes = schema['entities'][entity]['attributes']
+        vocabularies = {field: FieldNormalizer(field, vocabulary[field])
+                        for field in {spec.get('vocabulary') for spec in self.iter_specs(attributes)}
+                        if field and field in vocabulary}
+        # 抽取只识别 schema 中的非派生关系，其余类型的关系会被丢弃
+        relation_types = frozenset(name for name, rel in schema.get('relations', {}).items()
+                                   if not rel.get('derived_by'))
+        enums = {'relations[].type': (relation_types, 'unknown_relation_type')}
+        self.top_level_keys = frozenset(attributes)
+
+        generator = _CodeGenerator(vocabularies, enums)
+        generator.emit(0, "def validate(paper, index, _add):")
+        generator.emit(1, "if type(paper) is not dict:")
+        generator.emit(2, "_add(index, None, '', '', 'not_object', 'object', paper)")
+        generator.emit(2, "return None")
+        generator.emit(1, "pid = paper.get('paper_id')")
+        generator.emit(1, "if type(pid) is not str:")
+        generator.emit(2, "pid = None")
+        for key, spec in attributes.items():
+            generator.field(1, 'paper', key, spec, key, repr(key))
+        generator.emit(1, "return pid")
+        self.source = '\n'.join(generator.lines) + '\n'
+        namespace = generator.namespace
+        exec(compile(self.source, f'<schema_validator:{entity}>', 'exec'), namespace)
+        self.validate = namespace['validate']
+
+    @staticmethod
+    def iter_specs(attributes: Dict):
+        """schema 中所有（含嵌套的）字段定义"""
+        stack = list(attributes.values())
+        while stack:
+            spec = stack.pop()
+            yield spec
+            items = spec.get('items')
+            if isinstance(items, dict):
+                stack.extend(items.get('properties', {}).values())
+            stack.extend(spec.get('properties', {}).values())
+
+    @classmethod
+    def from_files(cls, schema_file: str, vocab_file: str) -> 'CompiledValidator':
+        with open(schema_file, 'r', encoding='utf-8') as f:
+            schema = json.load(f)
+        with open(vocab_file, 'r', encoding='utf-8') as f:
+            vocabulary = json.load(f)
+        return cls(schema, vocabulary)
+
+
+def _char_boundary(mm, pos: int) -> int:
+    """把字节位置向前调整到 UTF-8 字符边界"""
+    while 0 < pos < len(mm) and mm[pos] & 0xC0 == 0x80:
+        pos -= 1
+    return pos
+
+
+def find_first_record(mm) -> Tuple[int, bool]:
+    """数组中第一个论文的字节位置；返回 (位置, 数组是否为空)"""
+    pos = 0
+    if mm[:3] == b'\xef\xbb\xbf':
+        pos = 3
+    while pos < len(mm) and mm[pos] in _WHITESPACE:
+        pos += 1
+    if pos >= len(mm) or mm[pos] != ord('['):
+        raise ValueError("standard.json 的顶层必须是论文数组")
+    pos += 1
+    while pos < len(mm) and mm[pos] in _WHITESPACE:
+        pos += 1
+    return pos, pos < len(mm) and mm[pos] == ord(']')
+
+
+def find_candidate(mm, start: int, stop: int, top_level_keys: frozenset) -> Optional[int]:
+    """[start, stop) 中第一个候选论文起点：`},{` 之后的第一个键是论文字段（嵌套对象的键与之不重合）"""
+    pos = max(0, start - 64)
+    while True:
+        match = _CANDIDATE.search(mm, pos, min(len(mm), stop + 4096))
+        if match is None or match.start(1) >= stop:
+            return None
+        pos = match.start(1)
+        if pos >= start and match.group(2).decode('utf-8', 'replace') in top_level_keys:
+            return pos
+
+
+def validate_range(path: str, start: int, stop: int, exact: bool, max_details: int,
+                   validator: 'CompiledValidator' = None) -> Dict:
+    """校验起点位于 [start, stop) 字节区间内的论文
+
+    exact 为 True 时 start 就是论文起点；否则从候选起点开始（由调用方与前一个区间核对）。
+    返回起点、下一个论文的起点（next，数组结束时 closed 为 True）、论文数、错误计数和明细。
+    """
+    validator = validator or _validator
+    collector = ErrorCollector(max_details)
+    result = {'start': None, 'next': None, 'closed': False, 'papers': 0, 'paper_ids': [],
+              'collector': collector, 'fatal': None}
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if not exact:
+            start = find_candidate(mm, start, stop, validator.top_level_keys)
+            if start is None:
+                return result
+        result['start'] = start
+        stop = _char_boundary(mm, stop)
+        text = mm[start:stop].decode('utf-8')
+        limit = len(text)
+        tail_end = stop
+
+        def extend() -> bool:
+            """多解码一段区间之后的字节（跨越边界的论文）；已到文件末尾时返回 False"""
+            nonlocal text, tail_end
+            if tail_end >= len(mm):
+                return False
+            new_end = _char_boundary(mm, min(len(mm), tail_end + max(TAIL_BYTES, (tail_end - start) // 4)))
+            if new_end <= tail_end:
+                new_end = len(mm)
+            text += mm[tail_end:new_end].decode('utf-8')
+            tail_end = new_end
+            return True
+
+        decode = json.JSONDecoder().raw_decode
+        validate = validator.validate
+        add = collector.add
+        paper_ids = result['paper_ids']
+        index = 0
+        pos = 0
+        while pos < limit:
+            try:
+                paper, end = decode(text, pos)
+            except json.JSONDecodeError as e:
+                if extend():
+                    continue
+                result['fatal'] = {'code': 'invalid_json', 'message': e.msg,
+                                   'offset': start + len(text[:e.pos].encode('utf-8')), 'index': index}
+                break
+            pid = validate(paper, index, add)
+            if pid is not None:
+                paper_ids.append(pid)
+            index += 1
+            separator = _SEPARATOR.match(text, end)
+            while (separator is None or separator.end() == len(text)) and extend():
+                separator = _SEPARATOR.match(text, end)
+            if separator is None:
+                result['fatal'] = {'code': 'invalid_json', 'message': "论文之后应为 ',' 或 ']'",
+                                   'offset': start + len(text[:end].encode('utf-8')), 'index': index}
+                break
+            pos = separator.end()
+            if separator.group(1) == ']':
+                result['closed'] = True
+                break
+        result['papers'] = index
+        result['next'] = start + len(text[:pos].encode('utf-8'))
+    return result
+
+
+def _range_worker(args: Tuple) -> Dict:
+    return validate_range(*args)
+
+
+def validate_file(path: str, validator: CompiledValidator, workers: int = None,
+                  chunk_bytes: int = DEFAULT_CHUNK_MB << 20, max_details: int = DEFAULT_MAX_DETAILS) -> Dict:
+    """流式校验整个文件，返回汇总报告"""
+    global _validator
+    started = time.perf_counter()
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        first, empty = find_first_record(mm)
+    bounds = list(range(first, size, chunk_bytes)) + [size] if not empty else [first, first]
+    ranges = list(zip(bounds[:-1], bounds[1:]))
+    workers = min(workers or os.cpu_count() or 1, len(ranges))
+    parallel = (workers > 1 and size >= PARALLEL_MIN_BYTES
+                and 'fork' in multiprocessing.get_all_start_methods())
+
+    counts = Counter()
+    details = []
+    paper_ids = []
+    papers = error_papers = resynced = 0
+    fatal = None
+    _validator = validator
+    pool = None
+    try:
+        if parallel:
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            results = pool.imap(_range_worker, [(path, lo, hi, lo == first, max_details) for lo, hi in ranges])
+        else:
+            results = iter(ranges)
+        expected = first
+        for (lo, hi), result in zip(ranges, results):
+            if expected >= hi:
+                # 上一个区间的最后一篇论文跨过了整个区间
+                continue
+            if not parallel:
+                result = validate_range(path, expected, hi, True, max_details, validator)
+            elif result['start'] != expected:
+                # 候选起点与真实起点不一致：从真实起点重新校验该区间
+                resynced += 1
+                result = validate_range(path, expected, hi, True, max_details, validator)
+            collector = result['collector']
+            counts.update(collector.counts)
+            for detail in collector.details[:max(0, max_details - len(details))]:
+                details.append((detail[0] + papers,) + detail[1:])
+            error_papers += collector.error_papers
+            paper_ids.extend(result['paper_ids'])
+            if result['fatal']:
+                fatal = dict(result['fatal'], index=result['fatal']['index'] + papers)
+            papers += result['papers']
+            expected = result['next']
+            if result['closed'] or fatal:
+                break
+    finally:
+        _validator = None
+        if pool is not None:
+            pool.terminate()
+
+    # paper_id 重复（跨区间）
+    id_counts = Counter(paper_ids)
+    duplicates = {pid: n for pid, n in id_counts.items() if n > 1}
+    if duplicates:
+        counts['duplicate_paper_id', 'paper_id'] += sum(duplicates.values()) - len(duplicates)
+
+    elapsed = time.perf_counter() - started
+    by_code = Counter()
+    by_field: Dict[str, Dict[str, int]] = {}
+    for (code, pattern), n in counts.most_common():
+        by_code[code] += n
+        by_field.setdefault(pattern or '<paper>', {})[code] = n
+    warnings = sum(n for code, n in by_code.items() if code in WARNING_CODES)
+    return {
+        'input': os.path.abspath(path),
+        'bytes': size,
+        'papers': papers,
+        'valid_papers': papers - error_papers,
+        'invalid_papers': error_papers,
+        'errors': sum(by_code.values()) - warnings + (1 if fatal else 0),
+        'warnings': warnings,
+        'fatal': fatal,
+        'by_code': dict(by_code.most_common()),
+        'by_field': by_field,
+        'duplicate_paper_ids': {'count': len(duplicates),
+                                'examples': sorted(duplicates, key=lambda pid: -duplicates[pid])[:20]},
+        'details': [{'index': index, 'paper_id': pid, 'path': field_path, 'code': code,
+                     'severity': 'warning' if code in WARNING_CODES else 'error',
+                     'expected': expected, 'value': value}
+                    for index, pid, field_path, code, expected, value in details],
+        'timing': {
+            'seconds': round(elapsed, 3),
+            'papers_per_sec': round(papers / elapsed, 1) if elapsed > 0 else None,
+            'mb_per_sec': round(size / 1e6 / elapsed, 1) if elapsed > 0 else None,
+            'workers': workers if parallel else 1,
+            'ranges': len(ranges),
+            'resynced_ranges': resynced,
+        },
+    }
+
+
+def write_report(report: Dict, output_file: str):
+    """原子写入报告（临时文件 + 重命名）"""
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, output_file)
+
+
+def print_summary(report: Dict, top: int = 10):
+    """打印校验总结"""
+    timing = report['timing']
+    print(f"   论文数: {report['papers']}，有错误的论文: {report['invalid_papers']}，"
+          f"错误: {report['errors']}，警告: {report['warnings']}")
+    print(f"   耗时: {timing['seconds']:.2f}s（{timing['papers_per_sec'] or 0:.0f} 篇/秒，"
+          f"{timing['mb_per_sec'] or 0:.1f} MB/s，{timing['workers']} 个进程，{timing['ranges']} 个区间）")
+    if report['fatal']:
+        fatal = report['fatal']
+        print(f"❌ JSON 语法错误（字节 {fatal['offset']}，第 {fatal['index']} 篇论文附近）: {fatal['message']}")
+    if report['by_code']:
+        print(f"\n📊 问题类型:")
+        for code, n in report['by_code'].items():
+            print(f"   - {code}: {n}")
+        print(f"\n📊 问题最多的字段:")
+        fields = sorted(report['by_field'].items(), key=lambda item: -sum(item[1].values()))
+        for pattern, codes in fields[:top]:
+            print(f"   - {pattern}: " + ', '.join(f"{code} {n}" for code, n in codes.items()))
+    if report['duplicate_paper_ids']['count']:
+        print(f"\n⚠ {report['duplicate_paper_ids']['count']} 个 paper_id 重复，"
+              f"例如: {report['duplicate_paper_ids']['examples'][:3]}")
+    if report['errors'] == 0:
+        print(f"\n✅ 所有论文符合 schema" + ("（有警告）" if report['warnings'] else ""))
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(script_dir)
+    parser = argparse.ArgumentParser(description='按 schema_v1.json 和 vocabulary.json 校验 standard.json')
+    parser.add_argument('--input', default=os.path.join(project_root, 'standard.json'),
+                       help='待校验的 JSON 文件 (默认: ../standard.json)')
+    parser.add_argument('--schema', default=os.path.join(project_root, 'schema_v1.json'),
+                       help='schema 文件 (默认: ../schema_v1.json)')
+    parser.add_argument('--vocabulary', default=os.path.join(project_root, 'vocabulary.json'),
+                       help='词表文件 (默认: ../vocabulary.json)')
+    parser.add_argument('--output', default=os.path.join(script_dir, 'validation_report.json'),
+                       help='报告文件 (默认: validation_report.json)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help=f'并行进程数 (默认: CPU 核数；小于 {PARALLEL_MIN_BYTES >> 20} MB 的文件单进程校验)')
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_MB,
+                       help=f'每个区间的大小 (MB，默认: {DEFAULT_CHUNK_MB})')
+    parser.add_argument('--max-details', type=int, default=DEFAULT_MAX_DETAILS,
+                       help=f'报告中保存的明细条数 (默认: {DEFAULT_MAX_DETAILS})')
+    parser.add_argument('--fail-on-error', action='store_true',
+                       help='发现错误（不含警告）时以退出码 1 结束')
+    parser.add_argument('--show-source', action='store_true',
+                       help='打印编译出的校验代码后退出')
+    args = parser.parse_args(argv)
+
+    with phase('compile'):
+        validator = CompiledValidator.from_files(args.schema, args.vocabulary)
+    if args.show_source:
+        print(validator.source)
+        return
+
+    if not os.path.exists(args.input):
+        print(f"❌ 输入文件不存在: {args.input}")
+        sys.exit(1)
+
+    print(f"🔍 校验 {args.input}")
+    with phase('validate') as p:
+        report = validate_file(args.input, validator, args.workers, args.chunk_mb << 20, args.max_details)
+        p.rows_in = report['papers']
+        p.bytes_read = report['bytes']
+    stage_rows(rows_in=report['papers'], rows_out=report['papers'] - report['invalid_papers'])
+    print_summary(report)
+    write_report(report, args.output)
+    print(f"\n✅ 报告已保存到: {args.output}")
+
+    if args.fail_on_error and report['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
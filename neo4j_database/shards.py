@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+哈希分区的 CSV 分片
+json_to_csv.py --shards N 在 csv/shards/ 下为每种节点类型、每种关系类型各写出最多 N 个分片，
+manifest.json 记录分片文件、行数、字节数和 SHA-256，以及分片时各原始 CSV 的大小和修改时间。
+
+- 节点按 id 分区，关系按 from_id 分区：crc32(UTF-8 键) % N，与运行和机器无关；
+  同一个 ID 在所有节点类型中都落在同一编号的分片，重复 ID 检查在同编号的分片内即可完成
+- 原始的 nodes_<类型>.csv / relations*.csv 保持不变，不使用分片的步骤照常读取
+- 下游步骤（embedding、质量检查、流式统计、导入）并发处理各分片，结果按分片顺序合并，
+  相同的分片数下输出确定
+
+只依赖标准库（质量检查等轻量命令也会导入）。
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import zlib
+import shutil
+import multiprocessing
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cypher_scripts'))
+from import_journal import file_sha256
+
+SHARD_DIRNAME = 'shards'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+PARTITION = 'crc32(key) % shards; nodes by id, relations by from_id'
+
+# 类型不在 schema 中或端点标签与 schema 不一致的关系（只在 relations.csv 中，不在 relations_<TYPE>.csv 中）
+UNSPLIT_GROUP = '_UNSPLIT'
+
+# 下游步骤并发处理分片的默认进程/线程数
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def shard_index(key: str, shards: int) -> int:
+    """键所属的分片编号"""
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+def shard_file_name(csv_name: str, index: int) -> str:
+    """原始 CSV 文件名对应的分片文件名（nodes_Paper.csv -> nodes_Paper.00003.csv）"""
+    return f'{os.path.splitext(csv_name)[0]}.{index:05d}.csv'
+
+
+def shard_dir(csv_dir: str) -> str:
+    return os.path.join(csv_dir, SHARD_DIRNAME)
+
+
+def file_entry(path: str, rows: int) -> Dict:
+    """manifest 中一个分片文件的记录"""
+    return {
+        'file': os.path.basename(path),
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'sha256': file_sha256(path),
+    }
+
+
+def source_entry(path: str) -> Dict:
+    """manifest 中一个原始 CSV 的记录（大小和修改时间变化即视为分片过期）"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ShardWriter:
+    def __init__(self, directory: str, csv_name: str, fields: Sequence[str], shards: int):
+        """按键的哈希把行写入 directory 下的 shards 个分片（只创建有数据的分片）"""
+        self.directory = directory
+        self.csv_name = csv_name
+        self.fields = list(fields)
+        self.shards = shards
+        self.files = {}
+        self.writers = {}
+        self.rows = [0] * shards
+
+    def write(self, key: str, row: Sequence):
+        index = shard_index(key, self.shards)
+        writer = self.writers.get(index)
+        if writer is None:
+            path = os.path.join(self.directory, shard_file_name(self.csv_name, index))
+            self.files[index] = open(path, 'w', newline='', encoding='utf-8')
+            writer = self.writers[index] = csv.writer(self.files[index])
+            writer.writerow(self.fields)
+        writer.writerow(row)
+        self.rows[index] += 1
+
+    def close(self) -> List[Dict]:
+        """关闭所有分片，按编号返回各分片的记录"""
+        for f in self.files.values():
+            f.close()
+        return [dict(file_entry(self.files[index].name, self.rows[index]), index=index)
+                for index in sorted(self.files)]
+
+
+def write_manifest(path: str, manifest: Dict):
+    """原子写入 manifest（先写临时文件并 fsync，再重命名）"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def new_manifest(shards: int) -> Dict:
+    return {
+        'version': MANIFEST_VERSION,
+        'shards': shards,
+        'partition': PARTITION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sources': {},
+        'nodes': {},
+        'relations': {},
+    }
+
+
+def publish_shards(csv_dir: str, tmp_dir: str, manifest: Dict):
+    """在临时目录写完所有分片后写入 manifest，再替换旧的分片目录"""
+    write_manifest(os.path.join(tmp_dir, MANIFEST_NAME), manifest)
+    target = shard_dir(csv_dir)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp_dir, target)
+
+
+def remove_shards(csv_dir: str) -> bool:
+    """删除分片目录（不分片重新生成 CSV 后旧分片已过期），返回是否删除了目录"""
+    target = shard_dir(csv_dir)
+    if not os.path.isdir(target):
+        return False
+    shutil.rmtree(target)
+    return True
+
+
+class ShardManifest:
+    def __init__(self, csv_dir: str, data: Dict):
+        """csv/shards/manifest.json 的内容；分片文件路径相对 csv/shards/"""
+        self.csv_dir = csv_dir
+        self.directory = shard_dir(csv_dir)
+        self.path = os.path.join(self.directory, MANIFEST_NAME)
+        self.data = data
+
+    @classmethod
+    def load(cls, csv_dir: str) -> Optional['ShardManifest']:
+        """读取 manifest；不存在或损坏时返回 None"""
+        path = os.path.join(shard_dir(csv_dir), MANIFEST_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != MANIFEST_VERSION:
+            return None
+        return cls(csv_dir, data)
+
+    @property
+    def shards(self) -> int:
+        return self.data['shards']
+
+    def file_path(self, entry: Dict) -> str:
+        return os.path.join(self.directory, entry['file'])
+
+    def node_types(self) -> List[str]:
+        return list(self.data['nodes'])
+
+    def node_shards(self, node_type: str) -> List[Dict]:
+        """某节点类型的分片记录（按编号排序）"""
+        return self.data['nodes'].get(node_type, {}).get('shards', [])
+
+    def relation_groups(self) -> List[str]:
+        """关系分片的分组：schema 中的关系类型，以及 UNSPLIT_GROUP"""
+        return list(self.data['relations'])
+
+    def relation_shards(self, group: str) -> List[Dict]:
+        return self.data['relations'].get(group, {}).get('shards', [])
+
+    def entries(self) -> Iterable[Tuple[str, str, Dict]]:
+        """所有分片记录：(nodes|relations, 类型, 记录)"""
+        for section in ('nodes', 'relations'):
+            for name, group in self.data[section].items():
+                for entry in group['shards']:
+                    yield section, name, entry
+
+    def stale_sources(self) -> List[str]:
+        """分片之后被修改（或删除）的原始 CSV"""
+        stale = []
+        for name, recorded in self.data['sources'].items():
+            path = os.path.join(self.csv_dir, name)
+            if not os.path.exists(path) or source_entry(path) != recorded:
+                stale.append(name)
+        return stale
+
+    def refresh_source(self, name: str):
+        """原始 CSV 由分片重建后更新其记录"""
+        self.data['sources'][name] = source_entry(os.path.join(self.csv_dir, name))
+
+    def verify(self, checksums: bool = False, sources: bool = True, sizes: bool = True) -> List[str]:
+        """检查分片文件是否存在、大小是否与记录一致（checksums 时再比较 SHA-256），返回问题列表
+
+        sources 为 False 时不检查原始 CSV 是否在分片之后被修改，sizes 为 False 时只检查分片是否存在。
+        """
+        problems = []
+        for _, _, entry in self.entries():
+            path = self.file_path(entry)
+            if not os.path.exists(path):
+                problems.append(f"分片不存在: {entry['file']}")
+            elif not sizes:
+                continue
+            elif os.path.getsize(path) != entry['bytes']:
+                problems.append(f"分片大小与 manifest 不一致: {entry['file']}")
+            elif checksums and file_sha256(path) != entry['sha256']:
+                problems.append(f"分片校验和与 manifest 不一致: {entry['file']}")
+        if sources:
+            problems += [f"{name} 在分片之后被修改" for name in self.stale_sources()]
+        return problems
+
+    def save(self):
+        write_manifest(self.path, self.data)
+
+
+def require_manifest(csv_dir: str, checksums: bool = False, sources: bool = True,
+                     sizes: bool = True) -> ShardManifest:
+    """读取并校验分片 manifest；不存在或校验失败时打印原因并以状态 1 退出"""
+    manifest = ShardManifest.load(csv_dir)
+    if manifest is None:
+        print(f"❌ 分片 manifest 不存在: {os.path.join(shard_dir(csv_dir), MANIFEST_NAME)}")
+        print("   请先运行 json_to_csv.py --shards N 生成分片")
+        raise SystemExit(1)
+    problems = manifest.verify(checksums, sources, sizes)
+    if problems:
+        print(f"❌ 分片与 manifest 不一致 ({len(problems)} 处):")
+        for problem in problems[:10]:
+            print(f"   - {problem}")
+        print("   请重新运行 json_to_csv.py --shards N 生成分片")
+        raise SystemExit(1)
+    return manifest
+
+
+def map_shards(func: Callable, items: Sequence, workers: int = DEFAULT_WORKERS) -> List:
+    """对每一项调用 func，结果按 items 的顺序返回（调用方按此顺序合并，结果确定）
+
+    workers > 1 时使用 fork 进程池：func 须为模块级函数，大的只读数据通过模块全局变量在 fork 时继承。
+    """
+    items = list(items)
+    workers = min(workers or 1, len(items))
+    if workers <= 1:
+        return [func(item) for item in items]
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        return list(pool.imap(func, items))
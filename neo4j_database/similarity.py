@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+节点相似度图（kNN）
+“相似论文”不再每次实时查询向量索引：批量计算每个 Paper 节点（可选 Method、Innovation）
+余弦相似度最高的 k 个同类节点，写成关系 CSV，与其他关系一样导入，查询变为一跳读取。
+
+- 节点 CSV 中的 embedding 逐行解析，L2 归一化后写入磁盘上的 float32 矩阵（内存映射），
+  不在内存中保存全部向量
+- 按行块计算：一个查询块（--block-size 行）依次与各列块做矩阵乘法，
+  每块结果立即与当前的 top-k 合并，内存只取决于块大小和 k
+- 查询块由多个线程并行处理（numpy 的矩阵乘法和 argpartition 释放 GIL）
+- 输出 relations_<TYPE>.csv（列与其他关系文件相同，value 为余弦相似度），
+  关系类型见 SIMILARITY_RELATIONS，在 schema_v1.json 中标记为 derived_by: similarity.py
+
+用法:
+    python similarity.py                                    # Paper，k=10
+    python similarity.py --labels Paper Method Innovation --top-k 20 --min-score 0.3
+    python similarity.py --block-size 2048 --workers 8
+"""
+
+import os
+import csv
+import time
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from csv_layout import RELATION_FIELDS, relation_csv_name
+from telemetry import phase
+
+# 节点标签 -> 相似关系类型
+SIMILARITY_RELATIONS = {
+    'Paper': 'SIMILAR_TO',
+    'Method': 'SIMILAR_METHOD',
+    'Innovation': 'SIMILAR_INNOVATION',
+}
+
+DEFAULT_TOP_K = 10
+DEFAULT_BLOCK_SIZE = 1024
+
+csv.field_size_limit(1 << 30)
+
+
+def load_embedding_matrix(node_file: str, matrix_file: str) -> Tuple[List[str], np.ndarray, Dict[str, int]]:
+    """读取节点 CSV 的 embedding，归一化后写入 matrix_file，返回 (节点 ID, 内存映射矩阵, 统计)
+
+    没有 embedding 或维度与第一个向量不一致的节点不参与计算。
+    """
+    ids = []
+    stats = {'empty': 0, 'dimension_mismatch': 0, 'zero_norm': 0}
+    dimension = None
+    with open(node_file, 'r', encoding='utf-8') as f, open(matrix_file, 'wb') as out:
+        for row in csv.DictReader(f):
+            value = row.get('embedding', '')
+            if not value or not value.strip():
+                stats['empty'] += 1
+                continue
+            vector = np.array(value.split(','), dtype=np.float32)
+            if dimension is None:
+                dimension = len(vector)
+            if len(vector) != dimension:
+                stats['dimension_mismatch'] += 1
+                continue
+            norm = float(np.linalg.norm(vector))
+            if norm == 0.0:
+                stats['zero_norm'] += 1
+                continue
+            out.write((vector / norm).tobytes())
+            ids.append(row['id'])
+    if not ids:
+        return ids, np.zeros((0, 0), dtype=np.float32), stats
+    matrix = np.memmap(matrix_file, dtype=np.float32, mode='r', shape=(len(ids), dimension))
+    return ids, matrix, stats
+
+
+def knn_block(matrix: np.ndarray, start: int, end: int, k: int,
+              block_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """查询行 [start, end) 的 top-k 邻居（不含自身），返回 (索引, 相似度)，按相似度降序"""
+    queries = np.ascontiguousarray(matrix[start:end])
+    rows = end - start
+    best_index = np.full((rows, k), -1, dtype=np.int64)
+    best_score = np.full((rows, k), -np.inf, dtype=np.float32)
+    local = np.arange(rows)
+    for column in range(0, matrix.shape[0], block_size):
+        column_end = min(column + block_size, matrix.shape[0])
+        scores = queries @ np.ascontiguousarray(matrix[column:column_end]).T
+        # 排除自身
+        overlap = local[(local + start >= column) & (local + start < column_end)]
+        scores[overlap, overlap + start - column] = -np.inf
+        # 先取列块内的 top-k，再与当前结果合并
+        if scores.shape[1] > k:
+            chunk_top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            chunk_top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        candidates = np.concatenate([best_score, np.take_along_axis(scores, chunk_top, axis=1)], axis=1)
+        indices = np.concatenate([best_index, chunk_top + column], axis=1)
+        top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+        best_score = np.take_along_axis(candidates, top, axis=1)
+        best_index = np.take_along_axis(indices, top, axis=1)
+    order = np.argsort(-best_score, axis=1, kind='stable')
+    return np.take_along_axis(best_index, order, axis=1), np.take_along_axis(best_score, order, axis=1)
+
+
+def knn_graph(matrix: np.ndarray, k: int, block_size: int = DEFAULT_BLOCK_SIZE, workers: int = None):
+    """按查询块依次产出 (起始行, 邻居索引, 相似度)；多个查询块并行计算，按顺序返回"""
+    n = matrix.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        return
+    workers = workers or os.cpu_count() or 1
+    starts = list(range(0, n, block_size))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # 同时提交的块数有限，已完成的结果按顺序写出后释放
+        pending = []
+        for start in starts:
+            pending.append((start, pool.submit(knn_block, matrix, start, min(start + block_size, n), k, block_size)))
+            if len(pending) >= workers * 2:
+                first, future = pending.pop(0)
+                yield (first,) + future.result()
+        for first, future in pending:
+            yield (first,) + future.result()
+
+
+def write_similarity_csv(path: str, rel_type: str, ids: List[str], matrix: np.ndarray, k: int,
+                         min_score: float, block_size: int, workers: int) -> int:
+    """计算 kNN 并写入关系 CSV（临时文件 + 原子替换），返回关系数"""
+    blank = [''] * (len(RELATION_FIELDS) - 4)
+    count = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(RELATION_FIELDS)
+        if len(ids) > 1:
+            for start, neighbors, scores in knn_graph(matrix, k, block_size, workers):
+                for offset, (row_neighbors, row_scores) in enumerate(zip(neighbors.tolist(), scores.tolist())):
+                    from_id = ids[start + offset]
+                    for neighbor, score in zip(row_neighbors, row_scores):
+                        if score < min_score:
+                            break
+                        writer.writerow([from_id, ids[neighbor], rel_type, round(score, 6)] + blank)
+                        count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def build_similarity(csv_dir: str, labels: List[str], k: int = DEFAULT_TOP_K, min_score: float = -1.0,
+                     block_size: int = DEFAULT_BLOCK_SIZE, workers: int = None) -> Dict[str, Dict]:
+    """为各标签计算 kNN 关系文件，返回 标签 -> 摘要"""
+    summary = {}
+    with tempfile.TemporaryDirectory(dir=csv_dir, prefix='.similarity_') as tmp_dir:
+        for label in labels:
+            rel_type = SIMILARITY_RELATIONS[label]
+            node_file = os.path.join(csv_dir, f'nodes_{label}.csv')
+            output_file = os.path.join(csv_dir, relation_csv_name(rel_type))
+            if not os.path.exists(node_file):
+                print(f"⚠ 节点文件不存在，跳过: {node_file}")
+                continue
+            with phase(f'load_{label}') as p:
+                ids, matrix, stats = load_embedding_matrix(node_file, os.path.join(tmp_dir, f'{label}.f32'))
+                p.rows_out = len(ids)
+            started = time.perf_counter()
+            with phase(f'knn_{label}') as p:
+                p.rows_in = len(ids)
+                edges = write_similarity_csv(output_file, rel_type, ids, matrix, k, min_score, block_size, workers)
+                p.rows_out = edges
+            del matrix
+            summary[label] = dict(stats, relation=rel_type, nodes=len(ids), edges=edges,
+                                  seconds=round(time.perf_counter() - started, 3), file=output_file)
+
+    # 未计算的类型也需要有文件（只有表头），导入脚本的 LOAD CSV 才能找到
+    for label, rel_type in SIMILARITY_RELATIONS.items():
+        output_file = os.path.join(csv_dir, relation_csv_name(rel_type))
+        if label not in labels and not os.path.exists(output_file):
+            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(RELATION_FIELDS)
+    return summary
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='根据 embedding 计算 kNN 相似关系')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--labels', nargs='+', choices=list(SIMILARITY_RELATIONS), default=['Paper'],
+                       help='计算相似关系的节点标签 (默认: Paper)')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                       help=f'每个节点保留的邻居数 (默认: {DEFAULT_TOP_K})')
+    parser.add_argument('--min-score', type=float, default=-1.0,
+                       help='最低余弦相似度，低于该值的邻居不输出 (默认: 不过滤)')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                       help=f'矩阵乘法的行块大小，决定内存占用 (默认: {DEFAULT_BLOCK_SIZE})')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='并行计算的线程数 (默认: CPU 核数)')
+    args = parser.parse_args(argv)
+
+    print(f"🧭 计算 kNN 相似关系（k={args.top_k}）...")
+    summary = build_similarity(args.csv_dir, args.labels, args.top_k, args.min_score,
+                               args.block_size, args.workers)
+    for label, item in summary.items():
+        print(f"✓ {label}: {item['nodes']} 个节点 → {item['edges']} 条 {item['relation']} 关系 "
+              f"({item['seconds']}s): {item['file']}")
+        if item['empty']:
+            print(f"   ⚠ {item['empty']} 个节点没有 embedding（先运行 generate_embeddings.py）")
+        if item['dimension_mismatch']:
+            print(f"   ⚠ {item['dimension_mismatch']} 个节点的 embedding 维度不一致，已跳过")
+
+
+if __name__ == '__main__':
+    main()
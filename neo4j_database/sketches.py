@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式统计使用的概率数据结构（sketch）
+- HyperLogLog：去重计数，相对标准误差 1.04/sqrt(2^p)
+- KLLSketch：分位数，归一化秩误差约 2.296/k^0.9723（99% 置信）
+- HeavyHitters：Misra-Gries 高频项，每个计数的低估量不超过 max_error
+- DegreeSample：按 ID 哈希的 bottom-k 节点样本，样本内节点的度数精确
+- BloomFilter：集合成员检测，只有假阳性
+
+所有结构的内存与数据量无关（由参数决定），都支持 merge（合并多个分片的结果，
+与在全部数据上一次计算等价）以及 to_dict / from_dict（JSON 序列化）。
+"""
+
+import math
+import heapq
+import zlib
+import base64
+import random
+import hashlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+HASH_BITS = 64
+
+
+@lru_cache(maxsize=1 << 14)
+def hash64(value: str) -> int:
+    """字符串的 64 位哈希（各分片、各次运行一致）；高频取值（如热门节点 ID）走有界缓存"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _pack(data: bytes) -> str:
+    return base64.b64encode(zlib.compress(data)).decode('ascii')
+
+
+def _unpack(text: str) -> bytes:
+    return zlib.decompress(base64.b64decode(text))
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = 14):
+        """2^precision 个 6 位寄存器（按字节存储），precision=14 时占 16 KB，标准误差约 0.81%"""
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision 应在 4-18 之间: {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value: str):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed: int):
+        index = hashed >> (HASH_BITS - self.precision)
+        rest = hashed & ((1 << (HASH_BITS - self.precision)) - 1)
+        rank = HASH_BITS - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError(f"HyperLogLog 精度不一致: {self.precision} != {other.precision}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @property
+    def relative_error(self) -> float:
+        """相对标准误差"""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # 小基数时用线性计数
+            return m * math.log(m / zeros)
+        return raw
+
+    def summary(self) -> Dict:
+        """估计值、相对标准误差和 95% 区间"""
+        estimate = self.estimate()
+        error = self.relative_error
+        return {
+            'estimate': round(estimate),
+            'relative_error': round(error, 4),
+            'interval_95': [round(estimate * (1 - 1.96 * error)), round(estimate * (1 + 1.96 * error))],
+        }
+
+    def to_dict(self) -> Dict:
+        return {'precision': self.precision, 'registers': _pack(bytes(self.registers))}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HyperLogLog':
+        sketch = cls(data['precision'])
+        sketch.registers = bytearray(_unpack(data['registers']))
+        return sketch
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200, seed: int = 0):
+        """KLL 分位数 sketch：第 h 层的数据项代表 2^h 个原始值，保存约 3k 个数据项"""
+        self.k = k
+        self.n = 0
+        self.min = None
+        self.max = None
+        self.levels: List[list] = [[]]
+        self.random = random.Random(seed)
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth))) + 1
+
+    def add(self, value):
+        self.n += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self.levels[0].append(value)
+        if len(self.levels[0]) >= self.capacity(0):
+            self.compress()
+
+    def compress(self):
+        """从低层开始，超出容量的层排序后隔一取一提升到上一层（随机奇偶）"""
+        for level in range(len(self.levels)):
+            items = self.levels[level]
+            if len(items) < self.capacity(level):
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            items.sort()
+            offset = self.random.getrandbits(1)
+            keep = items.pop() if len(items) % 2 else None
+            self.levels[level + 1].extend(items[offset::2])
+            self.levels[level] = [keep] if keep is not None else []
+
+    def merge(self, other: 'KLLSketch'):
+        if other.k != self.k:
+            raise ValueError(f"KLL 参数 k 不一致: {self.k} != {other.k}")
+        if other.n == 0:
+            return
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.compress()
+
+    @property
+    def rank_error(self) -> float:
+        """归一化秩误差（数据全部保留在第 0 层时为 0）"""
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
+    def quantile(self, q: float):
+        """秩约为 q * n 的值"""
+        if self.n == 0:
+            return None
+        weighted = sorted((item, 1 << level) for level, items in enumerate(self.levels) for item in items)
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for item, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return item
+        return weighted[-1][0]
+
+    def summary(self, quantiles: Iterable[float] = (0.1, 0.25, 0.5, 0.75, 0.9, 0.99)) -> Dict:
+        """最小/最大值（精确）、各分位数和秩误差"""
+        result = {'count': self.n, 'min': self.min, 'max': self.max}
+        for q in quantiles:
+            result[f'p{round(q * 100)}'] = self.quantile(q)
+        result['rank_error'] = round(self.rank_error, 4)
+        return result
+
+    def to_dict(self) -> Dict:
+        return {'k': self.k, 'n': self.n, 'min': self.min, 'max': self.max, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'KLLSketch':
+        sketch = cls(data['k'])
+        sketch.n, sketch.min, sketch.max = data['n'], data['min'], data['max']
+        sketch.levels = [list(items) for items in data['levels']]
+        return sketch
+
+
+class HeavyHitters:
+    def __init__(self, k: int = 100):
+        """Misra-Gries：最多保留 2k 个计数，超出时所有计数减去第 k+1 大的计数
+
+        保留项的计数只会低估，低估量不超过累计减去的量 max_error（<= n / (k+1)）；
+        真实计数大于 max_error 的项一定被保留。不同取值不超过 k 个时结果精确。
+        """
+        self.k = k
+        self.n = 0
+        self.max_error = 0
+        self.counters: Dict[str, int] = {}
+
+    def add(self, item: str, weight: int = 1):
+        self.n += weight
+        self.counters[item] = self.counters.get(item, 0) + weight
+        if len(self.counters) > 2 * self.k:
+            self.reduce()
+
+    def reduce(self):
+        if len(self.counters) <= self.k:
+            return
+        cut = heapq.nlargest(self.k + 1, self.counters.values())[-1]
+        self.max_error += cut
+        self.counters = {item: count - cut for item, count in self.counters.items() if count > cut}
+
+    def merge(self, other: 'HeavyHitters'):
+        if other.k != self.k:
+            raise ValueError(f"HeavyHitters 参数 k 不一致: {self.k} != {other.k}")
+        for item, count in other.counters.items():
+            self.counters[item] = self.counters.get(item, 0) + count
+        self.n += other.n
+        self.max_error += other.max_error
+        self.reduce()
+
+    def top(self, limit: int = 10) -> List[Tuple[str, int]]:
+        """计数最大的 limit 项（计数为下界）"""
+        self.reduce()
+        return heapq.nlargest(limit, self.counters.items(), key=lambda item: (item[1], item[0]))
+
+    def summary(self, limit: int = 10) -> List[Dict]:
+        """高频项及计数区间 [count, count + max_error]"""
+        return [{'value': item, 'count': count, 'max_error': self.max_error}
+                for item, count in self.top(limit)]
+
+    def to_dict(self) -> Dict:
+        self.reduce()
+        return {'k': self.k, 'n': self.n, 'max_error': self.max_error, 'counters': self.counters}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HeavyHitters':
+        sketch = cls(data['k'])
+        sketch.n, sketch.max_error = data['n'], data['max_error']
+        sketch.counters = dict(data['counters'])
+        return sketch
+
+
+class DegreeSample:
+    def __init__(self, size: int = 4096):
+        """哈希值最小的 size 个节点的度数
+
+        节点是否入样只取决于 ID 的哈希，因此样本是全部有连接节点的均匀样本，
+        样本内节点的度数精确（阈值只会降低，入样节点的每次出现都被计入）。
+        """
+        self.size = size
+        self.degrees: Dict[str, int] = {}
+        self.heap: List[Tuple[int, str]] = []  # (-哈希, ID)，堆顶为样本中哈希最大的节点
+        self.complete = True
+
+    def add(self, node_id: str, weight: int = 1, hashed: int = None):
+        if node_id in self.degrees:
+            self.degrees[node_id] += weight
+            return
+        if hashed is None:
+            hashed = hash64(node_id)
+        if len(self.degrees) < self.size:
+            heapq.heappush(self.heap, (-hashed, node_id))
+            self.degrees[node_id] = weight
+        elif hashed < -self.heap[0][0]:
+            _, evicted = heapq.heapreplace(self.heap, (-hashed, node_id))
+            del self.degrees[evicted]
+            self.degrees[node_id] = weight
+            self.complete = False
+        else:
+            self.complete = False
+
+    def merge(self, other: 'DegreeSample'):
+        if other.size != self.size:
+            raise ValueError(f"DegreeSample 大小不一致: {self.size} != {other.size}")
+        merged = dict(self.degrees)
+        for node_id, degree in other.degrees.items():
+            merged[node_id] = merged.get(node_id, 0) + degree
+        keep = heapq.nsmallest(self.size, ((hash64(node_id), node_id) for node_id in merged))
+        self.complete = self.complete and other.complete and len(keep) == len(merged)
+        self.degrees = {node_id: merged[node_id] for _, node_id in keep}
+        self.heap = [(-hashed, node_id) for hashed, node_id in keep]
+        heapq.heapify(self.heap)
+
+    @property
+    def rank_error(self) -> float:
+        """样本分位数的秩误差（DKW 不等式，99% 置信）；样本包含全部节点时为 0"""
+        if self.complete or not self.degrees:
+            return 0.0
+        return math.sqrt(math.log(2 / 0.01) / (2 * len(self.degrees)))
+
+    def summary(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> Dict:
+        degrees = sorted(self.degrees.values())
+        if not degrees:
+            return {}
+        result = {'sample_size': len(degrees), 'exact': self.complete, 'min': degrees[0]}
+        for q in quantiles:
+            result[f'p{round(q * 100)}'] = degrees[min(len(degrees) - 1, int(q * len(degrees)))]
+        result['rank_error'] = round(self.rank_error, 4)
+        return result
+
+    def to_dict(self) -> Dict:
+        return {'size': self.size, 'complete': self.complete, 'degrees': self.degrees}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DegreeSample':
+        sample = cls(data['size'])
+        sample.complete = data['complete']
+        sample.degrees = dict(data['degrees'])
+        sample.heap = [(-hash64(node_id), node_id) for node_id in sample.degrees]
+        heapq.heapify(sample.heap)
+        return sample
+
+
+class BloomFilter:
+    def __init__(self, bits: int = 1 << 24, hashes: int = 7):
+        """bits 位的 Bloom 过滤器（默认 2 MB），用双重哈希生成 hashes 个位置"""
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, hashed: int):
+        low, high = hashed & 0xFFFFFFFF, (hashed >> 32) | 1
+        return [(low + i * high) % self.bits for i in range(self.hashes)]
+
+    def add(self, value: str):
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed: int):
+        self.count += 1
+        for position in self._positions(hashed):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return self.contains_hash(hash64(value))
+
+    def contains_hash(self, hashed: int) -> bool:
+        array = self.array
+        for position in self._positions(hashed):
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def merge(self, other: 'BloomFilter'):
+        if (other.bits, other.hashes) != (self.bits, self.hashes):
+            raise ValueError("BloomFilter 参数不一致")
+        merged = int.from_bytes(self.array, 'little') | int.from_bytes(other.array, 'little')
+        self.array = bytearray(merged.to_bytes(len(self.array), 'little'))
+        self.count += other.count
+
+    @property
+    def false_positive_rate(self) -> float:
+        """按已插入数量估计的假阳性率"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def to_dict(self) -> Dict:
+        return {'bits': self.bits, 'hashes': self.hashes, 'count': self.count, 'array': _pack(bytes(self.array))}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BloomFilter':
+        bloom = cls(data['bits'], data['hashes'])
+        bloom.count = data['count']
+        bloom.array = bytearray(_unpack(data['array']))
+        return bloom
@@ -5,14 +5,30 @@
 - 节点统计
 - 关系统计
 - 结构验证
+
+默认逐行精确统计，并生成论文聚合立方体（aggregate_cubes.py，年份 × 任务 × 模态 × 解剖结构）；
+--mode streaming 时单遍读取 CSV，用 sketches.py 中的概率数据结构统计，
+内存与图谱规模无关，每个结果附带误差界，各分片的中间结果（--sketch-out）可合并（--merge）；
+--shards 时读取 json_to_csv.py 生成的哈希分片，各分片由独立进程统计后按分片顺序合并。
 """
 
 import os
 import csv
 import json
+import argparse
 from collections import Counter, defaultdict
 from typing import Dict, List
 
+from telemetry import phase
+from sketches import HyperLogLog, KLLSketch, HeavyHitters, DegreeSample, BloomFilter, hash64
+from shards import DEFAULT_WORKERS, ShardManifest, map_shards, require_manifest
+
+NODE_TYPES = ['Paper', 'Task', 'ImagingModality', 'AnatomicalStructure',
+              'Method', 'Dataset', 'Metric', 'Innovation']
+
+# 流式模式报告中列出的结构问题数上限
+MAX_REPORTED_ISSUES = 20
+
 
 def count_nodes(csv_dir: str) -> Dict[str, int]:
     """统计各类型节点数量"""
@@ -95,14 +111,14 @@ def analyze_paper_statistics(csv_dir: str) -> Dict:
         print("⚠ 论文文件不存在")
         return {}
     
-    papers = []
+    total_papers = 0
     years = []
     categories = Counter()
     
     with open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            papers.append(row)
+            total_papers += 1
             year = row.get('year', '')
             if year and year.isdigit():
                 years.append(int(year))
@@ -111,7 +127,7 @@ def analyze_paper_statistics(csv_dir: str) -> Dict:
                 categories[category] += 1
     
     stats = {
-        'total_papers': len(papers),
+        'total_papers': total_papers,
         'year_range': {
             'min': min(years) if years else None,
             'max': max(years) if years else None
@@ -254,24 +270,356 @@ def validate_structure(csv_dir: str) -> Dict:
     }
 
 
-def generate_statistics_report(csv_dir: str, output_file: str = None):
-    """生成统计报告"""
+class StreamingStatistics:
+    """流式统计：单遍读取 CSV，内存只取决于各 sketch 的参数
+
+    - 节点数、关系数、年份最小/最大值：精确计数
+    - 关系类型、年份分布、论文类别、高连接度节点：Misra-Gries 高频项（计数为下界，附最大低估量）
+    - 有连接的节点数、不同关系数、作者数：HyperLogLog（附相对标准误差和 95% 区间）
+    - 年份分位数：KLL；连接度分位数：bottom-k 节点样本（附秩误差）
+    - 重复节点 ID、关系端点缺失：Bloom 过滤器（缺失的端点一定缺失，重复 ID 可能含假阳性）
+    """
+
+    # 可合并、可序列化的 sketch 属性
+    SKETCHES = ['relation_types', 'years', 'year_counts', 'categories', 'authors',
+                'connected_nodes', 'edges', 'top_nodes', 'degrees', 'node_ids']
+
+    def __init__(self):
+        self.node_counts = Counter()
+        self.relation_total = 0
+        self.paper_total = 0
+        self.relation_types = HeavyHitters(k=64)
+        self.years = KLLSketch(k=200)
+        self.year_counts = HeavyHitters(k=64)
+        self.categories = HeavyHitters(k=100)
+        self.authors = HyperLogLog()
+        self.connected_nodes = HyperLogLog()
+        self.edges = HyperLogLog()
+        self.top_nodes = HeavyHitters(k=256)
+        self.degrees = DegreeSample(size=4096)
+        self.node_ids = BloomFilter()
+        self.possible_duplicates = 0
+        self.expected_false_duplicates = 0.0
+        self.missing_endpoints = 0
+        self.issues: List[str] = []
+
+    def add_node(self, node_type: str, row: Dict):
+        self.node_counts[node_type] += 1
+        node_id = row.get('id', '')
+        if node_id:
+            hashed = hash64(node_id)
+            if self.node_ids.contains_hash(hashed):
+                self.possible_duplicates += 1
+                self.expected_false_duplicates += self.node_ids.false_positive_rate
+                if len(self.issues) < MAX_REPORTED_ISSUES:
+                    self.issues.append(f"可能重复的节点ID: {node_id} (类型: {node_type})")
+            self.node_ids.add_hash(hashed)
+        if node_type != 'Paper':
+            return
+        self.paper_total += 1
+        year = row.get('year', '')
+        if year and year.isdigit():
+            self.years.add(int(year))
+            self.year_counts.add(year)
+        category = row.get('category', '')
+        if category:
+            self.categories.add(category)
+        for author in (row.get('authors') or '').split('|'):
+            if author:
+                self.authors.add(author)
+
+    def add_relation(self, row: Dict):
+        self.relation_total += 1
+        from_id = row.get('from_id', '')
+        to_id = row.get('to_id', '')
+        self.relation_types.add(row.get('type', 'UNKNOWN'))
+        self.edges.add(f"{from_id}\t{row.get('type', '')}\t{to_id}")
+        for node_id, role in ((from_id, '起始'), (to_id, '目标')):
+            hashed = hash64(node_id)
+            self.connected_nodes.add_hash(hashed)
+            self.top_nodes.add(node_id)
+            self.degrees.add(node_id, hashed=hashed)
+            if node_id and not self.node_ids.contains_hash(hashed):
+                self.missing_endpoints += 1
+                if len(self.issues) < MAX_REPORTED_ISSUES:
+                    self.issues.append(f"关系 {self.relation_total}: {role}节点不存在 ({node_id})")
+
+    def consume(self, csv_dir: str):
+        """读取一个 CSV 目录（节点文件先于关系文件，用于端点检查）"""
+        for node_type in NODE_TYPES:
+            csv_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+            if not os.path.exists(csv_file):
+                continue
+            with open(csv_file, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    self.add_node(node_type, row)
+        relations_file = os.path.join(csv_dir, 'relations.csv')
+        if os.path.exists(relations_file):
+            with open(relations_file, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    self.add_relation(row)
+
+    def merge(self, other: 'StreamingStatistics'):
+        """合并另一个分片的统计（端点检查按各分片自身的节点文件进行）"""
+        self.node_counts.update(other.node_counts)
+        self.relation_total += other.relation_total
+        self.paper_total += other.paper_total
+        for name in self.SKETCHES:
+            getattr(self, name).merge(getattr(other, name))
+        self.possible_duplicates += other.possible_duplicates
+        self.expected_false_duplicates += other.expected_false_duplicates
+        self.missing_endpoints += other.missing_endpoints
+        self.issues = (self.issues + other.issues)[:MAX_REPORTED_ISSUES]
+
+    def to_dict(self) -> Dict:
+        data = {name: getattr(self, name).to_dict() for name in self.SKETCHES}
+        data.update({
+            'node_counts': dict(self.node_counts),
+            'relation_total': self.relation_total,
+            'paper_total': self.paper_total,
+            'possible_duplicates': self.possible_duplicates,
+            'expected_false_duplicates': self.expected_false_duplicates,
+            'missing_endpoints': self.missing_endpoints,
+            'issues': self.issues,
+        })
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'StreamingStatistics':
+        stats = cls()
+        for name in cls.SKETCHES:
+            sketch = getattr(stats, name)
+            setattr(stats, name, type(sketch).from_dict(data[name]))
+        stats.node_counts = Counter(data['node_counts'])
+        for name in ('relation_total', 'paper_total', 'possible_duplicates',
+                     'expected_false_duplicates', 'missing_endpoints', 'issues'):
+            setattr(stats, name, data[name])
+        return stats
+
+    def report(self) -> Dict:
+        """与精确模式相同的报告结构，近似值附带误差界"""
+        connected = self.connected_nodes.summary()
+        top_nodes = self.top_nodes.summary(10)
+        degree_sample = self.degrees.summary()
+        avg_degree = 2 * self.relation_total / connected['estimate'] if connected['estimate'] else 0
+        return {
+            'mode': 'streaming',
+            'node_counts': {node_type: self.node_counts.get(node_type, 0) for node_type in NODE_TYPES},
+            'relation_stats': {
+                'total': self.relation_total,
+                'by_type': dict(self.relation_types.top(self.relation_types.k)),
+                'by_type_max_error': self.relation_types.max_error,
+                'distinct_edges': self.edges.summary(),
+            },
+            'paper_stats': {
+                'total_papers': self.paper_total,
+                'year_range': {'min': self.years.min, 'max': self.years.max},
+                'year_quantiles': self.years.summary((0.1, 0.25, 0.5, 0.75, 0.9)),
+                'year_distribution': dict(self.year_counts.top(self.year_counts.k)),
+                'year_distribution_max_error': self.year_counts.max_error,
+                'top_categories': self.categories.summary(10),
+                'distinct_authors': self.authors.summary(),
+            },
+            'connectivity_stats': {
+                'total_nodes_with_relations': connected,
+                'max_degree': {'value': top_nodes[0]['count'], 'max_error': top_nodes[0]['max_error']}
+                if top_nodes else None,
+                'min_degree': degree_sample.get('min'),
+                'avg_degree': {'estimate': round(avg_degree, 2), 'relative_error': connected['relative_error']},
+                'median_degree': degree_sample.get('p50'),
+                'degree_quantiles': degree_sample,
+                'top_nodes': top_nodes,
+            },
+            'structure_validation': {
+                'issues': self.issues,
+                'total_issues': self.possible_duplicates + self.missing_endpoints,
+                'missing_endpoints': self.missing_endpoints,
+                'possible_duplicate_ids': self.possible_duplicates,
+                'expected_false_duplicates': round(self.expected_false_duplicates, 2),
+                'bloom_false_positive_rate': round(self.node_ids.false_positive_rate, 6),
+            },
+        }
+
+
+# 分片统计的子进程在 fork 时继承的 manifest 和全部节点 ID 的 Bloom 过滤器
+_manifest: ShardManifest = None
+_node_ids: BloomFilter = None
+
+
+def _stream_node_shard(index: int) -> StreamingStatistics:
+    """统计编号为 index 的所有节点分片（同一 ID 的各类型节点都在同编号的分片中，重复检查不跨分片）"""
+    stats = StreamingStatistics()
+    for node_type in NODE_TYPES:
+        for entry in _manifest.node_shards(node_type):
+            if entry['index'] != index:
+                continue
+            with open(_manifest.file_path(entry), 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    stats.add_node(node_type, row)
+    return stats
+
+
+def _stream_relation_shard(index: int) -> StreamingStatistics:
+    """统计编号为 index 的所有关系分片，端点与全部节点的 Bloom 过滤器比较"""
+    stats = StreamingStatistics()
+    stats.node_ids = _node_ids
+    for group in _manifest.relation_groups():
+        for entry in _manifest.relation_shards(group):
+            if entry['index'] != index:
+                continue
+            with open(_manifest.file_path(entry), 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    stats.add_relation(row)
+    # 节点 ID 已在节点分片的结果中，不再返回（也避免合并时重复计数）
+    stats.node_ids = BloomFilter()
+    return stats
+
+
+def consume_shards(csv_dir: str, workers: int = DEFAULT_WORKERS) -> StreamingStatistics:
+    """并发统计一个 CSV 目录下的分片：先统计各编号的节点分片并合并出全部节点 ID，
+    再统计各编号的关系分片；结果按分片编号顺序合并，相同的分片数下结果确定"""
+    global _manifest, _node_ids
+    manifest = require_manifest(csv_dir)
+    indexes = range(manifest.shards)
+    stats = StreamingStatistics()
+    _manifest = manifest
+    try:
+        with phase('stream_node_shards') as p:
+            for shard in map_shards(_stream_node_shard, indexes, workers):
+                stats.merge(shard)
+            p.rows_in = sum(stats.node_counts.values())
+        _node_ids = stats.node_ids
+        with phase('stream_relation_shards') as p:
+            for shard in map_shards(_stream_relation_shard, indexes, workers):
+                stats.merge(shard)
+            p.rows_in = stats.relation_total
+    finally:
+        _manifest = None
+        _node_ids = None
+    return stats
+
+
+def print_streaming_report(report: Dict):
+    """打印流式统计报告"""
+    print("=" * 60)
+    print("📊 流式统计（近似值附误差界）")
+    print("=" * 60)
+    for node_type, count in report['node_counts'].items():
+        print(f"   {node_type:20s}: {count:6d} 个节点")
+    print(f"   {'总计':20s}: {sum(report['node_counts'].values()):6d} 个节点")
+
+    relation_stats = report['relation_stats']
+    print(f"\n   总关系数: {relation_stats['total']}")
+    print(f"   不同关系数: ≈{relation_stats['distinct_edges']['estimate']} "
+          f"(±{relation_stats['distinct_edges']['relative_error']:.2%})")
+    print(f"   关系类型分布 (计数低估不超过 {relation_stats['by_type_max_error']}):")
+    for rel_type, count in relation_stats['by_type'].items():
+        print(f"      {rel_type:30s}: {count:6d} 条")
+
+    paper_stats = report['paper_stats']
+    years = paper_stats['year_quantiles']
+    print(f"\n   总论文数: {paper_stats['total_papers']}")
+    if years['min'] is not None:
+        print(f"   年份范围: {years['min']} - {years['max']}，中位数 {years['p50']} (秩误差 {years['rank_error']:.2%})")
+    print(f"   作者数: ≈{paper_stats['distinct_authors']['estimate']} "
+          f"(±{paper_stats['distinct_authors']['relative_error']:.2%})")
+    print(f"   热门类别 (Top 10):")
+    for item in paper_stats['top_categories']:
+        print(f"      {item['value']:40s}: {item['count']:4d} 篇 (+{item['max_error']})")
+
+    connectivity = report['connectivity_stats']
+    nodes = connectivity['total_nodes_with_relations']
+    degrees = connectivity['degree_quantiles']
+    print(f"\n   有连接的节点数: ≈{nodes['estimate']} (95% 区间 {nodes['interval_95'][0]}-{nodes['interval_95'][1]})")
+    print(f"   平均连接度: ≈{connectivity['avg_degree']['estimate']}")
+    if degrees:
+        print(f"   连接度中位数 / P90 / P99: {degrees['p50']} / {degrees['p90']} / {degrees['p99']} "
+              f"(样本 {degrees['sample_size']} 个节点，秩误差 {degrees['rank_error']:.2%})")
+    print(f"   连接度最高的节点 (Top 10):")
+    for item in connectivity['top_nodes']:
+        print(f"      {item['value'][:20]:20s}: {item['count']:4d} 条连接 (+{item['max_error']})")
+
+    validation = report['structure_validation']
+    if validation['total_issues']:
+        print(f"\n❌ 结构问题: {validation['missing_endpoints']} 个关系端点不存在，"
+              f"{validation['possible_duplicate_ids']} 个可能重复的节点ID "
+              f"(其中约 {validation['expected_false_duplicates']} 个为假阳性)")
+        for issue in validation['issues']:
+            print(f"   - {issue}")
+    else:
+        print("\n✅ 结构验证通过")
+    print()
+
+
+def generate_streaming_report(csv_dirs: List[str] = (), sketch_files: List[str] = (),
+                              output_file: str = None, sketch_out: str = None,
+                              shards: bool = False, workers: int = DEFAULT_WORKERS) -> Dict:
+    """流式统计：读取 CSV 目录（shards 时读取其中的哈希分片）和/或合并已保存的分片统计，生成报告"""
+    stats = StreamingStatistics()
+    for csv_dir in csv_dirs:
+        if shards:
+            stats.merge(consume_shards(csv_dir, workers))
+            continue
+        with phase('stream_csv') as p:
+            shard = StreamingStatistics()
+            shard.consume(csv_dir)
+            stats.merge(shard)
+            p.rows_in = sum(shard.node_counts.values()) + shard.relation_total
+    for sketch_file in sketch_files:
+        with phase('merge_sketches'):
+            with open(sketch_file, 'r', encoding='utf-8') as f:
+                stats.merge(StreamingStatistics.from_dict(json.load(f)))
+
+    if sketch_out:
+        with open(sketch_out, 'w', encoding='utf-8') as f:
+            json.dump(stats.to_dict(), f, ensure_ascii=False)
+        print(f"✅ 分片统计已保存到: {sketch_out}")
+
+    report = stats.report()
+    print_streaming_report(report)
+    if output_file:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"\n✅ 报告已保存到: {output_file}")
+    return report
+
+
+def generate_statistics_report(csv_dir: str, output_file: str = None, cubes: bool = True):
+    """生成统计报告（cubes 为 True 时同时生成论文聚合立方体）"""
     print("\n" + "=" * 60)
     print("📋 生成统计报告")
     print("=" * 60)
     
-    node_counts = count_nodes(csv_dir)
-    relation_stats = count_relations(csv_dir)
-    paper_stats = analyze_paper_statistics(csv_dir)
-    connectivity_stats = analyze_node_connectivity(csv_dir)
-    structure_validation = validate_structure(csv_dir)
+    with phase('count_nodes') as p:
+        node_counts = count_nodes(csv_dir)
+        p.rows_in = sum(node_counts.values())
+    with phase('count_relations') as p:
+        relation_stats = count_relations(csv_dir)
+        p.rows_in = relation_stats.get('total', 0)
+    with phase('paper_statistics'):
+        paper_stats = analyze_paper_statistics(csv_dir)
+    with phase('connectivity'):
+        connectivity_stats = analyze_node_connectivity(csv_dir)
+    with phase('validate_structure'):
+        structure_validation = validate_structure(csv_dir)
+    cube_summary = None
+    if cubes and paper_stats:
+        # 立方体依赖 numpy，只在需要时导入
+        from aggregate_cubes import materialize_cubes
+
+        with phase('aggregate_cubes') as p:
+            cube_summary = materialize_cubes(csv_dir)
+            p.rows_in = cube_summary['fact_rows']
+        print(f"🧊 论文聚合立方体: {cube_summary['file']} ({cube_summary['bytes'] / 1024:.1f} KB, "
+              f"{cube_summary['members']})")
     
     report = {
         'node_counts': node_counts,
         'relation_stats': relation_stats,
         'paper_stats': paper_stats,
         'connectivity_stats': connectivity_stats,
-        'structure_validation': structure_validation
+        'structure_validation': structure_validation,
+        'paper_cubes': cube_summary
     }
     
     if output_file:
@@ -282,18 +630,43 @@ def generate_statistics_report(csv_dir: str, output_file: str = None):
     return report
 
 
-def main():
-    """主函数"""
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_dir = os.path.join(script_dir, 'csv')
-    
-    if not os.path.exists(csv_dir):
-        print(f"❌ CSV 目录不存在: {csv_dir}")
-        print("   请先运行 json_to_csv.py 生成 CSV 文件")
-        return
-    
-    output_file = os.path.join(script_dir, 'statistics_report.json')
-    generate_statistics_report(csv_dir, output_file)
+    parser = argparse.ArgumentParser(description='图谱统计和验证')
+    parser.add_argument('--mode', choices=['exact', 'streaming'], default='exact',
+                       help='exact: 精确统计（默认）；streaming: 单遍流式近似统计，内存固定')
+    parser.add_argument('--csv-dir', action='append',
+                       help='CSV 目录，可重复指定多个分片（默认: csv/）')
+    parser.add_argument('--output', default=os.path.join(script_dir, 'statistics_report.json'),
+                       help='报告文件 (默认: statistics_report.json)')
+    parser.add_argument('--no-cubes', action='store_true',
+                       help='exact 模式：不生成论文聚合立方体')
+    parser.add_argument('--sketch-out', help='streaming 模式：保存可合并的分片统计')
+    parser.add_argument('--merge', nargs='+', default=[], metavar='SKETCH',
+                       help='streaming 模式：合并 --sketch-out 保存的分片统计（可不读取 CSV）')
+    parser.add_argument('--shards', action='store_true',
+                       help='streaming 模式：读取 json_to_csv.py --shards 生成的分片（<csv-dir>/shards/），并发统计后合并')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                       help=f'--shards 时的并发进程数 (默认: {DEFAULT_WORKERS})')
+    args = parser.parse_args(argv)
+    if args.shards and args.mode != 'streaming':
+        parser.error('--shards 只支持 --mode streaming')
+
+    csv_dirs = args.csv_dir or ([] if args.merge else [os.path.join(script_dir, 'csv')])
+    for csv_dir in csv_dirs:
+        if not os.path.exists(csv_dir):
+            print(f"❌ CSV 目录不存在: {csv_dir}")
+            print("   请先运行 json_to_csv.py 生成 CSV 文件")
+            return
+
+    if args.mode == 'streaming' or args.merge or args.sketch_out:
+        generate_streaming_report(csv_dirs, args.merge, args.output, args.sketch_out,
+                                  args.shards, args.workers)
+    else:
+        if len(csv_dirs) > 1:
+            parser.error('exact 模式只支持一个 CSV 目录，多个分片请使用 --mode streaming')
+        generate_statistics_report(csv_dirs[0], args.output, cubes=not args.no_cubes)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+子图检索（供图增强 QA 使用）
+为每个问题返回一个相关子图：向量匹配的种子节点 + 按关系类型限定的 k 跳邻域 + 节点数上限，
+全部在进程内的图和 embedding 副本上完成，不再多次往返执行 Cypher。
+
+- 图从 CSV 目录加载为 CSR 邻接表（relations.csv 与 similarity.py 生成的 SIMILAR_* 关系，按无向处理），
+  每个节点的邻居按度数升序排列：扇出受限时优先取连接论文少、更“专门”的节点
+- 种子选择：每个标签一个 L2 归一化的 embedding 矩阵；维度较高时先在 PCA 降维后的矩阵上取候选，
+  再用原始向量精确重排（--projection-dim 0 时直接精确计算）
+- 有界的按类型 BFS：度数超过 max_degree 的枢纽节点（如常见指标）会加入子图但不展开，
+  每个节点最多取 fanout 个新邻居，节点总数不超过 max_nodes
+- 子图的边为已选节点之间的关系（从非枢纽节点一侧收集，两个枢纽节点之间的关系不输出）
+- 序列化为紧凑的列式 JSON（边用节点序号表示）；相同种子和参数的结果由 LRU 缓存
+
+用法:
+    python subgraph.py --seeds paper_1 paper_2 --hops 2
+    python subgraph.py --query-paper paper_1859 --types ADDRESSES_TASK PROPOSES_METHOD USES_DATASET
+    python subgraph.py --bench 1000                         # 随机问题的延迟（p50/p99）
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from csv_layout import NODE_FIELDS, relation_csv_name
+from extract_tables import parse_number
+from similarity import SIMILARITY_RELATIONS
+from graph_client import QueryCache, LatencyStats
+
+DEFAULT_HOPS = 2
+DEFAULT_SEED_K = 5
+DEFAULT_MAX_DEGREE = 100
+DEFAULT_FANOUT = 20
+DEFAULT_MAX_NODES = 200
+DEFAULT_PROJECTION_DIM = 128
+DEFAULT_CACHE_SIZE = 4096
+# 降维检索时每个种子保留的候选数（精确重排前）
+CANDIDATES_PER_SEED = 16
+# 计算 PCA 投影时最多采样的向量数
+PROJECTION_SAMPLE = 20000
+
+# 各标签用作显示名称的列
+NAME_COLUMNS = {'Paper': 'title', 'Innovation': 'description'}
+
+csv.field_size_limit(1 << 30)
+
+
+class EmbeddingIndex:
+    def __init__(self, nodes: np.ndarray, matrix: np.ndarray, projection_dim: int = DEFAULT_PROJECTION_DIM):
+        """一个标签的种子检索索引：nodes 为矩阵各行对应的节点序号，matrix 已 L2 归一化"""
+        self.nodes = nodes
+        self.matrix = matrix
+        self.dimension = matrix.shape[1]
+        self.projection = None
+        self.reduced = None
+        if 0 < projection_dim < self.dimension and len(matrix) > projection_dim:
+            # 未中心化的 PCA（右奇异向量）：保留内积的主要成分
+            step = max(1, len(matrix) // PROJECTION_SAMPLE)
+            _, _, vt = np.linalg.svd(matrix[::step], full_matrices=False)
+            self.projection = np.ascontiguousarray(vt[:projection_dim].T)
+            self.reduced = matrix @ self.projection
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """返回余弦相似度最高的 k 个 (节点序号, 相似度)，按相似度降序"""
+        k = min(k, len(self.nodes))
+        if self.reduced is not None:
+            candidates = min(len(self.nodes), max(k * CANDIDATES_PER_SEED, 64))
+            approx = self.reduced @ (query @ self.projection)
+            rows = np.argpartition(-approx, candidates - 1)[:candidates]
+            scores = self.matrix[rows] @ query
+        else:
+            rows = np.arange(len(self.nodes))
+            scores = self.matrix @ query
+        top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return self.nodes[rows[top]], scores[top]
+
+
+class SubgraphRetriever:
+    def __init__(self, ids: List[str], labels: List[str], label_codes: np.ndarray, names: List[str],
+                 edge_from: np.ndarray, edge_to: np.ndarray, edge_types: np.ndarray, edge_values: np.ndarray,
+                 type_names: List[str], embeddings: Dict[str, EmbeddingIndex] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        """由节点表和边表构建检索器（通常使用 load）"""
+        self.ids = ids
+        self.labels = labels
+        self.label_codes = label_codes
+        self.names = names
+        self.index = {node_id: position for position, node_id in enumerate(ids)}
+        self.edge_from = edge_from
+        self.edge_to = edge_to
+        self.edge_types = edge_types
+        self.edge_values = edge_values
+        self.type_names = type_names
+        self.type_codes = {name: code for code, name in enumerate(type_names)}
+        self.embeddings = embeddings or {}
+        # 进程内的数据不会变化，缓存不过期
+        self.cache = QueryCache(cache_size, float('inf'))
+        self.latency = LatencyStats()
+
+        # 对称 CSR：每条边在两端各出现一次，记录边序号；邻居按度数升序
+        n = len(ids)
+        ends = np.concatenate([edge_from, edge_to])
+        others = np.concatenate([edge_to, edge_from])
+        edge_ids = np.concatenate([np.arange(len(edge_from))] * 2).astype(np.int32)
+        self.degree = np.bincount(ends, minlength=n).astype(np.int32)
+        order = np.lexsort((others, self.degree[others], ends))
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self.degree, out=self.indptr[1:])
+        self.neighbors = others[order].astype(np.int32)
+        self.neighbor_edges = edge_ids[order]
+        self.neighbor_types = edge_types[self.neighbor_edges]
+
+    @classmethod
+    def load(cls, csv_dir: str, seed_labels: Optional[Sequence[str]] = None,
+             projection_dim: int = DEFAULT_PROJECTION_DIM, cache_size: int = DEFAULT_CACHE_SIZE):
+        """从 CSV 目录加载图和 embedding；seed_labels 为空时所有有 embedding 的标签都可作为种子"""
+        ids, labels, codes, names = [], [], [], []
+        vectors = {}
+        for node_type in NODE_FIELDS:
+            node_file = os.path.join(csv_dir, f'nodes_{node_type}.csv')
+            if not os.path.exists(node_file):
+                continue
+            labels.append(node_type)
+            name_column = NAME_COLUMNS.get(node_type, 'name')
+            use_embedding = seed_labels is None or node_type in seed_labels
+            rows, matrix = [], []
+            with open(node_file, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    position = len(ids)
+                    ids.append(row['id'])
+                    codes.append(len(labels) - 1)
+                    names.append(row.get(name_column) or '')
+                    value = row.get('embedding', '') if use_embedding else ''
+                    if value and value.strip():
+                        vector = np.array(value.split(','), dtype=np.float32)
+                        if matrix and len(vector) != len(matrix[0]):
+                            continue
+                        norm = float(np.linalg.norm(vector))
+                        if norm > 0.0:
+                            rows.append(position)
+                            matrix.append(vector / norm)
+            if matrix:
+                vectors[node_type] = EmbeddingIndex(np.array(rows, dtype=np.int32), np.vstack(matrix),
+                                                    projection_dim)
+
+        index = {node_id: position for position, node_id in enumerate(ids)}
+        relation_files = [os.path.join(csv_dir, 'relations.csv')]
+        relation_files += [os.path.join(csv_dir, relation_csv_name(rel_type))
+                           for rel_type in SIMILARITY_RELATIONS.values()]
+        type_names, type_codes = [], {}
+        edge_from, edge_to, edge_types, edge_values = [], [], [], []
+        for relation_file in relation_files:
+            if not os.path.exists(relation_file):
+                continue
+            with open(relation_file, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                from_column, to_column = header.index('from_id'), header.index('to_id')
+                type_column, value_column = header.index('type'), header.index('value')
+                for row in reader:
+                    source = index.get(row[from_column])
+                    target = index.get(row[to_column])
+                    if source is None or target is None or source == target:
+                        continue
+                    rel_type = row[type_column]
+                    code = type_codes.get(rel_type)
+                    if code is None:
+                        code = type_codes[rel_type] = len(type_names)
+                        type_names.append(rel_type)
+                    edge_from.append(source)
+                    edge_to.append(target)
+                    edge_types.append(code)
+                    # value 保留第一次报告的原文（如 "65.2%"），不是数值时记为 NaN
+                    value = parse_number(row[value_column])
+                    edge_values.append(np.nan if value is None else value)
+
+        return cls(ids, labels, np.array(codes, dtype=np.int8), names,
+                   np.array(edge_from, dtype=np.int32), np.array(edge_to, dtype=np.int32),
+                   np.array(edge_types, dtype=np.int16), np.array(edge_values, dtype=np.float64),
+                   type_names, vectors, cache_size)
+
+    def select_seeds(self, query_vector, k: int = DEFAULT_SEED_K,
+                     labels: Optional[Sequence[str]] = None) -> List[Tuple[str, float]]:
+        """按余弦相似度选出 k 个种子节点，返回 [(节点 ID, 相似度)]"""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+        found_nodes, found_scores = [], []
+        for label, embedding in self.embeddings.items():
+            if (labels is not None and label not in labels) or embedding.dimension != len(query):
+                continue
+            nodes, scores = embedding.search(query, k)
+            found_nodes.append(nodes)
+            found_scores.append(scores)
+        if not found_nodes:
+            return []
+        nodes, scores = np.concatenate(found_nodes), np.concatenate(found_scores)
+        top = np.argsort(-scores, kind='stable')[:k]
+        return [(self.ids[node], float(score)) for node, score in zip(nodes[top].tolist(), scores[top].tolist())]
+
+    def expand(self, seeds: Sequence[int], hops: int, type_mask: Optional[np.ndarray],
+               max_degree: int, fanout: int, max_nodes: int) -> Dict:
+        """从种子节点序号出发的有界 BFS，返回子图（节点序号、跳数、边序号）"""
+        indptr, neighbors, neighbor_types = self.indptr, self.neighbors, self.neighbor_types
+        selected = np.zeros(len(self.ids), dtype=bool)
+        nodes, hops_of = [], []
+        for seed in seeds:
+            if not selected[seed]:
+                selected[seed] = True
+                nodes.append(seed)
+                hops_of.append(0)
+        frontier = list(nodes)
+        truncated = len(nodes) > max_nodes
+        for hop in range(1, hops + 1):
+            next_frontier = []
+            for node in frontier:
+                if truncated:
+                    break
+                # 枢纽节点不展开（种子除外）
+                if hop > 1 and self.degree[node] > max_degree:
+                    continue
+                start, end = indptr[node], indptr[node + 1]
+                candidates = neighbors[start:end]
+                if type_mask is not None:
+                    candidates = candidates[type_mask[neighbor_types[start:end]]]
+                candidates = candidates[~selected[candidates]]
+                if len(candidates) > 1:
+                    # 同一对节点的多条关系相邻（邻居按 (度数, 序号) 排序）
+                    candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+                budget = min(fanout, max_nodes - len(nodes))
+                if len(candidates) > budget:
+                    candidates = candidates[:budget]
+                    truncated = len(nodes) + budget >= max_nodes
+                selected[candidates] = True
+                added = candidates.tolist()
+                nodes.extend(added)
+                hops_of.extend([hop] * len(added))
+                next_frontier.extend(added)
+            frontier = next_frontier
+
+        # 已选节点之间的关系：从种子和非枢纽节点的邻接表中一次性收集
+        nodes = np.array(nodes, dtype=np.int32)
+        hops_of = np.array(hops_of, dtype=np.int8)
+        scanned = nodes[(hops_of == 0) | (self.degree[nodes] <= max_degree)]
+        starts, lengths = indptr[scanned], self.degree[scanned]
+        total = int(lengths.sum())
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths) + np.arange(total)
+        mask = selected[neighbors[offsets]]
+        if type_mask is not None:
+            mask &= type_mask[neighbor_types[offsets]]
+        edge_ids = np.unique(self.neighbor_edges[offsets[mask]])
+        return {'nodes': nodes, 'hops': hops_of, 'edges': edge_ids, 'truncated': truncated}
+
+    def retrieve(self, query_vector=None, seeds: Optional[Sequence[str]] = None, seed_k: int = DEFAULT_SEED_K,
+                 seed_labels: Optional[Sequence[str]] = None, hops: int = DEFAULT_HOPS,
+                 relation_types: Optional[Sequence[str]] = None, max_degree: int = DEFAULT_MAX_DEGREE,
+                 fanout: int = DEFAULT_FANOUT, max_nodes: int = DEFAULT_MAX_NODES) -> Dict:
+        """检索子图：种子为 seeds（节点 ID）与 query_vector 匹配到的 seed_k 个节点的并集
+
+        返回列式字典（见 serialize），相同种子与参数的结果来自 LRU 缓存（调用方不应修改）。
+        """
+        started = time.perf_counter()
+        seed_scores = {}
+        for node_id in seeds or []:
+            if node_id in self.index:
+                seed_scores[node_id] = None
+        if query_vector is not None:
+            for node_id, score in self.select_seeds(query_vector, seed_k, seed_labels):
+                seed_scores.setdefault(node_id, score)
+        type_key = tuple(sorted(relation_types)) if relation_types is not None else None
+        key = (tuple(sorted(seed_scores)), hops, type_key, max_degree, fanout, max_nodes)
+
+        hit, result = self.cache.get(key)
+        if not hit:
+            type_mask = None
+            if relation_types is not None:
+                type_mask = np.zeros(max(len(self.type_names), 1), dtype=bool)
+                for rel_type in relation_types:
+                    if rel_type in self.type_codes:
+                        type_mask[self.type_codes[rel_type]] = True
+            graph = self.expand([self.index[node_id] for node_id in key[0]], hops, type_mask,
+                                max_degree, fanout, max_nodes)
+            result = self.to_columns(key[0], graph)
+            self.cache.put(key, result)
+        if any(score is not None for score in seed_scores.values()):
+            result = dict(result, seed_scores=[seed_scores[node_id] for node_id in result['seeds']])
+        self.latency.record('retrieve', (time.perf_counter() - started) * 1000.0)
+        return result
+
+    def to_columns(self, seeds: Sequence[str], graph: Dict) -> Dict:
+        """子图转为列式字典：节点列 + 以节点序号表示端点的边列"""
+        nodes, edge_ids = graph['nodes'], graph['edges']
+        position = np.empty(len(self.ids), dtype=np.int32)
+        position[nodes] = np.arange(len(nodes), dtype=np.int32)
+        values = self.edge_values[edge_ids].astype(object)
+        values[self.edge_values[edge_ids] != self.edge_values[edge_ids]] = None
+        return {
+            'seeds': list(seeds),
+            'truncated': graph['truncated'],
+            'labels': self.labels,
+            'types': self.type_names,
+            'nodes': {
+                'id': [self.ids[node] for node in nodes.tolist()],
+                'label': self.label_codes[nodes].tolist(),
+                'name': [self.names[node] for node in nodes.tolist()],
+                'hop': graph['hops'].tolist(),
+            },
+            'edges': {
+                'from': position[self.edge_from[edge_ids]].tolist(),
+                'to': position[self.edge_to[edge_ids]].tolist(),
+                'type': self.edge_types[edge_ids].tolist(),
+                'value': values.tolist(),
+            },
+        }
+
+    @staticmethod
+    def serialize(subgraph: Dict) -> bytes:
+        """紧凑 JSON（UTF-8，无空白）"""
+        return json.dumps(subgraph, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def stats(self) -> Dict:
+        """图规模、缓存命中率与检索延迟"""
+        return {
+            'nodes': len(self.ids),
+            'edges': len(self.edge_from),
+            'seed_labels': {label: len(index.nodes) for label, index in self.embeddings.items()},
+            'cache': self.cache.stats(),
+            'latency': self.latency.stats(),
+        }
+
+
+def benchmark(retriever: SubgraphRetriever, queries: int, seed_k: int, **options) -> Dict:
+    """用随机节点的 embedding（加噪声）作为问题向量，测量检索延迟；返回 stats()"""
+    rng = np.random.default_rng(0)
+    random.seed(0)
+    indexes = list(retriever.embeddings.values())
+    for _ in range(queries):
+        if indexes:
+            index = indexes[rng.integers(len(indexes))]
+            vector = index.matrix[rng.integers(len(index.nodes))]
+            retriever.retrieve(vector + rng.normal(0, 0.01, len(vector)).astype(np.float32),
+                               seed_k=seed_k, **options)
+        else:
+            retriever.retrieve(seeds=[retriever.ids[random.randrange(len(retriever.ids))]], **options)
+    return retriever.stats()
+
+
+def main(argv: List[str] = None):
+    """主函数（argv 为空时读取命令行参数）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='从本地图副本检索问题相关子图')
+    parser.add_argument('--csv-dir', default=os.path.join(script_dir, 'csv'),
+                       help='CSV 目录 (默认: csv/)')
+    parser.add_argument('--seeds', nargs='+', default=[],
+                       help='种子节点 ID')
+    parser.add_argument('--query-paper', default=None,
+                       help='用该论文的 embedding 作为问题向量选择种子')
+    parser.add_argument('--seed-k', type=int, default=DEFAULT_SEED_K,
+                       help=f'向量匹配的种子数 (默认: {DEFAULT_SEED_K})')
+    parser.add_argument('--seed-labels', nargs='+', choices=list(NODE_FIELDS), default=None,
+                       help='可作为种子的节点标签 (默认: 所有有 embedding 的标签)')
+    parser.add_argument('--hops', type=int, default=DEFAULT_HOPS,
+                       help=f'展开的跳数 (默认: {DEFAULT_HOPS})')
+    parser.add_argument('--types', nargs='+', default=None,
+                       help='只沿这些关系类型展开 (默认: 全部)')
+    parser.add_argument('--max-degree', type=int, default=DEFAULT_MAX_DEGREE,
+                       help=f'度数超过该值的节点不展开 (默认: {DEFAULT_MAX_DEGREE})')
+    parser.add_argument('--fanout', type=int, default=DEFAULT_FANOUT,
+                       help=f'每个节点最多展开的新邻居数 (默认: {DEFAULT_FANOUT})')
+    parser.add_argument('--max-nodes', type=int, default=DEFAULT_MAX_NODES,
+                       help=f'子图节点数上限 (默认: {DEFAULT_MAX_NODES})')
+    parser.add_argument('--projection-dim', type=int, default=DEFAULT_PROJECTION_DIM,
+                       help=f'种子检索的降维维度，0 为精确计算 (默认: {DEFAULT_PROJECTION_DIM})')
+    parser.add_argument('--bench', type=int, default=0, metavar='N',
+                       help='执行 N 次随机检索并打印延迟统计')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    retriever = SubgraphRetriever.load(args.csv_dir, args.seed_labels, args.projection_dim)
+    print(f"📦 已加载 {len(retriever.ids)} 个节点、{len(retriever.edge_from)} 条关系 "
+          f"({time.perf_counter() - started:.2f}s)")
+    options = dict(hops=args.hops, relation_types=args.types, max_degree=args.max_degree,
+                   fanout=args.fanout, max_nodes=args.max_nodes)
+
+    if args.bench:
+        stats = benchmark(retriever, args.bench, args.seed_k, **options)
+        print(json.dumps({'cache': stats['cache'], 'latency': stats['latency']}, ensure_ascii=False, indent=2))
+        return
+
+    query_vector = None
+    if args.query_paper:
+        position = retriever.index.get(args.query_paper)
+        index = retriever.embeddings.get('Paper')
+        rows = np.flatnonzero(index.nodes == position) if index is not None and position is not None else []
+        if not len(rows):
+            print(f"❌ 论文不存在或没有 embedding: {args.query_paper}")
+            return
+        query_vector = index.matrix[rows[0]]
+    if not args.seeds and query_vector is None:
+        parser.error('需要 --seeds、--query-paper 或 --bench')
+
+    result = retriever.retrieve(query_vector, args.seeds, args.seed_k, args.seed_labels, **options)
+    payload = SubgraphRetriever.serialize(result)
+    print(f"✅ 子图: {len(result['nodes']['id'])} 个节点、{len(result['edges']['from'])} 条关系，"
+          f"{len(payload)} 字节{'（已截断）' if result['truncated'] else ''}")
+    print(payload.decode('utf-8')[:2000])
+
+
+if __name__ == '__main__':
+    main()
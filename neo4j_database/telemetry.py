@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线性能遥测
+- 各脚本用 phase() 标记子阶段（如 CSV 解析、编码、写出），记录耗时、CPU 时间、行数和读写字节数
+- main.py（pipeline.py）在进程内运行各步骤，直接读取 process_summary()；
+  单独运行脚本时可设置 KG_TELEMETRY_FILE，脚本退出时把子阶段数据和资源占用写入该文件，
+  未设置时只在内存中记录，不产生任何输出
+- start_profiler() 或 KG_PROFILE=cprofile:<文件> / sampling:<文件> 做 cProfile / 采样分析
+- main.py 汇总后写出 JSON 运行日志和 Prometheus textfile
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import resource
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List
+
+TELEMETRY_ENV = 'KG_TELEMETRY_FILE'
+PROFILE_ENV = 'KG_PROFILE'
+
+# 采样分析的采样间隔（秒）
+SAMPLING_INTERVAL = 0.005
+
+_phases: List[Dict] = []
+_counters = Counter()
+_stage_rows: Dict[str, int] = {}
+
+
+def read_io_counters() -> Dict[str, int]:
+    """进程累计读写字节数（Linux /proc/self/io 的 rchar / wchar），不可用时为空"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            fields = dict(line.split(':', 1) for line in f if ':' in line)
+        return {'bytes_read': int(fields['rchar']), 'bytes_written': int(fields['wchar'])}
+    except (OSError, KeyError, ValueError):
+        return {}
+
+
+def peak_rss_bytes() -> int:
+    """本进程峰值 RSS（Linux 下 ru_maxrss 单位为 KB，macOS 下为字节）"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+class Phase:
+    def __init__(self, name: str):
+        """一个子阶段的计量；rows_in / rows_out 由调用方在 with 块内填写"""
+        self.name = name
+        self.rows_in = 0
+        self.rows_out = 0
+
+    def to_dict(self, wall: float, cpu: float, io_before: Dict, io_after: Dict) -> Dict:
+        record = {
+            'phase': self.name,
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        for key in ('bytes_read', 'bytes_written'):
+            if key in io_before and key in io_after:
+                record[key] = io_after[key] - io_before[key]
+        if wall > 0 and self.rows_out:
+            record['rows_per_sec'] = round(self.rows_out / wall, 1)
+        return record
+
+
+@contextmanager
+def phase(name: str):
+    """记录一个子阶段：
+
+        with phase('parse') as p:
+            rows = ...
+            p.rows_out = len(rows)
+    """
+    current = Phase(name)
+    io_before = read_io_counters()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield current
+    finally:
+        _phases.append(current.to_dict(time.perf_counter() - start_wall,
+                                       time.process_time() - start_cpu,
+                                       io_before, read_io_counters()))
+
+
+def stage_rows(rows_in: int = None, rows_out: int = None):
+    """记录整个脚本的读入/输出行数（未记录时取各子阶段的最大值）"""
+    if rows_in is not None:
+        _stage_rows['rows_in'] = rows_in
+    if rows_out is not None:
+        _stage_rows['rows_out'] = rows_out
+
+
+def count(name: str, value: int = 1):
+    """累加一个自定义计数（如跳过的行数），随遥测一起输出"""
+    _counters[name] += value
+
+
+def phases() -> List[Dict]:
+    """本进程已记录的子阶段"""
+    return list(_phases)
+
+
+def process_summary() -> Dict:
+    """本进程的资源占用和子阶段汇总"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    summary = {
+        'pid': os.getpid(),
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 6),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'rows_in': _stage_rows.get('rows_in', max((p['rows_in'] for p in _phases), default=0)),
+        'rows_out': _stage_rows.get('rows_out', max((p['rows_out'] for p in _phases), default=0)),
+        'phases': list(_phases),
+        'counters': dict(_counters),
+    }
+    summary.update(read_io_counters())
+    return summary
+
+
+def _dump_telemetry(path: str):
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(process_summary(), f, ensure_ascii=False)
+    os.replace(tmp_file, path)
+
+
+class SamplingProfiler:
+    def __init__(self, output_file: str, interval: float = SAMPLING_INTERVAL):
+        """定时采样启动分析器的线程的调用栈，输出 collapsed stacks 格式（可直接用 flamegraph.pl 绘图）"""
+        self.output_file = output_file
+        self.interval = interval
+        self.stacks = Counter()
+        self.target_thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='kg-sampling-profiler', daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            for stack, samples in self.stacks.most_common():
+                f.write(f"{stack} {samples}\n")
+
+
+def start_profiler(kind: str, output_file: str):
+    """启动分析器（'cprofile' 或 'sampling'），返回停止并写出结果的函数"""
+    if kind == 'cprofile':
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def stop():
+            profiler.disable()
+            profiler.dump_stats(output_file)
+
+        return stop
+    if kind == 'sampling':
+        profiler = SamplingProfiler(output_file)
+        profiler.start()
+        return profiler.stop
+    raise ValueError(f"未知的分析方式: {kind}")
+
+
+def reset():
+    """清空已记录的子阶段和计数（同一进程中依次运行多个步骤时使用）"""
+    _phases.clear()
+    _counters.clear()
+    _stage_rows.clear()
+
+
+if os.getenv(PROFILE_ENV):
+    # KG_PROFILE=<cprofile|sampling>:<输出文件>，进程退出时写出结果
+    _kind, _, _output_file = os.environ[PROFILE_ENV].partition(':')
+    if _output_file:
+        atexit.register(start_profiler(_kind, _output_file))
+
+if os.getenv(TELEMETRY_ENV):
+    atexit.register(_dump_telemetry, os.environ[TELEMETRY_ENV])
+
+
+def prometheus_escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_prometheus_textfile(path: str, run: Dict):
+    """把一次运行的各步骤指标写成 Prometheus textfile（node_exporter textfile collector 格式）"""
+    stage_metrics = [
+        ('wall_seconds', 'kg_pipeline_stage_wall_seconds', '步骤耗时（秒）'),
+        ('cpu_seconds', 'kg_pipeline_stage_cpu_seconds', '步骤 CPU 时间（秒）'),
+        ('peak_rss_bytes', 'kg_pipeline_stage_peak_rss_bytes', '步骤峰值 RSS（字节）'),
+        ('rows_in', 'kg_pipeline_stage_rows_in', '步骤读入行数'),
+        ('rows_out', 'kg_pipeline_stage_rows_out', '步骤输出行数'),
+        ('bytes_read', 'kg_pipeline_stage_bytes_read', '步骤读取字节数'),
+        ('bytes_written', 'kg_pipeline_stage_bytes_written', '步骤写入字节数'),
+        ('rows_per_sec', 'kg_pipeline_stage_rows_per_second', '步骤吞吐（处理行/秒）'),
+        ('success', 'kg_pipeline_stage_success', '步骤是否成功（1/0）'),
+    ]
+    lines = []
+    for key, metric, help_text in stage_metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for stage in run['stages']:
+            value = stage.get(key)
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = int(value)
+            lines.append(f'{metric}{{stage="{prometheus_escape(stage["stage"])}"}} {value}')
+
+    lines.append("# HELP kg_pipeline_phase_wall_seconds 子阶段耗时（秒）")
+    lines.append("# TYPE kg_pipeline_phase_wall_seconds gauge")
+    for stage in run['stages']:
+        for item in stage.get('phases', []):
+            lines.append(f'kg_pipeline_phase_wall_seconds{{stage="{prometheus_escape(stage["stage"])}",'
+                         f'phase="{prometheus_escape(item["phase"])}"}} {item["wall_seconds"]}')
+
+    lines.append("# HELP kg_pipeline_last_run_timestamp_seconds 最近一次运行的结束时间")
+    lines.append("# TYPE kg_pipeline_last_run_timestamp_seconds gauge")
+    lines.append(f"kg_pipeline_last_run_timestamp_seconds {run['finished_at_unix']}")
+
+    # textfile collector 可能随时读取，先写临时文件再重命名
+    tmp_file = path + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_file, path)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+测试公用的夹具：把若干篇 standard.json 格式的论文转换为 CSV 目录
+"""
+
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.dirname(TESTS_DIR)
+PROJECT_ROOT = os.path.dirname(PACKAGE_DIR)
+sys.path.insert(0, os.path.join(PACKAGE_DIR, 'cypher_scripts'))
+sys.path.insert(0, PACKAGE_DIR)
+
+SCHEMA_FILE = os.path.join(PROJECT_ROOT, 'schema_v1.json')
+VOCAB_FILE = os.path.join(PROJECT_ROOT, 'vocabulary.json')
+
+
+def paper(number: int, datasets=(), methods=(), relations=(), year: int = 2020) -> dict:
+    """一篇最小的论文记录（relations 为 (类型, from, to[, value[, note]])，from 为 None 时为论文自身）"""
+    paper_id = f'paper_{number}'
+    record = {
+        'paper_id': paper_id, 'title': f'Paper {number}', 'doi': '', 'year': year,
+        'category': '分割', 'authors': [], 'tasks': [], 'imaging_modalities': [],
+        'anatomical_structures': [], 'methods': [{'name': name, 'type': ''} for name in methods],
+        'datasets': list(datasets), 'metrics': [], 'innovations': [], 'relations': [],
+    }
+    for dataset in datasets:
+        record['relations'].append({'type': 'USES_DATASET', 'from': paper_id, 'to': dataset})
+    for method in methods:
+        record['relations'].append({'type': 'PROPOSES_METHOD', 'from': paper_id, 'to': method})
+    names = set()
+    for rel_type, source, target, *rest in relations:
+        relation = {'type': rel_type, 'from': source or paper_id, 'to': target}
+        if rest:
+            relation['value'] = rest[0]
+        if len(rest) > 1:
+            relation['note'] = rest[1]
+        record['relations'].append(relation)
+        if rel_type in ('REPORTS_METRIC', 'ACHIEVES_METRIC') and target not in names:
+            names.add(target)
+            record['metrics'].append({'name': target, 'value': '', 'note': ''})
+    return record
+
+
+@pytest.fixture
+def build_csv(tmp_path):
+    """返回 build(papers, name='csv') -> CSV 目录：抽取并写出节点、按类型拆分的关系和指标提及"""
+    from json_to_csv import (extract_nodes_and_relations, write_nodes_csv, write_relations_csv,
+                             write_relations_by_type, write_metric_mentions)
+    from csv_layout import load_schema
+
+    def build(papers, name: str = 'csv') -> str:
+        csv_dir = str(tmp_path / name)
+        os.makedirs(csv_dir, exist_ok=True)
+        schema = load_schema(SCHEMA_FILE)
+        nodes, relations = extract_nodes_and_relations(papers, schema=schema)
+        write_nodes_csv(nodes, csv_dir)
+        write_relations_csv(relations, csv_dir)
+        write_relations_by_type(nodes, relations, schema, csv_dir)
+        write_metric_mentions(relations, csv_dir)
+        return csv_dir
+
+    return build
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+导入 -> 增量同步 -> 校验：同步后导入日志与数据库中的数量一致
+"""
+
+import os
+
+from conftest import SCHEMA_FILE, paper
+from csv_layout import NODE_FIELDS, load_schema, relation_csv_name
+from graph_sinks import SQLiteSink
+from graph_snapshot import build_snapshot
+from import_journal import ImportJournal
+from import_to_cloud import Neo4jImporter
+
+
+def snapshot(csv_dir, schema):
+    return build_snapshot(csv_dir, list(NODE_FIELDS), list(schema['relations']), relation_csv_name)
+
+
+def import_all(importer, csv_dir, schema):
+    """完整导入：所有节点文件，再按类型导入关系，返回新建数量之和"""
+    total = 0
+    for node_type in NODE_FIELDS:
+        total += importer.import_nodes(os.path.join(csv_dir, f'nodes_{node_type}.csv'), node_type)
+    for rel_type, rel_def in schema['relations'].items():
+        total += importer.import_relations(os.path.join(csv_dir, relation_csv_name(rel_type)),
+                                           rel_type, rel_def['from'], rel_def['to'])
+    return total
+
+
+def open_importer(tmp_path):
+    sink = SQLiteSink(str(tmp_path / 'graph.sqlite'))
+    journal = ImportJournal(str(tmp_path / 'import_journal.json'), sink.uri)
+    return Neo4jImporter(sink, journal)
+
+
+def test_verify_passes_after_sync(build_csv, tmp_path):
+    schema = load_schema(SCHEMA_FILE)
+    csv_dir = build_csv([
+        paper(1, datasets=['BraTS'], methods=['Net-A'], relations=[('REPORTS_METRIC', None, 'Dice', 0.91)]),
+        paper(2, datasets=['LiTS'], methods=['Net-B'], relations=[('REPORTS_METRIC', None, 'Dice', 0.85)]),
+    ])
+    importer = open_importer(tmp_path)
+    importer.create_constraints_and_indexes(schema)
+    assert import_all(importer, csv_dir, schema) > 0
+    old = snapshot(csv_dir, schema)
+    assert importer.verify_counts(schema)
+
+    # 删除论文 2（及只属于它的数据集、方法），新增论文 3，修改论文 1 的指标值
+    build_csv([
+        paper(1, datasets=['BraTS'], methods=['Net-A'], relations=[('REPORTS_METRIC', None, 'Dice', 0.93)]),
+        paper(3, datasets=['BraTS', 'KiTS'], methods=['Net-C'], relations=[('REPORTS_METRIC', None, 'HD95', 4.2)]),
+    ])
+    new = snapshot(csv_dir, schema)
+    summary = importer.sync(csv_dir, schema, old, new)
+    assert summary['nodes']['Paper'] == {'inserts': 1, 'updates': 0, 'deletes': 1}
+    assert importer.verify_counts(schema)
+
+    # 重新打开的日志与同步后的数据库一致，完整导入跳过所有已同步的文件
+    importer.close()
+    importer = open_importer(tmp_path)
+    assert importer.verify_counts(schema)
+    assert import_all(importer, csv_dir, schema) == 0
+    assert importer.sink.count_nodes('Paper') == 2
+    importer.close()
+
+
+def test_verify_passes_after_full_reimport_of_changed_csv(build_csv, tmp_path):
+    schema = load_schema(SCHEMA_FILE)
+    papers = [paper(number, datasets=[f'Dataset-{number}']) for number in (1, 2)]
+    csv_dir = build_csv(papers)
+    importer = open_importer(tmp_path)
+    importer.create_constraints_and_indexes(schema)
+    import_all(importer, csv_dir, schema)
+    assert importer.verify_counts(schema)
+
+    # 数据更新后完整导入：文件哈希变化，MERGE 只新建 1 篇论文
+    build_csv(papers + [paper(3, datasets=['Dataset-3'])])
+    import_all(importer, csv_dir, schema)
+    assert importer.sink.count_nodes('Paper') == 3
+    assert importer.journal.expected_counts('node')['Paper'] == 3
+    assert importer.journal.expected_counts('relation')['USES_DATASET'] == 3
+    assert importer.verify_counts(schema)
+    importer.close()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+关系端点匹配（按 schema 的端点标签，名称中包含词表术语的方法、数据集不会被匹配到词表节点）和关系 value
+"""
+
+import os
+import csv
+
+import pytest
+
+from conftest import SCHEMA_FILE, VOCAB_FILE, paper
+from csv_layout import load_schema
+from json_to_csv import extract_nodes_and_relations
+from vocab_normalizer import VocabularyNormalizer
+
+
+def extract(record):
+    nodes, relations = extract_nodes_and_relations([record], VocabularyNormalizer.from_file(VOCAB_FILE),
+                                                   schema=load_schema(SCHEMA_FILE))
+    names = {}
+    for node_type, table in nodes.items():
+        ids = table.column('id')
+        names.update((ids[row], (node_type, key)) for key, row in table.index.items())
+    return {(rel.type, names[rel.to_id]) for rel in relations}
+
+
+@pytest.fixture
+def record():
+    """有 CT、MRI 模态，分割任务和肺结构节点的论文"""
+    record = paper(1, datasets=['LIDC CT', '肺结节检测'], methods=['CT-Net', 'MRI Recon Net', '非分割'])
+    record['imaging_modalities'] = ['CT', 'MRI']
+    record['tasks'] = ['分割']
+    record['anatomical_structures'] = ['肺']
+    return record
+
+
+def test_method_and_dataset_names_containing_vocabulary_terms(record):
+    edges = extract(record)
+    assert ('PROPOSES_METHOD', ('Method', 'CT-Net')) in edges
+    assert ('PROPOSES_METHOD', ('Method', 'MRI Recon Net')) in edges
+    assert ('PROPOSES_METHOD', ('Method', '非分割')) in edges
+    assert ('USES_DATASET', ('Dataset', 'LIDC CT')) in edges
+    assert ('USES_DATASET', ('Dataset', '肺结节检测')) in edges
+    assert not any(label in ('Task', 'ImagingModality', 'AnatomicalStructure')
+                   for _, (label, _) in edges)
+
+
+def test_vocabulary_endpoints_still_use_aliases(record):
+    record['relations'] += [
+        {'type': 'USES_MODALITY', 'from': 'paper_1', 'to': 'CT'},
+        {'type': 'ADDRESSES_TASK', 'from': 'paper_1', 'to': '图像分割'},
+        {'type': 'FOCUSES_ON_STRUCTURE', 'from': 'paper_1', 'to': '肺'},
+        {'type': 'APPLIED_TO_MODALITY', 'from': 'MRI Recon Net', 'to': 'MRI'},
+    ]
+    edges = extract(record)
+    assert ('USES_MODALITY', ('ImagingModality', 'CT(计算机断层)')) in edges
+    assert ('ADDRESSES_TASK', ('Task', '分割')) in edges
+    assert ('FOCUSES_ON_STRUCTURE', ('AnatomicalStructure', '肺')) in edges
+    assert ('APPLIED_TO_MODALITY', ('ImagingModality', 'MRI(磁共振)')) in edges
+
+
+def test_zero_value_is_kept(build_csv):
+    csv_dir = build_csv([
+        paper(1, relations=[('REPORTS_METRIC', None, 'HD95', 0)]),
+        paper(2, methods=['Net-A'], relations=[('ACHIEVES_METRIC', 'Net-A', 'HD95', 0.0),
+                                               ('ACHIEVES_METRIC', 'Net-A', 'HD95', 1.5)]),
+    ])
+    with open(os.path.join(csv_dir, 'relations.csv'), 'r', encoding='utf-8') as f:
+        rows = {row['type']: row for row in csv.DictReader(f) if row['type'].endswith('_METRIC')}
+    assert rows['REPORTS_METRIC']['value'] == '0'
+    assert rows['ACHIEVES_METRIC']['value'] == '0.0'
+    assert (rows['ACHIEVES_METRIC']['value_min'], rows['ACHIEVES_METRIC']['value_max']) == ('0.0', '1.5')
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+排行榜：同一指标在同一篇论文的两个数据集上有不同的数值
+"""
+
+from conftest import VOCAB_FILE, paper
+from leaderboard import build_leaderboard, write_leaderboard, Leaderboard
+
+
+def open_board(csv_dir, tmp_path):
+    info, arrays = build_leaderboard(csv_dir, VOCAB_FILE)
+    path = str(tmp_path / 'leaderboard.bin')
+    write_leaderboard(path, info, arrays)
+    return info, Leaderboard(path)
+
+
+def test_same_metric_on_two_datasets_is_attributed_by_note(build_csv, tmp_path):
+    csv_dir = build_csv([
+        paper(1, datasets=['BraTS', 'LiTS'], methods=['Net-A'], relations=[
+            ('REPORTS_METRIC', None, 'Dice', 0.91, 'BraTS 上的结果'),
+            ('REPORTS_METRIC', None, 'Dice', 0.85, 'LiTS 上的结果'),
+        ]),
+        paper(2, datasets=['BraTS'], methods=['Net-B'], relations=[
+            ('REPORTS_METRIC', None, 'Dice', 0.88),
+        ]),
+        # 两个数据集且 note 没有指明：无法确定数据集，跳过
+        paper(3, datasets=['BraTS', 'LiTS'], methods=['Net-C'], relations=[
+            ('REPORTS_METRIC', None, 'Dice', 0.99),
+        ]),
+    ])
+    info, board = open_board(csv_dir, tmp_path)
+    with board:
+        brats = board.top('BraTS', 'Dice')
+        lits = board.top('LiTS', 'Dice')
+
+    assert [(entry['value'], entry['method']) for entry in brats] == [(0.91, 'Net-A'), (0.88, 'Net-B')]
+    assert [(entry['value'], entry['method']) for entry in lits] == [(0.85, 'Net-A')]
+    assert info['unattributed_mentions'] == 1
+
+
+def test_method_mentions_use_their_own_values(build_csv, tmp_path):
+    csv_dir = build_csv([
+        paper(1, datasets=['BraTS', 'LiTS'], methods=['Net-A', 'Net-B'], relations=[
+            ('REPORTS_METRIC', None, 'Dice', 0.9),
+            ('ACHIEVES_METRIC', 'Net-A', 'Dice', 0.9, 'BraTS'),
+            ('ACHIEVES_METRIC', 'Net-B', 'Dice', 0.7, 'BraTS'),
+            ('ACHIEVES_METRIC', 'Net-B', 'Dice', 0.6, 'LiTS'),
+        ]),
+    ])
+    _, board = open_board(csv_dir, tmp_path)
+    with board:
+        brats = board.top('BraTS', 'Dice')
+        lits = board.top('LiTS', 'Dice')
+
+    # 论文级的 0.9 不再记给 Net-B；Net-B 的两个数值各自属于自己的数据集
+    assert [(entry['value'], entry['method']) for entry in brats] == [(0.9, 'Net-A'), (0.7, 'Net-B')]
+    assert [(entry['value'], entry['method']) for entry in lits] == [(0.6, 'Net-B')]
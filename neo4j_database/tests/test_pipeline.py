@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+流水线：输入摘要在步骤启动前计算，运行期间被其他步骤改写的输入不会被记为已读取
+"""
+
+from pipeline import DagExecutor, Step
+
+# 读取 data.txt 写出 report.txt，运行期间 data.txt 被改写（模拟并行步骤写入同一 glob 匹配的文件）
+SCRIPT = '''
+def main(argv):
+    data, report = argv
+    with open(data, 'r') as f:
+        content = f.read()
+    with open(report, 'w') as f:
+        f.write(content)
+    with open(data, 'a') as f:
+        f.write('written by another step\\n')
+'''
+
+
+def test_inputs_changed_during_step_are_not_recorded(tmp_path):
+    script = tmp_path / 'reader.py'
+    script.write_text(SCRIPT)
+    data, report = tmp_path / 'data.txt', tmp_path / 'report.txt'
+    data.write_text('v1\n')
+    step = Step('reader', 'reader', str(script), args=[str(data), str(report)],
+                inputs=[str(data)], outputs=[str(report)])
+
+    def run():
+        executor = DagExecutor([step], str(tmp_path / 'state.json'))
+        return executor.run()[0]['status'], executor.state
+
+    status, state = run()
+    assert status == 'succeeded'
+    # 上次运行读到的是 v1，data.txt 已变化，必须重跑
+    assert not state.is_up_to_date(step)
+    status, _ = run()
+    assert status == 'succeeded'
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+子图检索加载：关系 value 保留原文（如 "65.2%"），不是数值时记为 NaN
+"""
+
+import math
+
+from conftest import paper
+from subgraph import SubgraphRetriever
+
+
+def test_load_keeps_non_numeric_values_as_nan(build_csv):
+    csv_dir = build_csv([
+        paper(1, relations=[('REPORTS_METRIC', None, 'Accuracy', '65.2%')]),
+        paper(2, relations=[('REPORTS_METRIC', None, 'Accuracy', 0.7)]),
+    ])
+    retriever = SubgraphRetriever.load(csv_dir)
+    values = sorted(retriever.edge_values.tolist(), key=math.isnan)
+    assert values[0] == 0.7
+    assert math.isnan(values[1])
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Embedding 列的解析与向量索引配置检测
+- CSV 中的 embedding 为逗号分隔的浮点数，空字符串表示没有 embedding
+- 根据数据检测向量维度和相似度函数，用于创建 Neo4j 向量索引
+"""
+
+import os
+import csv
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+# 判断向量已 L2 归一化的容差
+NORM_TOLERANCE = 1e-3
+
+
+def parse_embedding(value: str) -> Optional[List[float]]:
+    """解析 CSV 中的 embedding 字符串，空值返回 None"""
+    if not value or not value.strip():
+        return None
+    return [float(x) for x in value.split(',')]
+
+
+class VectorStats:
+    def __init__(self):
+        """累计一组向量的维度分布和归一化情况"""
+        self.dimensions = Counter()
+        self.empty = 0
+        self.unnormalized = 0
+
+    def add(self, vector: Optional[List[float]]):
+        """记录一个向量（None 表示空 embedding）"""
+        if vector is None:
+            self.empty += 1
+            return
+        self.dimensions[len(vector)] += 1
+        norm = math.sqrt(sum(x * x for x in vector))
+        if abs(norm - 1.0) > NORM_TOLERANCE:
+            self.unnormalized += 1
+
+    @property
+    def dimension(self) -> Optional[int]:
+        """出现最多的维度；没有向量时为 None"""
+        if not self.dimensions:
+            return None
+        return self.dimensions.most_common(1)[0][0]
+
+    @property
+    def similarity_function(self) -> str:
+        """向量均已 L2 归一化时使用 cosine，否则使用 euclidean（保留向量长度信息）"""
+        return 'cosine' if self.unnormalized == 0 else 'euclidean'
+
+    def summary(self) -> Dict:
+        """用于打印和报告的摘要"""
+        return {
+            'vectors': sum(self.dimensions.values()),
+            'empty': self.empty,
+            'dimension': self.dimension,
+            'dimensions': dict(self.dimensions),
+            'similarity_function': self.similarity_function,
+        }
+
+
+def scan_embedding_csv(csv_file: str, sample_size: int = 1000) -> VectorStats:
+    """扫描节点 CSV 的 embedding 列
+
+    所有行都统计维度（只数逗号，不解析），归一化只检查前 sample_size 个向量。
+    """
+    stats = VectorStats()
+    if not os.path.exists(csv_file):
+        return stats
+
+    sampled = 0
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            value = row.get('embedding', '')
+            if not value or not value.strip():
+                stats.empty += 1
+            elif sampled < sample_size:
+                stats.add(parse_embedding(value))
+                sampled += 1
+            else:
+                stats.dimensions[value.count(',') + 1] += 1
+    return stats
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词表规范化引擎
+从 vocabulary.json 一次性编译，在抽取节点时把任务、模态、解剖结构、方法类型、创新类型
+规范为词表中的标准值：
+1. 精确匹配：词表值、mapping_rules 的键、可选的 aliases
+2. 折叠后匹配：NFKC（全角转半角）+ 大小写折叠 + 空白归一，适用于中英文混排
+3. 别名检测：Aho-Corasick 多模式匹配，在文本中找到指向唯一标准值的别名
+   （如 "低剂量CT重建" 中的 "CT"）
+结果按原始字符串缓存，重复出现的取值只需一次字典查找。无法规范的取值保留原文并计入 OOV 统计。
+"""
+
+import re
+import json
+import unicodedata
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+# 词表字段 -> 节点类型 / 论文字段
+VOCAB_FIELDS = {
+    'task': 'Task',
+    'modality': 'ImagingModality',
+    'structure': 'AnatomicalStructure',
+    'method_type': None,
+    'innovation_type': None,
+}
+NODE_TYPE_FIELDS = {node_type: field for field, node_type in VOCAB_FIELDS.items() if node_type}
+
+# 别名最短长度（折叠后）：过短的拉丁别名（如单个字母）容易误匹配
+MIN_LATIN_ALIAS_LENGTH = 2
+
+_WHITESPACE = re.compile(r'\s+')
+# "CT(计算机断层)" -> ("CT", "计算机断层")
+_PAREN_ALIAS = re.compile(r'^(.+?)\s*\((.+)\)$')
+
+
+def fold(text: str) -> str:
+    """折叠：NFKC（全角字母、数字、括号转半角）、大小写折叠、空白归一"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def derived_aliases(value: str) -> List[str]:
+    """从标准值推导别名：括号内外各为一个别名，如 "MRI(磁共振)" -> ["MRI", "磁共振"]"""
+    match = _PAREN_ALIAS.match(unicodedata.normalize('NFKC', value))
+    if not match:
+        return []
+    return [part.strip() for part in match.groups() if part.strip()]
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Dict[str, str]):
+        """多模式匹配自动机；patterns 为 模式 -> 标准值"""
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[Tuple[int, str]]] = [[]]
+
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            self.output[state].append((len(pattern), value))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """返回所有匹配 (起始位置, 长度, 标准值)"""
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, value in self.output[state]:
+                matches.append((index - length + 1, length, value))
+        return matches
+
+
+class FieldNormalizer:
+    def __init__(self, field: str, spec: Dict):
+        """编译一个词表字段：精确映射、折叠映射和别名自动机"""
+        self.field = field
+        self.values = list(spec.get('values', []))
+        value_set = set(self.values)
+
+        self.exact: Dict[str, str] = {value: value for value in self.values}
+        for source, target in spec.get('mapping_rules', {}).items():
+            # 目标不是单个词表值的规则（如 "PET(正电子发射) 或 SPECT(单光子发射)"）有歧义，不自动映射
+            if target in value_set:
+                self.exact.setdefault(source, target)
+        for alias, target in spec.get('aliases', {}).items():
+            if target in value_set:
+                self.exact.setdefault(alias, target)
+
+        self.folded: Dict[str, str] = {}
+        for source, target in self.exact.items():
+            self.folded.setdefault(fold(source), target)
+
+        # 别名：折叠后的标准值、推导别名和显式别名；指向多个标准值的别名丢弃
+        alias_targets: Dict[str, set] = {}
+        for value in self.values:
+            for alias in [value] + derived_aliases(value):
+                alias_targets.setdefault(fold(alias), set()).add(value)
+        for source, target in self.exact.items():
+            alias_targets.setdefault(fold(source), set()).add(target)
+        patterns = {}
+        for alias, targets in alias_targets.items():
+            if len(targets) != 1 or not alias:
+                continue
+            if alias.isascii() and len(alias) < MIN_LATIN_ALIAS_LENGTH:
+                continue
+            patterns[alias] = next(iter(targets))
+        self.automaton = AhoCorasick(patterns)
+
+        # 原始字符串 -> (标准值或 None, 匹配方式)
+        self.cache: Dict[str, Tuple[Optional[str], str]] = {}
+        self.hits = Counter()
+        self.oov = Counter()
+
+    def match_alias(self, folded: str) -> Optional[str]:
+        """在折叠后的文本中找别名
+
+        拉丁别名要求词边界；被更长匹配包含的匹配忽略（"左肺动脉" 取 "肺动脉" 而不是 "肺"）；
+        剩余匹配都指向同一标准值时才采用。
+        """
+        spans = []
+        for start, length, value in self.automaton.find(folded):
+            end = start + length
+            if folded[start:end].isascii():
+                if start > 0 and folded[start - 1].isascii() and folded[start - 1].isalnum():
+                    continue
+                if end < len(folded) and folded[end].isascii() and folded[end].isalnum():
+                    continue
+            spans.append((start, end, value))
+        targets = {value for start, end, value in spans
+                   if not any(s <= start and end <= e and (s, e) != (start, end) for s, e, _ in spans)}
+        return targets.pop() if len(targets) == 1 else None
+
+    def normalize(self, raw: str) -> Tuple[Optional[str], str]:
+        """返回 (标准值或 None, 匹配方式)；匹配方式为 exact / folded / alias / oov"""
+        value = raw.strip()
+        if value in self.exact:
+            return self.exact[value], 'exact'
+        folded = fold(value)
+        if folded in self.folded:
+            return self.folded[folded], 'folded'
+        alias = self.match_alias(folded)
+        if alias is not None:
+            return alias, 'alias'
+        return None, 'oov'
+
+    def canonical(self, raw: str) -> str:
+        """规范后的取值；无法规范时返回去除首尾空白的原文（计入 OOV）"""
+        cached = self.cache.get(raw)
+        if cached is None:
+            cached = self.cache[raw] = self.normalize(raw)
+        result, kind = cached
+        if result is None:
+            self.oov[raw.strip()] += 1
+            return raw.strip()
+        self.hits[kind] += 1
+        return result
+
+
+class VocabularyNormalizer:
+    def __init__(self, vocabulary: Dict):
+        """从 vocabulary.json 的内容编译所有字段"""
+        self.fields = {field: FieldNormalizer(field, vocabulary[field])
+                       for field in VOCAB_FIELDS if field in vocabulary}
+
+    @classmethod
+    def from_file(cls, vocab_file: str) -> 'VocabularyNormalizer':
+        with open(vocab_file, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def canonical(self, field: str, raw: str) -> str:
+        """规范一个字段取值；字段不在词表中时只去除首尾空白"""
+        if not raw:
+            return ''
+        normalizer = self.fields.get(field)
+        return normalizer.canonical(raw) if normalizer else raw.strip()
+
+    def lookup(self, field: str, raw: str) -> str:
+        """同 canonical，但不计入统计（用于关系端点匹配，避免重复计数）"""
+        normalizer = self.fields.get(field)
+        if not raw or normalizer is None:
+            return raw.strip() if raw else ''
+        cached = normalizer.cache.get(raw)
+        if cached is None:
+            cached = normalizer.cache[raw] = normalizer.normalize(raw)
+        result = cached[0]
+        return raw.strip() if result is None else result
+
+    def report(self, top: int = 20) -> Dict:
+        """各字段的匹配方式统计和出现最多的 OOV 取值"""
+        return {
+            field: {
+                'matched': dict(normalizer.hits),
+                'oov_total': sum(normalizer.oov.values()),
+                'oov_distinct': len(normalizer.oov),
+                'oov_top': normalizer.oov.most_common(top),
+            }
+            for field, normalizer in self.fields.items()
+        }